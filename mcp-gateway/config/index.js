@@ -33,13 +33,45 @@ const config = {
     expiresIn: process.env.JWT_EXPIRES_IN || '1h',
   },
   
+  // 認証設定
+  auth: {
+    // 認証済みユーザー (プリンシパル) のキャッシュ件数と有効期間 (秒)
+    principalCacheSize: parseInt(process.env.PRINCIPAL_CACHE_SIZE, 10) || 10000,
+    principalCacheTtl: parseInt(process.env.PRINCIPAL_CACHE_TTL, 10) || 60,
+  },
+  
   // SCIM設定
   scim: {
     path: process.env.SCIM_PATH || '/scim/v2',
     auth: {
       type: 'bearer',
       token: process.env.SCIM_AUTH_TOKEN || 'your_secure_token',
-    }
+    },
+    // コンパイル済みフィルター式のキャッシュ件数
+    filterCacheSize: parseInt(process.env.SCIM_FILTER_CACHE_SIZE, 10) || 1000,
+  },
+  
+  // アクセスログ設定
+  accessLog: {
+    // insertMany で一括保存する件数と間隔 (ミリ秒)
+    batchSize: parseInt(process.env.ACCESS_LOG_BATCH_SIZE, 10) || 500,
+    flushInterval: parseInt(process.env.ACCESS_LOG_FLUSH_INTERVAL, 10) || 1000,
+    // メモリ上に溜める上限 (超えた分は退避ファイルに書き出す)
+    maxQueue: parseInt(process.env.ACCESS_LOG_MAX_QUEUE, 10) || 10000,
+    // 退避ファイル (空文字の場合は退避せずに破棄する)
+    spillFile: process.env.ACCESS_LOG_SPILL_FILE ?? path.join(__dirname, '../logs', 'access-log-spill.jsonl'),
+  },
+  
+  // 利用統計設定
+  stats: {
+    // メモリ上の統計をデータベースの件数と照合する間隔 (秒)
+    reconcileInterval: parseInt(process.env.STATS_RECONCILE_INTERVAL, 10) || 300,
+  },
+  
+  // モデルカタログ設定
+  modelCatalog: {
+    // モデル定義を再読み込みする間隔 (秒)
+    refreshInterval: parseInt(process.env.MODEL_CATALOG_REFRESH_INTERVAL, 10) || 60,
   },
   
   // ログ設定
@@ -51,6 +83,19 @@ const config = {
   // モックAIモデル設定
   mockAi: {
     url: process.env.MOCK_AI_URL || 'http://localhost:3001',
+  },
+  
+  // 上流 (AIバックエンド) への接続設定 (バックエンドごとに適用)
+  upstream: {
+    // 同時実行数の上限 (キープアライブ接続数の上限を兼ねる)
+    maxConcurrent: parseInt(process.env.UPSTREAM_MAX_CONCURRENT, 10) || 64,
+    // 上限に達している間に待機できる件数と時間 (ミリ秒)
+    maxQueue: parseInt(process.env.UPSTREAM_MAX_QUEUE, 10) || 256,
+    queueTimeout: parseInt(process.env.UPSTREAM_QUEUE_TIMEOUT, 10) || 5000,
+    // 再利用のために保持するアイドル接続数
+    maxFreeSockets: parseInt(process.env.UPSTREAM_MAX_FREE_SOCKETS, 10) || 16,
+    // 応答までの時間とストリーミング中の無通信時間の上限 (ミリ秒)
+    timeout: parseInt(process.env.UPSTREAM_TIMEOUT, 10) || 30000,
   }
 };
 
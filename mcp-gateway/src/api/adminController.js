@@ -7,6 +7,9 @@ const User = require('../models/User');
 const Model = require('../models/Model');
 const AccessLog = require('../models/AccessLog');
 const logger = require('../utils/logger');
+const { accessLogWriter } = require('../utils/accessLogWriter');
+const { usageStats } = require('../utils/usageStats');
+const upstreamClient = require('../utils/upstreamClient');
 
 /**
  * ユーザー一覧を取得
@@ -159,64 +162,22 @@ const getLogs = async (req, res) => {
  */
 const getStats = async (req, res) => {
   try {
-    // ユーザー統計
-    const totalUsers = await User.countDocuments();
-    const activeUsers = await User.countDocuments({ active: true });
-    const adminUsers = await User.countDocuments({ systemRole: 'admin' });
-    
-    // アクセスレベル別ユーザー数
-    const basicUsers = await User.countDocuments({ accessTier: 'basic' });
-    const advancedUsers = await User.countDocuments({ accessTier: 'advanced' });
-    const adminTierUsers = await User.countDocuments({ accessTier: 'admin' });
-    
-    // モデル統計
-    const totalModels = await Model.countDocuments();
-    const activeModels = await Model.countDocuments({ active: true });
-    
-    // モデルタイプ別カウント
-    const textModels = await Model.countDocuments({ type: 'text' });
-    const imageModels = await Model.countDocuments({ type: 'image' });
-    
-    // ログ統計
-    const totalLogs = await AccessLog.countDocuments();
-    const successLogs = await AccessLog.countDocuments({ status: 'success' });
-    const errorLogs = await AccessLog.countDocuments({ status: 'error' });
-    
-    // 直近30日間のアクティビティ
-    const thirtyDaysAgo = new Date();
-    thirtyDaysAgo.setDate(thirtyDaysAgo.getDate() - 30);
-    
-    const recentLogs = await AccessLog.countDocuments({
-      requestTime: { $gte: thirtyDaysAgo }
-    });
+    // メモリ上の統計 (SCIM・モデル定義の変更とアクセスログの保存で更新し、定期的に照合する)
+    const stats = await usageStats.snapshot();
     
     res.status(200).json({
       success: true,
       stats: {
-        users: {
-          total: totalUsers,
-          active: activeUsers,
-          admins: adminUsers,
-          byAccessLevel: {
-            basic: basicUsers,
-            advanced: advancedUsers,
-            admin: adminTierUsers
-          }
-        },
-        models: {
-          total: totalModels,
-          active: activeModels,
-          byType: {
-            text: textModels,
-            image: imageModels
-          }
-        },
+        users: stats.users,
+        models: stats.models,
         logs: {
-          total: totalLogs,
-          success: successLogs,
-          error: errorLogs,
-          last30Days: recentLogs
-        }
+          ...stats.logs,
+          // 保存待ちのキューの件数と退避・破棄した件数
+          writer: accessLogWriter.stats()
+        },
+        // AIバックエンドごとの同時実行数と接続プールの状態
+        upstream: upstreamClient.stats(),
+        reconciledAt: stats.reconciledAt
       }
     });
     
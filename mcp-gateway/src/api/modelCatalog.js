@@ -0,0 +1,173 @@
+/**
+ * モデルカタログ
+ * 有効なモデル定義をメモリ上に保持し、アクセスレベルごとに参照可能なモデルの一覧を事前に求める
+ * (モデル一覧の取得とアクセス権限の検証でデータベースを検索しない)
+ */
+
+const Model = require('../models/Model');
+const config = require('../../config');
+const logger = require('../utils/logger');
+const { canAccessModel } = require('../auth/principalCache');
+
+const ACCESS_LEVELS = Object.keys(Model.LEVEL_RANK);
+
+// 現在のカタログ (再構築のたびに置き換える)
+let catalog = null;
+let loading = null;
+let dirty = false;
+let timer = null;
+
+// プリンシパルごとの参照可能なモデル一覧 (カタログの再構築またはプリンシパルの破棄で無効になる)
+let visibleCache = new WeakMap();
+
+/**
+ * モデル定義からカタログを構築
+ * @param {Array} models - 有効なモデル定義 (lean() の結果)
+ * @returns {Object} byId (ID → モデル), byLevel (アクセスレベル → モデル一覧)
+ */
+const buildCatalog = (models) => {
+  const byId = new Map();
+  const byLevel = new Map(ACCESS_LEVELS.map(level => [level, []]));
+
+  models.forEach((model, position) => {
+    const entry = Object.freeze({
+      id: model.id,
+      type: model.type,
+      requiredLevel: model.requiredLevel || 'basic',
+      apiEndpoint: model.apiEndpoint,
+      position,
+      // モデル一覧のレスポンスに含める項目
+      summary: Object.freeze({
+        id: model.id,
+        name: model.name,
+        description: model.description,
+        type: model.type,
+        parameters: model.parameters
+      })
+    });
+    byId.set(entry.id, entry);
+    ACCESS_LEVELS.forEach(level => {
+      if (level === 'admin' || Model.isLevelSufficient(level, entry.requiredLevel)) {
+        byLevel.get(level).push(entry);
+      }
+    });
+  });
+
+  return { byId, byLevel, loadedAt: new Date() };
+};
+
+/**
+ * データベースからカタログを再構築
+ * 実行中に変更された場合は完了後にもう一度読み込む
+ * @returns {Promise<void>}
+ */
+const reload = () => {
+  if (loading) {
+    dirty = true;
+    return loading;
+  }
+  loading = (async () => {
+    do {
+      dirty = false;
+      const models = await Model.find({ active: true }).lean();
+      catalog = buildCatalog(models);
+      visibleCache = new WeakMap();
+      logger.debug(`モデルカタログを再構築しました: ${models.length}件`);
+    } while (dirty);
+  })().finally(() => {
+    loading = null;
+  });
+  return loading;
+};
+
+/**
+ * カタログを取得（未読み込みの場合は読み込みを待つ）
+ * @returns {Promise<Object>} カタログ
+ */
+const getCatalog = async () => {
+  if (!catalog) {
+    await reload();
+  }
+  return catalog;
+};
+
+/**
+ * プリンシパルが参照可能なモデルの一覧
+ * アクセスレベルで参照可能なモデルに、許可リストのモデルを定義順に加える
+ * @param {Object} principal - プリンシパル
+ * @param {string} [type] - モデルタイプで絞り込む場合のタイプ
+ * @returns {Promise<Array>} モデル一覧のレスポンス項目
+ */
+const listVisible = async (principal, type) => {
+  const current = await getCatalog();
+  let visible = visibleCache.get(principal);
+  if (!visible || visible.catalog !== current) {
+    const entries = current.byLevel.get(principal.accessTier) || [];
+    let models = entries;
+    const extras = principal.allowedModels
+      .map(id => current.byId.get(id))
+      .filter(entry => entry && !Model.isLevelSufficient(principal.accessTier, entry.requiredLevel));
+    if (extras.length > 0 && principal.accessTier !== 'admin') {
+      models = [...entries, ...new Set(extras)].sort((a, b) => a.position - b.position);
+    }
+    visible = { catalog: current, all: models.map(entry => entry.summary), byType: new Map() };
+    visibleCache.set(principal, visible);
+  }
+  if (!type) {
+    return visible.all;
+  }
+  if (!visible.byType.has(type)) {
+    visible.byType.set(type, visible.all.filter(model => model.type === type));
+  }
+  return visible.byType.get(type);
+};
+
+/**
+ * 有効なモデル定義を取得
+ * @param {string} modelId - モデルID
+ * @returns {Promise<Object|undefined>} モデル定義（存在しないか無効な場合は undefined）
+ */
+const getModel = async (modelId) => (await getCatalog()).byId.get(modelId);
+
+/**
+ * プリンシパルがモデルにアクセスできるか
+ * @param {Object} principal - プリンシパル
+ * @param {Object} model - getModel で取得したモデル定義
+ * @returns {boolean} 許可リストに含まれるか、アクセスレベルが必要なレベル以上の場合は true
+ */
+const canAccess = (principal, model) => (
+  canAccessModel(principal, model.id) || Model.isLevelSufficient(principal.accessTier, model.requiredLevel)
+);
+
+/**
+ * カタログを読み込み、定期的な再読み込みを開始
+ * (このプロセス外での変更は定期的な再読み込みで反映する)
+ * @returns {Promise<void>}
+ */
+const start = () => {
+  if (!timer) {
+    timer = setInterval(() => {
+      reload().catch(error => {
+        logger.error(`モデルカタログの再構築エラー: ${error.message}`);
+      });
+    }, config.modelCatalog.refreshInterval * 1000);
+    timer.unref();
+  }
+  return reload();
+};
+
+// このプロセスでのモデル定義の変更は直ちに反映する
+Model.changes.on('change', () => {
+  reload().catch(error => {
+    logger.error(`モデルカタログの再構築エラー: ${error.message}`);
+  });
+});
+
+module.exports = {
+  buildCatalog,
+  reload,
+  listVisible,
+  getModel,
+  canAccess,
+  start
+};
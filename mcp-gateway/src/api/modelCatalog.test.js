@@ -0,0 +1,135 @@
+/**
+ * モデルカタログのテスト
+ */
+
+jest.mock('../utils/logger', () => ({ debug: jest.fn(), info: jest.fn(), warn: jest.fn(), error: jest.fn() }));
+jest.mock('../utils/accessLogWriter', () => ({ accessLogWriter: { write: jest.fn() } }));
+
+const Model = require('../models/Model');
+const { toPrincipal } = require('../auth/principalCache');
+const { accessLogWriter } = require('../utils/accessLogWriter');
+const modelCatalog = require('./modelCatalog');
+const { textCompletion, imageGeneration } = require('./modelController');
+
+const MODELS = [
+  { id: 'text-basic', name: 'Text Basic', type: 'text', requiredLevel: 'basic' },
+  { id: 'text-advanced', name: 'Text Advanced', type: 'text', requiredLevel: 'advanced' },
+  { id: 'image-basic', name: 'Image Basic', type: 'image' },
+  { id: 'image-admin', name: 'Image Admin', type: 'image', requiredLevel: 'admin' },
+  { id: 'text-legacy', name: 'Text Legacy', type: 'text', requiredLevel: 'basic', active: false }
+];
+
+/**
+ * Model.find({ active: true }).lean() を置き換える
+ * @param {Array} models - モデル定義 (active を省略した場合は有効)
+ */
+const stubModels = (models) => jest.spyOn(Model, 'find').mockImplementation((query) => ({
+  lean: async () => models.filter(model => (model.active ?? true) === query.active)
+}));
+
+const principal = (accessTier, allowedModels = []) => toPrincipal({ id: `user-${accessTier}`, userName: accessTier, accessTier, allowedModels });
+
+const ids = (models) => models.map(model => model.id);
+
+beforeEach(async () => {
+  jest.restoreAllMocks();
+  accessLogWriter.write.mockClear();
+  stubModels(MODELS);
+  await modelCatalog.reload();
+});
+
+describe('buildCatalog', () => {
+  test('アクセスレベルごとに参照可能なモデルを定義順に求める', () => {
+    const catalog = modelCatalog.buildCatalog(MODELS.filter(model => model.active !== false));
+
+    expect(ids(catalog.byLevel.get('basic'))).toEqual(['text-basic', 'image-basic']);
+    expect(ids(catalog.byLevel.get('advanced'))).toEqual(['text-basic', 'text-advanced', 'image-basic']);
+    expect(ids(catalog.byLevel.get('admin'))).toEqual(['text-basic', 'text-advanced', 'image-basic', 'image-admin']);
+    expect(catalog.byId.get('image-basic').requiredLevel).toBe('basic');
+    expect(catalog.byId.get('text-advanced').summary).toEqual({
+      id: 'text-advanced', name: 'Text Advanced', description: undefined, type: 'text', parameters: undefined
+    });
+  });
+});
+
+describe('listVisible', () => {
+  test('アクセスレベルで参照可能なモデルを返し、タイプで絞り込める', async () => {
+    const user = principal('basic');
+
+    expect(ids(await modelCatalog.listVisible(user))).toEqual(['text-basic', 'image-basic']);
+    expect(ids(await modelCatalog.listVisible(user, 'image'))).toEqual(['image-basic']);
+    expect(await modelCatalog.listVisible(user, 'image')).toBe(await modelCatalog.listVisible(user, 'image'));
+  });
+
+  test('許可リストのモデルを重複なく定義順に加え、存在しないモデルと無効なモデルは除く', async () => {
+    const user = principal('basic', ['image-admin', 'text-advanced', 'text-basic', 'missing', 'text-legacy', 'image-admin']);
+
+    expect(ids(await modelCatalog.listVisible(user))).toEqual(['text-basic', 'text-advanced', 'image-basic', 'image-admin']);
+    expect(ids(await modelCatalog.listVisible(user, 'text'))).toEqual(['text-basic', 'text-advanced']);
+  });
+
+  test('カタログを再構築した場合はプリンシパルごとの一覧を作り直す', async () => {
+    const user = principal('advanced');
+    const before = await modelCatalog.listVisible(user, 'text');
+    expect(ids(before)).toEqual(['text-basic', 'text-advanced']);
+    expect(await modelCatalog.listVisible(user, 'text')).toBe(before);
+
+    stubModels([...MODELS.slice(1), { id: 'text-new', type: 'text', requiredLevel: 'advanced' }]);
+    Model.changes.emit('change');
+    await modelCatalog.reload();
+
+    expect(ids(await modelCatalog.listVisible(user, 'text'))).toEqual(['text-advanced', 'text-new']);
+    expect(await modelCatalog.getModel('text-basic')).toBeUndefined();
+  });
+});
+
+describe('モデルの実行時のアクセス検証', () => {
+  const request = (user, modelId) => ({ user, params: { modelId }, body: { prompt: 'hi' }, headers: {} });
+
+  const call = async (handler, user, modelId) => {
+    const res = {};
+    res.status = jest.fn(() => res);
+    res.json = jest.fn(() => res);
+    await handler(request(user, modelId), res);
+    return { status: res.status.mock.calls[0][0], body: res.json.mock.calls[0][0] };
+  };
+
+  test('textCompletion は無効なモデルを許可リストに含まれていても 404 で拒否する', async () => {
+    const { status, body } = await call(textCompletion, principal('admin', ['text-legacy']), 'text-legacy');
+
+    expect(status).toBe(404);
+    expect(body.error).toBe('MODEL_001');
+    expect(accessLogWriter.write).toHaveBeenCalledWith(expect.objectContaining({ modelId: 'text-legacy', status: 'error' }));
+  });
+
+  test('textCompletion はアクセスレベルが不足するモデルを 403 で拒否する', async () => {
+    const { status, body } = await call(textCompletion, principal('basic'), 'text-advanced');
+
+    expect(status).toBe(403);
+    expect(body.error).toBe('ACCESS_001');
+    expect(accessLogWriter.write.mock.calls[0][0].errorMessage).toBe('このモデルへのアクセス権限がありません');
+  });
+
+  test('imageGeneration は無効なモデルと画像生成以外のモデルを 404 で拒否する', async () => {
+    stubModels(MODELS.map(model => (model.id === 'image-basic' ? { ...model, active: false } : model)));
+    await modelCatalog.reload();
+
+    expect((await call(imageGeneration, principal('admin'), 'image-basic')).status).toBe(404);
+    expect((await call(imageGeneration, principal('admin'), 'text-basic')).body.error).toBe('MODEL_001');
+  });
+
+  test('imageGeneration はアクセスレベルが不足するモデルを 403 で拒否する', async () => {
+    const { status, body } = await call(imageGeneration, principal('advanced'), 'image-admin');
+
+    expect(status).toBe(403);
+    expect(body.error).toBe('ACCESS_001');
+  });
+
+  test('許可リストに含まれるモデルはアクセスレベルが不足していても実行できる', () => {
+    const model = { id: 'image-admin', requiredLevel: 'admin' };
+
+    expect(modelCatalog.canAccess(principal('basic', ['image-admin']), model)).toBe(true);
+    expect(modelCatalog.canAccess(principal('advanced'), model)).toBe(false);
+    expect(modelCatalog.canAccess(principal('admin'), model)).toBe(true);
+  });
+});
@@ -4,10 +4,9 @@
  */
 
 const { v4: uuidv4 } = require('uuid');
-const axios = require('axios');
-const Model = require('../models/Model');
-const User = require('../models/User');
-const AccessLog = require('../models/AccessLog');
+const modelCatalog = require('./modelCatalog');
+const { accessLogWriter } = require('../utils/accessLogWriter');
+const upstreamClient = require('../utils/upstreamClient');
 const config = require('../../config');
 const logger = require('../utils/logger');
 
@@ -17,52 +16,12 @@ const logger = require('../utils/logger');
  */
 const getModels = async (req, res) => {
   try {
-    const userId = req.user.id;
+    // 認証ミドルウェアが読み込んだユーザー
+    const user = req.user;
     const { type } = req.query;
     
-    // ユーザーの取得
-    const user = await User.findOne({ id: userId });
-    
-    if (!user) {
-      return res.status(404).json({
-        success: false,
-        error: 'MODEL_003',
-        message: 'ユーザーが見つかりません'
-      });
-    }
-    
-    // クエリフィルターの設定
-    const filter = { active: true };
-    if (type) {
-      filter.type = type;
-    }
-    
-    // モデル一覧の取得
-    const allModels = await Model.find(filter);
-    
-    // ユーザーのアクセスレベルでフィルタリング
-    const accessibleModels = allModels
-      .filter(model => {
-        // 管理者は全モデルアクセス可能
-        if (user.accessTier === 'admin') {
-          return true;
-        }
-        
-        // 特定のモデルが許可リストに含まれているか
-        if (user.allowedModels.includes(model.id)) {
-          return true;
-        }
-        
-        // アクセスレベルに基づく評価
-        return model.isAccessibleByLevel(user.accessTier);
-      })
-      .map(model => ({
-        id: model.id,
-        name: model.name,
-        description: model.description,
-        type: model.type,
-        parameters: model.parameters
-      }));
+    // アクセスレベルと許可リストで参照可能なモデル（モデルカタログから取得）
+    const accessibleModels = await modelCatalog.listVisible(user, type);
     
     res.status(200).json({
       success: true,
@@ -80,6 +39,130 @@ const getModels = async (req, res) => {
   }
 };
 
+/**
+ * 上流が混雑している場合のレスポンス
+ */
+const sendUpstreamBusy = (res) => res.status(503).json({
+  success: false,
+  error: 'MODEL_004',
+  message: 'モデルが混雑しています。しばらくしてから再度お試しください'
+});
+
+/**
+ * 上流のストリーミングレスポンス (Server-Sent Events) をクライアントに転送
+ * 受信したイベントはそのまま転送し、ストリームの終了時に使用トークン数をアクセスログに記録する
+ * (上流が usage を返さない場合は受信したチャンク数をトークン数とする)
+ * @param {Object} req - リクエスト
+ * @param {Object} res - レスポンス
+ * @param {Object} upstream - upstreamClient の stream() の戻り値
+ * @param {Object} logEntry - アクセスログ
+ * @param {number} startTime - リクエストの受信時刻
+ * @returns {Promise<void>} 転送が終了した時点で解決する
+ */
+const relayCompletionStream = (req, res, upstream, logEntry, startTime) => new Promise(resolve => {
+  const stream = upstream.data;
+  let buffer = '';
+  let usage = null;
+  let completionId = null;
+  let completionModel = null;
+  let chunks = 0;
+  let firstTokenTime = null;
+  let completed = false;
+  let finished = false;
+  // クライアントへの送信待ちで上流からの受信を止めているか
+  let waitingDrain = false;
+  
+  const finish = (errorMessage) => {
+    if (finished) return;
+    finished = true;
+    logEntry.responseTime = Date.now() - startTime;
+    logEntry.tokenCount = usage ? usage.total_tokens : chunks;
+    logEntry.responseData = {
+      id: completionId,
+      model: completionModel,
+      usage,
+      stream: true,
+      chunks,
+      firstTokenTime
+    };
+    if (errorMessage) {
+      logEntry.errorMessage = errorMessage;
+    } else {
+      logEntry.status = 'success';
+    }
+    accessLogWriter.write(logEntry);
+    resolve();
+  };
+  
+  const forward = (event) => {
+    const data = event.split('\n')
+      .filter(line => line.startsWith('data:'))
+      .map(line => line.slice(5).trimStart())
+      .join('\n');
+    if (!data) return;
+    if (!res.write(`data: ${data}\n\n`) && !waitingDrain) {
+      // クライアントへの送信が追いつかない場合は上流からの受信を止める
+      // (1回の受信に複数のイベントが含まれる場合も drain の待機は1つだけ登録する)
+      waitingDrain = true;
+      stream.pause();
+      res.once('drain', () => {
+        waitingDrain = false;
+        stream.resume();
+      });
+    }
+    if (data === '[DONE]') {
+      completed = true;
+      return;
+    }
+    try {
+      const chunk = JSON.parse(data);
+      chunks++;
+      if (firstTokenTime === null) firstTokenTime = Date.now() - startTime;
+      completionId = completionId || chunk.id;
+      completionModel = completionModel || chunk.model;
+      if (chunk.usage) usage = chunk.usage;
+    } catch (error) {
+      logger.debug(`ストリーミングのイベントを解析できません: ${data}`);
+    }
+  };
+  
+  res.writeHead(200, {
+    'Content-Type': 'text/event-stream; charset=utf-8',
+    'Cache-Control': 'no-cache',
+    'Connection': 'keep-alive',
+    'X-Accel-Buffering': 'no'
+  });
+  res.flushHeaders();
+  
+  stream.setEncoding('utf8');
+  stream.on('data', text => {
+    buffer += text.replace(/\r\n/g, '\n');
+    let index;
+    while ((index = buffer.indexOf('\n\n')) !== -1) {
+      forward(buffer.slice(0, index));
+      buffer = buffer.slice(index + 2);
+    }
+  });
+  stream.on('end', () => {
+    if (buffer.trim()) forward(buffer);
+    res.end();
+    finish(completed ? null : '上流のストリームが途中で終了しました');
+  });
+  stream.on('error', error => {
+    logger.error(`ストリーミング中の上流エラー: ${error.message}`);
+    if (!res.writableEnded) {
+      res.end(`data: ${JSON.stringify({ error: { message: 'サーバーエラーが発生しました' } })}\n\n`);
+    }
+    finish(error.message);
+  });
+  res.on('close', () => {
+    if (!finished) {
+      stream.destroy();
+      finish('クライアントが切断しました');
+    }
+  });
+});
+
 /**
  * テキスト生成モデルへのアクセス
  * POST /api/models/:modelId/completions
@@ -104,11 +187,11 @@ const textCompletion = async (req, res) => {
     const userId = req.user.id;
     
     // モデルの存在確認
-    const model = await Model.findOne({ id: modelId, active: true });
+    const model = await modelCatalog.getModel(modelId);
     
     if (!model) {
       logEntry.errorMessage = 'モデルが存在しません';
-      await AccessLog.create(logEntry);
+      accessLogWriter.write(logEntry);
       
       return res.status(404).json({
         success: false,
@@ -117,24 +200,13 @@ const textCompletion = async (req, res) => {
       });
     }
     
-    // ユーザーの取得
-    const user = await User.findOne({ id: userId });
-    
-    if (!user) {
-      logEntry.errorMessage = 'ユーザーが見つかりません';
-      await AccessLog.create(logEntry);
-      
-      return res.status(404).json({
-        success: false,
-        error: 'MODEL_003',
-        message: 'ユーザーが見つかりません'
-      });
-    }
+    // 認証ミドルウェアが読み込んだユーザー
+    const user = req.user;
     
     // アクセス権限の検証
-    if (!user.canAccessModel(modelId) && !model.isAccessibleByLevel(user.accessTier)) {
+    if (!modelCatalog.canAccess(user, model)) {
       logEntry.errorMessage = 'このモデルへのアクセス権限がありません';
-      await AccessLog.create(logEntry);
+      accessLogWriter.write(logEntry);
       
       return res.status(403).json({
         success: false,
@@ -144,12 +216,12 @@ const textCompletion = async (req, res) => {
     }
     
     // ユーザーの制限を取得
-    const limits = user.getLimits();
+    const limits = user.limits;
     
     // トークン数の制限チェック
     if (req.body.max_tokens && req.body.max_tokens > limits.maxTokens) {
       logEntry.errorMessage = `トークン数が制限を超えています (最大: ${limits.maxTokens})`;
-      await AccessLog.create(logEntry);
+      accessLogWriter.write(logEntry);
       
       return res.status(400).json({
         success: false,
@@ -159,7 +231,6 @@ const textCompletion = async (req, res) => {
     }
     
     // モックAIモデルへのリクエスト
-    const mockAiUrl = `${config.mockAi.url}/v1/completions`;
     const mockAiRequest = {
       model: modelId,
       ...req.body,
@@ -167,11 +238,18 @@ const textCompletion = async (req, res) => {
       user: userId
     };
     
-    logger.debug(`モックAIへのリクエスト: ${mockAiUrl}`);
-      // モックAIサーバーへのリクエストを実行
-    logger.debug(`モックAIへのリクエスト: ${mockAiUrl}, データ: ${JSON.stringify(mockAiRequest)}`);
+    // モックAIサーバーへのリクエストを実行
+    logger.debug(`モックAIへのリクエスト: ${config.mockAi.url}/v1/completions, データ: ${JSON.stringify(mockAiRequest)}`);
+    
+    const upstream = upstreamClient.getBackend();
     
-    const mockResponse = await axios.post(mockAiUrl, mockAiRequest);
+    // ストリーミング (stream: true) の場合は生成されたトークンを受信した順に転送する
+    if (req.body.stream === true) {
+      const upstreamResponse = await upstream.stream('/v1/completions', mockAiRequest);
+      return relayCompletionStream(req, res, upstreamResponse, logEntry, startTime);
+    }
+    
+    const mockResponse = await upstream.post('/v1/completions', mockAiRequest);
     const completion = mockResponse.data;
     
     // 処理時間の計算
@@ -186,7 +264,7 @@ const textCompletion = async (req, res) => {
       usage: completion.usage
     };
     
-    await AccessLog.create(logEntry);
+    accessLogWriter.write(logEntry);
     
     // 成功レスポンスの返却
     res.status(200).json(completion);
@@ -197,7 +275,11 @@ const textCompletion = async (req, res) => {
     // エラーログの保存
     logEntry.errorMessage = error.message;
     logEntry.responseTime = Date.now() - startTime;
-    await AccessLog.create(logEntry);
+    accessLogWriter.write(logEntry);
+    
+    if (error instanceof upstreamClient.UpstreamBusyError) {
+      return sendUpstreamBusy(res);
+    }
     
     res.status(500).json({
       success: false,
@@ -231,11 +313,11 @@ const imageGeneration = async (req, res) => {
     const userId = req.user.id;
     
     // モデルの存在確認
-    const model = await Model.findOne({ id: modelId, active: true, type: 'image' });
+    const model = await modelCatalog.getModel(modelId);
     
-    if (!model) {
+    if (!model || model.type !== 'image') {
       logEntry.errorMessage = 'モデルが存在しないか、画像生成モデルではありません';
-      await AccessLog.create(logEntry);
+      accessLogWriter.write(logEntry);
       
       return res.status(404).json({
         success: false,
@@ -244,24 +326,13 @@ const imageGeneration = async (req, res) => {
       });
     }
     
-    // ユーザーの取得
-    const user = await User.findOne({ id: userId });
-    
-    if (!user) {
-      logEntry.errorMessage = 'ユーザーが見つかりません';
-      await AccessLog.create(logEntry);
-      
-      return res.status(404).json({
-        success: false,
-        error: 'MODEL_003',
-        message: 'ユーザーが見つかりません'
-      });
-    }
+    // 認証ミドルウェアが読み込んだユーザー
+    const user = req.user;
     
     // アクセス権限の検証
-    if (!user.canAccessModel(modelId) && !model.isAccessibleByLevel(user.accessTier)) {
+    if (!modelCatalog.canAccess(user, model)) {
       logEntry.errorMessage = 'このモデルへのアクセス権限がありません';
-      await AccessLog.create(logEntry);
+      accessLogWriter.write(logEntry);
       
       return res.status(403).json({
         success: false,
@@ -270,17 +341,16 @@ const imageGeneration = async (req, res) => {
       });
     }
       // モックAIモデルへのリクエスト
-    const mockAiUrl = `${config.mockAi.url}/v1/images/generations`;
     const mockAiRequest = {
       model: modelId,
       ...req.body,
       user: userId
     };
     
-    logger.debug(`モックAIへのリクエスト: ${mockAiUrl}, データ: ${JSON.stringify(mockAiRequest)}`);
+    logger.debug(`モックAIへのリクエスト: ${config.mockAi.url}/v1/images/generations, データ: ${JSON.stringify(mockAiRequest)}`);
     
     // モックAIサーバーへのリクエストを実行
-    const mockResponse = await axios.post(mockAiUrl, mockAiRequest);
+    const mockResponse = await upstreamClient.getBackend().post('/v1/images/generations', mockAiRequest);
     const imageResult = mockResponse.data;
     
     // 処理時間の計算
@@ -294,7 +364,7 @@ const imageGeneration = async (req, res) => {
       data_count: imageResult.data.length
     };
     
-    await AccessLog.create(logEntry);
+    accessLogWriter.write(logEntry);
     
     // 成功レスポンスの返却
     res.status(200).json(imageResult);
@@ -305,7 +375,11 @@ const imageGeneration = async (req, res) => {
     // エラーログの保存
     logEntry.errorMessage = error.message;
     logEntry.responseTime = Date.now() - startTime;
-    await AccessLog.create(logEntry);
+    accessLogWriter.write(logEntry);
+    
+    if (error instanceof upstreamClient.UpstreamBusyError) {
+      return sendUpstreamBusy(res);
+    }
     
     res.status(500).json({
       success: false,
@@ -0,0 +1,179 @@
+/**
+ * モデルコントローラ (上流への転送) のテスト
+ */
+
+jest.mock('../utils/logger', () => ({ debug: jest.fn(), info: jest.fn(), warn: jest.fn(), error: jest.fn() }));
+jest.mock('../utils/accessLogWriter', () => ({ accessLogWriter: { write: jest.fn() } }));
+jest.mock('./modelCatalog', () => ({
+  getModel: jest.fn(async (id) => ({ id, type: 'text', requiredLevel: 'basic' })),
+  canAccess: jest.fn(() => true),
+  listVisible: jest.fn()
+}));
+
+const http = require('http');
+const express = require('express');
+const config = require('../../config');
+const { accessLogWriter } = require('../utils/accessLogWriter');
+const upstreamClient = require('../utils/upstreamClient');
+const { textCompletion } = require('./modelController');
+
+const listen = (server) => new Promise(resolve => {
+  server.listen(0, '127.0.0.1', () => resolve(`http://127.0.0.1:${server.address().port}`));
+});
+
+const close = (server) => new Promise(resolve => {
+  server.closeAllConnections();
+  server.close(resolve);
+});
+
+const sse = (data) => `data: ${typeof data === 'string' ? data : JSON.stringify(data)}\n\n`;
+
+/**
+ * ゲートウェイへのリクエスト
+ * @param {string} url - ゲートウェイのURL
+ * @param {Object} body - リクエストボディ
+ * @param {Function} [onData] - 受信したチャンクごとに (chunk, request) で呼び出す関数
+ * @returns {Promise<Object>} status, body
+ */
+const post = (url, body, onData) => new Promise((resolve, reject) => {
+  const request = http.request(`${url}/models/text-basic/completions`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' }
+  }, response => {
+    let text = '';
+    response.setEncoding('utf8');
+    response.on('data', chunk => {
+      text += chunk;
+      if (onData) onData(chunk, request);
+    });
+    response.on('end', () => resolve({ status: response.statusCode, body: text }));
+    response.on('close', () => resolve({ status: response.statusCode, body: text }));
+  });
+  request.on('error', error => (onData ? resolve({ status: null, body: '' }) : reject(error)));
+  request.end(JSON.stringify(body));
+});
+
+/**
+ * アクセスログが書き込まれるまで待機
+ * @returns {Promise<Object>} 最後に書き込まれたアクセスログ
+ */
+const waitForLog = async () => {
+  for (let i = 0; i < 100 && accessLogWriter.write.mock.calls.length === 0; i++) {
+    await new Promise(resolve => setTimeout(resolve, 10));
+  }
+  const calls = accessLogWriter.write.mock.calls;
+  return calls[calls.length - 1][0];
+};
+
+describe('textCompletion', () => {
+  let upstream;
+  let upstreamUrl;
+  let upstreamHandler;
+  let gateway;
+  let gatewayUrl;
+  let backend;
+
+  beforeAll(async () => {
+    upstream = http.createServer((req, res) => upstreamHandler(req, res));
+    upstreamUrl = await listen(upstream);
+
+    const app = express();
+    app.use(express.json());
+    app.use((req, res, next) => {
+      req.user = { id: 'user-1', userName: 'alice', accessTier: 'basic', limits: { maxTokens: 1000 } };
+      next();
+    });
+    app.post('/models/:modelId/completions', textCompletion);
+    gateway = http.createServer(app);
+    gatewayUrl = await listen(gateway);
+  });
+
+  afterAll(async () => {
+    await close(gateway);
+    await close(upstream);
+  });
+
+  beforeEach(() => {
+    accessLogWriter.write.mockClear();
+    backend = new upstreamClient.UpstreamBackend(upstreamUrl, { ...config.upstream, maxConcurrent: 1, queueTimeout: 50 });
+    jest.spyOn(upstreamClient, 'getBackend').mockReturnValue(backend);
+  });
+
+  afterEach(() => {
+    jest.restoreAllMocks();
+    backend.httpAgent.destroy();
+  });
+
+  test('ストリーミングのイベントを転送し、終了時に使用トークン数とチャンク数を記録する', async () => {
+    upstreamHandler = (req, res) => {
+      res.writeHead(200, { 'Content-Type': 'text/event-stream' });
+      // 1回の送信に複数のイベントを含める
+      res.write(sse({ id: 'cmpl-1', model: 'text-basic', choices: [{ text: 'Hello' }] }) +
+        sse({ id: 'cmpl-1', model: 'text-basic', choices: [{ text: ' world' }] }));
+      setTimeout(() => {
+        res.write(sse({ id: 'cmpl-1', model: 'text-basic', choices: [], usage: { total_tokens: 7 } }));
+        res.end(sse('[DONE]'));
+      }, 20);
+    };
+
+    const response = await post(gatewayUrl, { prompt: 'hi', stream: true });
+    expect(response.status).toBe(200);
+    expect(response.body.match(/^data: /gm)).toHaveLength(4);
+    expect(response.body).toContain('data: [DONE]');
+
+    const logEntry = await waitForLog();
+    expect(logEntry.status).toBe('success');
+    expect(logEntry.tokenCount).toBe(7);
+    expect(logEntry.responseData).toMatchObject({ id: 'cmpl-1', model: 'text-basic', stream: true, chunks: 3 });
+    expect(logEntry.responseData.firstTokenTime).toBeGreaterThanOrEqual(0);
+    expect(logEntry.responseData.firstTokenTime).toBeLessThanOrEqual(logEntry.responseTime);
+    expect(backend.limiter.active).toBe(0);
+  });
+
+  test('上流が usage を返さない場合はチャンク数をトークン数とし、途中終了を記録する', async () => {
+    upstreamHandler = (req, res) => {
+      res.writeHead(200, { 'Content-Type': 'text/event-stream' });
+      res.end(sse({ id: 'cmpl-2', choices: [{ text: 'a' }] }) + sse({ id: 'cmpl-2', choices: [{ text: 'b' }] }));
+    };
+
+    await post(gatewayUrl, { prompt: 'hi', stream: true });
+    const logEntry = await waitForLog();
+    expect(logEntry.tokenCount).toBe(2);
+    expect(logEntry.status).toBe('error');
+    expect(logEntry.errorMessage).toBe('上流のストリームが途中で終了しました');
+  });
+
+  test('クライアントが切断した場合は上流への接続を中断する', async () => {
+    let upstreamClosed;
+    const closed = new Promise(resolve => { upstreamClosed = resolve; });
+    upstreamHandler = (req, res) => {
+      res.writeHead(200, { 'Content-Type': 'text/event-stream' });
+      res.write(sse({ id: 'cmpl-3', choices: [{ text: 'a' }] }));
+      res.on('close', upstreamClosed);
+    };
+
+    await post(gatewayUrl, { prompt: 'hi', stream: true }, (chunk, request) => request.destroy());
+    await closed;
+
+    const logEntry = await waitForLog();
+    expect(logEntry.errorMessage).toBe('クライアントが切断しました');
+    expect(logEntry.responseData.chunks).toBe(1);
+    expect(backend.limiter.active).toBe(0);
+  });
+
+  test('実行待ちがタイムアウトした場合は 503 MODEL_004 を返す', async () => {
+    upstreamHandler = (req, res) => res.end('{}');
+    const release = await backend.limiter.acquire();
+    try {
+      const response = await post(gatewayUrl, { prompt: 'hi' });
+      expect(response.status).toBe(503);
+      expect(JSON.parse(response.body).error).toBe('MODEL_004');
+
+      const logEntry = await waitForLog();
+      expect(logEntry.status).toBe('error');
+      expect(backend.limiter.rejected).toBe(1);
+    } finally {
+      release();
+    }
+  });
+});
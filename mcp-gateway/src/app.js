@@ -12,9 +12,13 @@ const bodyParser = require('body-parser');
 const fs = require('fs');
 const config = require('../config');
 const logger = require('./utils/logger');
+const { accessLogWriter } = require('./utils/accessLogWriter');
+const { usageStats } = require('./utils/usageStats');
+const modelCatalog = require('./api/modelCatalog');
 
 // データベース接続選択（環境に応じてモックかMongoDBを使い分け）
-const db = config.server.env === 'development' && process.env.USE_MOCK_DB === 'true'
+const mockMode = config.server.env === 'development' && process.env.USE_MOCK_DB === 'true';
+const db = mockMode
   ? require('./utils/dbMock')
   : require('./utils/db');
 
@@ -71,12 +75,20 @@ app.use((err, req, res, next) => {
   });
 });
 
+// 起動したHTTPサーバー（終了時に新しいリクエストの受付を停止するために保持する）
+let server = null;
+
 // サーバー起動
 const startServer = async () => {
   try {
     // データベース接続
     await db.connectDB();
     
+    // モデルカタログと利用統計の読み込み（モックデータの場合はAPIもモックのため不要）
+    if (!mockMode) {
+      await Promise.all([modelCatalog.start(), usageStats.start()]);
+    }
+    
     // logsディレクトリの作成（存在しない場合）
     const logsDir = path.join(__dirname, '../logs');
     if (!fs.existsSync(logsDir)) {
@@ -85,7 +97,7 @@ const startServer = async () => {
     
     // サーバー起動
     const PORT = config.server.port;
-    app.listen(PORT, () => {
+    server = app.listen(PORT, () => {
       logger.info(`サーバーが起動しました: http://${config.server.host}:${PORT}`);
       logger.info(`環境: ${config.server.env}`);
       logger.info(`SCIMエンドポイント: ${config.scim.path}`);
@@ -112,17 +124,35 @@ process.on('unhandledRejection', (reason, promise) => {
 });
 
 // プロセス終了時の処理
-process.on('SIGTERM', async () => {
-  logger.info('SIGTERMシグナルを受信しました。サーバーを正常終了します');
-  await db.closeDB();
-  process.exit(0);
-});
+let shuttingDown = false;
 
-process.on('SIGINT', async () => {
-  logger.info('SIGINTシグナルを受信しました。サーバーを正常終了します');
-  await db.closeDB();
+/**
+ * サーバーを正常終了
+ * 新しいリクエストの受付を停止して処理中のリクエストの完了を待ち、
+ * その後にアクセスログの書き込み、データベース接続の順に閉じる
+ * @param {string} signal - 受信したシグナル
+ */
+const shutdown = async (signal) => {
+  if (shuttingDown) return;
+  shuttingDown = true;
+  logger.info(`${signal}シグナルを受信しました。サーバーを正常終了します`);
+  try {
+    if (server) {
+      const closed = new Promise(resolve => server.close(resolve));
+      server.closeIdleConnections();
+      await closed;
+    }
+    await accessLogWriter.close();
+    await db.closeDB();
+  } catch (error) {
+    logger.error(`終了処理エラー: ${error.message}`);
+    process.exit(1);
+  }
   process.exit(0);
-});
+};
+
+process.on('SIGTERM', () => shutdown('SIGTERM'));
+process.on('SIGINT', () => shutdown('SIGINT'));
 
 // サーバー起動実行
 startServer();
@@ -96,8 +96,7 @@ const login = async (req, res) => {
  */
 const generateApiKey = async (req, res) => {
   try {
-    // ユーザーIDとキーの説明
-    const userId = req.user.id;
+    // キーの説明
     const { description } = req.body;
     
     if (!description) {
@@ -108,16 +107,8 @@ const generateApiKey = async (req, res) => {
       });
     }
     
-    // ユーザーの取得
-    const user = await User.findOne({ id: userId });
-    
-    if (!user) {
-      return res.status(404).json({
-        success: false,
-        error: 'AUTH_005',
-        message: 'ユーザーが見つかりません'
-      });
-    }
+    // 認証ミドルウェアが読み込んだユーザー
+    const user = req.user;
     
     // APIキーの生成
     const apiKey = uuidv4();
@@ -152,18 +143,8 @@ const generateApiKey = async (req, res) => {
  */
 const getCurrentUser = async (req, res) => {
   try {
-    const userId = req.user.id;
-    
-    // ユーザーの取得
-    const user = await User.findOne({ id: userId });
-    
-    if (!user) {
-      return res.status(404).json({
-        success: false,
-        error: 'AUTH_005',
-        message: 'ユーザーが見つかりません'
-      });
-    }
+    // 認証ミドルウェアが読み込んだユーザー
+    const user = req.user;
     
     // ユーザー情報をクライアント用に整形
     const userData = {
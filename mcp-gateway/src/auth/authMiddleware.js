@@ -4,13 +4,15 @@
  */
 
 const jwt = require('jsonwebtoken');
-const User = require('../models/User');
+const { getPrincipal } = require('./principalCache');
 const config = require('../../config');
 const logger = require('../utils/logger');
 
 /**
  * JWT認証ミドルウェア
  * Authorization: Bearer <token> ヘッダーを検証する
+ * 検証したユーザーのプリンシパル（アクセスレベル・許可モデル・制限）を req.user に設定し、
+ * 後続の処理ではユーザーを再検索せずにこれを使用する
  */
 const authenticate = async (req, res, next) => {
   try {
@@ -38,11 +40,8 @@ const authenticate = async (req, res, next) => {
       // トークンを検証
       const decoded = jwt.verify(token, config.jwt.secret);
       
-      // 検証できたらユーザー情報をreqオブジェクトに追加
-      req.user = decoded;
-      
       // ユーザーが実際に存在し、アクティブかチェック
-      const user = await User.findOne({ id: decoded.id });
+      const user = await getPrincipal(decoded.id);
       
       if (!user) {
         logger.warn(`不明なユーザーID: ${decoded.id}`);
@@ -62,6 +61,9 @@ const authenticate = async (req, res, next) => {
         });
       }
       
+      // 検証できたらユーザー情報をreqオブジェクトに追加
+      req.user = user;
+      
       next();
     } catch (error) {
       if (error.name === 'TokenExpiredError') {
@@ -0,0 +1,122 @@
+/**
+ * プリンシパルキャッシュ
+ * 認証済みユーザーのアクセスレベル・許可モデル・制限をプロセス内に保持し、
+ * リクエストごとのユーザー検索を省略する
+ */
+
+const User = require('../models/User');
+const config = require('../../config');
+const LruCache = require('../utils/lruCache');
+
+// プリンシパルの生成に必要なフィールド
+const PRINCIPAL_FIELDS = 'id userName displayName email active systemRole accessTier userGroups ' +
+  'allowedModels maxTokens allowedFeatures';
+
+const cache = new LruCache({
+  maxSize: config.auth.principalCacheSize,
+  ttl: config.auth.principalCacheTtl * 1000
+});
+
+// 読み込み中のユーザー (同じユーザーへの同時リクエストでは検索を1回にまとめる)
+const loading = new Map();
+
+/**
+ * ユーザードキュメントからプリンシパルを生成
+ * @param {Object} user - ユーザー (lean() の結果)
+ * @returns {Object} 変更不可のプリンシパル
+ */
+const toPrincipal = (user) => {
+  const accessTier = user.accessTier || 'basic';
+  const allowedModels = Object.freeze([...(user.allowedModels || [])]);
+  return Object.freeze({
+    id: user.id,
+    userName: user.userName,
+    displayName: user.displayName,
+    email: user.email,
+    active: user.active ?? true,
+    systemRole: user.systemRole || 'user',
+    accessTier,
+    userGroups: Object.freeze([...(user.userGroups || [])]),
+    allowedModels,
+    allowedModelSet: new Set(allowedModels),
+    allowedFeatures: Object.freeze([...(user.allowedFeatures || [])]),
+    limits: User.limitsFor(accessTier)
+  });
+};
+
+/**
+ * プリンシパルを取得（キャッシュにない場合はデータベースから読み込む）
+ * @param {string} userId - ユーザーID
+ * @returns {Promise<Object|null>} プリンシパル（ユーザーが存在しない場合は null）
+ */
+const getPrincipal = async (userId) => {
+  const cached = cache.get(userId);
+  if (cached) {
+    return cached;
+  }
+
+  let pending = loading.get(userId);
+  if (!pending) {
+    pending = User.findOne({ id: userId }, PRINCIPAL_FIELDS).lean()
+      .then(user => {
+        const principal = user ? toPrincipal(user) : null;
+        // 読み込み中に無効化された場合は古い内容になり得るためキャッシュしない
+        if (principal && loading.get(userId) === pending) {
+          cache.set(userId, principal);
+        }
+        return principal;
+      })
+      .finally(() => {
+        if (loading.get(userId) === pending) {
+          loading.delete(userId);
+        }
+      });
+    loading.set(userId, pending);
+  }
+  return pending;
+};
+
+/**
+ * ユーザーのプリンシパルを無効化
+ * SCIMによるユーザーの更新・削除時に呼び出し、アクセスレベルの変更を直ちに反映する
+ * @param {string} userId - ユーザーID
+ */
+const invalidate = (userId) => {
+  cache.delete(userId);
+  loading.delete(userId);
+};
+
+/**
+ * プリンシパルがモデルの許可リストに含まれるか
+ * @param {Object} principal - プリンシパル
+ * @param {string} modelId - モデルID
+ * @returns {boolean} 管理者または許可リストに含まれる場合は true
+ */
+const canAccessModel = (principal, modelId) => {
+  if (!principal.active) return false;
+  if (principal.accessTier === 'admin') return true;
+  return principal.allowedModelSet.has(modelId);
+};
+
+/**
+ * キャッシュの統計
+ * @returns {Object} size, maxSize, hits, misses, evictions
+ */
+const stats = () => cache.stats();
+
+/**
+ * すべてのプリンシパルを無効化
+ */
+const clear = () => {
+  cache.clear();
+  loading.clear();
+};
+
+module.exports = {
+  getPrincipal,
+  invalidate,
+  canAccessModel,
+  stats,
+  clear,
+  toPrincipal
+};
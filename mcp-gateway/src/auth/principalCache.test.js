@@ -0,0 +1,194 @@
+/**
+ * プリンシパルキャッシュのテスト
+ */
+
+jest.mock('../utils/logger', () => ({ debug: jest.fn(), info: jest.fn(), warn: jest.fn(), error: jest.fn() }));
+
+// キャッシュの有効期限は Date.now で判定するため、モジュールの読み込み前に置き換える
+let now = 1000000;
+const clock = jest.spyOn(Date, 'now').mockImplementation(() => now);
+
+const jwt = require('jsonwebtoken');
+const config = require('../../config');
+const User = require('../models/User');
+const principalCache = require('./principalCache');
+const { authenticate } = require('./authMiddleware');
+const userController = require('../scim/userController');
+
+const userDoc = (overrides = {}) => ({
+  id: 'user-1',
+  userName: 'alice',
+  active: true,
+  accessTier: 'basic',
+  allowedModels: ['gpt-basic'],
+  ...overrides
+});
+
+/**
+ * User.findOne(...).lean() を置き換え、呼び出しごとに解決を制御できる検索を返す
+ */
+const stubFindOne = () => {
+  const pending = [];
+  const findOne = jest.spyOn(User, 'findOne').mockImplementation(() => ({
+    lean: () => new Promise(resolve => pending.push(resolve))
+  }));
+  return { findOne, pending };
+};
+
+const mockResponse = () => {
+  const res = {};
+  res.status = jest.fn(() => res);
+  res.json = jest.fn(() => res);
+  res.send = jest.fn(() => res);
+  return res;
+};
+
+beforeEach(() => {
+  jest.restoreAllMocks();
+  clock.mockImplementation(() => now);
+  principalCache.clear();
+});
+
+describe('principalCache', () => {
+  test('同じユーザーへの同時の検索は1回にまとめる', async () => {
+    const { findOne, pending } = stubFindOne();
+    const first = principalCache.getPrincipal('user-1');
+    const second = principalCache.getPrincipal('user-1');
+    expect(findOne).toHaveBeenCalledTimes(1);
+
+    pending[0](userDoc());
+    const [a, b] = await Promise.all([first, second]);
+    expect(a).toBe(b);
+    expect(a.allowedModelSet.has('gpt-basic')).toBe(true);
+    expect(Object.isFrozen(a)).toBe(true);
+
+    await principalCache.getPrincipal('user-1');
+    expect(findOne).toHaveBeenCalledTimes(1);
+  });
+
+  test('読み込み中に無効化した場合は読み込んだ内容をキャッシュしない', async () => {
+    const { findOne, pending } = stubFindOne();
+    const stale = principalCache.getPrincipal('user-1');
+    principalCache.invalidate('user-1');
+    pending[0](userDoc({ accessTier: 'basic' }));
+    expect((await stale).accessTier).toBe('basic');
+
+    const fresh = principalCache.getPrincipal('user-1');
+    expect(findOne).toHaveBeenCalledTimes(2);
+    pending[1](userDoc({ accessTier: 'advanced' }));
+    expect((await fresh).accessTier).toBe('advanced');
+    expect((await principalCache.getPrincipal('user-1')).accessTier).toBe('advanced');
+    expect(findOne).toHaveBeenCalledTimes(2);
+  });
+
+  test('有効期間を過ぎた場合は再読み込みする', async () => {
+    const { findOne, pending } = stubFindOne();
+    const first = principalCache.getPrincipal('user-1');
+    pending[0](userDoc());
+    await first;
+
+    now += config.auth.principalCacheTtl * 1000 - 1;
+    await principalCache.getPrincipal('user-1');
+    expect(findOne).toHaveBeenCalledTimes(1);
+
+    now += 1;
+    const reloaded = principalCache.getPrincipal('user-1');
+    expect(findOne).toHaveBeenCalledTimes(2);
+    pending[1](userDoc());
+    await reloaded;
+  });
+
+  test('存在しないユーザーはキャッシュしない', async () => {
+    const { findOne, pending } = stubFindOne();
+    const missing = principalCache.getPrincipal('user-1');
+    pending[0](null);
+    expect(await missing).toBeNull();
+
+    principalCache.getPrincipal('user-1');
+    expect(findOne).toHaveBeenCalledTimes(2);
+  });
+});
+
+describe('authenticate', () => {
+  const request = (userId) => ({
+    headers: { authorization: `Bearer ${jwt.sign({ id: userId }, config.jwt.secret)}` }
+  });
+
+  const stubUser = (user) => jest.spyOn(User, 'findOne').mockImplementation(() => ({
+    lean: () => Promise.resolve(user)
+  }));
+
+  test('有効なユーザーはプリンシパルを req.user に設定する', async () => {
+    stubUser(userDoc());
+    const req = request('user-1');
+    const next = jest.fn();
+    await authenticate(req, mockResponse(), next);
+
+    expect(next).toHaveBeenCalled();
+    expect(req.user.userName).toBe('alice');
+    expect(req.user.limits).toBe(User.limitsFor('basic'));
+  });
+
+  test('無効なユーザーは 401 AUTH_003 で拒否する', async () => {
+    stubUser(userDoc({ active: false }));
+    const res = mockResponse();
+    const next = jest.fn();
+    await authenticate(request('user-1'), res, next);
+
+    expect(next).not.toHaveBeenCalled();
+    expect(res.status).toHaveBeenCalledWith(401);
+    expect(res.json.mock.calls[0][0].error).toBe('AUTH_003');
+  });
+
+  test('存在しないユーザーは 401 AUTH_001 で拒否する', async () => {
+    stubUser(null);
+    const res = mockResponse();
+    const next = jest.fn();
+    await authenticate(request('missing'), res, next);
+
+    expect(next).not.toHaveBeenCalled();
+    expect(res.status).toHaveBeenCalledWith(401);
+    expect(res.json.mock.calls[0][0].error).toBe('AUTH_001');
+  });
+});
+
+describe('SCIMによるユーザーの変更', () => {
+  const storedUser = () => ({
+    ...userDoc(),
+    save: jest.fn().mockResolvedValue(),
+    toScim: jest.fn(() => ({ id: 'user-1' }))
+  });
+
+  test('updateUser はプリンシパルを無効化する', async () => {
+    jest.spyOn(User, 'findOne').mockResolvedValue(storedUser());
+    const invalidate = jest.spyOn(principalCache, 'invalidate');
+    const res = mockResponse();
+    await userController.updateUser({ params: { id: 'user-1' }, body: { userName: 'alice' } }, res);
+
+    expect(res.status).toHaveBeenCalledWith(200);
+    expect(invalidate).toHaveBeenCalledWith('user-1');
+  });
+
+  test('deleteUser はプリンシパルを無効化する', async () => {
+    jest.spyOn(User, 'findOne').mockResolvedValue(storedUser());
+    jest.spyOn(User, 'deleteOne').mockResolvedValue({ deletedCount: 1 });
+    const invalidate = jest.spyOn(principalCache, 'invalidate');
+    const res = mockResponse();
+    await userController.deleteUser({ params: { id: 'user-1' } }, res);
+
+    expect(res.status).toHaveBeenCalledWith(204);
+    expect(invalidate).toHaveBeenCalledWith('user-1');
+  });
+
+  test('更新後の認証では新しいアクセスレベルを使用する', async () => {
+    jest.spyOn(User, 'findOne').mockImplementation(() => ({ lean: () => Promise.resolve(userDoc()) }));
+    expect((await principalCache.getPrincipal('user-1')).accessTier).toBe('basic');
+
+    const stored = storedUser();
+    User.findOne.mockResolvedValueOnce(stored);
+    await userController.updateUser({ params: { id: 'user-1' }, body: { userName: 'alice' } }, mockResponse());
+
+    User.findOne.mockImplementation(() => ({ lean: () => Promise.resolve(userDoc({ accessTier: 'advanced' })) }));
+    expect((await principalCache.getPrincipal('user-1')).accessTier).toBe('advanced');
+  });
+});
@@ -3,6 +3,7 @@
  * アクセス可能なAIモデルの定義を格納するモデル
  */
 
+const EventEmitter = require('events');
 const mongoose = require('mongoose');
 
 const ModelSchema = new mongoose.Schema({
@@ -58,17 +59,36 @@ ModelSchema.pre('save', function(next) {
   next();
 });
 
+// 権限レベルの順位
+ModelSchema.statics.LEVEL_RANK = Object.freeze({
+  "basic": 1,
+  "advanced": 2,
+  "admin": 3
+});
+
+// 権限レベルが必要なレベル以上か
+ModelSchema.statics.isLevelSufficient = function(accessLevel, requiredLevel) {
+  return this.LEVEL_RANK[accessLevel] >= this.LEVEL_RANK[requiredLevel || 'basic'];
+};
+
 // 権限レベルによるアクセス評価
 ModelSchema.methods.isAccessibleByLevel = function(accessLevel) {
   if (!this.active) return false;
   
-  const levelMap = {
-    "basic": 1,
-    "advanced": 2,
-    "admin": 3
-  };
-  
-  return levelMap[accessLevel] >= levelMap[this.requiredLevel];
+  return this.constructor.isLevelSufficient(accessLevel, this.requiredLevel);
 };
 
+// モデル定義の変更通知 (統計やモデルカタログの再構築に使用)
+// このプロセス外での変更は通知されないため、利用側で定期的に再読み込みする
+const changes = new EventEmitter();
+ModelSchema.statics.changes = changes;
+
+ModelSchema.post(
+  ['save', 'insertMany', 'updateOne', 'updateMany', 'findOneAndUpdate', 'replaceOne',
+    'deleteOne', 'deleteMany', 'findOneAndDelete'],
+  function() {
+    changes.emit('change');
+  }
+);
+
 module.exports = mongoose.model('Model', ModelSchema);
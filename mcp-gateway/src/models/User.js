@@ -84,6 +84,12 @@ const UserSchema = new mongoose.Schema({
   }
 });
 
+// SCIMフィルターで検索する属性のインデックス (id・userName はユニークインデックス)
+UserSchema.index({ displayName: 1 });
+UserSchema.index({ email: 1 }, { sparse: true });
+UserSchema.index({ accessTier: 1 });
+UserSchema.index({ userGroups: 1 });
+
 // パスワードをハッシュ化するミドルウェア
 UserSchema.pre('save', async function(next) {
   if (!this.isModified('password')) {
@@ -132,64 +138,80 @@ UserSchema.methods.canAccessModel = function(modelId) {
   return this.allowedModels.includes(modelId);
 };
 
+// アクセスレベルごとの制限
+// (複数のリクエストで共有するため変更不可にしている)
+UserSchema.statics.TIER_LIMITS = Object.freeze({
+  basic: Object.freeze({
+    maxTokens: 1000,
+    rateLimit: 10
+  }),
+  advanced: Object.freeze({
+    maxTokens: 4000,
+    rateLimit: 30
+  }),
+  admin: Object.freeze({
+    maxTokens: 10000,
+    rateLimit: 100
+  })
+});
+
+// アクセスレベルに応じた制限を返す
+UserSchema.statics.limitsFor = function(accessTier) {
+  return this.TIER_LIMITS[accessTier] || this.TIER_LIMITS.basic;
+};
+
 // アクセス制限の取得メソッド
 UserSchema.methods.getLimits = function() {
-  // アクセスレベルに応じた制限を返す
-  const limits = {
-    basic: {
-      maxTokens: 1000,
-      rateLimit: 10
-    },
-    advanced: {
-      maxTokens: 4000,
-      rateLimit: 30
-    },
-    admin: {
-      maxTokens: 10000,
-      rateLimit: 100
-    }
-  };
-  
-  return limits[this.accessTier] || limits.basic;
+  return this.constructor.limitsFor(this.accessTier);
 };
 
-// SCIM表現の取得メソッド
-UserSchema.methods.toScim = function() {
+// SCIM表現に必要なフィールド (一覧取得の射影に使用し、password などは読み込まない)
+UserSchema.statics.SCIM_FIELDS = 'id userName displayName active email systemRole accessTier userGroups ' +
+  'allowedModels maxTokens allowedFeatures createdAt updatedAt';
+
+// プレーンオブジェクト (lean() の結果) からSCIM表現を生成
+// lean() ではスキーマの既定値が適用されないため、未設定のフィールドは既定値で補う
+UserSchema.statics.toScimObject = function(user) {
   return {
     "schemas": ["urn:ietf:params:scim:schemas:core:2.0:User", "urn:extic:scim:schemas:1.0:User", "custom:ai:access"],
-    "id": this.id,
-    "userName": this.userName,
-    "displayName": this.displayName,
-    "active": this.active,
-    "emails": this.email ? [
+    "id": user.id,
+    "userName": user.userName,
+    "displayName": user.displayName,
+    "active": user.active ?? true,
+    "emails": user.email ? [
       {
-        "value": this.email,
+        "value": user.email,
         "primary": true
       }
     ] : [],
     "urn:extic:scim:schemas:1.0:User": {
-      "role": this.systemRole,
-      "exticGroups": this.userGroups,
+      "role": user.systemRole || 'user',
+      "exticGroups": user.userGroups || [],
       "extendAttrs": [
         {
           "name": "accessLevel",
-          "value": this.accessTier
+          "value": user.accessTier || 'basic'
         }
       ]
     },
     "custom:ai:access": {
-      "allowedModels": this.allowedModels,
-      "maxTokens": this.maxTokens,
-      "allowedFeatures": this.allowedFeatures
+      "allowedModels": user.allowedModels || [],
+      "maxTokens": user.maxTokens ?? 1000,
+      "allowedFeatures": user.allowedFeatures || []
     },
     "meta": {
-      "created": this.createdAt,
-      "lastModified": this.updatedAt,
+      "created": user.createdAt,
+      "lastModified": user.updatedAt,
       "resourceType": "User"
     }
   };
 };
 
+// SCIM表現の取得メソッド
+UserSchema.methods.toScim = function() {
+  return this.constructor.toScimObject(this);
+};
+
 // SCIMデータからユーザーを更新するメソッド
 UserSchema.statics.fromScim = function(scimData) {
   const userData = {
@@ -0,0 +1,425 @@
+/**
+ * SCIMフィルター式のコンパイラ
+ * RFC 7644 3.4.2.2 のフィルター式を解析し、MongoDBクエリに変換する
+ */
+
+const SCHEMA_CORE = 'urn:ietf:params:scim:schemas:core:2.0:User';
+const SCHEMA_EXTIC = 'urn:extic:scim:schemas:1.0:User';
+const SCHEMA_AI_ACCESS = 'custom:ai:access';
+
+// どのドキュメントにも一致しないクエリ（id のユニークインデックスで即座に空になる）
+const MATCH_NONE = Object.freeze({ id: { $in: [] } });
+
+// 比較演算子とMongoDB演算子の対応
+const ORDER_OPERATORS = { gt: '$gt', ge: '$gte', lt: '$lt', le: '$lte' };
+const COMPARISON_OPERATORS = ['eq', 'ne', 'co', 'sw', 'ew', 'gt', 'ge', 'lt', 'le'];
+
+/**
+ * スキーマごとの属性定義（属性名は小文字）
+ * field: User モデルのフィールド, type: SCIMの型, multiValued: 配列フィールド
+ * constant: 格納されていない固定値の属性（presence は値が存在する条件となる属性）
+ * 文字列はインデックスを使用するため、格納値と大文字小文字を区別して比較する
+ */
+const ATTRIBUTES = {
+  [SCHEMA_CORE]: {
+    'id': { field: 'id', type: 'string' },
+    'username': { field: 'userName', type: 'string' },
+    'displayname': { field: 'displayName', type: 'string' },
+    'active': { field: 'active', type: 'boolean' },
+    'emails': { field: 'email', type: 'string' },
+    'emails.value': { field: 'email', type: 'string' },
+    // 格納するメールアドレスは1件のみで、常に primary として返す
+    'emails.primary': { constant: true, presence: 'emails.value' },
+    'meta.created': { field: 'createdAt', type: 'dateTime' },
+    'meta.lastmodified': { field: 'updatedAt', type: 'dateTime' },
+    'meta.resourcetype': { constant: 'User' }
+  },
+  [SCHEMA_EXTIC]: {
+    'role': { field: 'systemRole', type: 'string' },
+    'exticgroups': { field: 'userGroups', type: 'string', multiValued: true },
+    'exticgroups.value': { field: 'userGroups', type: 'string', multiValued: true },
+    // 拡張属性は accessLevel のみを accessTier として格納する
+    'extendattrs': { field: 'accessTier', type: 'complex' },
+    'extendattrs.name': { constant: 'accessLevel', presence: 'extendattrs.value' },
+    'extendattrs.value': { field: 'accessTier', type: 'string' }
+  },
+  [SCHEMA_AI_ACCESS]: {
+    'allowedmodels': { field: 'allowedModels', type: 'string', multiValued: true },
+    'allowedmodels.value': { field: 'allowedModels', type: 'string', multiValued: true },
+    'maxtokens': { field: 'maxTokens', type: 'integer' },
+    'allowedfeatures': { field: 'allowedFeatures', type: 'string', multiValued: true },
+    'allowedfeatures.value': { field: 'allowedFeatures', type: 'string', multiValued: true }
+  }
+};
+
+// スキーマURIを省略した属性名の解決用
+const BARE_ATTRIBUTES = Object.assign({}, ...Object.values(ATTRIBUTES).map(attributes => {
+  const result = {};
+  for (const [name, definition] of Object.entries(attributes)) {
+    result[name] = { name, definition };
+  }
+  return result;
+}));
+const SCHEMA_URIS = Object.keys(ATTRIBUTES);
+
+/**
+ * フィルター式の構文エラー・未対応の属性
+ */
+class ScimFilterError extends Error {
+  constructor(message) {
+    super(message);
+    this.name = 'ScimFilterError';
+    this.status = 400;
+    this.scimType = 'invalidFilter';
+  }
+}
+
+const TOKEN_PATTERN = /\s*(?:(\()|(\))|(\[)|(\])|("(?:[^"\\]|\\.)*")|(-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?(?![\w:.]))|([A-Za-z][\w\-.:$]*))/y;
+const TOKEN_KINDS = [null, 'lparen', 'rparen', 'lbracket', 'rbracket', 'string', 'number', 'word'];
+
+/**
+ * フィルター式を字句に分割
+ * @param {string} text - フィルター式
+ * @returns {Array} { kind, value } の配列
+ */
+const tokenize = (text) => {
+  const tokens = [];
+  const source = text.trimEnd();
+  TOKEN_PATTERN.lastIndex = 0;
+  while (TOKEN_PATTERN.lastIndex < source.length) {
+    const position = TOKEN_PATTERN.lastIndex;
+    const match = TOKEN_PATTERN.exec(source);
+    if (!match) {
+      throw new ScimFilterError(`フィルター式を解析できません (位置 ${position}): ${text}`);
+    }
+    const index = match.findIndex((group, i) => i > 0 && group !== undefined);
+    const kind = TOKEN_KINDS[index];
+    let value = match[index];
+    if (kind === 'string') {
+      try {
+        value = JSON.parse(value);
+      } catch (error) {
+        throw new ScimFilterError(`文字列リテラルが不正です: ${value}`);
+      }
+    } else if (kind === 'number') {
+      value = Number(value);
+    }
+    tokens.push({ kind, value });
+  }
+  return tokens;
+};
+
+/**
+ * 再帰下降パーサー（優先順位: not > and > or）
+ */
+class Parser {
+  constructor(text) {
+    this.text = text;
+    this.tokens = tokenize(text);
+    this.position = 0;
+  }
+
+  peek() {
+    return this.tokens[this.position] || { kind: null, value: null };
+  }
+
+  take(kind) {
+    const token = this.peek();
+    if (token.kind === null || (kind && token.kind !== kind)) {
+      throw new ScimFilterError(`フィルター式の構文エラー (字句 ${this.position}): ${this.text}`);
+    }
+    this.position++;
+    return token;
+  }
+
+  peekKeyword(...keywords) {
+    const token = this.peek();
+    return token.kind === 'word' && keywords.includes(token.value.toLowerCase());
+  }
+
+  parse() {
+    if (this.tokens.length === 0) {
+      throw new ScimFilterError('フィルター式が空です');
+    }
+    const node = this.parseOr();
+    if (this.position !== this.tokens.length) {
+      throw new ScimFilterError(`フィルター式の末尾に不正な字句があります: ${this.text}`);
+    }
+    return node;
+  }
+
+  parseOr() {
+    const children = [this.parseAnd()];
+    while (this.peekKeyword('or')) {
+      this.take();
+      children.push(this.parseAnd());
+    }
+    return children.length === 1 ? children[0] : { type: 'or', children };
+  }
+
+  parseAnd() {
+    const children = [this.parseNot()];
+    while (this.peekKeyword('and')) {
+      this.take();
+      children.push(this.parseNot());
+    }
+    return children.length === 1 ? children[0] : { type: 'and', children };
+  }
+
+  parseNot() {
+    if (this.peekKeyword('not')) {
+      this.take();
+      this.take('lparen');
+      const child = this.parseOr();
+      this.take('rparen');
+      return { type: 'not', child };
+    }
+    return this.parseAtom();
+  }
+
+  parseAtom() {
+    if (this.peek().kind === 'lparen') {
+      this.take();
+      const node = this.parseOr();
+      this.take('rparen');
+      return node;
+    }
+
+    const path = this.take('word').value;
+    if (this.peek().kind === 'lbracket') {
+      this.take();
+      const filter = this.parseOr();
+      this.take('rbracket');
+      return { type: 'valuePath', path, filter };
+    }
+
+    const operator = this.take('word').value.toLowerCase();
+    if (operator === 'pr') {
+      return { type: 'present', path };
+    }
+    if (!COMPARISON_OPERATORS.includes(operator)) {
+      throw new ScimFilterError(`未対応の演算子です: ${operator}`);
+    }
+
+    const token = this.take();
+    let value;
+    if (token.kind === 'string' || token.kind === 'number') {
+      value = token.value;
+    } else if (token.kind === 'word' && ['true', 'false', 'null'].includes(token.value.toLowerCase())) {
+      value = JSON.parse(token.value.toLowerCase());
+    } else {
+      throw new ScimFilterError(`比較値が不正です: ${token.value}`);
+    }
+    return { type: 'compare', path, operator, value };
+  }
+}
+
+/**
+ * フィルター式を構文木に変換
+ * @param {string} text - フィルター式
+ * @returns {Object} 構文木
+ */
+const parseFilter = (text) => new Parser(text).parse();
+
+/**
+ * 属性パスを属性定義に解決
+ * @param {string} path - 属性パス（スキーマURI付きも可）
+ * @param {string} [parent] - 値パス（emails[...] など）の親属性名
+ * @returns {Object} { name, definition }
+ */
+const resolveAttribute = (path, parent = null) => {
+  let schema = null;
+  let name = path;
+  const lower = path.toLowerCase();
+  for (const uri of SCHEMA_URIS) {
+    if (lower.startsWith(`${uri.toLowerCase()}:`)) {
+      schema = uri;
+      name = path.slice(uri.length + 1);
+      break;
+    }
+  }
+  name = name.toLowerCase();
+  if (parent) {
+    name = `${parent}.${name}`;
+  }
+
+  const resolved = schema
+    ? (ATTRIBUTES[schema][name] && { name, definition: ATTRIBUTES[schema][name] })
+    : BARE_ATTRIBUTES[name];
+  if (!resolved) {
+    throw new ScimFilterError(`未対応の属性です: ${path}`);
+  }
+  return resolved;
+};
+
+const escapeRegex = (value) => value.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+
+/**
+ * 比較値を属性の型に合わせて変換
+ */
+const castValue = (definition, operator, value, path) => {
+  if (value === null) {
+    if (operator !== 'eq' && operator !== 'ne') {
+      throw new ScimFilterError(`null と比較できるのは eq/ne のみです: ${path}`);
+    }
+    return null;
+  }
+  switch (definition.type) {
+    case 'boolean':
+      if (typeof value !== 'boolean' || (operator !== 'eq' && operator !== 'ne')) {
+        throw new ScimFilterError(`真偽値の属性は true/false との eq/ne のみ指定できます: ${path}`);
+      }
+      return value;
+    case 'integer':
+      if (typeof value !== 'number' || ['co', 'sw', 'ew'].includes(operator)) {
+        throw new ScimFilterError(`数値の属性には数値と eq/ne/gt/ge/lt/le を指定してください: ${path}`);
+      }
+      return value;
+    case 'dateTime': {
+      const date = typeof value === 'string' ? new Date(value) : null;
+      if (!date || Number.isNaN(date.getTime()) || ['co', 'sw', 'ew'].includes(operator)) {
+        throw new ScimFilterError(`日時の属性には日時文字列と eq/ne/gt/ge/lt/le を指定してください: ${path}`);
+      }
+      return date;
+    }
+    case 'string':
+      if (typeof value !== 'string') {
+        throw new ScimFilterError(`文字列の属性には文字列を指定してください: ${path}`);
+      }
+      return value;
+    default:
+      throw new ScimFilterError(`複合属性は値パス (${path}[...]) または pr で指定してください: ${path}`);
+  }
+};
+
+/**
+ * 固定値の属性の比較を評価
+ */
+const compareConstant = (constant, operator, value) => {
+  switch (operator) {
+    case 'eq': return constant === value;
+    case 'ne': return constant !== value;
+    case 'co': return typeof value === 'string' && String(constant).includes(value);
+    case 'sw': return typeof value === 'string' && String(constant).startsWith(value);
+    case 'ew': return typeof value === 'string' && String(constant).endsWith(value);
+    case 'gt': return constant > value;
+    case 'ge': return constant >= value;
+    case 'lt': return constant < value;
+    default: return constant <= value;
+  }
+};
+
+const presentQuery = (definition) => {
+  if (definition.multiValued) {
+    return { [definition.field]: { $exists: true, $ne: [] } };
+  }
+  if (definition.type === 'string' || definition.type === 'complex') {
+    return { [definition.field]: { $exists: true, $nin: [null, ''] } };
+  }
+  return { [definition.field]: { $exists: true, $ne: null } };
+};
+
+const combine = (operator, queries) => {
+  const flattened = [];
+  for (const query of queries) {
+    if (operator === '$and') {
+      if (query === MATCH_NONE) return MATCH_NONE;
+      if (Object.keys(query).length === 0) continue;
+    } else {
+      if (Object.keys(query).length === 0) return {};
+      if (query === MATCH_NONE) continue;
+    }
+    if (query[operator] && Object.keys(query).length === 1) {
+      flattened.push(...query[operator]);
+    } else {
+      flattened.push(query);
+    }
+  }
+  if (flattened.length === 0) {
+    return operator === '$and' ? {} : MATCH_NONE;
+  }
+  return flattened.length === 1 ? flattened[0] : { [operator]: flattened };
+};
+
+/**
+ * 構文木をMongoDBクエリに変換
+ * @param {Object} node - parseFilter の戻り値
+ * @param {string} [parent] - 値パスの親属性名
+ * @returns {Object} MongoDBクエリ
+ */
+const compileNode = (node, parent = null) => {
+  switch (node.type) {
+    case 'or':
+      return combine('$or', node.children.map(child => compileNode(child, parent)));
+    case 'and':
+      return combine('$and', node.children.map(child => compileNode(child, parent)));
+    case 'not': {
+      const query = compileNode(node.child, parent);
+      if (query === MATCH_NONE) return {};
+      if (Object.keys(query).length === 0) return MATCH_NONE;
+      return { $nor: [query] };
+    }
+    case 'valuePath': {
+      if (parent) {
+        throw new ScimFilterError(`値パスは入れ子にできません: ${node.path}`);
+      }
+      // 値パスの中の属性は親属性からの相対名で解決する
+      // (格納している要素は1件のため、要素ごとの評価と属性ごとの評価は同じ結果になる)
+      const { name } = resolveAttribute(node.path);
+      return compileNode(node.filter, name.split('.')[0]);
+    }
+    case 'present': {
+      const { definition } = resolveAttribute(node.path, parent);
+      if (definition.constant !== undefined) {
+        return definition.presence ? compileNode({ type: 'present', path: definition.presence }) : {};
+      }
+      return presentQuery(definition);
+    }
+    default: {
+      const { definition } = resolveAttribute(node.path, parent);
+      if (definition.constant !== undefined) {
+        if (!compareConstant(definition.constant, node.operator, node.value)) {
+          return MATCH_NONE;
+        }
+        return definition.presence ? compileNode({ type: 'present', path: definition.presence }) : {};
+      }
+
+      const value = castValue(definition, node.operator, node.value, node.path);
+      const field = definition.field;
+      switch (node.operator) {
+        case 'eq':
+          return { [field]: value };
+        case 'ne':
+          return { [field]: { $ne: value } };
+        case 'co':
+          return { [field]: { $regex: escapeRegex(value) } };
+        case 'sw':
+          // 先頭一致は接頭辞の範囲検索としてインデックスを使用する
+          return { [field]: { $regex: `^${escapeRegex(value)}` } };
+        case 'ew':
+          return { [field]: { $regex: `${escapeRegex(value)}$` } };
+        default:
+          return { [field]: { [ORDER_OPERATORS[node.operator]]: value } };
+      }
+    }
+  }
+};
+
+/**
+ * フィルター式をMongoDBクエリにコンパイル
+ * @param {string} text - フィルター式
+ * @returns {Object} MongoDBクエリ
+ * @throws {ScimFilterError} 構文エラー・未対応の属性の場合
+ */
+const compileFilter = (text) => {
+  const query = compileNode(parseFilter(text));
+  return query === MATCH_NONE ? { id: { $in: [] } } : query;
+};
+
+module.exports = {
+  ScimFilterError,
+  tokenize,
+  parseFilter,
+  compileFilter,
+  ATTRIBUTES
+};
@@ -0,0 +1,135 @@
+/**
+ * SCIMフィルター式のコンパイラのテスト
+ */
+
+jest.mock('../utils/logger', () => ({ debug: jest.fn(), info: jest.fn(), warn: jest.fn(), error: jest.fn() }));
+
+const { ScimFilterError, compileFilter } = require('./scimFilter');
+const { parseScimFilter, filterCache } = require('./scimUtils');
+
+const MATCH_NONE = { id: { $in: [] } };
+const ACCESS_LEVEL_PRESENT = { accessTier: { $exists: true, $nin: [null, ''] } };
+
+describe('compileFilter', () => {
+  test('and は or より優先して結合する', () => {
+    expect(compileFilter('userName eq "a" or displayName eq "b" and active eq true')).toEqual({
+      $or: [{ userName: 'a' }, { $and: [{ displayName: 'b' }, { active: true }] }]
+    });
+  });
+
+  test('括弧で優先順位を変更できる', () => {
+    expect(compileFilter('(userName eq "a" or displayName eq "b") and active eq true')).toEqual({
+      $and: [{ $or: [{ userName: 'a' }, { displayName: 'b' }] }, { active: true }]
+    });
+  });
+
+  test('not は直後の括弧内のみを否定する', () => {
+    expect(compileFilter('not (userName sw "test") and active eq true')).toEqual({
+      $and: [{ $nor: [{ userName: { $regex: '^test' } }] }, { active: true }]
+    });
+  });
+
+  test('同じ演算子の入れ子は平坦化する', () => {
+    expect(compileFilter('userName eq "a" or (displayName eq "b" or emails eq "c")')).toEqual({
+      $or: [{ userName: 'a' }, { displayName: 'b' }, { email: 'c' }]
+    });
+  });
+
+  test('比較演算子を対応するMongoDB演算子に変換する', () => {
+    expect(compileFilter('userName ne "a"')).toEqual({ userName: { $ne: 'a' } });
+    expect(compileFilter('userName co "a.b"')).toEqual({ userName: { $regex: 'a\\.b' } });
+    expect(compileFilter('userName ew "@example.com"')).toEqual({ userName: { $regex: '@example\\.com$' } });
+    expect(compileFilter('maxTokens ge 1000')).toEqual({ maxTokens: { $gte: 1000 } });
+    expect(compileFilter('meta.lastModified gt "2024-01-01T00:00:00Z"')).toEqual({
+      updatedAt: { $gt: new Date('2024-01-01T00:00:00Z') }
+    });
+    expect(compileFilter('emails pr')).toEqual({ email: { $exists: true, $nin: [null, ''] } });
+  });
+
+  test('値パスの属性は親属性からの相対名で解決する', () => {
+    expect(compileFilter('emails[value ew "@example.com"]')).toEqual({ email: { $regex: '@example\\.com$' } });
+    expect(compileFilter('extendAttrs[name eq "accessLevel" and value eq "advanced"]')).toEqual({
+      $and: [ACCESS_LEVEL_PRESENT, { accessTier: 'advanced' }]
+    });
+  });
+
+  test('スキーマURI付きの属性名を解決する', () => {
+    expect(compileFilter('urn:ietf:params:scim:schemas:core:2.0:User:userName eq "x"')).toEqual({ userName: 'x' });
+    expect(compileFilter('urn:extic:scim:schemas:1.0:User:exticGroups eq "g1"')).toEqual({ userGroups: 'g1' });
+    expect(compileFilter('custom:ai:access:allowedModels eq "gpt"')).toEqual({ allowedModels: 'gpt' });
+  });
+
+  test('テスターが送信する拡張属性のフィルターを accessTier の条件に変換する', () => {
+    expect(compileFilter('(extendAttrs.name eq "accessLevel") and (extendAttrs.value eq "advanced")')).toEqual({
+      $and: [ACCESS_LEVEL_PRESENT, { accessTier: 'advanced' }]
+    });
+  });
+
+  test('固定値の属性に一致しない条件はどのユーザーにも一致しない', () => {
+    expect(compileFilter('extendAttrs[name eq "other"]')).toEqual(MATCH_NONE);
+    expect(compileFilter('extendAttrs.name eq "other" and userName eq "a"')).toEqual(MATCH_NONE);
+    expect(compileFilter('extendAttrs.name eq "other" or userName eq "a"')).toEqual({ userName: 'a' });
+    expect(compileFilter('not (extendAttrs[name eq "other"])')).toEqual({});
+    expect(compileFilter('meta.resourceType eq "User"')).toEqual({});
+  });
+
+  test.each([
+    ['', 'フィルター式が空です'],
+    ['userName eq', '構文エラー'],
+    ['userName like "x"', '未対応の演算子です'],
+    ['unknown eq "x"', '未対応の属性です'],
+    ['active eq "yes"', '真偽値の属性'],
+    ['maxTokens co "1"', '数値の属性'],
+    ['meta.created gt "yesterday"', '日時の属性'],
+    ['extendAttrs eq "x"', '複合属性は値パス'],
+    ['userName eq "a")', '末尾に不正な字句があります'],
+    ['emails[value eq "a"', '構文エラー'],
+    ['urn:extic:scim:schemas:1.0:User:userName eq "x"', '未対応の属性です']
+  ])('不正なフィルター式は ScimFilterError になる: %s', (filter, message) => {
+    expect(() => compileFilter(filter)).toThrow(ScimFilterError);
+    expect(() => compileFilter(filter)).toThrow(message);
+  });
+
+  test('ScimFilterError は 400 invalidFilter として返す', () => {
+    try {
+      compileFilter('userName like "x"');
+      throw new Error('ScimFilterError が送出されませんでした');
+    } catch (error) {
+      expect(error.status).toBe(400);
+      expect(error.scimType).toBe('invalidFilter');
+    }
+  });
+});
+
+describe('parseScimFilter', () => {
+  beforeEach(() => {
+    filterCache.clear();
+  });
+
+  test('コンパイル結果をキャッシュする', () => {
+    parseScimFilter('userName eq "a"');
+    parseScimFilter('userName eq "a"');
+    expect(filterCache.size).toBe(1);
+    expect(filterCache.stats().hits).toBeGreaterThanOrEqual(1);
+  });
+
+  test('返したクエリを変更してもキャッシュに影響しない', () => {
+    const filter = '(userName eq "a") and (active eq true)';
+    const first = parseScimFilter(filter);
+    first.$and.push({ injected: true });
+    first.$and[0].userName = 'b';
+
+    expect(parseScimFilter(filter)).toEqual({ $and: [{ userName: 'a' }, { active: true }] });
+  });
+
+  test('不正なフィルター式のエラーもキャッシュする', () => {
+    expect(() => parseScimFilter('userName like "x"')).toThrow(ScimFilterError);
+    expect(() => parseScimFilter('userName like "x"')).toThrow(ScimFilterError);
+    expect(filterCache.size).toBe(1);
+  });
+
+  test('フィルター式が空の場合は全件を対象とする', () => {
+    expect(parseScimFilter('')).toEqual({});
+    expect(parseScimFilter(undefined)).toEqual({});
+  });
+});
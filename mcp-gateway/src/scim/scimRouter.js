@@ -33,6 +33,12 @@ router.get('/ServiceProviderConfig', (req, res) => {
       "supported": true,
       "maxResults": 200
     },
+    "pagination": {
+      "cursor": true,
+      "index": true,
+      "defaultPaginationMethod": "index",
+      "defaultPageSize": 10
+    },
     "changePassword": {
       "supported": false
     },
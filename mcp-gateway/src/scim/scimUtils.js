@@ -3,7 +3,10 @@
  * SCIMプロトコルの処理をサポートする関数群
  */
 
+const config = require('../../config');
 const logger = require('../utils/logger');
+const LruCache = require('../utils/lruCache');
+const { ScimFilterError, compileFilter } = require('./scimFilter');
 
 /**
  * SCIMエラーレスポンスを生成
@@ -44,81 +47,115 @@ const createListResponse = (resources, totalResults, startIndex = 1, count = 10)
   };
 };
 
+// コンパイル済みフィルターのキャッシュ（同じフィルター式の再解析を省く）
+const filterCache = new LruCache({ maxSize: config.scim.filterCacheSize });
+
 /**
  * SCIMフィルターをMongoDBクエリに変換
+ * RFC 7644 のフィルター式（and/or/not、括弧、値パス、全比較演算子、pr）と
+ * Extic・custom:ai:access 拡張スキーマの属性に対応する。
+ * コンパイル結果はフィルター文字列をキーにLRUキャッシュへ保存し、呼び出し側が変更しても
+ * キャッシュに影響しないよう複製を返す。
  * @param {string} filter - SCIMフィルター式
  * @returns {Object} MongoDBクエリオブジェクト
+ * @throws {ScimFilterError} 構文エラー・未対応の属性の場合（400 invalidFilter として返す）
  */
 const parseScimFilter = (filter) => {
-  logger.debug(`SCIMフィルター解析: ${filter}`);
-  
   if (!filter) {
     return {};
   }
-  
-  try {
-    // 単純なSCIMフィルターの解析（基本的なケースのみサポート）
-    // 例: userName eq "john"
-    const equalityMatch = filter.match(/(\w+)\s+eq\s+"([^"]+)"/);
-    if (equalityMatch) {
-      const [_, attribute, value] = equalityMatch;
-      logger.debug(`フィルター解析結果: ${attribute} = ${value}`);
-      
-      // 属性に基づいてクエリを構築
-      if (attribute === 'userName') {
-        return { userName: value };
-      } else if (attribute === 'email') {
-        return { email: value };
-      } else if (attribute === 'id') {
-        return { id: value };
-      } else if (attribute === 'displayName') {
-        return { displayName: value };
-      } else {
-        // その他の属性への対応
-        logger.warn(`未サポートの属性フィルター: ${attribute}`);
-        return {};
+
+  let compiled = filterCache.get(filter);
+  if (compiled === undefined) {
+    logger.debug(`SCIMフィルター解析: ${filter}`);
+    try {
+      compiled = { query: compileFilter(filter) };
+    } catch (error) {
+      if (!(error instanceof ScimFilterError)) {
+        throw error;
       }
+      // 不正なフィルター式も繰り返し送られるため、エラーもキャッシュする
+      compiled = { error };
     }
-    
-    // 'present' 演算子 (例: active pr)
-    const presentMatch = filter.match(/(\w+)\s+pr/);
-    if (presentMatch) {
-      const [_, attribute] = presentMatch;
-      logger.debug(`Present フィルター解析結果: ${attribute} exists`);
-      
-      return { [attribute]: { $exists: true } };
-    }
-    
-    // より複雑なフィルターの場合は未サポート
-    logger.warn(`複雑すぎるフィルター式: ${filter}`);
-    return {};
-    
-  } catch (error) {
-    logger.error(`SCIMフィルター解析エラー: ${error.message}`);
-    return {};
+    filterCache.set(filter, compiled);
+  }
+
+  if (compiled.error) {
+    logger.warn(`SCIMフィルター解析エラー: ${compiled.error.message}`);
+    throw compiled.error;
+  }
+  return structuredClone(compiled.query);
+};
+
+/**
+ * カーソル方式のページングのリストレスポンスを生成 (RFC 9865)
+ * @param {Array} resources - リソースの配列
+ * @param {number} totalResults - 全リソース数
+ * @param {string} [nextCursor] - 次のページのカーソル（最後のページでは省略）
+ * @returns {Object} SCIMリストレスポンス
+ */
+const createCursorListResponse = (resources, totalResults, nextCursor) => {
+  const response = {
+    schemas: ["urn:ietf:params:scim:api:messages:2.0:ListResponse"],
+    totalResults,
+    itemsPerPage: resources.length,
+    Resources: resources
+  };
+  if (nextCursor) {
+    response.nextCursor = nextCursor;
   }
+  return response;
 };
 
 /**
  * ページングパラメータを処理
+ * count=0 の場合は件数 (totalResults) のみを返す (RFC 7644 3.4.2.4)。
+ * cursor が指定された場合 (初回は空文字) はカーソル方式で、startIndex は使用しない。
  * @param {Object} params - リクエストパラメータ
- * @returns {Object} スタートインデックスとカウント
+ * @returns {Object} スタートインデックス・カウント・カーソル
  */
 const handlePaging = (params) => {
-  const startIndex = parseInt(params.startIndex) || 1;
-  const count = parseInt(params.count) || 10;
+  const startIndex = Math.max(1, parseInt(params.startIndex) || 1);
+  const parsedCount = parseInt(params.count);
+  const count = Number.isNaN(parsedCount) ? 10 : Math.max(0, parsedCount);
   
   return {
     startIndex,
     count,
-    skip: Math.max(0, startIndex - 1),
-    limit: count
+    skip: startIndex - 1,
+    limit: count,
+    cursor: typeof params.cursor === 'string' ? params.cursor : undefined
   };
 };
 
+/**
+ * カーソルを生成（ページ最後のドキュメントの _id を base64url で表現）
+ * @param {Object} objectId - ドキュメントの _id
+ * @returns {string} カーソル
+ */
+const encodeCursor = (objectId) => Buffer.from(objectId.toString(), 'hex').toString('base64url');
+
+/**
+ * カーソルを _id に戻す
+ * @param {string} cursor - encodeCursor で生成したカーソル
+ * @returns {string|null} _id の16進文字列（不正なカーソルの場合は null）
+ */
+const decodeCursor = (cursor) => {
+  const bytes = Buffer.from(cursor, 'base64url');
+  if (bytes.length !== 12 || bytes.toString('base64url') !== cursor) {
+    return null;
+  }
+  return bytes.toString('hex');
+};
+
 module.exports = {
   createScimError,
   createListResponse,
+  createCursorListResponse,
   parseScimFilter,
-  handlePaging
+  filterCache,
+  ScimFilterError,
+  handlePaging,
+  encodeCursor,
+  decodeCursor
 };
@@ -6,40 +6,79 @@
 const { v4: uuidv4 } = require('uuid');
 const User = require('../models/User');
 const logger = require('../utils/logger');
+const principalCache = require('../auth/principalCache');
+const { usageStats } = require('../utils/usageStats');
 const { 
   createScimError, 
   createListResponse, 
+  createCursorListResponse,
   parseScimFilter,
-  handlePaging 
+  handlePaging,
+  encodeCursor,
+  decodeCursor,
+  ScimFilterError
 } = require('./scimUtils');
 
+/**
+ * 条件に一致するユーザー数を取得
+ * フィルターがない場合はコレクションのメタデータから求め、全件の走査を避ける
+ * @param {Object} query - MongoDBクエリ
+ * @returns {Promise<number>} ユーザー数
+ */
+const countUsers = (query) => (
+  Object.keys(query).length === 0 ? User.estimatedDocumentCount() : User.countDocuments(query)
+);
+
 /**
  * ユーザー一覧を取得
  * GET /scim/v2/Users
+ * ページと件数は並列に取得し、ドキュメントは lean() で読み込んでSCIM表現に変換する。
+ * cursor パラメータを指定した場合は _id によるキーセット方式でページングする
+ * (startIndex が大きくなっても skip による走査が発生しない)。
  */
 const getUsers = async (req, res) => {
   try {
     logger.debug('SCIMユーザー一覧リクエスト受信');
     
     // ページング処理
-    const { startIndex, count, skip, limit } = handlePaging(req.query);
+    const { startIndex, count, skip, limit, cursor } = handlePaging(req.query);
     
     // フィルター処理
-    let query = {};
-    if (req.query.filter) {
-      query = parseScimFilter(req.query.filter);
+    const query = parseScimFilter(req.query.filter);
+    
+    // カーソル方式: 前のページ最後の _id より後ろを count + 1 件取得し、次のページの有無を判定する
+    if (cursor !== undefined) {
+      const after = cursor ? decodeCursor(cursor) : null;
+      if (cursor && !after) {
+        return res.status(400).json(
+          createScimError(400, `カーソルが不正です: ${cursor}`, 'invalidCursor')
+        );
+      }
+      const pageQuery = after ? { $and: [query, { _id: { $gt: after } }] } : query;
+      const [users, totalResults] = await Promise.all([
+        count > 0
+          ? User.find(pageQuery, User.SCIM_FIELDS).sort({ _id: 1 }).limit(count + 1).lean()
+          : [],
+        countUsers(query)
+      ]);
+      const page = users.slice(0, count);
+      const nextCursor = users.length > count ? encodeCursor(page[page.length - 1]._id) : undefined;
+      const scimUsers = page.map(User.toScimObject);
+      
+      logger.info(`SCIMユーザー一覧取得成功 (カーソル): ${scimUsers.length}件 / 合計${totalResults}件`);
+      return res.status(200).json(createCursorListResponse(scimUsers, totalResults, nextCursor));
     }
     
-    // ユーザーの取得
-    const users = await User.find(query)
-      .skip(skip)
-      .limit(limit);
-    
-    // 合計カウントの取得
-    const totalResults = await User.countDocuments(query);
+    // インデックス方式: ページと合計件数を並列に取得 (count=0 の場合は件数のみ)
+    const [users, totalResults] = await Promise.all([
+      limit > 0
+        ? User.find(query, User.SCIM_FIELDS).sort({ _id: 1 }).skip(skip).limit(limit).lean()
+        : [],
+      countUsers(query)
+    ]);
     
     // ユーザーをSCIM形式に変換
-    const scimUsers = users.map(user => user.toScim());
+    const scimUsers = users.map(User.toScimObject);
     
     // レスポンスの作成
     const response = createListResponse(
@@ -53,6 +92,9 @@ const getUsers = async (req, res) => {
     return res.status(200).json(response);
     
   } catch (error) {
+    if (error instanceof ScimFilterError) {
+      return res.status(400).json(createScimError(400, error.message, error.scimType));
+    }
     logger.error(`SCIMユーザー一覧取得エラー: ${error.message}`);
     return res.status(500).json(
       createScimError(500, `ユーザー一覧の取得中にエラーが発生しました: ${error.message}`)
@@ -70,7 +112,7 @@ const getUserById = async (req, res) => {
     logger.debug(`SCIMユーザー詳細リクエスト受信: ID=${id}`);
     
     // ユーザーの取得
-    const user = await User.findOne({ id });
+    const user = await User.findOne({ id }, User.SCIM_FIELDS).lean();
     
     if (!user) {
       logger.warn(`SCIMユーザー詳細取得失敗: ID=${id} のユーザーが見つかりません`);
@@ -80,7 +122,7 @@ const getUserById = async (req, res) => {
     }
     
     // SCIM形式にして返す
-    const scimUser = user.toScim();
+    const scimUser = User.toScimObject(user);
     
     logger.info(`SCIMユーザー詳細取得成功: ID=${id}`);
     return res.status(200).json(scimUser);
@@ -129,6 +171,7 @@ const createUser = async (req, res) => {
     
     // ユーザーの作成
     const user = await User.create(userData);
+    usageStats.updateUser(null, user);
     
     // SCIM形式にして返す
     const scimUser = user.toScim();
@@ -169,6 +212,9 @@ const updateUser = async (req, res) => {
       id // IDを維持
     });
     
+    // 統計の更新に使用する変更前の値
+    const before = { active: user.active, systemRole: user.systemRole, accessTier: user.accessTier };
+    
     // ユーザーの更新
     Object.keys(userData).forEach(key => {
       if (key !== 'id') { // IDは変更不可
@@ -177,6 +223,10 @@ const updateUser = async (req, res) => {
     });
     
     await user.save();
+    usageStats.updateUser(before, user);
+    
+    // 認証キャッシュを破棄し、アクセスレベルの変更を次のリクエストから反映する
+    principalCache.invalidate(id);
     
     // SCIM形式にして返す
     const scimUser = user.toScim();
@@ -212,7 +262,13 @@ const deleteUser = async (req, res) => {
     }
     
     // ユーザーの削除
-    await User.deleteOne({ id });
+    const { deletedCount } = await User.deleteOne({ id });
+    if (deletedCount > 0) {
+      usageStats.updateUser(user, null);
+    }
+    
+    // 認証キャッシュを破棄し、削除したユーザーのトークンを直ちに拒否する
+    principalCache.invalidate(id);
     
     logger.info(`SCIMユーザー削除成功: ID=${id}`);
     return res.status(204).send();
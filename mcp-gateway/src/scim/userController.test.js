@@ -0,0 +1,170 @@
+/**
+ * SCIMユーザー一覧 (ページング) のテスト
+ */
+
+jest.mock('../utils/logger', () => ({ debug: jest.fn(), info: jest.fn(), warn: jest.fn(), error: jest.fn() }));
+
+const User = require('../models/User');
+const { getUsers } = require('./userController');
+const { encodeCursor, decodeCursor } = require('./scimUtils');
+
+// _id の昇順に並んだユーザー
+const USERS = Array.from({ length: 5 }, (_, index) => ({
+  _id: `65a0000000000000000000${index.toString(16).padStart(2, '0')}`,
+  id: `user-${index}`,
+  userName: `user${index}`,
+  active: index % 2 === 0
+}));
+
+/**
+ * User.find(...).sort().skip().limit().lean() を置き換える
+ * _id の $gt 条件・active の条件・sort/skip/limit を解釈し、呼び出しを記録する
+ * @returns {Array} 検索ごとの { query, sort, skip, limit }
+ */
+const stubUsers = () => {
+  const queries = [];
+  jest.spyOn(User, 'find').mockImplementation((query) => {
+    const call = { query };
+    queries.push(call);
+    const chain = {
+      sort: (sort) => { call.sort = sort; return chain; },
+      skip: (skip) => { call.skip = skip; return chain; },
+      limit: (limit) => { call.limit = limit; return chain; },
+      lean: async () => {
+        const conditions = query.$and || [query];
+        let users = USERS.filter(user => conditions.every(condition => (
+          (!condition._id || user._id > condition._id.$gt) &&
+          (condition.active === undefined || user.active === condition.active)
+        )));
+        users = users.slice(call.skip || 0);
+        return call.limit ? users.slice(0, call.limit) : users;
+      }
+    };
+    return chain;
+  });
+  jest.spyOn(User, 'estimatedDocumentCount').mockResolvedValue(USERS.length);
+  jest.spyOn(User, 'countDocuments').mockImplementation(async (query) => (
+    USERS.filter(user => query.active === undefined || user.active === query.active).length
+  ));
+  return queries;
+};
+
+const list = async (query) => {
+  const res = {};
+  res.status = jest.fn(() => res);
+  res.json = jest.fn(() => res);
+  await getUsers({ query }, res);
+  return { status: res.status.mock.calls[0][0], body: res.json.mock.calls[0][0] };
+};
+
+beforeEach(() => {
+  jest.restoreAllMocks();
+});
+
+describe('カーソル方式のページング', () => {
+  test('count + 1 件を取得して次のページの有無を判定する', async () => {
+    const queries = stubUsers();
+    const { status, body } = await list({ cursor: '', count: '2' });
+
+    expect(status).toBe(200);
+    expect(body.Resources.map(user => user.id)).toEqual(['user-0', 'user-1']);
+    expect(body.itemsPerPage).toBe(2);
+    expect(body.totalResults).toBe(5);
+    expect(body.nextCursor).toBe(encodeCursor(USERS[1]._id));
+    expect(body.startIndex).toBeUndefined();
+    expect(queries[0]).toMatchObject({ sort: { _id: 1 }, limit: 3 });
+    expect(queries[0].skip).toBeUndefined();
+  });
+
+  test('nextCursor をたどると重複・欠落なく最後のページまで取得できる', async () => {
+    stubUsers();
+    const ids = [];
+    let cursor = '';
+    let pages = 0;
+    do {
+      const { body } = await list({ cursor, count: '2' });
+      ids.push(...body.Resources.map(user => user.id));
+      cursor = body.nextCursor;
+      pages++;
+    } while (cursor);
+
+    expect(ids).toEqual(USERS.map(user => user.id));
+    expect(pages).toBe(3);
+  });
+
+  test('残りが count 件ちょうどの場合は nextCursor を返さない', async () => {
+    stubUsers();
+    const { body } = await list({ cursor: encodeCursor(USERS[2]._id), count: '2' });
+
+    expect(body.Resources.map(user => user.id)).toEqual(['user-3', 'user-4']);
+    expect(body.nextCursor).toBeUndefined();
+  });
+
+  test('フィルター条件とカーソルの条件を組み合わせる', async () => {
+    const queries = stubUsers();
+    const { body } = await list({ cursor: encodeCursor(USERS[0]._id), count: '10', filter: 'active eq true' });
+
+    expect(queries[0].query).toEqual({ $and: [{ active: true }, { _id: { $gt: USERS[0]._id } }] });
+    expect(body.Resources.map(user => user.id)).toEqual(['user-2', 'user-4']);
+    expect(body.totalResults).toBe(3);
+  });
+
+  test('不正なカーソルは 400 invalidCursor を返し、検索しない', async () => {
+    const queries = stubUsers();
+    const { status, body } = await list({ cursor: 'not-a-cursor', count: '2' });
+
+    expect(status).toBe(400);
+    expect(body.scimType).toBe('invalidCursor');
+    expect(queries).toHaveLength(0);
+  });
+
+  test('count=0 の場合はページを検索せず件数のみを返す', async () => {
+    const queries = stubUsers();
+    const { body } = await list({ cursor: '', count: '0' });
+
+    expect(queries).toHaveLength(0);
+    expect(body).toMatchObject({ totalResults: 5, itemsPerPage: 0, Resources: [] });
+    expect(body.nextCursor).toBeUndefined();
+  });
+});
+
+describe('インデックス方式のページング', () => {
+  test('_id の順に skip して取得する', async () => {
+    const queries = stubUsers();
+    const { body } = await list({ startIndex: '3', count: '2' });
+
+    expect(queries[0]).toMatchObject({ sort: { _id: 1 }, skip: 2, limit: 2 });
+    expect(body.Resources.map(user => user.id)).toEqual(['user-2', 'user-3']);
+    expect(body).toMatchObject({ startIndex: 3, totalResults: 5 });
+  });
+
+  test('count=0 の場合はページを検索せず、フィルターがなければ推定件数を使う', async () => {
+    const queries = stubUsers();
+    const { body } = await list({ count: '0' });
+
+    expect(queries).toHaveLength(0);
+    expect(User.estimatedDocumentCount).toHaveBeenCalled();
+    expect(User.countDocuments).not.toHaveBeenCalled();
+    expect(body).toMatchObject({ totalResults: 5, itemsPerPage: 0 });
+  });
+
+  test('フィルターがある場合は条件に一致する件数を数える', async () => {
+    stubUsers();
+    const { body } = await list({ count: '0', filter: 'active eq true' });
+
+    expect(User.countDocuments).toHaveBeenCalledWith({ active: true });
+    expect(body.totalResults).toBe(3);
+  });
+});
+
+describe('encodeCursor / decodeCursor', () => {
+  test('_id を往復変換できる', () => {
+    const cursor = encodeCursor(USERS[3]._id);
+    expect(cursor).toMatch(/^[A-Za-z0-9_-]{16}$/);
+    expect(decodeCursor(cursor)).toBe(USERS[3]._id);
+  });
+
+  test.each(['', 'abc', encodeCursor(USERS[0]._id) + 'A', 'ZaAAAAAAAAAAAAAA='])('不正なカーソルは null を返す: %s', (cursor) => {
+    expect(decodeCursor(cursor)).toBeNull();
+  });
+});
@@ -0,0 +1,331 @@
+/**
+ * アクセスログ書き込み
+ * アクセスログをメモリ上のキューに溜め、一定間隔で insertMany によりまとめて保存する
+ * (リクエストの応答はデータベースへの書き込みを待たない)
+ */
+
+const EventEmitter = require('events');
+const fs = require('fs');
+const path = require('path');
+const readline = require('readline');
+const AccessLog = require('../models/AccessLog');
+const config = require('../../config');
+const logger = require('./logger');
+
+// 重複キーエラー (退避したログの再保存で既に保存済みのものを含む場合)
+const DUPLICATE_KEY = 11000;
+
+/**
+ * 一括挿入のエラーが重複キーのみか
+ * @param {Error} error - insertMany のエラー
+ * @returns {boolean} 重複キーのみの場合は true
+ */
+const isDuplicateOnly = (error) => {
+  if (error.code === DUPLICATE_KEY) return true;
+  const writeErrors = error.writeErrors || (error.result && error.result.writeErrors);
+  return Array.isArray(writeErrors) && writeErrors.length > 0 &&
+    writeErrors.every(writeError => (writeError.code ?? (writeError.err && writeError.err.code)) === DUPLICATE_KEY);
+};
+
+/**
+ * 重複キーのみのエラーで終了した一括挿入のうち、実際に保存されたアクセスログ
+ * @param {Array} batch - 保存しようとしたアクセスログ
+ * @param {Error} error - insertMany のエラー
+ * @returns {Array} 保存されたアクセスログ
+ */
+const insertedEntries = (batch, error) => {
+  const writeErrors = error.writeErrors || (error.result && error.result.writeErrors);
+  if (Array.isArray(writeErrors) && writeErrors.every(writeError => Number.isInteger(writeError.index))) {
+    const failed = new Set(writeErrors.map(writeError => writeError.index));
+    return batch.filter((entry, index) => !failed.has(index));
+  }
+  return Array.isArray(error.insertedDocs) ? error.insertedDocs : [];
+};
+
+class AccessLogWriter extends EventEmitter {
+  /**
+   * 保存したアクセスログは 'inserted' イベント (引数: アクセスログの配列) で通知する
+   * (終了後に書き込まれたログは退避ファイルに書き出すか破棄する)
+   *
+   * @param {Object} [options]
+   * @param {Object} [options.model] - 保存先のモデル
+   * @param {number} [options.batchSize=500] - 1回の insertMany で保存する最大件数
+   * @param {number} [options.flushInterval=1000] - 保存間隔（ミリ秒）
+   * @param {number} [options.maxQueue=10000] - キューの上限（超えた分は退避ファイルに書き出すか破棄する）
+   * @param {string} [options.spillFile] - 退避ファイルのパス（空の場合は退避せず破棄する）
+   */
+  constructor({ model = AccessLog, batchSize = 500, flushInterval = 1000, maxQueue = 10000, spillFile = '' } = {}) {
+    super();
+    this.model = model;
+    this.batchSize = batchSize;
+    this.flushInterval = flushInterval;
+    this.maxQueue = maxQueue;
+    this.spillFile = spillFile;
+    this.queue = [];
+    this.spillBuffer = [];
+    this.spillWrite = Promise.resolve();
+    this.flushing = null;
+    this.timer = null;
+    this.closed = false;
+    this.backpressure = false;
+    // 直前の保存に失敗したか (失敗している間は退避ファイルを再保存しない)
+    this.failing = false;
+    this.counters = {
+      inserted: 0,
+      batches: 0,
+      failedBatches: 0,
+      spilled: 0,
+      replayed: 0,
+      duplicates: 0,
+      dropped: 0
+    };
+    this.lastFlushMs = 0;
+  }
+
+  /**
+   * アクセスログを書き込みキューに追加
+   * @param {Object} entry - アクセスログ
+   * @returns {boolean} キューに追加した場合は true（上限を超えて退避・破棄した場合は false）
+   */
+  write(entry) {
+    if (this.closed || this.queue.length >= this.maxQueue) {
+      this._overflow([entry]);
+      return false;
+    }
+    this._startTimer();
+    this.queue.push(entry);
+    if (this.queue.length >= this.batchSize && !this.flushing) {
+      this.flush();
+    }
+    return true;
+  }
+
+  _startTimer() {
+    if (this.timer) return;
+    this.timer = setInterval(() => {
+      this.flush();
+      this._writeSpill();
+    }, this.flushInterval);
+    this.timer.unref();
+  }
+
+  /**
+   * 保存できないログを退避ファイルに書き出す（退避しない設定の場合は破棄する）
+   * @param {Array} entries - アクセスログ
+   */
+  _overflow(entries) {
+    if (!this.backpressure && !this.closed) {
+      this.backpressure = true;
+      logger.warn(`アクセスログの保存が遅れています: キュー=${this.queue.length}件 (上限 ${this.maxQueue}件)`);
+    }
+    if (!this.spillFile) {
+      this.counters.dropped += entries.length;
+      return;
+    }
+    this.spillBuffer.push(...entries);
+    // 終了後は定期的な退避が行われないため、直ちに書き出す
+    if (this.closed || this.spillBuffer.length >= this.batchSize) {
+      this._writeSpill();
+    }
+  }
+
+  /**
+   * 退避待ちのログを退避ファイルに追記
+   * @returns {Promise<void>}
+   */
+  _writeSpill() {
+    if (this.spillBuffer.length === 0) {
+      return this.spillWrite;
+    }
+    const entries = this.spillBuffer;
+    this.spillBuffer = [];
+    const data = entries.map(entry => JSON.stringify(entry)).join('\n') + '\n';
+    return this._spillTask(async () => {
+      await fs.promises.mkdir(path.dirname(this.spillFile), { recursive: true });
+      await fs.promises.appendFile(this.spillFile, data);
+      this.counters.spilled += entries.length;
+    }, entries.length);
+  }
+
+  /**
+   * 退避ファイルへの操作を順に実行
+   * @param {Function} task - 実行する処理
+   * @param {number} [count=0] - 失敗した場合に破棄件数として数える件数
+   * @returns {Promise<void>}
+   */
+  _spillTask(task, count = 0) {
+    this.spillWrite = this.spillWrite
+      .then(task)
+      .catch(error => {
+        this.counters.dropped += count;
+        logger.error(`アクセスログの退避に失敗しました (${count}件を破棄): ${error.message}`);
+      });
+    return this.spillWrite;
+  }
+
+  /**
+   * アクセスログを一括保存
+   * @param {Array} batch - アクセスログ
+   * @returns {Promise<boolean>} 保存できた場合は true
+   */
+  async _insert(batch) {
+    let inserted = batch;
+    try {
+      await this.model.insertMany(batch, { ordered: false });
+    } catch (error) {
+      if (!isDuplicateOnly(error)) {
+        this.failing = true;
+        this.counters.failedBatches++;
+        logger.error(`アクセスログの保存に失敗しました (${batch.length}件): ${error.message}`);
+        return false;
+      }
+      // 既に保存済みのログは数えず、通知もしない
+      inserted = insertedEntries(batch, error);
+      this.counters.duplicates += batch.length - inserted.length;
+    }
+    this.failing = false;
+    this.counters.batches++;
+    this.counters.inserted += inserted.length;
+    if (inserted.length > 0) {
+      this.emit('inserted', inserted);
+    }
+    return true;
+  }
+
+  /**
+   * キューのアクセスログを保存
+   * 実行中の場合は実行中の保存の完了を待つ
+   * @returns {Promise<void>}
+   */
+  flush() {
+    if (!this.flushing) {
+      this.flushing = this._drain().finally(() => {
+        this.flushing = null;
+      });
+    }
+    return this.flushing;
+  }
+
+  async _drain() {
+    const started = Date.now();
+    const healthy = await this._drainQueue();
+    this.lastFlushMs = Date.now() - started;
+    if (!healthy || this.failing) return;
+
+    if (this.backpressure && this.queue.length === 0) {
+      this.backpressure = false;
+      logger.info('アクセスログの保存の遅れが解消しました');
+    }
+    if (this.spillFile && !this.closed) {
+      await this._replaySpill();
+    }
+  }
+
+  /**
+   * キューが空になるまでバッチ単位で保存
+   * @returns {Promise<boolean>} すべて保存できた場合は true
+   */
+  async _drainQueue() {
+    while (this.queue.length > 0) {
+      const batch = this.queue.splice(0, this.batchSize);
+      if (!(await this._insert(batch))) {
+        // 保存に失敗したバッチは退避し、残りは次の保存で再試行する
+        this._overflow(batch);
+        return false;
+      }
+    }
+    return true;
+  }
+
+  /**
+   * 退避ファイルのアクセスログを再保存
+   * 再保存に失敗した場合は再保存中のファイルを残し、次回は先頭から再保存する
+   * (保存済みのログは id の一意インデックスにより重複として無視される)
+   */
+  async _replaySpill() {
+    await this._writeSpill();
+    const replayFile = `${this.spillFile}.replay`;
+    await this._spillTask(async () => {
+      if (!fs.existsSync(replayFile) && fs.existsSync(this.spillFile)) {
+        await fs.promises.rename(this.spillFile, replayFile);
+      }
+    });
+    if (!fs.existsSync(replayFile)) return;
+
+    const input = fs.createReadStream(replayFile);
+    const lines = readline.createInterface({ input, crlfDelay: Infinity });
+    let batch = [];
+    const save = async () => {
+      // 再保存中に追加されたログを先に保存し、キューが溢れないようにする
+      if (!(await this._drainQueue()) || !(await this._insert(batch))) {
+        return false;
+      }
+      this.counters.replayed += batch.length;
+      batch = [];
+      return true;
+    };
+    let saved = true;
+    for await (const line of lines) {
+      if (!line.trim()) continue;
+      try {
+        batch.push(JSON.parse(line));
+      } catch (error) {
+        // 書き込み途中で終了した行は読み飛ばす
+        this.counters.dropped++;
+        continue;
+      }
+      if (batch.length >= this.batchSize && !(saved = await save())) {
+        break;
+      }
+    }
+    if (saved && batch.length > 0) {
+      saved = await save();
+    }
+    lines.close();
+    input.destroy();
+    if (saved) {
+      await fs.promises.unlink(replayFile);
+      logger.info('退避したアクセスログを保存しました');
+    }
+  }
+
+  /**
+   * 書き込みを終了し、キューのアクセスログをすべて保存する（保存できない分は退避する）
+   * @returns {Promise<void>}
+   */
+  async close() {
+    this.closed = true;
+    if (this.timer) {
+      clearInterval(this.timer);
+      this.timer = null;
+    }
+    await this.flush();
+    while (this.queue.length > 0) {
+      await this.flush();
+    }
+    await this._writeSpill();
+  }
+
+  /**
+   * キューの状態と件数
+   * @returns {Object} queued (キューの件数), maxQueue, backpressure (保存が遅れているか),
+   *   inserted, batches, failedBatches, spilled, replayed, duplicates, dropped, lastFlushMs
+   */
+  stats() {
+    return {
+      queued: this.queue.length,
+      maxQueue: this.maxQueue,
+      backpressure: this.backpressure,
+      ...this.counters,
+      lastFlushMs: this.lastFlushMs
+    };
+  }
+}
+
+// アプリケーション全体で共有する書き込み
+const accessLogWriter = new AccessLogWriter(config.accessLog);
+
+module.exports = {
+  AccessLogWriter,
+  accessLogWriter
+};
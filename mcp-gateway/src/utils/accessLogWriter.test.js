@@ -0,0 +1,202 @@
+/**
+ * アクセスログ書き込みのテスト
+ */
+
+jest.mock('./logger', () => ({ debug: jest.fn(), info: jest.fn(), warn: jest.fn(), error: jest.fn() }));
+
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { AccessLogWriter } = require('./accessLogWriter');
+
+/**
+ * insertMany の結果を切り替えられるモデル
+ * mode: 'ok' (保存する), 'fail' (接続エラー), 'duplicate' (duplicates に含まれる id を重複とする)
+ */
+const stubModel = () => {
+  const model = {
+    mode: 'ok',
+    duplicates: new Set(),
+    saved: [],
+    insertMany: jest.fn(async (batch) => {
+      if (model.mode === 'fail') {
+        throw new Error('connection refused');
+      }
+      const writeErrors = [];
+      batch.forEach((entry, index) => {
+        if (model.mode === 'duplicate' && model.duplicates.has(entry.id)) {
+          writeErrors.push({ index, code: 11000 });
+        } else {
+          model.saved.push(entry);
+        }
+      });
+      if (writeErrors.length > 0) {
+        const error = new Error('E11000 duplicate key error');
+        error.name = 'MongoBulkWriteError';
+        error.code = 11000;
+        error.writeErrors = writeErrors;
+        throw error;
+      }
+      return batch;
+    })
+  };
+  return model;
+};
+
+const entry = (id, status = 'success') => ({ id, status, requestTime: new Date('2026-01-01T00:00:00Z') });
+
+const readSpill = (file) => fs.readFileSync(file, 'utf8').trim().split('\n').filter(Boolean).map(JSON.parse);
+
+describe('AccessLogWriter', () => {
+  let dir;
+  let writer;
+
+  beforeEach(() => {
+    dir = fs.mkdtempSync(path.join(os.tmpdir(), 'access-log-'));
+  });
+
+  afterEach(async () => {
+    if (writer && !writer.closed) {
+      writer.model.mode = 'ok';
+      await writer.close();
+    }
+    fs.rmSync(dir, { recursive: true, force: true });
+  });
+
+  const create = (options = {}) => {
+    writer = new AccessLogWriter({
+      model: stubModel(),
+      batchSize: 10,
+      flushInterval: 60000,
+      spillFile: path.join(dir, 'spill.jsonl'),
+      ...options
+    });
+    return writer;
+  };
+
+  test('キューのログをバッチ単位で保存し、保存したログを通知する', async () => {
+    create({ batchSize: 2 });
+    const inserted = [];
+    writer.on('inserted', entries => inserted.push(entries.map(e => e.id)));
+
+    ['a', 'b', 'c'].forEach(id => writer.write(entry(id)));
+    await writer.flush();
+
+    expect(inserted).toEqual([['a', 'b'], ['c']]);
+    expect(writer.stats()).toMatchObject({ queued: 0, inserted: 3, batches: 2, failedBatches: 0 });
+  });
+
+  test('保存に失敗したバッチは退避ファイルに書き出し、回復後に再保存して削除する', async () => {
+    create();
+    writer.model.mode = 'fail';
+    writer.write(entry('a'));
+    writer.write(entry('b'));
+    await writer.flush();
+    await writer._writeSpill();
+
+    expect(readSpill(writer.spillFile).map(e => e.id)).toEqual(['a', 'b']);
+    expect(writer.stats()).toMatchObject({ failedBatches: 1, spilled: 2, backpressure: true });
+
+    writer.model.mode = 'ok';
+    writer.write(entry('c'));
+    await writer.flush();
+
+    expect(writer.model.saved.map(e => e.id)).toEqual(['c', 'a', 'b']);
+    expect(writer.stats()).toMatchObject({ replayed: 2, backpressure: false });
+    expect(fs.existsSync(writer.spillFile)).toBe(false);
+    expect(fs.existsSync(`${writer.spillFile}.replay`)).toBe(false);
+  });
+
+  test('再保存に失敗した場合は再保存中のファイルを残す', async () => {
+    create();
+    fs.writeFileSync(writer.spillFile, `${JSON.stringify(entry('a'))}\n`);
+    writer.model.insertMany.mockRejectedValueOnce(new Error('connection refused'));
+    await writer._replaySpill();
+
+    expect(readSpill(`${writer.spillFile}.replay`).map(e => e.id)).toEqual(['a']);
+
+    await writer._replaySpill();
+    expect(fs.existsSync(`${writer.spillFile}.replay`)).toBe(false);
+    expect(writer.model.saved.map(e => e.id)).toEqual(['a']);
+  });
+
+  test('重複キーのみのエラーでは実際に保存したログのみを数えて通知する', async () => {
+    create();
+    writer.model.mode = 'duplicate';
+    writer.model.duplicates = new Set(['b', 'd']);
+    const inserted = [];
+    writer.on('inserted', entries => inserted.push(...entries.map(e => e.id)));
+
+    ['a', 'b', 'c', 'd'].forEach(id => writer.write(entry(id)));
+    await writer.flush();
+
+    expect(inserted).toEqual(['a', 'c']);
+    expect(writer.stats()).toMatchObject({ inserted: 2, duplicates: 2, batches: 1, failedBatches: 0 });
+    expect(fs.existsSync(writer.spillFile)).toBe(false);
+  });
+
+  test('すべて重複の場合は通知しない', async () => {
+    create();
+    writer.model.mode = 'duplicate';
+    writer.model.duplicates = new Set(['a']);
+    const listener = jest.fn();
+    writer.on('inserted', listener);
+
+    writer.write(entry('a'));
+    await writer.flush();
+
+    expect(listener).not.toHaveBeenCalled();
+    expect(writer.stats()).toMatchObject({ inserted: 0, duplicates: 1 });
+  });
+
+  test('キューの上限を超えたログは退避ファイルに書き出す', async () => {
+    create({ maxQueue: 2, batchSize: 100 });
+    expect(writer.write(entry('a'))).toBe(true);
+    expect(writer.write(entry('b'))).toBe(true);
+    expect(writer.write(entry('c'))).toBe(false);
+    await writer._writeSpill();
+
+    expect(writer.stats()).toMatchObject({ queued: 2, spilled: 1, backpressure: true, dropped: 0 });
+    expect(readSpill(writer.spillFile).map(e => e.id)).toEqual(['c']);
+  });
+
+  test('退避ファイルを指定しない場合、上限を超えたログは破棄する', () => {
+    create({ maxQueue: 1, batchSize: 100, spillFile: '' });
+    writer.write(entry('a'));
+    writer.write(entry('b'));
+    writer.write(entry('c'));
+
+    expect(writer.stats()).toMatchObject({ queued: 1, spilled: 0, dropped: 2 });
+  });
+
+  test('close() はキューをすべて保存する', async () => {
+    create({ batchSize: 3 });
+    for (let i = 0; i < 7; i++) {
+      writer.queue.push(entry(`id-${i}`));
+    }
+    await writer.close();
+
+    expect(writer.model.saved).toHaveLength(7);
+    expect(writer.stats()).toMatchObject({ queued: 0, inserted: 7, batches: 3 });
+    expect(fs.existsSync(writer.spillFile)).toBe(false);
+  });
+
+  test('close() で保存できなかったログは退避する', async () => {
+    create();
+    writer.model.mode = 'fail';
+    writer.write(entry('a'));
+    await writer.close();
+
+    expect(readSpill(writer.spillFile).map(e => e.id)).toEqual(['a']);
+  });
+
+  test('close() 後に書き込まれたログは直ちに退避する', async () => {
+    create();
+    await writer.close();
+    expect(writer.write(entry('late'))).toBe(false);
+    await writer.spillWrite;
+
+    expect(readSpill(writer.spillFile).map(e => e.id)).toEqual(['late']);
+    expect(writer.stats().spilled).toBe(1);
+  });
+});
@@ -0,0 +1,103 @@
+/**
+ * LRUキャッシュ
+ * 件数上限と有効期限付きのインプロセスキャッシュ
+ */
+
+class LruCache {
+  /**
+   * @param {Object} [options]
+   * @param {number} [options.maxSize=1000] - 保持する最大件数（超えた場合は最も古く参照されたものから削除）
+   * @param {number} [options.ttl=0] - 有効期間（ミリ秒、0の場合は無期限）
+   * @param {Function} [options.now] - 現在時刻を返す関数（テスト用）
+   */
+  constructor({ maxSize = 1000, ttl = 0, now = Date.now } = {}) {
+    this.maxSize = maxSize;
+    this.ttl = ttl;
+    this.now = now;
+    // Map は挿入順を保持するため、先頭が最も古く参照されたエントリになる
+    this.entries = new Map();
+    this.hits = 0;
+    this.misses = 0;
+    this.evictions = 0;
+  }
+
+  /**
+   * 値を取得（参照したエントリは最新として扱う）
+   * @param {*} key - キー
+   * @returns {*} 値（存在しないか期限切れの場合は undefined）
+   */
+  get(key) {
+    const entry = this.entries.get(key);
+    if (!entry) {
+      this.misses++;
+      return undefined;
+    }
+    if (entry.expiresAt && entry.expiresAt <= this.now()) {
+      this.entries.delete(key);
+      this.misses++;
+      return undefined;
+    }
+    this.entries.delete(key);
+    this.entries.set(key, entry);
+    this.hits++;
+    return entry.value;
+  }
+
+  /**
+   * 値を保存
+   * @param {*} key - キー
+   * @param {*} value - 値
+   * @returns {LruCache} this
+   */
+  set(key, value) {
+    this.entries.delete(key);
+    this.entries.set(key, {
+      value,
+      expiresAt: this.ttl > 0 ? this.now() + this.ttl : 0
+    });
+    while (this.entries.size > this.maxSize) {
+      this.entries.delete(this.entries.keys().next().value);
+      this.evictions++;
+    }
+    return this;
+  }
+
+  /**
+   * エントリを削除
+   * @param {*} key - キー
+   * @returns {boolean} 削除した場合は true
+   */
+  delete(key) {
+    return this.entries.delete(key);
+  }
+
+  /**
+   * すべてのエントリを削除
+   */
+  clear() {
+    this.entries.clear();
+  }
+
+  /**
+   * 保持している件数（期限切れを含む）
+   */
+  get size() {
+    return this.entries.size;
+  }
+
+  /**
+   * ヒット率などの統計
+   * @returns {Object} size, maxSize, hits, misses, evictions
+   */
+  stats() {
+    return {
+      size: this.entries.size,
+      maxSize: this.maxSize,
+      hits: this.hits,
+      misses: this.misses,
+      evictions: this.evictions
+    };
+  }
+}
+
+module.exports = LruCache;
@@ -0,0 +1,69 @@
+/**
+ * LRUキャッシュのテスト
+ */
+
+const LruCache = require('./lruCache');
+
+describe('LruCache', () => {
+  test('上限を超えた場合は最も古く参照されたエントリを削除する', () => {
+    const cache = new LruCache({ maxSize: 2 });
+    cache.set('a', 1).set('b', 2);
+    expect(cache.get('a')).toBe(1);
+
+    cache.set('c', 3);
+    expect(cache.get('b')).toBeUndefined();
+    expect(cache.get('a')).toBe(1);
+    expect(cache.get('c')).toBe(3);
+    expect(cache.stats()).toEqual({ size: 2, maxSize: 2, hits: 3, misses: 1, evictions: 1 });
+  });
+
+  test('既存のキーへの保存は最新として扱い、件数を増やさない', () => {
+    const cache = new LruCache({ maxSize: 2 });
+    cache.set('a', 1).set('b', 2).set('a', 10);
+    cache.set('c', 3);
+
+    expect(cache.get('a')).toBe(10);
+    expect(cache.get('b')).toBeUndefined();
+    expect(cache.size).toBe(2);
+  });
+
+  test('有効期間を過ぎたエントリは取得できない', () => {
+    let now = 1000;
+    const cache = new LruCache({ ttl: 500, now: () => now });
+    cache.set('a', 1);
+
+    now = 1499;
+    expect(cache.get('a')).toBe(1);
+    now = 1500;
+    expect(cache.get('a')).toBeUndefined();
+    expect(cache.size).toBe(0);
+    expect(cache.stats().misses).toBe(1);
+  });
+
+  test('参照しても有効期限は延長しない', () => {
+    let now = 0;
+    const cache = new LruCache({ ttl: 100, now: () => now });
+    cache.set('a', 1);
+    now = 90;
+    cache.get('a');
+    now = 100;
+    expect(cache.get('a')).toBeUndefined();
+  });
+
+  test('ttl が 0 の場合は期限切れにならない', () => {
+    let now = 0;
+    const cache = new LruCache({ now: () => now });
+    cache.set('a', 1);
+    now = Number.MAX_SAFE_INTEGER;
+    expect(cache.get('a')).toBe(1);
+  });
+
+  test('削除とクリア', () => {
+    const cache = new LruCache();
+    cache.set('a', 1).set('b', 2);
+    expect(cache.delete('a')).toBe(true);
+    expect(cache.delete('a')).toBe(false);
+    cache.clear();
+    expect(cache.size).toBe(0);
+  });
+});
@@ -0,0 +1,196 @@
+/**
+ * 上流クライアント
+ * AIバックエンドへのリクエストを、バックエンドごとのキープアライブ接続プールと
+ * 同時実行数の上限・タイムアウト付きで送信する
+ */
+
+const http = require('http');
+const https = require('https');
+const axios = require('axios');
+const config = require('../../config');
+const logger = require('./logger');
+
+/**
+ * 上流が混雑している (同時実行数の上限に達し、待機も上限を超えた) 場合のエラー
+ */
+class UpstreamBusyError extends Error {
+  constructor(message) {
+    super(message);
+    this.name = 'UpstreamBusyError';
+  }
+}
+
+/**
+ * 同時実行数の上限
+ * 上限に達している間のリクエストは待機キューに入り、待機件数または待機時間が上限を超えると拒否する
+ */
+class ConcurrencyLimiter {
+  /**
+   * @param {Object} options
+   * @param {number} options.maxConcurrent - 同時実行数の上限
+   * @param {number} options.maxQueue - 待機件数の上限
+   * @param {number} options.queueTimeout - 待機時間の上限（ミリ秒）
+   */
+  constructor({ maxConcurrent, maxQueue, queueTimeout }) {
+    this.maxConcurrent = maxConcurrent;
+    this.maxQueue = maxQueue;
+    this.queueTimeout = queueTimeout;
+    this.active = 0;
+    this.waiting = [];
+    this.rejected = 0;
+  }
+
+  /**
+   * 実行枠を取得
+   * @returns {Promise<Function>} 実行枠を解放する関数（複数回呼び出しても1回だけ解放する）
+   */
+  acquire() {
+    if (this.active < this.maxConcurrent) {
+      this.active++;
+      return Promise.resolve(this._release());
+    }
+    if (this.waiting.length >= this.maxQueue) {
+      this.rejected++;
+      return Promise.reject(new UpstreamBusyError(`同時実行数の上限に達しています (${this.maxConcurrent}件, 待機 ${this.waiting.length}件)`));
+    }
+    return new Promise((resolve, reject) => {
+      const waiter = { resolve };
+      waiter.timer = setTimeout(() => {
+        this.waiting.splice(this.waiting.indexOf(waiter), 1);
+        this.rejected++;
+        reject(new UpstreamBusyError(`実行待ちがタイムアウトしました (${this.queueTimeout}ms)`));
+      }, this.queueTimeout);
+      this.waiting.push(waiter);
+    });
+  }
+
+  _release() {
+    let released = false;
+    return () => {
+      if (released) return;
+      released = true;
+      const next = this.waiting.shift();
+      if (next) {
+        // 実行枠をそのまま待機中のリクエストに引き継ぐ
+        clearTimeout(next.timer);
+        next.resolve(this._release());
+      } else {
+        this.active--;
+      }
+    };
+  }
+}
+
+/**
+ * バックエンドごとの接続プールと同時実行数の上限
+ */
+class UpstreamBackend {
+  /**
+   * @param {string} baseUrl - バックエンドのURL
+   * @param {Object} options - config.upstream
+   */
+  constructor(baseUrl, { maxConcurrent, maxQueue, queueTimeout, maxFreeSockets, timeout }) {
+    this.baseUrl = baseUrl;
+    const agentOptions = { keepAlive: true, maxSockets: maxConcurrent, maxFreeSockets };
+    this.httpAgent = new http.Agent(agentOptions);
+    this.httpsAgent = new https.Agent(agentOptions);
+    this.client = axios.create({
+      baseURL: baseUrl,
+      httpAgent: this.httpAgent,
+      httpsAgent: this.httpsAgent,
+      // 応答までの時間とストリーミング中の無通信時間の上限
+      timeout
+    });
+    this.limiter = new ConcurrencyLimiter({ maxConcurrent, maxQueue, queueTimeout });
+  }
+
+  /**
+   * POSTリクエストを送信し、JSONのレスポンスを返す
+   * @param {string} path - パス
+   * @param {Object} data - リクエストボディ
+   * @returns {Promise<Object>} axios のレスポンス
+   */
+  async post(path, data) {
+    const release = await this.limiter.acquire();
+    try {
+      return await this.client.post(path, data);
+    } finally {
+      release();
+    }
+  }
+
+  /**
+   * POSTリクエストを送信し、レスポンスをストリームとして返す
+   * 実行枠はストリームが終了するまで保持する
+   * @param {string} path - パス
+   * @param {Object} data - リクエストボディ
+   * @returns {Promise<Object>} axios のレスポンス (data は Readable)
+   */
+  async stream(path, data) {
+    const release = await this.limiter.acquire();
+    let response;
+    try {
+      response = await this.client.post(path, data, { responseType: 'stream' });
+    } catch (error) {
+      release();
+      throw error;
+    }
+    response.data.once('close', release);
+    response.data.once('end', release);
+    response.data.once('error', release);
+    return response;
+  }
+
+  /**
+   * 接続プールと同時実行数の状態
+   * @returns {Object} active, waiting, rejected, sockets, freeSockets
+   */
+  stats() {
+    const count = (sockets) => Object.values(sockets).reduce((sum, list) => sum + list.length, 0);
+    const agents = [this.httpAgent, this.httpsAgent];
+    return {
+      active: this.limiter.active,
+      waiting: this.limiter.waiting.length,
+      rejected: this.limiter.rejected,
+      sockets: agents.reduce((sum, agent) => sum + count(agent.sockets), 0),
+      freeSockets: agents.reduce((sum, agent) => sum + count(agent.freeSockets), 0)
+    };
+  }
+}
+
+const backends = new Map();
+
+/**
+ * バックエンドを取得（初回はプールを作成する）
+ * @param {string} [baseUrl] - バックエンドのURL（省略した場合はモックAIサーバー）
+ * @returns {UpstreamBackend} バックエンド
+ */
+const getBackend = (baseUrl = config.mockAi.url) => {
+  let backend = backends.get(baseUrl);
+  if (!backend) {
+    backend = new UpstreamBackend(baseUrl, config.upstream);
+    backends.set(baseUrl, backend);
+    logger.debug(`上流の接続プールを作成しました: ${baseUrl}`);
+  }
+  return backend;
+};
+
+/**
+ * すべてのバックエンドの状態
+ * @returns {Object} バックエンドのURL → 状態
+ */
+const stats = () => {
+  const result = {};
+  for (const [baseUrl, backend] of backends) {
+    result[baseUrl] = backend.stats();
+  }
+  return result;
+};
+
+module.exports = {
+  UpstreamBusyError,
+  ConcurrencyLimiter,
+  UpstreamBackend,
+  getBackend,
+  stats
+};
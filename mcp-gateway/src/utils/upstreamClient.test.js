@@ -0,0 +1,75 @@
+/**
+ * 上流クライアントのテスト
+ */
+
+jest.mock('./logger', () => ({ debug: jest.fn(), info: jest.fn(), warn: jest.fn(), error: jest.fn() }));
+
+const { ConcurrencyLimiter, UpstreamBusyError } = require('./upstreamClient');
+
+describe('ConcurrencyLimiter', () => {
+  test('上限までは待機せずに実行枠を取得する', async () => {
+    const limiter = new ConcurrencyLimiter({ maxConcurrent: 2, maxQueue: 0, queueTimeout: 1000 });
+    await limiter.acquire();
+    await limiter.acquire();
+    expect(limiter.active).toBe(2);
+    expect(limiter.waiting).toHaveLength(0);
+  });
+
+  test('待機件数の上限を超えた場合は直ちに拒否する', async () => {
+    const limiter = new ConcurrencyLimiter({ maxConcurrent: 1, maxQueue: 1, queueTimeout: 1000 });
+    const release = await limiter.acquire();
+    const queued = limiter.acquire();
+
+    await expect(limiter.acquire()).rejects.toThrow(UpstreamBusyError);
+    expect(limiter.rejected).toBe(1);
+
+    release();
+    (await queued)();
+    expect(limiter.active).toBe(0);
+  });
+
+  test('待機時間の上限を超えた場合は拒否して待機キューから外す', async () => {
+    jest.useFakeTimers();
+    try {
+      const limiter = new ConcurrencyLimiter({ maxConcurrent: 1, maxQueue: 5, queueTimeout: 100 });
+      await limiter.acquire();
+      const queued = limiter.acquire();
+      expect(limiter.waiting).toHaveLength(1);
+
+      jest.advanceTimersByTime(100);
+      await expect(queued).rejects.toThrow('実行待ちがタイムアウトしました');
+      expect(limiter.waiting).toHaveLength(0);
+      expect(limiter.rejected).toBe(1);
+    } finally {
+      jest.useRealTimers();
+    }
+  });
+
+  test('解放した実行枠は待機中のリクエストに順に引き継ぐ', async () => {
+    const limiter = new ConcurrencyLimiter({ maxConcurrent: 1, maxQueue: 5, queueTimeout: 1000 });
+    const release = await limiter.acquire();
+    const order = [];
+    const first = limiter.acquire().then(next => { order.push('first'); return next; });
+    const second = limiter.acquire().then(next => { order.push('second'); return next; });
+
+    release();
+    const releaseFirst = await first;
+    expect(order).toEqual(['first']);
+    expect(limiter.active).toBe(1);
+    expect(limiter.waiting).toHaveLength(1);
+
+    releaseFirst();
+    (await second)();
+    expect(order).toEqual(['first', 'second']);
+    expect(limiter.active).toBe(0);
+  });
+
+  test('同じ実行枠を複数回解放しても1回だけ解放する', async () => {
+    const limiter = new ConcurrencyLimiter({ maxConcurrent: 2, maxQueue: 0, queueTimeout: 1000 });
+    const release = await limiter.acquire();
+    await limiter.acquire();
+    release();
+    release();
+    expect(limiter.active).toBe(1);
+  });
+});
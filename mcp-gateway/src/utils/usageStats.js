@@ -0,0 +1,314 @@
+/**
+ * 利用統計
+ * 管理者向け統計 (ユーザー・モデル・アクセスログの件数) をメモリ上で更新し、
+ * 一定間隔でデータベースの件数と照合する
+ */
+
+const User = require('../models/User');
+const Model = require('../models/Model');
+const AccessLog = require('../models/AccessLog');
+const config = require('../../config');
+const logger = require('./logger');
+const { accessLogWriter } = require('./accessLogWriter');
+
+const ACCESS_LEVELS = ['basic', 'advanced', 'admin'];
+const MODEL_TYPES = ['text', 'image'];
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+/**
+ * 時間別集計のキー (UTCの日時の時まで)
+ * @param {Date|string|number} time - 時刻
+ * @returns {string} YYYY-MM-DDTHH
+ */
+const hourKey = (time) => new Date(time).toISOString().slice(0, 13);
+
+const emptyUsers = () => ({
+  total: 0,
+  active: 0,
+  admins: 0,
+  byAccessLevel: { basic: 0, advanced: 0, admin: 0 }
+});
+
+const emptyModels = () => ({
+  total: 0,
+  active: 0,
+  byType: { text: 0, image: 0 }
+});
+
+const emptyLogs = () => ({
+  total: 0,
+  success: 0,
+  error: 0
+});
+
+/**
+ * ユーザーの件数を加減算
+ * @param {Object} users - ユーザーの件数
+ * @param {Object|null} user - ユーザー
+ * @param {number} sign - 1 (追加) または -1 (削除)
+ */
+const applyUser = (users, user, sign) => {
+  if (!user) return;
+  users.total += sign;
+  if (user.active ?? true) users.active += sign;
+  if (user.systemRole === 'admin') users.admins += sign;
+  const level = user.accessTier || 'basic';
+  if (level in users.byAccessLevel) users.byAccessLevel[level] += sign;
+};
+
+class UsageStats {
+  /**
+   * @param {Object} [options]
+   * @param {number} [options.reconcileInterval=300] - データベースとの照合間隔（秒）
+   * @param {number} [options.windowDays=30] - 直近の利用件数を集計する日数
+   * @param {Function} [options.now] - 現在時刻を返す関数（テスト用）
+   */
+  constructor({ reconcileInterval = 300, windowDays = 30, now = Date.now } = {}) {
+    this.reconcileInterval = reconcileInterval;
+    this.windowDays = windowDays;
+    this.now = now;
+    this.users = emptyUsers();
+    this.models = emptyModels();
+    this.logs = emptyLogs();
+    // 時間別のアクセスログ件数 (YYYY-MM-DDTHH → 件数)
+    this.hourly = new Map();
+    this.reconciledAt = null;
+    this.reconciling = null;
+    // 照合中に反映した増減 (照合の結果に加算する)
+    this.inFlight = null;
+    this.refreshingModels = null;
+    this.modelsDirty = false;
+    this.timer = null;
+  }
+
+  /**
+   * 初回の照合を行い、定期的な照合を開始
+   * @returns {Promise<void>}
+   */
+  start() {
+    if (!this.timer) {
+      this.timer = setInterval(() => {
+        this.reconcile().catch(error => {
+          logger.error(`利用統計の照合エラー: ${error.message}`);
+        });
+      }, this.reconcileInterval * 1000);
+      this.timer.unref();
+    }
+    return this.reconcile();
+  }
+
+  /**
+   * 定期的な照合を停止
+   */
+  stop() {
+    if (this.timer) {
+      clearInterval(this.timer);
+      this.timer = null;
+    }
+  }
+
+  /**
+   * 集計対象の最初の時間
+   * @returns {string} YYYY-MM-DDTHH
+   */
+  _windowStart() {
+    return hourKey(this.now() - this.windowDays * DAY_MS);
+  }
+
+  /**
+   * 統計に増減を反映（照合中の場合は照合の結果に加算するために記録する）
+   * @param {Function} change - users, logs, hourly を持つオブジェクトを受け取り、増減を反映する関数
+   */
+  _apply(change) {
+    change(this);
+    if (this.inFlight) change(this.inFlight);
+  }
+
+  /**
+   * データベースの件数で統計を置き換える
+   * 実行中の場合は実行中の照合の完了を待つ
+   * @returns {Promise<void>}
+   */
+  reconcile() {
+    if (!this.reconciling) {
+      this.reconciling = this._reconcile().finally(() => {
+        this.reconciling = null;
+      });
+    }
+    return this.reconciling;
+  }
+
+  async _reconcile() {
+    const started = Date.now();
+    const windowStart = this._windowStart();
+    // 件数を数えている間の増減は結果に含まれない可能性があるため、記録して照合後に加算する
+    // (数えた件数に含まれていた場合の重複は次の照合で解消する)
+    const inFlight = { users: emptyUsers(), logs: emptyLogs(), hourly: new Map(), modelsChanged: false };
+    this.inFlight = inFlight;
+    let users, models, logs, hourly;
+    try {
+      [users, models, logs, hourly] = await Promise.all([
+        this._countUsers(),
+        this._countModels(),
+        Promise.all([
+          AccessLog.estimatedDocumentCount(),
+          AccessLog.countDocuments({ status: 'success' }),
+          AccessLog.countDocuments({ status: 'error' })
+        ]),
+        AccessLog.aggregate([
+          { $match: { requestTime: { $gte: new Date(`${windowStart}:00:00Z`) } } },
+          { $group: { _id: { $dateToString: { format: '%Y-%m-%dT%H', date: '$requestTime' } }, count: { $sum: 1 } } }
+        ])
+      ]);
+    } finally {
+      this.inFlight = null;
+    }
+
+    for (const key of ['total', 'active', 'admins']) {
+      users[key] += inFlight.users[key];
+    }
+    for (const level of ACCESS_LEVELS) {
+      users.byAccessLevel[level] += inFlight.users.byAccessLevel[level];
+    }
+    this.users = users;
+    this.logs = {
+      total: logs[0] + inFlight.logs.total,
+      success: logs[1] + inFlight.logs.success,
+      error: logs[2] + inFlight.logs.error
+    };
+    this.hourly = new Map(hourly.map(bucket => [bucket._id, bucket.count]));
+    for (const [hour, count] of inFlight.hourly) {
+      this.hourly.set(hour, (this.hourly.get(hour) || 0) + count);
+    }
+    this.models = models;
+    if (inFlight.modelsChanged) {
+      // 照合中に変更されたモデル定義は数え直す
+      this.refreshModels();
+    }
+    this.reconciledAt = new Date();
+    logger.debug(`利用統計を照合しました (${Date.now() - started}ms)`);
+  }
+
+  async _countUsers() {
+    const [total, active, admins, ...tiers] = await Promise.all([
+      User.estimatedDocumentCount(),
+      User.countDocuments({ active: true }),
+      User.countDocuments({ systemRole: 'admin' }),
+      ...ACCESS_LEVELS.map(level => User.countDocuments({ accessTier: level }))
+    ]);
+    const users = { total, active, admins, byAccessLevel: {} };
+    ACCESS_LEVELS.forEach((level, index) => {
+      users.byAccessLevel[level] = tiers[index];
+    });
+    return users;
+  }
+
+  async _countModels() {
+    const [total, active, ...types] = await Promise.all([
+      Model.estimatedDocumentCount(),
+      Model.countDocuments({ active: true }),
+      ...MODEL_TYPES.map(type => Model.countDocuments({ type }))
+    ]);
+    const models = { total, active, byType: {} };
+    MODEL_TYPES.forEach((type, index) => {
+      models.byType[type] = types[index];
+    });
+    return models;
+  }
+
+  /**
+   * モデル定義の件数を数え直す
+   * モデル定義は件数が少ないため、変更のたびに数え直す（実行中に変更された場合は完了後にもう一度数える）
+   * @returns {Promise<void>}
+   */
+  refreshModels() {
+    if (this.inFlight) {
+      this.inFlight.modelsChanged = true;
+    }
+    if (this.refreshingModels) {
+      this.modelsDirty = true;
+      return this.refreshingModels;
+    }
+    this.refreshingModels = (async () => {
+      do {
+        this.modelsDirty = false;
+        this.models = await this._countModels();
+      } while (this.modelsDirty);
+    })()
+      .catch(error => {
+        logger.error(`モデル統計の更新エラー: ${error.message}`);
+      })
+      .finally(() => {
+        this.refreshingModels = null;
+      });
+    return this.refreshingModels;
+  }
+
+  /**
+   * ユーザーの作成・更新・削除を統計に反映
+   * @param {Object|null} before - 変更前のユーザー（作成の場合は null）
+   * @param {Object|null} after - 変更後のユーザー（削除の場合は null）
+   */
+  updateUser(before, after) {
+    this._apply(stats => {
+      applyUser(stats.users, before, -1);
+      applyUser(stats.users, after, 1);
+    });
+  }
+
+  /**
+   * 保存したアクセスログを統計に反映
+   * @param {Array} entries - アクセスログ
+   */
+  recordLogs(entries) {
+    const windowStart = this._windowStart();
+    this._apply(stats => {
+      for (const entry of entries) {
+        stats.logs.total++;
+        if (entry.status === 'success') stats.logs.success++;
+        if (entry.status === 'error') stats.logs.error++;
+        const hour = hourKey(entry.requestTime || this.now());
+        if (hour >= windowStart) {
+          stats.hourly.set(hour, (stats.hourly.get(hour) || 0) + 1);
+        }
+      }
+    });
+  }
+
+  /**
+   * 統計を取得（未照合の場合は照合の完了を待つ）
+   * logs.last30Days は時間単位で集計するため、windowDays 日前の時刻を含む1時間分を含む
+   * @returns {Promise<Object>} users, models, logs (last30Days を含む), reconciledAt
+   */
+  async snapshot() {
+    if (!this.reconciledAt) {
+      await this.reconcile();
+    }
+    const windowStart = this._windowStart();
+    let recent = 0;
+    for (const [hour, count] of this.hourly) {
+      if (hour < windowStart) {
+        this.hourly.delete(hour);
+      } else {
+        recent += count;
+      }
+    }
+    return {
+      users: { ...this.users, byAccessLevel: { ...this.users.byAccessLevel } },
+      models: { ...this.models, byType: { ...this.models.byType } },
+      logs: { ...this.logs, last30Days: recent },
+      reconciledAt: this.reconciledAt
+    };
+  }
+}
+
+// アプリケーション全体で共有する統計
+const usageStats = new UsageStats(config.stats);
+
+accessLogWriter.on('inserted', entries => usageStats.recordLogs(entries));
+Model.changes.on('change', () => usageStats.refreshModels());
+
+module.exports = {
+  UsageStats,
+  usageStats
+};
@@ -0,0 +1,154 @@
+/**
+ * 利用統計のテスト
+ */
+
+jest.mock('./logger', () => ({ debug: jest.fn(), info: jest.fn(), warn: jest.fn(), error: jest.fn() }));
+jest.mock('./accessLogWriter', () => ({ accessLogWriter: { on: jest.fn() } }));
+
+const User = require('../models/User');
+const Model = require('../models/Model');
+const AccessLog = require('../models/AccessLog');
+const { UsageStats } = require('./usageStats');
+
+/**
+ * 各モデルの件数の問い合わせを置き換える
+ * countDocuments は条件の値ごとの件数を返す
+ * @param {Object} [hourly] - AccessLog.aggregate が返す時間別の件数 (YYYY-MM-DDTHH → 件数)
+ */
+const stubCounts = (hourly = {}) => {
+  jest.spyOn(User, 'estimatedDocumentCount').mockResolvedValue(10);
+  jest.spyOn(User, 'countDocuments').mockImplementation(async (query) => ({
+    active: 8, systemRole: 1, basic: 6, advanced: 3, admin: 1
+  })[query.accessTier || Object.keys(query)[0]]);
+  jest.spyOn(Model, 'estimatedDocumentCount').mockResolvedValue(4);
+  jest.spyOn(Model, 'countDocuments').mockImplementation(async (query) => ({
+    active: 3, text: 3, image: 1
+  })[query.type || Object.keys(query)[0]]);
+  jest.spyOn(AccessLog, 'estimatedDocumentCount').mockResolvedValue(100);
+  jest.spyOn(AccessLog, 'countDocuments').mockImplementation(async ({ status }) => (status === 'success' ? 90 : 10));
+  return jest.spyOn(AccessLog, 'aggregate').mockImplementation(async () => (
+    Object.entries(hourly).map(([hour, count]) => ({ _id: hour, count }))
+  ));
+};
+
+const deferred = () => {
+  let resolve;
+  let reject;
+  const promise = new Promise((res, rej) => { resolve = res; reject = rej; });
+  return { promise, resolve, reject };
+};
+
+let now;
+const createStats = () => new UsageStats({ windowDays: 30, now: () => now });
+
+beforeEach(() => {
+  jest.restoreAllMocks();
+  now = Date.parse('2024-03-31T12:30:00Z');
+});
+
+describe('reconcile', () => {
+  test('データベースの件数で統計を置き換える', async () => {
+    const aggregate = stubCounts({ '2024-03-01T12': 2, '2024-03-31T12': 5 });
+    const stats = createStats();
+    const snapshot = await stats.snapshot();
+
+    expect(snapshot.users).toEqual({ total: 10, active: 8, admins: 1, byAccessLevel: { basic: 6, advanced: 3, admin: 1 } });
+    expect(snapshot.models).toEqual({ total: 4, active: 3, byType: { text: 3, image: 1 } });
+    expect(snapshot.logs).toEqual({ total: 100, success: 90, error: 10, last30Days: 7 });
+    expect(snapshot.reconciledAt).toBeInstanceOf(Date);
+
+    const [match, group] = aggregate.mock.calls[0][0];
+    expect(match.$match.requestTime.$gte).toEqual(new Date('2024-03-01T12:00:00Z'));
+    expect(group.$group._id.$dateToString.format).toBe('%Y-%m-%dT%H');
+  });
+
+  test('照合中に反映した増減は照合の結果に加算する', async () => {
+    stubCounts();
+    const pendingLogs = deferred();
+    AccessLog.estimatedDocumentCount.mockReturnValue(pendingLogs.promise);
+    const stats = createStats();
+
+    const reconciling = stats.reconcile();
+    stats.updateUser(null, { active: true, accessTier: 'advanced' });
+    stats.recordLogs([
+      { status: 'success', requestTime: new Date(now) },
+      { status: 'error', requestTime: new Date(now) }
+    ]);
+    pendingLogs.resolve(100);
+    await reconciling;
+
+    const snapshot = await stats.snapshot();
+    expect(snapshot.users).toMatchObject({ total: 11, active: 9, byAccessLevel: { advanced: 4 } });
+    expect(snapshot.logs).toEqual({ total: 102, success: 91, error: 11, last30Days: 2 });
+    expect(stats.inFlight).toBeNull();
+
+    // 照合後の増減は照合の結果と二重に数えない
+    stats.recordLogs([{ status: 'success', requestTime: new Date(now) }]);
+    expect((await stats.snapshot()).logs.total).toBe(103);
+  });
+
+  test('照合中にモデル定義が変更された場合は照合後に数え直す', async () => {
+    stubCounts();
+    const pendingModels = deferred();
+    Model.estimatedDocumentCount.mockReturnValueOnce(pendingModels.promise);
+    const stats = createStats();
+
+    const reconciling = stats.reconcile();
+    Model.estimatedDocumentCount.mockResolvedValue(5);
+    await stats.refreshModels();
+    pendingModels.resolve(4);
+    await reconciling;
+    await stats.refreshingModels;
+
+    expect(stats.models.total).toBe(5);
+  });
+
+  test('照合に失敗した場合は統計を変更しない', async () => {
+    stubCounts();
+    const stats = createStats();
+    await stats.reconcile();
+    stats.recordLogs([{ status: 'success', requestTime: new Date(now) }]);
+
+    AccessLog.aggregate.mockRejectedValue(new Error('connection lost'));
+    await expect(stats.reconcile()).rejects.toThrow('connection lost');
+
+    expect(stats.inFlight).toBeNull();
+    expect(stats.logs.total).toBe(101);
+  });
+});
+
+describe('recordLogs / snapshot', () => {
+  test('直近30日間の件数は windowDays 日前の時刻を含む時間から数える', async () => {
+    stubCounts();
+    const stats = createStats();
+    await stats.reconcile();
+    stats.recordLogs([
+      { status: 'success', requestTime: new Date('2024-03-01T11:59:59Z') },
+      { status: 'success', requestTime: new Date('2024-03-01T12:00:00Z') },
+      { status: 'error', requestTime: new Date('2024-03-31T12:00:00Z') }
+    ]);
+
+    let snapshot = await stats.snapshot();
+    expect(snapshot.logs).toMatchObject({ total: 103, success: 92, error: 11, last30Days: 2 });
+
+    // 1時間後には30日前の時間の件数は集計対象から外れる
+    now += 60 * 60 * 1000;
+    snapshot = await stats.snapshot();
+    expect(snapshot.logs.last30Days).toBe(1);
+    expect([...stats.hourly.keys()]).toEqual(['2024-03-31T12']);
+  });
+
+  test('ユーザーの作成・更新・削除を反映する', async () => {
+    stubCounts();
+    const stats = createStats();
+    await stats.reconcile();
+
+    const user = { active: true, accessTier: 'basic' };
+    stats.updateUser(null, user);
+    stats.updateUser(user, { active: false, accessTier: 'advanced', systemRole: 'admin' });
+    expect(stats.users).toEqual({ total: 11, active: 8, admins: 2, byAccessLevel: { basic: 6, advanced: 4, admin: 1 } });
+
+    stats.updateUser({ active: false, accessTier: 'advanced', systemRole: 'admin' }, null);
+    expect(stats.users).toEqual({ total: 10, active: 8, admins: 1, byAccessLevel: { basic: 6, advanced: 3, admin: 1 } });
+  });
+});
@@ -14,6 +14,10 @@ const PORT = process.env.PORT || 3001;
 const SIMULATE_DELAY = process.env.SIMULATE_DELAY === 'true';
 const MIN_DELAY_MS = parseInt(process.env.MIN_DELAY_MS || '100');
 const MAX_DELAY_MS = parseInt(process.env.MAX_DELAY_MS || '500');
+// ストリーミング時のトークン間の遅延 (SIMULATE_DELAY=true の場合のみ)
+const TOKEN_DELAY_MS = parseInt(process.env.TOKEN_DELAY_MS || '20');
+// ストリーミング時に1トークンとして送る文字数 (トークン数の概算と同じ 4文字)
+const CHARS_PER_TOKEN = 4;
 
 // モック処理の遅延をシミュレート
 const simulateProcessingDelay = () => {
@@ -23,6 +27,21 @@ const simulateProcessingDelay = () => {
   return new Promise(resolve => setTimeout(resolve, delay));
 };
 
+// ストリーミングのトークン間の遅延をシミュレート
+const simulateTokenDelay = () => {
+  if (!SIMULATE_DELAY || TOKEN_DELAY_MS <= 0) return Promise.resolve();
+  return new Promise(resolve => setTimeout(resolve, TOKEN_DELAY_MS));
+};
+
+// テキストをストリーミング用のトークンに分割
+const splitTokens = (text) => {
+  const tokens = [];
+  for (let i = 0; i < text.length; i += CHARS_PER_TOKEN) {
+    tokens.push(text.slice(i, i + CHARS_PER_TOKEN));
+  }
+  return tokens;
+};
+
 // トークン使用量を計算
 const calculateTokenUsage = (input) => {
   // 簡易的な計算: 文字数÷4でトークン数を概算
@@ -57,6 +76,56 @@ app.get('/', (req, res) => {
   });
 });
 
+/**
+ * テキスト生成結果をトークンごとに Server-Sent Events で送信
+ * 各イベントは completion と同じ形式で、最後のイベントに finish_reason と usage を含め、
+ * 最後に "data: [DONE]" を送る
+ */
+const streamCompletion = async (req, res, model, responseText, usage) => {
+  const id = `mock-completion-${uuidv4()}`;
+  const created = Math.floor(Date.now() / 1000);
+  let closed = false;
+  res.on('close', () => {
+    closed = true;
+  });
+  
+  res.writeHead(200, {
+    'Content-Type': 'text/event-stream; charset=utf-8',
+    'Cache-Control': 'no-cache',
+    'Connection': 'keep-alive'
+  });
+  
+  const tokens = splitTokens(responseText);
+  for (let i = 0; i < tokens.length; i++) {
+    if (closed) return;
+    if (i > 0) {
+      await simulateTokenDelay();
+    }
+    const last = i === tokens.length - 1;
+    const chunk = {
+      id,
+      object: 'text_completion',
+      created,
+      model,
+      choices: [
+        {
+          text: tokens[i],
+          index: 0,
+          logprobs: null,
+          finish_reason: last ? 'stop' : null
+        }
+      ]
+    };
+    if (last) {
+      chunk.usage = usage;
+    }
+    res.write(`data: ${JSON.stringify(chunk)}\n\n`);
+  }
+  if (!closed) {
+    res.end('data: [DONE]\n\n');
+  }
+};
+
 // モックテキスト生成API
 app.post('/v1/completions', async (req, res) => {
   try {
@@ -67,7 +136,7 @@ app.post('/v1/completions', async (req, res) => {
       return res.status(400).json({ error: { message: 'model と prompt は必須パラメータです' } });
     }
 
-    // 処理遅延をシミュレート
+    // 処理遅延をシミュレート (ストリーミングの場合は最初のトークンまでの遅延)
     await simulateProcessingDelay();
     
     // モデルによって異なる応答を生成
@@ -84,6 +153,10 @@ app.post('/v1/completions', async (req, res) => {
     // 使用トークンを計算
     const usage = calculateTokenUsage(prompt + responseText);
     
+    if (req.body.stream === true) {
+      return streamCompletion(req, res, model, responseText, usage);
+    }
+    
     // レスポンス
     return res.json({
       id: `mock-completion-${uuidv4()}`,
@@ -49,6 +49,46 @@ describe('モックAIサーバーテスト', () => {
     }
   });
   
+  test('テキスト生成エンドポイントがトークンごとにストリーミングする', async () => {
+    try {
+      const testData = {
+        model: 'text-basic-v1',
+        prompt: 'これはテスト用のプロンプトです',
+        max_tokens: 100,
+        stream: true
+      };
+      
+      const response = await request(BASE_URL)
+        .post('/v1/completions')
+        .send(testData)
+        .buffer(true)
+        .parse((res, callback) => {
+          let data = '';
+          res.setEncoding('utf8');
+          res.on('data', chunk => { data += chunk; });
+          res.on('end', () => callback(null, data));
+        });
+        
+      expect(response.status).toBe(200);
+      expect(response.headers['content-type']).toMatch(/^text\/event-stream/);
+      
+      const events = response.body.split('\n\n').filter(Boolean).map(event => event.replace(/^data: /, ''));
+      expect(events[events.length - 1]).toBe('[DONE]');
+      
+      const chunks = events.slice(0, -1).map(event => JSON.parse(event));
+      expect(chunks.length).toBeGreaterThan(1);
+      expect(chunks[0].choices[0].finish_reason).toBeNull();
+      
+      const last = chunks[chunks.length - 1];
+      expect(last.choices[0].finish_reason).toBe('stop');
+      expect(last).toHaveProperty('usage');
+      expect(chunks.map(chunk => chunk.choices[0].text).join('')).toContain('text-basic-v1');
+    } catch (error) {
+      console.error('テスト失敗: サーバーが起動していない可能性があります');
+      throw error;
+    }
+  });
+  
   test('画像生成エンドポイントが応答する', async () => {
     try {
       const testData = {
@@ -12,6 +12,20 @@ def setup_teardown():
     yield
     # Teardown code here
 
+@pytest.fixture(autouse=True)
+def discovery_cache_dir(tmp_path, monkeypatch):
+    """SCIM機能情報のキャッシュをテストごとの一時ディレクトリに分離"""
+    cache_dir = str(tmp_path / "discovery")
+    monkeypatch.setenv("EXTIC_DISCOVERY_CACHE_DIR", cache_dir)
+    return cache_dir
+
+@pytest.fixture(autouse=True)
+def log_dir(tmp_path, monkeypatch):
+    """テスターの既定のログ・ジャーナル出力先をテストごとの一時ディレクトリに分離"""
+    path = str(tmp_path / "logs")
+    monkeypatch.setenv("EXTIC_LOG_DIR", path)
+    return path
+
 @pytest.fixture(scope="session")
 def test_base_url():
     """テスト用のベースURLを返す"""
@@ -30,4 +44,22 @@ def test_password():
 @pytest.fixture(scope="session")
 def test_token():
     """テスト用のトークンを返す"""
-    return "test_token"
\ No newline at end of file
+    return "test_token"
+
+
+@pytest.fixture
+def fake_scim_server():
+    """ネットワーク不要のインプロセスSCIMサーバー (Extic SCIM APIの代替)"""
+    from fake_scim_server import FakeSCIMServer
+    with FakeSCIMServer(seed=0) as server:
+        yield server
+
+
+@pytest.fixture
+def fake_scim_tester(fake_scim_server, tmp_path):
+    """インプロセスSCIMサーバーに接続するテスター (ログ・ジャーナルはテストごとの一時ディレクトリに出力)"""
+    from extic_tester import ExticSCIMTester
+    tester = ExticSCIMTester(fake_scim_server.base_url, auth_type="bearer", token="test_token",
+                             log_file=str(tmp_path / "test.log"), journal=str(tmp_path / "test_journal.jsonl"))
+    yield tester
+    tester.close()
@@ -1,39 +1,464 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import argparse
+import json
 import sys
 import os
 
 # パスの調整
-sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
-from src.extic_tester import ExticSCIMTester
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+from capture import load_trace
+from benchmark import BenchmarkSuite, compare, format_comparison, load_baseline, parse_thresholds, save_baseline
+from extic_tester import ExticSCIMTester
+from filter_matrix import DEFAULT_DATASET_SIZES, FilterMatrixBenchmark
+from metrics_exporter import MetricsServer, render_openmetrics, tester_openmetrics, write_openmetrics
+from process_driver import MultiProcessDriver
+from propagation import DEFAULT_PROBE_TIMEOUT, GatewayClient, PropagationProbe
+from replay import DEFAULT_REPLAY_CONCURRENCY, TraceReplayer
+from scenario import ScenarioRunner, load_scenario
+from sweeper import DEFAULT_JOURNAL_PATTERN, DEFAULT_SWEEP_PREFIXES, Sweeper
+from sync import SyncEngine
+from transport import DEFAULT_MAX_RETRIES, DEFAULT_POOL_MAXSIZE
+
+
+def print_usage():
+    """使用方法を表示"""
+    print("使用方法:")
+    print("  Basic認証: python run_tests.py <base_url> basic <username> <password>")
+    print("  Bearer認証: python run_tests.py <base_url> bearer <token>")
+    print("  負荷テスト: python run_tests.py load <base_url> <basic|bearer> <認証情報...> [オプション]")
+    print("  ベンチマーク: python run_tests.py bench <base_url> <basic|bearer> <認証情報...> [--save <JSON>] [--baseline <JSON>]")
+    print("  フィルター検索: python run_tests.py filter-bench <base_url> <basic|bearer> <認証情報...> [--sizes 1000,10000,100000]")
+    print("  シナリオ: python run_tests.py scenario <base_url> <basic|bearer> <認証情報...> --file <YAML/JSON> [--processes <N>]")
+    print("  反映時間計測: python run_tests.py propagation <base_url> <basic|bearer> <認証情報...> --gateway-url <URL> [--jwt-secret <秘密鍵>]")
+    print("  残存ユーザー削除: python run_tests.py sweep <base_url> <basic|bearer> <認証情報...> [--journal <JSONL>] [--prefix <接頭辞>] [--dry-run]")
+    print("  トレース再送: python run_tests.py replay <base_url> <basic|bearer> <認証情報...> --trace <JSONL.GZ> [--speed <倍率>]")
+    print("  差分同期: python run_tests.py sync <base_url> <basic|bearer> <認証情報...> --source <CSV/JSONL> [オプション]")
+
+
+def create_tester(base_url, auth_type, credentials, log_level="INFO", **options):
+    """
+    認証情報からExticSCIMTesterを生成
+
+    Args:
+        base_url (str): SCIM APIのベースURL
+        auth_type (str): 認証タイプ ("basic" または "bearer")
+        credentials (list): 認証情報 (basic: [username, password], bearer: [token])
+        log_level (str): ログ出力レベル
+        **options: ExticSCIMTester に渡す設定 (rate_limit, max_retries, pool_maxsize, timeout, journal)
+
+    Returns:
+        ExticSCIMTester or None: 認証情報が不正な場合は None
+    """
+    auth_type = auth_type.lower()
+    if auth_type == "basic" and len(credentials) >= 2:
+        return ExticSCIMTester(base_url, auth_type="basic", username=credentials[0], password=credentials[1],
+                               log_level=log_level, **options)
+    elif auth_type == "bearer" and len(credentials) >= 1:
+        return ExticSCIMTester(base_url, auth_type="bearer", token=credentials[0], log_level=log_level, **options)
+    return None
+
+
+def add_connection_arguments(parser):
+    """接続先と認証情報の引数を追加"""
+    parser.add_argument("base_url", help="SCIM APIのベースURL")
+    parser.add_argument("auth_type", choices=["basic", "bearer"], help="認証タイプ")
+    parser.add_argument("credentials", nargs="+", help="認証情報 (basic: ユーザー名 パスワード / bearer: トークン)")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="ログ出力レベル (DEBUG の場合はレスポンス本文も出力)")
+    parser.add_argument("--rate-limit", type=float, help="1秒あたりの最大リクエスト数 (テナントの上限より少し低く設定)")
+    parser.add_argument("--max-retries", type=int, default=DEFAULT_MAX_RETRIES,
+                        help=f"429/503・接続エラー時の最大再送回数 (デフォルト: {DEFAULT_MAX_RETRIES})")
+    parser.add_argument("--pool-size", type=int, dest="pool_maxsize", default=DEFAULT_POOL_MAXSIZE,
+                        help=f"ホストごとに保持する接続数 (デフォルト: {DEFAULT_POOL_MAXSIZE})")
+    parser.add_argument("--timeout", type=float, help="リクエストのタイムアウト (秒)")
+    parser.add_argument("--capture", help="送信したリクエストとレスポンスを記録するトレースファイル (*.jsonl.gz)")
+
+
+def add_metrics_arguments(parser):
+    """メトリクス出力の引数を追加"""
+    parser.add_argument("--metrics-port", type=int,
+                        help="実行中の計測値を http://127.0.0.1:<ポート>/metrics で公開 (0 で空きポート)")
+    parser.add_argument("--metrics-file", help="終了時に計測値を OpenMetrics 形式で出力するファイル")
+
+
+def start_metrics(args, tester):
+    """--metrics-port が指定されていればメトリクス公開を開始"""
+    if args.metrics_port is None:
+        return None
+    return MetricsServer(tester, port=args.metrics_port).start()
+
+
+def finish_metrics(args, tester, server):
+    """メトリクス公開を終了し、--metrics-file が指定されていれば計測値を出力"""
+    if server is not None:
+        server.stop()
+    if args.metrics_file:
+        print(f"メトリクス出力: {write_openmetrics(args.metrics_file, tester_openmetrics(tester))}")
+
+
+def transport_options(args):
+    """コマンドライン引数から送信設定を取り出す"""
+    return {
+        "rate_limit": args.rate_limit,
+        "max_retries": args.max_retries,
+        "pool_maxsize": args.pool_maxsize,
+        "timeout": args.timeout,
+        "capture": args.capture,
+    }
+
+
+def run_load(argv):
+    """負荷テストサブコマンド"""
+    parser = argparse.ArgumentParser(prog="run_tests.py load", description="Extic SCIM API 並列負荷テスト")
+    add_connection_arguments(parser)
+    parser.add_argument("--workers", type=int, default=4, help="並列ワーカー数 (デフォルト: 4)")
+    parser.add_argument("--duration", type=float, help="実行時間 (秒)")
+    parser.add_argument("--requests", type=int, dest="total_requests", help="送信するリクエスト総数")
+    parser.add_argument("--rate", type=float, dest="target_rate", help="目標リクエストレート (リクエスト/秒)")
+    parser.add_argument("--report", help="レイテンシレポート(JSON)の出力先 (省略時は logs/ 配下)")
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.duration is None and args.total_requests is None:
+        parser.error("--duration または --requests のいずれかを指定してください")
+
+    tester = create_tester(args.base_url, args.auth_type, args.credentials, args.log_level, **transport_options(args))
+    if tester is None:
+        parser.error("認証情報が不正です")
+
+    server = start_metrics(args, tester)
+    result = tester.test_load(
+        workers=args.workers,
+        duration=args.duration,
+        total_requests=args.total_requests,
+        target_rate=args.target_rate
+    )
+    finish_metrics(args, tester, server)
+    tester.write_latency_report(args.report)
+    tester.close()
+    return 0 if result["failures"] == 0 else 1
+
+
+def run_sync(argv):
+    """差分同期サブコマンド"""
+    parser = argparse.ArgumentParser(prog="run_tests.py sync", description="あるべき状態のファイルとExticのユーザーを差分同期")
+    add_connection_arguments(parser)
+    parser.add_argument("--source", required=True, help="あるべき状態のCSVまたはJSONLファイル")
+    parser.add_argument("--format", dest="file_format", choices=["csv", "jsonl"], help="ファイル形式 (省略時は拡張子から判定)")
+    parser.add_argument("--workers", type=int, default=8, help="並列ワーカー数 (デフォルト: 8)")
+    parser.add_argument("--delete-missing", action="store_true", help="ファイルに存在しないユーザーを削除する")
+    parser.add_argument("--filter", dest="filter_query", help="同期対象とするリモートユーザーのSCIMフィルター")
+    parser.add_argument("--dry-run", action="store_true", help="計画のみ表示し、変更を送信しない")
+    args = parser.parse_args(argv)
+
+    tester = create_tester(args.base_url, args.auth_type, args.credentials, args.log_level, **transport_options(args))
+    if tester is None:
+        parser.error("認証情報が不正です")
+
+    engine = SyncEngine(tester, workers=args.workers, delete_missing=args.delete_missing,
+                        filter_query=args.filter_query)
+    result = engine.run(args.source, file_format=args.file_format, dry_run=args.dry_run)
+    tester.close()
+    print(json.dumps({key: value for key, value in result.items() if key != "failures"}, ensure_ascii=False))
+    return 0 if not result.get("failed") else 1
+
+
+def run_bench(argv):
+    """ベンチマークサブコマンド"""
+    parser = argparse.ArgumentParser(prog="run_tests.py bench", description="SCIMエンドポイントのベンチマークと回帰検出")
+    add_connection_arguments(parser)
+    parser.add_argument("--iterations", type=int, default=50, help="シナリオごとの計測回数 (デフォルト: 50)")
+    parser.add_argument("--warmup", type=int, default=5, help="計測前の実行回数 (デフォルト: 5)")
+    parser.add_argument("--workers", type=int, default=1, help="シナリオごとの並列数 (デフォルト: 1)")
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[1, 10, 100], help="一覧取得のページサイズ")
+    parser.add_argument("--label", help="結果に付けるラベル (リリースバージョンなど)")
+    parser.add_argument("--save", help="結果をベースラインとして保存するJSONファイル")
+    parser.add_argument("--baseline", help="比較対象のベースラインJSONファイル")
+    parser.add_argument("--threshold", action="append", default=[],
+                        help="回帰判定のしきい値 (例: p99=0.3, throughput=0.1)。複数指定可")
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+
+    try:
+        thresholds = parse_thresholds(args.threshold)
+        baseline = load_baseline(args.baseline) if args.baseline else None
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    tester = create_tester(args.base_url, args.auth_type, args.credentials, args.log_level, **transport_options(args))
+    if tester is None:
+        parser.error("認証情報が不正です")
+
+    suite = BenchmarkSuite(tester, iterations=args.iterations, warmup=args.warmup, workers=args.workers,
+                           page_sizes=tuple(args.page_sizes))
+    server = start_metrics(args, tester)
+    result = suite.run(label=args.label)
+    finish_metrics(args, tester, server)
+    tester.close()
+    if args.save:
+        print(f"ベースライン保存: {save_baseline(result, args.save)}")
+    if baseline is None:
+        return 0
+
+    comparison = compare(baseline, result, thresholds)
+    print(format_comparison(comparison))
+    if comparison["regressions"]:
+        print(f"\n性能回帰: {len(comparison['regressions'])}件 (ベースライン: {baseline.get('label') or args.baseline})")
+        return 1
+    return 0
+
+
+def run_filter_bench(argv):
+    """フィルター検索ベンチマークサブコマンド"""
+    parser = argparse.ArgumentParser(prog="run_tests.py filter-bench",
+                                     description="データ件数ごとのフィルター検索のレイテンシ・レスポンスサイズの計測")
+    add_connection_arguments(parser)
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_DATASET_SIZES),
+                        help="投入するユーザー数 (カンマ区切り、デフォルト: 1000,10000,100000)")
+    parser.add_argument("--iterations", type=int, default=20, help="フィルター式・件数ごとの計測回数 (デフォルト: 20)")
+    parser.add_argument("--page-size", type=int, default=100, help="検索リクエストの count (デフォルト: 100)")
+    parser.add_argument("--workers", type=int, default=8, help="ユーザー投入・削除の並列数 (デフォルト: 8)")
+    parser.add_argument("--keep", action="store_true", help="終了後に投入したユーザーを削除しない")
+    parser.add_argument("--output", help="計測結果(JSON)の出力先")
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+
+    try:
+        sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    except ValueError:
+        parser.error(f"--sizes の形式が不正です: {args.sizes}")
+
+    tester = create_tester(args.base_url, args.auth_type, args.credentials, args.log_level, **transport_options(args))
+    if tester is None:
+        parser.error("認証情報が不正です")
+
+    benchmark = FilterMatrixBenchmark(tester, sizes=sizes, iterations=args.iterations, page_size=args.page_size,
+                                      workers=args.workers, keep=args.keep)
+    server = start_metrics(args, tester)
+    result = benchmark.run()
+    finish_metrics(args, tester, server)
+    tester.write_latency_report()
+    tester.close()
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, sort_keys=True, ensure_ascii=False)
+    return 0 if not result["flagged"] else 1
+
+
+def run_scenario(argv):
+    """シナリオ実行サブコマンド"""
+    parser = argparse.ArgumentParser(prog="run_tests.py scenario", description="重み付き操作ミックスのオープンループ実行")
+    add_connection_arguments(parser)
+    parser.add_argument("--file", required=True, help="シナリオファイル (YAML または JSON)")
+    parser.add_argument("--max-concurrency", type=int, default=64, help="同時実行リクエスト数の上限 (デフォルト: 64)")
+    parser.add_argument("--seed", type=int, help="乱数シード (省略時はシナリオの seed)")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="ワーカープロセス数 (0 でCPUコア数、デフォルト: 1)。--max-concurrency はプロセスごとの上限")
+    parser.add_argument("--output", help="実行結果(JSON)の出力先")
+    parser.add_argument("--report", help="レイテンシレポート(JSON)の出力先 (省略時は logs/ 配下)")
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+
+    try:
+        scenario = load_scenario(args.file)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    if args.processes != 1:
+        if args.metrics_port is not None:
+            parser.error("--metrics-port は --processes 1 の場合のみ指定できます (--metrics-file を使用してください)")
+        result = run_scenario_processes(args, scenario)
+        if result is None:
+            parser.error("認証情報が不正です")
+        return write_scenario_result(args, result)
+
+    tester = create_tester(args.base_url, args.auth_type, args.credentials, args.log_level, **transport_options(args))
+    if tester is None:
+        parser.error("認証情報が不正です")
+
+    server = start_metrics(args, tester)
+    result = ScenarioRunner(tester, scenario, max_concurrency=args.max_concurrency, seed=args.seed).run()
+    finish_metrics(args, tester, server)
+    tester.write_latency_report(args.report)
+    tester.close()
+    return write_scenario_result(args, result)
+
+
+def run_scenario_processes(args, scenario):
+    """シナリオを複数プロセスで実行 (認証情報が不正な場合は None)"""
+    auth_type = args.auth_type.lower()
+    if auth_type == "basic" and len(args.credentials) >= 2:
+        credentials = {"username": args.credentials[0], "password": args.credentials[1]}
+    elif auth_type == "bearer" and len(args.credentials) >= 1:
+        credentials = {"token": args.credentials[0]}
+    else:
+        return None
+    connection = dict(base_url=args.base_url, auth_type=auth_type, log_level=args.log_level,
+                      **credentials, **transport_options(args))
+    driver = MultiProcessDriver(connection, scenario, processes=args.processes or None,
+                                max_concurrency=args.max_concurrency, seed=args.seed)
+    result = driver.run()
+    print(f"レイテンシレポート出力: {driver.write_latency_report(args.report)}")
+    if args.metrics_file:
+        text = render_openmetrics(args.base_url, driver.metrics, result["transport"])
+        print(f"メトリクス出力: {write_openmetrics(args.metrics_file, text)}")
+    return result
+
+
+def write_scenario_result(args, result):
+    """シナリオの実行結果を出力し、終了コードを返す"""
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, sort_keys=True, ensure_ascii=False)
+    failures = sum(operation["failures"] for operation in result["operations"].values())
+    failures += sum(1 for worker in result.get("workers", []) if worker["error"])
+    return 0 if failures == 0 else 1
+
+
+def run_propagation(argv):
+    """アクセスレベル変更の反映時間計測サブコマンド"""
+    parser = argparse.ArgumentParser(prog="run_tests.py propagation",
+                                     description="SCIMでのアクセスレベル変更がゲートウェイに反映されるまでの時間を計測")
+    add_connection_arguments(parser)
+    parser.add_argument("--gateway-url", required=True, help="ゲートウェイのベースURL (例: http://localhost:3000)")
+    parser.add_argument("--jwt-secret", default=os.environ.get("JWT_SECRET"),
+                        help="ゲートウェイの JWT_SECRET (省略時は環境変数 JWT_SECRET。未設定の場合はログインでトークンを取得)")
+    parser.add_argument("--users", type=int, default=20, help="計測するユーザー数 (デフォルト: 20)")
+    parser.add_argument("--workers", type=int, default=8, help="並列数 (デフォルト: 8)")
+    parser.add_argument("--probe-timeout", type=float, default=DEFAULT_PROBE_TIMEOUT,
+                        help=f"反映を待つ上限秒数 (デフォルト: {DEFAULT_PROBE_TIMEOUT:g})")
+    parser.add_argument("--output", help="計測結果(JSON)の出力先")
+    args = parser.parse_args(argv)
+
+    tester = create_tester(args.base_url, args.auth_type, args.credentials, args.log_level, **transport_options(args))
+    if tester is None:
+        parser.error("認証情報が不正です")
+
+    password = "ProbeP@ssw0rd"
+    gateway = GatewayClient(args.gateway_url, jwt_secret=args.jwt_secret, password=password,
+                            pool_maxsize=args.workers, timeout=args.timeout or 10.0, log=tester.log)
+    probe = PropagationProbe(tester, gateway, users=args.users, workers=args.workers, timeout=args.probe_timeout,
+                             password=password)
+    try:
+        result = probe.run()
+    except RuntimeError as e:
+        tester.log(str(e), level="ERROR")
+        tester.close()
+        return 1
+    tester.close()
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, sort_keys=True, ensure_ascii=False)
+    timeouts = sum(summary["timeouts"] + summary["errors"] for summary in result["transitions"].values())
+    return 0 if timeouts == 0 else 1
+
+
+def run_sweep(argv):
+    """残存ユーザー削除サブコマンド"""
+    parser = argparse.ArgumentParser(prog="run_tests.py sweep",
+                                     description="中断したテストが残したユーザーをジャーナルまたは接頭辞から削除")
+    add_connection_arguments(parser)
+    parser.add_argument("--journal", action="append", default=[],
+                        help="ジャーナルファイル (ワイルドカード可、複数指定可)。--journal も --prefix も省略した場合は logs/*_journal.jsonl")
+    parser.add_argument("--prefix", action="append", default=[],
+                        help="削除するユーザー名の接頭辞 (複数指定可)。'default' でテストが使用する接頭辞すべて")
+    parser.add_argument("--any-suffix", action="store_true",
+                        help="接頭辞の直後にエポック秒が続かないユーザーも対象にする")
+    parser.add_argument("--workers", type=int, default=8, help="並列ワーカー数 (デフォルト: 8)")
+    parser.add_argument("--dry-run", action="store_true", help="対象の表示のみ行い削除しない")
+    args = parser.parse_args(argv)
+
+    journals = args.journal or ([] if args.prefix else [DEFAULT_JOURNAL_PATTERN])
+    prefixes = []
+    for prefix in args.prefix:
+        prefixes.extend(DEFAULT_SWEEP_PREFIXES if prefix == "default" else [prefix])
+
+    tester = create_tester(args.base_url, args.auth_type, args.credentials, args.log_level, journal=False,
+                           **transport_options(args))
+    if tester is None:
+        parser.error("認証情報が不正です")
+
+    sweeper = Sweeper(tester, workers=args.workers, require_epoch=not args.any_suffix)
+    result = sweeper.run(journal_patterns=journals, prefixes=prefixes, dry_run=args.dry_run)
+    tester.close()
+    print(json.dumps({key: value for key, value in result.items() if key != "failures"}, ensure_ascii=False))
+    return 0 if not result["failed"] else 1
+
+
+def run_replay(argv):
+    """トレース再送サブコマンド"""
+    parser = argparse.ArgumentParser(prog="run_tests.py replay",
+                                     description="記録したリクエストの再送と記録時とのレイテンシ比較")
+    add_connection_arguments(parser)
+    parser.add_argument("--trace", action="append", required=True,
+                        help="--capture で記録したトレースファイル (ワイルドカード可、複数指定可)")
+    parser.add_argument("--speed", default="1",
+                        help="再送速度の倍率 (例: 1, 10。max で待機せずに送信、デフォルト: 1)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_REPLAY_CONCURRENCY,
+                        help=f"同時実行リクエスト数の上限 (デフォルト: {DEFAULT_REPLAY_CONCURRENCY})")
+    parser.add_argument("--output", help="比較結果(JSON)の出力先")
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+
+    try:
+        speed = None if args.speed.lower() == "max" else float(args.speed)
+    except ValueError:
+        parser.error(f"--speed の形式が不正です: {args.speed}")
+    if speed is not None and speed <= 0:
+        parser.error("--speed は0より大きい値または max を指定してください")
+    try:
+        records = load_trace(args.trace)
+    except ValueError as e:
+        parser.error(str(e))
+
+    tester = create_tester(args.base_url, args.auth_type, args.credentials, args.log_level, **transport_options(args))
+    if tester is None:
+        parser.error("認証情報が不正です")
+
+    server = start_metrics(args, tester)
+    result = TraceReplayer(tester, records, speed=speed, concurrency=args.concurrency).run()
+    finish_metrics(args, tester, server)
+    tester.write_latency_report()
+    tester.close()
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, sort_keys=True, ensure_ascii=False)
+    return 0 if not result["status_mismatches"] and not result["unresolved"] else 1
+
+
+SUBCOMMANDS = {
+    "load": run_load,
+    "bench": run_bench,
+    "filter-bench": run_filter_bench,
+    "scenario": run_scenario,
+    "sync": run_sync,
+    "sweep": run_sweep,
+    "propagation": run_propagation,
+    "replay": run_replay,
+}
+
 
 def main():
     """Extic SCIM接続テストのメイン関数"""
+    if len(sys.argv) >= 2 and sys.argv[1] in SUBCOMMANDS:
+        sys.exit(SUBCOMMANDS[sys.argv[1]](sys.argv[2:]))
+
     # コマンドライン引数の解析
     if len(sys.argv) < 3:
-        print("使用方法:")
-        print("  Basic認証: python run_tests.py <base_url> basic <username> <password>")
-        print("  Bearer認証: python run_tests.py <base_url> bearer <token>")
+        print_usage()
         sys.exit(1)
-        
-    base_url = sys.argv[1]
-    auth_type = sys.argv[2].lower()
-    
-    if auth_type == "basic" and len(sys.argv) >= 5:
-        username = sys.argv[3]
-        password = sys.argv[4]
-        tester = ExticSCIMTester(base_url, auth_type="basic", username=username, password=password)
-    elif auth_type == "bearer" and len(sys.argv) >= 4:
-        token = sys.argv[3]
-        tester = ExticSCIMTester(base_url, auth_type="bearer", token=token)
-    else:
+
+    tester = create_tester(sys.argv[1], sys.argv[2], sys.argv[3:])
+    if tester is None:
         print("引数が不正です。正しい認証情報を指定してください。")
         sys.exit(1)
-    
+
     # 全テストの実行
     success = tester.run_all_tests()
-    
+    tester.close()
+
     if success:
         print("\nテスト完了: すべてのテストが正常に実行されました。")
         sys.exit(0)
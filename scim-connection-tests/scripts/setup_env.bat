@@ -12,6 +12,6 @@ IF %ERRORLEVEL% NEQ 0 (
 )
 
 REM 必要なパッケージをインストール
-uv pip install requests pytest pytest-mock
+uv pip install requests pytest pytest-mock pyyaml
 
 echo インストール完了
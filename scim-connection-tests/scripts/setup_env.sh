@@ -8,6 +8,6 @@ fi
 
 # 必要なパッケージをインストール
 echo "必要なパッケージをインストール中..."
-uv pip install requests pytest pytest-mock
+uv pip install requests pytest pytest-mock pyyaml
 
 echo "インストール完了"
@@ -0,0 +1,407 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import platform
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+from bulk import BulkProvisioner
+from discovery import CORE_USER_SCHEMA
+from endpoints import (
+    ENDPOINT_LIST_USERS,
+    ENDPOINT_FILTER_USERS,
+    ENDPOINT_GET_USER,
+    ENDPOINT_CREATE_USER,
+    ENDPOINT_UPDATE_USER,
+    ENDPOINT_DELETE_USER,
+)
+from latency import REPORT_PERCENTILES, LatencyHistogram
+from payload_template import dumps, user_template
+
+# ベースラインファイルの形式バージョン (互換性のない変更時に上げる)
+BASELINE_FORMAT_VERSION = 1
+
+# 回帰判定の既定しきい値 (パーセンタイルは増加率、throughput は減少率、error_rate はエラー率の増加幅)
+DEFAULT_THRESHOLDS = {
+    "p50": 0.20,
+    "p90": 0.25,
+    "p99": 0.30,
+    "throughput": 0.15,
+    "error_rate": 0.01,
+}
+
+# しきい値を指定できる指標
+THRESHOLD_METRICS = set(DEFAULT_THRESHOLDS) | {name for name, _ in REPORT_PERCENTILES} | {"mean", "max"}
+
+# この差 (ミリ秒) 未満のパーセンタイル悪化は計測誤差として扱う
+DEFAULT_MIN_DELTA_MS = 1.0
+
+DEFAULT_PAGE_SIZES = (1, 10, 100)
+
+
+def parse_thresholds(values):
+    """
+    "p99=0.3" 形式のしきい値指定を辞書に変換 (未指定の指標は既定値)
+
+    Args:
+        values (list): "指標=比率" の文字列のリスト
+
+    Returns:
+        dict: 指標ごとのしきい値
+
+    Raises:
+        ValueError: 形式が不正な場合、または未知の指標を指定した場合
+    """
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    for value in values or []:
+        name, separator, ratio = value.partition("=")
+        name = name.strip()
+        if not separator:
+            raise ValueError(f"しきい値は 指標=比率 の形式で指定してください: {value}")
+        if name not in THRESHOLD_METRICS:
+            raise ValueError(f"未知の指標です: {name} (指定可能: {', '.join(sorted(THRESHOLD_METRICS))})")
+        thresholds[name] = float(ratio)
+    return thresholds
+
+
+class BenchmarkSuite:
+    def __init__(self, tester, iterations=50, warmup=5, workers=1, page_sizes=DEFAULT_PAGE_SIZES,
+                 fixture_users=20):
+        """
+        SCIMエンドポイントの固定シナリオベンチマーク
+
+        一覧取得 (ページサイズ別)、ID指定取得、作成・更新・削除、フィルター検索の各シナリオを
+        同じ回数ずつ実行し、シナリオごとのレイテンシ分布とスループットを記録する。
+
+        Args:
+            tester (ExticSCIMTester): リクエスト送信に使用するテスター
+            iterations (int): シナリオごとの計測回数
+            warmup (int): 計測前に実行する回数 (接続確立・キャッシュの影響を除く)
+            workers (int): シナリオごとの並列数
+            page_sizes (tuple): 一覧取得シナリオのページサイズ
+            fixture_users (int): 取得・検索シナリオ用に事前作成するユーザー数
+        """
+        if iterations < 1 or workers < 1:
+            raise ValueError("iterations と workers は1以上を指定してください")
+        self.tester = tester
+        self.iterations = iterations
+        self.warmup = warmup
+        self.workers = workers
+        self.page_sizes = page_sizes
+        self.fixture_users = fixture_users
+        self.prefix = f"bench_{int(time.time())}"
+        self._fixtures = []
+        self._created = {}
+        self._create_template = None
+        self._update_template = None
+
+    def _user(self, username, group="基本ユーザーグループ"):
+        extic_schema = self.tester.capabilities.extic_schema
+        return {
+            "schemas": [CORE_USER_SCHEMA, extic_schema],
+            "userName": username,
+            "password": "BenchP@ssw0rd",
+            "displayName": "ベンチマークユーザー",
+            extic_schema: {
+                "exticGroups": [group],
+                "extendAttrs": [{"name": "accessLevel", "value": "basic"}],
+            },
+        }
+
+    def _ok(self, response):
+        return 200 <= response.status_code < 300
+
+    def _get(self, endpoint, path):
+        return self._ok(self.tester._request("get", endpoint, f"{self.tester.base_url}{path}"))
+
+    def _filter(self, expression):
+        path = f"/Users?filter={requests.utils.quote(expression)}&startIndex=1&count=10"
+        return lambda index: self._get(ENDPOINT_FILTER_USERS, path)
+
+    def _fixture(self, index):
+        return self._fixtures[index % len(self._fixtures)]
+
+    def _filter_eq(self, index):
+        return self._filter(f'userName eq "{self._fixture(index)["userName"]}"')(index)
+
+    def _compile_templates(self):
+        """作成・更新のリクエストボディをコンパイル (計測中のクライアント側CPU負荷を抑える)"""
+        extic_schema = self.tester.capabilities.extic_schema
+        self._create_template = user_template(extic_schema, password="BenchP@ssw0rd")
+        self._update_template = user_template(extic_schema)
+        self._attributes = dumps([{"name": "accessLevel", "value": "basic"}])
+        self._basic_groups = dumps(["基本ユーザーグループ"])
+        self._research_groups = dumps(["研究グループ"])
+
+    def _create(self, index):
+        body = self._create_template.render(
+            userName=f"{self.prefix}_crud_{index}", displayName="ベンチマークユーザー",
+            groups=self._basic_groups, attributes=self._attributes
+        )
+        response = self.tester._request(
+            "post", ENDPOINT_CREATE_USER, f"{self.tester.base_url}/Users", data=body
+        )
+        if not self._ok(response):
+            return False
+        self._created[index] = response.json()["id"]
+        return True
+
+    def _update(self, index):
+        if index not in self._created:
+            return False
+        body = self._update_template.render(
+            userName=f"{self.prefix}_crud_{index}", displayName="ベンチマークユーザー",
+            groups=self._research_groups, attributes=self._attributes
+        )
+        return self._ok(self.tester._request(
+            "put", ENDPOINT_UPDATE_USER, f"{self.tester.base_url}/Users/{self._created[index]}", data=body
+        ))
+
+    def _delete(self, index):
+        if index not in self._created:
+            return False
+        return self._ok(self.tester._request(
+            "delete", ENDPOINT_DELETE_USER, f"{self.tester.base_url}/Users/{self._created[index]}"
+        ))
+
+    def scenarios(self):
+        """
+        実行するシナリオ (名前, 操作, 計測前の実行を行うか) の一覧
+
+        作成・更新・削除は同じユーザーを順に操作するため、この順番で実行する必要がある。
+        """
+        scenarios = []
+        for page_size in self.page_sizes:
+            path = f"/Users?startIndex=1&count={page_size}"
+            scenarios.append((f"list_page_{page_size}",
+                              lambda index, path=path: self._get(ENDPOINT_LIST_USERS, path), True))
+        scenarios.append(("get_by_id",
+                          lambda index: self._get(ENDPOINT_GET_USER, f"/Users/{self._fixture(index)['id']}"), True))
+        scenarios.append(("filter_eq", self._filter_eq, True))
+        scenarios.append(("filter_sw", self._filter(f'userName sw "{self.prefix}_fixture_"'), True))
+        scenarios.append(("filter_extension",
+                          self._filter('(extendAttrs.name eq "accessLevel") and (extendAttrs.value eq "basic")'),
+                          True))
+        scenarios.append(("create", self._create, False))
+        scenarios.append(("update", self._update, False))
+        scenarios.append(("delete", self._delete, False))
+        return scenarios
+
+    def _measure(self, operation):
+        histogram = LatencyHistogram()
+        errors = 0
+
+        def timed(index):
+            start = time.perf_counter()
+            try:
+                ok = operation(index)
+            except Exception:
+                ok = False
+            return ok, time.perf_counter() - start
+
+        start = time.perf_counter()
+        if self.workers == 1:
+            outcomes = [timed(index) for index in range(self.iterations)]
+        else:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                outcomes = list(executor.map(timed, range(self.iterations)))
+        elapsed = time.perf_counter() - start
+
+        # 失敗した回は早く終わることが多く、レイテンシ・スループットの改善に見えるため成功した回のみ集計する
+        for ok, seconds in outcomes:
+            if ok:
+                histogram.record_seconds(seconds)
+            else:
+                errors += 1
+        succeeded = self.iterations - errors
+        return {
+            "requests": self.iterations,
+            "errors": errors,
+            "elapsed": round(elapsed, 6),
+            "throughput": round(succeeded / elapsed, 3) if elapsed > 0 else 0.0,
+            "latency": histogram.summary(),
+        }
+
+    def _setup(self):
+        self._compile_templates()
+        provisioner = BulkProvisioner(self.tester, workers=max(self.workers, 4))
+        users = [self._user(f"{self.prefix}_fixture_{i}") for i in range(self.fixture_users)]
+        result = provisioner.create_users(users)
+        self._fixtures = result["created"]
+        if not self._fixtures:
+            raise RuntimeError("ベンチマーク用ユーザーを作成できませんでした")
+
+    def _teardown(self):
+        ids = [user["id"] for user in self._fixtures]
+        if ids:
+            BulkProvisioner(self.tester, workers=max(self.workers, 4)).delete_users(ids)
+        self._fixtures = []
+
+    def run(self, label=None):
+        """
+        全シナリオを実行
+
+        Args:
+            label (str): 結果に付けるラベル (リリースバージョンなど)
+
+        Returns:
+            dict: ベースライン形式の結果
+        """
+        self.tester.log(
+            f"=== ベンチマーク開始 (計測回数: {self.iterations}, 並列数: {self.workers}, ラベル: {label}) ==="
+        )
+        self.tester.configure_pool(self.workers)
+        self._created = {}
+        results = {}
+        self._setup()
+        try:
+            for name, operation, warm in self.scenarios():
+                if warm:
+                    for index in range(self.warmup):
+                        operation(index)
+                results[name] = self._measure(operation)
+                latency = results[name]["latency"]
+                self.tester.log(
+                    f"{name}: p50 {latency['p50']:.3f}ms / p90 {latency['p90']:.3f}ms / p99 {latency['p99']:.3f}ms / "
+                    f"{results[name]['throughput']:.1f}リクエスト/秒 (エラー {results[name]['errors']}件)"
+                )
+        finally:
+            self._teardown()
+
+        return {
+            "format_version": BASELINE_FORMAT_VERSION,
+            "label": label,
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "target": self.tester.base_url,
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+            },
+            "config": {
+                "iterations": self.iterations,
+                "warmup": self.warmup,
+                "workers": self.workers,
+                "page_sizes": list(self.page_sizes),
+            },
+            "scenarios": results,
+        }
+
+
+def save_baseline(result, path):
+    """
+    ベンチマーク結果をベースラインとして保存
+
+    Returns:
+        str: 出力先のファイルパス
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, sort_keys=True, ensure_ascii=False)
+        f.write("\n")
+    return path
+
+
+def load_baseline(path):
+    """
+    ベースラインを読み込む
+
+    Raises:
+        ValueError: 形式バージョンが異なる場合
+    """
+    with open(path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    version = baseline.get("format_version")
+    if version != BASELINE_FORMAT_VERSION:
+        raise ValueError(f"ベースラインの形式バージョンが異なります: {version} (期待値: {BASELINE_FORMAT_VERSION})")
+    return baseline
+
+
+def _error_rate(result):
+    requests = result.get("requests")
+    if not requests:
+        return None
+    return result.get("errors", 0) / requests
+
+
+def compare(baseline, current, thresholds=None, min_delta_ms=DEFAULT_MIN_DELTA_MS):
+    """
+    ベースラインと今回の結果を比較して回帰を検出
+
+    パーセンタイルは増加率がしきい値を超え、かつ増加幅が min_delta_ms 以上の場合、
+    throughput は減少率がしきい値を超えた場合、error_rate はエラー率の増加幅がしきい値を超えた場合に
+    回帰とみなす。成功した回がないシナリオはレイテンシ・スループットを比較しない (エラー率で判定する)。
+
+    Args:
+        baseline (dict): ベースライン
+        current (dict): 今回の結果
+        thresholds (dict): 指標ごとのしきい値 (省略時は DEFAULT_THRESHOLDS)
+        min_delta_ms (float): 回帰とみなすパーセンタイル増加幅の下限 (ミリ秒)
+
+    Returns:
+        dict: rows (全比較結果)、regressions (回帰のみ)、missing (今回実行されなかったシナリオ)
+    """
+    thresholds = thresholds or DEFAULT_THRESHOLDS
+    rows = []
+    missing = []
+    for name, base in sorted(baseline.get("scenarios", {}).items()):
+        result = current.get("scenarios", {}).get(name)
+        if result is None:
+            missing.append(name)
+            continue
+        no_success = result.get("requests") is not None and result.get("errors", 0) >= result["requests"]
+        for metric, threshold in sorted(thresholds.items()):
+            if metric == "error_rate":
+                before, after = _error_rate(base), _error_rate(result)
+                if before is None or after is None:
+                    continue
+                change = after - before
+                regressed = change > threshold
+            else:
+                if no_success:
+                    continue
+                if metric == "throughput":
+                    before, after = base.get("throughput"), result.get("throughput")
+                else:
+                    before, after = base.get("latency", {}).get(metric), result.get("latency", {}).get(metric)
+                if not before or after is None:
+                    continue
+                change = (after - before) / before
+                if metric == "throughput":
+                    regressed = -change > threshold
+                else:
+                    regressed = change > threshold and after - before >= min_delta_ms
+            rows.append({
+                "scenario": name,
+                "metric": metric,
+                "baseline": before,
+                "current": after,
+                "change": round(change, 4),
+                "threshold": threshold,
+                "regressed": regressed,
+            })
+    return {
+        "rows": rows,
+        "regressions": [row for row in rows if row["regressed"]],
+        "missing": missing,
+    }
+
+
+def format_comparison(comparison):
+    """比較結果を表形式の文字列に整形"""
+    lines = [f"{'シナリオ':<20}{'指標':<12}{'ベースライン':>14}{'今回':>14}{'変化':>10}"]
+    for row in comparison["rows"]:
+        mark = "  << 回帰" if row["regressed"] else ""
+        lines.append(
+            f"{row['scenario']:<20}{row['metric']:<12}{row['baseline']:>14.3f}{row['current']:>14.3f}"
+            f"{row['change'] * 100:>+9.1f}%{mark}"
+        )
+    for name in comparison["missing"]:
+        lines.append(f"{name:<20}(今回の結果にありません)")
+    return "\n".join(lines)
@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from endpoints import ENDPOINT_BULK, ENDPOINT_CREATE_USER, ENDPOINT_DELETE_USER
+
+BULK_REQUEST_SCHEMA = "urn:ietf:params:scim:api:messages:2.0:BulkRequest"
+
+
+def _status_code(status):
+    """Bulkレスポンスのstatus ("201" / 201 / {"code": 201}) を数値に変換"""
+    if isinstance(status, dict):
+        status = status.get("code")
+    try:
+        return int(status)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _error_detail(body):
+    """SCIMエラーレスポンスから詳細メッセージを取得"""
+    if isinstance(body, dict):
+        return body.get("detail") or body.get("scimType") or json.dumps(body, ensure_ascii=False)
+    return str(body) if body else ""
+
+
+class BulkProvisioner:
+    def __init__(self, tester, workers=8, max_operations=None, use_bulk=None):
+        """
+        ユーザーの一括作成・削除クラスのコンストラクタ
+
+        ServiceProviderConfig で bulk.supported が通知されている場合は RFC 7644 の /Bulk
+        リクエストを maxOperations (および maxPayloadSize) ごとに分割して並列送信し、
+        サポートされていない場合は個別の POST/DELETE をワーカープールで並列実行する。
+
+        Args:
+            tester (ExticSCIMTester): リクエスト送信に使用するテスター
+            workers (int): 並列ワーカー数
+            max_operations (int): 1回のBulkリクエストに含める操作数の上限 (サーバーの上限を超える場合はサーバーの値)
+            use_bulk (bool): /Bulk を使用するか (省略時は ServiceProviderConfig に従う)
+        """
+        if workers < 1:
+            raise ValueError("ワーカー数は1以上を指定してください")
+        self.tester = tester
+        self.workers = workers
+        self.max_operations = max_operations
+        self.use_bulk = use_bulk
+
+    def _bulk_config(self):
+        """Bulk操作の設定 (使用可否、操作数上限、ペイロードサイズ上限)"""
+        bulk = self.tester.get_service_provider_config().get("bulk", {}) or {}
+        supported = bool(bulk.get("supported")) if self.use_bulk is None else self.use_bulk
+        server_max = bulk.get("maxOperations") or 0
+        max_operations = self.max_operations or server_max or 100
+        if server_max:
+            max_operations = min(max_operations, server_max)
+        return supported, max_operations, bulk.get("maxPayloadSize") or 0
+
+    def create_users(self, users):
+        """
+        ユーザーの一括作成
+
+        Args:
+            users (list): SCIMユーザーリソースのリスト
+
+        Returns:
+            dict: 実行結果 (created に作成されたユーザーの id/userName、failures に失敗した操作)
+        """
+        operations = [
+            {"method": "POST", "path": "/Users", "bulkId": f"user{index}", "data": user}
+            for index, user in enumerate(users)
+        ]
+        return self._run("create", operations)
+
+    def delete_users(self, user_ids):
+        """
+        ユーザーの一括削除
+
+        Args:
+            user_ids (list): 削除するユーザーIDのリスト
+
+        Returns:
+            dict: 実行結果 (deleted に削除されたユーザーID、failures に失敗した操作)
+        """
+        operations = [{"method": "DELETE", "path": f"/Users/{user_id}"} for user_id in user_ids]
+        return self._run("delete", operations)
+
+    def _run(self, operation, operations):
+        supported, max_operations, max_payload_size = self._bulk_config()
+        mode = "bulk" if supported else "parallel"
+        self.tester.log(f"=== 一括{'作成' if operation == 'create' else '削除'} ({len(operations)}件, モード: {mode}) ===")
+        self.tester.configure_pool(self.workers)
+
+        start = time.perf_counter()
+        if supported:
+            chunks = self._chunk(operations, max_operations, max_payload_size)
+            outcomes = self._map(self._send_bulk, chunks)
+            outcomes = [outcome for chunk_outcomes in outcomes for outcome in chunk_outcomes]
+        else:
+            outcomes = self._map(self._send_single, operations)
+        elapsed = time.perf_counter() - start
+
+        succeeded = [outcome for outcome in outcomes if outcome["ok"]]
+        failures = [
+            {key: outcome[key] for key in ("method", "path", "userName", "status", "detail") if key in outcome}
+            for outcome in outcomes if not outcome["ok"]
+        ]
+        result = {
+            "operation": operation,
+            "mode": mode,
+            "requested": len(operations),
+            "succeeded": len(succeeded),
+            "failed": len(failures),
+            "elapsed": elapsed,
+            "throughput": len(succeeded) / elapsed if elapsed > 0 else 0.0,
+            "failures": failures,
+        }
+        if operation == "create":
+            result["created"] = [{"id": o["id"], "userName": o.get("userName")} for o in succeeded]
+        else:
+            result["deleted"] = [o["path"].rsplit("/", 1)[-1] for o in succeeded]
+
+        self.tester.log(
+            f"一括処理結果: 成功 {result['succeeded']}/{result['requested']}件, "
+            f"{elapsed:.3f}秒, {result['throughput']:.1f}ユーザー/秒"
+        )
+        for failure in failures:
+            self.tester.log(
+                f"一括処理失敗: {failure['method']} {failure['path']} "
+                f"(ステータス: {failure['status']}) {failure.get('detail', '')}"
+            )
+        return result
+
+    def _map(self, function, items):
+        """ワーカープールで並列実行 (結果は入力順)"""
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(items))) as executor:
+            return list(executor.map(function, items))
+
+    @staticmethod
+    def _chunk(operations, max_operations, max_payload_size):
+        """操作数とペイロードサイズの上限に収まるように分割"""
+        chunks = []
+        current = []
+        current_size = 0
+        for operation in operations:
+            size = len(json.dumps(operation, ensure_ascii=False).encode("utf-8"))
+            over_size = max_payload_size and current and current_size + size > max_payload_size
+            if len(current) >= max_operations or over_size:
+                chunks.append(current)
+                current = []
+                current_size = 0
+            current.append(operation)
+            current_size += size
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _send_bulk(self, operations):
+        """1回分のBulkリクエストを送信し、操作ごとの結果を返す"""
+        body = {
+            "schemas": [BULK_REQUEST_SCHEMA],
+            "Operations": operations,
+        }
+        try:
+            response = self.tester._request("post", ENDPOINT_BULK, f"{self.tester.base_url}/Bulk", json=body)
+            if response.status_code >= 400:
+                detail = _error_detail(_safe_json(response))
+                return [self._outcome(op, response.status_code, detail=detail) for op in operations]
+            results = _safe_json(response).get("Operations", [])
+        except Exception as e:
+            return [self._outcome(op, "error", detail=str(e)) for op in operations]
+
+        # 結果は bulkId (POST) または location 末尾のパス (DELETE) で対応付ける
+        by_bulk_id = {r["bulkId"]: r for r in results if r.get("bulkId")}
+        by_path = {"/Users/" + r["location"].rstrip("/").rsplit("/", 1)[-1]: r for r in results if r.get("location")}
+
+        outcomes = []
+        for operation in operations:
+            result = by_bulk_id.get(operation.get("bulkId")) or by_path.get(operation["path"])
+            if result is None:
+                outcomes.append(self._outcome(operation, "missing", detail="Bulkレスポンスに結果がありません"))
+                continue
+            status = _status_code(result.get("status"))
+            response_body = result.get("response") or {}
+            resource_id = response_body.get("id") if isinstance(response_body, dict) else None
+            if not resource_id and result.get("location"):
+                resource_id = result["location"].rstrip("/").rsplit("/", 1)[-1]
+            outcomes.append(self._outcome(
+                operation, status, resource_id=resource_id,
+                detail=None if 200 <= status < 300 else _error_detail(response_body)
+            ))
+        self._journal(outcomes)
+        return outcomes
+
+    def _journal(self, outcomes):
+        """Bulkリクエストで作成・削除したユーザーをジャーナルに記録 (個別リクエストはテスター側で記録)"""
+        journal = getattr(self.tester, "journal", None)
+        if journal is None:
+            return
+        for outcome in outcomes:
+            if outcome["method"] == "POST" and outcome["ok"]:
+                journal.created(outcome["id"], outcome.get("userName"))
+            elif outcome["method"] == "DELETE" and (outcome["ok"] or outcome["status"] == 404):
+                journal.deleted(outcome["path"].rsplit("/", 1)[-1])
+
+    def _send_single(self, operation):
+        """Bulk非対応時の個別リクエスト"""
+        url = f"{self.tester.base_url}{operation['path']}"
+        try:
+            if operation["method"] == "POST":
+                response = self.tester._request("post", ENDPOINT_CREATE_USER, url, json=operation["data"])
+            else:
+                response = self.tester._request("delete", ENDPOINT_DELETE_USER, url)
+        except Exception as e:
+            return self._outcome(operation, "error", detail=str(e))
+
+        body = _safe_json(response) if response.status_code != 204 else {}
+        status = response.status_code
+        return self._outcome(
+            operation, status, resource_id=body.get("id") if isinstance(body, dict) else None,
+            detail=None if 200 <= status < 300 else _error_detail(body)
+        )
+
+    @staticmethod
+    def _outcome(operation, status, resource_id=None, detail=None):
+        ok = isinstance(status, int) and 200 <= status < 300
+        if operation["method"] == "POST" and not resource_id:
+            ok = False
+        outcome = {
+            "ok": ok,
+            "method": operation["method"],
+            "path": operation["path"],
+            "status": status,
+            "id": resource_id,
+        }
+        if "data" in operation:
+            outcome["userName"] = operation["data"].get("userName")
+        if detail:
+            outcome["detail"] = detail
+        return outcome
+
+
+def _safe_json(response):
+    """レスポンス本文をJSONとして解析 (解析できない場合は空の辞書)"""
+    try:
+        return response.json()
+    except ValueError:
+        return {}
@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import glob
+import gzip
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import zlib
+
+TRACE_VERSION = 1
+
+
+def _decode(payload):
+    """リクエスト・レスポンスのボディをJSONとして解釈 (解釈できない場合は文字列のまま)"""
+    if payload is None or payload == b"" or payload == "":
+        return None
+    if isinstance(payload, bytes):
+        payload = payload.decode("utf-8", errors="replace")
+    if isinstance(payload, str):
+        try:
+            return json.loads(payload)
+        except ValueError:
+            return payload
+    return payload
+
+
+class TraceWriter:
+    def __init__(self, path, base_url, batch_size=256, flush_interval=0.2):
+        """
+        送信したリクエストとレスポンスの記録 (gzip圧縮のJSONL)
+
+        1行目はヘッダー (base_url と記録開始時刻)、以降は1リクエスト1行で、メソッド・ベースURLからのパス・
+        リクエストボディ・送信開始までの経過秒数・所要時間・ステータス・レスポンスボディを記録する。
+        再送した場合は最後の試行のステータスと、再送を含めた所要時間を記録する。
+        ボディの解析と圧縮はバックグラウンドスレッドで行う。
+
+        Args:
+            path (str): 出力先のファイルパス (*.jsonl.gz)
+            base_url (str): 記録するパスの基準となるベースURL
+            batch_size (int): 1回の書き込みでまとめる記録件数の上限
+            flush_interval (float): キューが空の場合の最大待機時間 (秒)
+        """
+        self.path = path
+        self.base_url = base_url
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.started_at = time.time()
+        self._origin = time.perf_counter()
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="extic-trace-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, method, url, endpoint, kwargs, started, elapsed, attempts, response=None, error=None):
+        """
+        1リクエスト分を記録 (送信層から呼び出す)
+
+        Args:
+            method (str): HTTPメソッド
+            url (str): リクエストURL
+            endpoint (str): レイテンシ記録用のエンドポイント名
+            kwargs (dict): requestsに渡した追加引数 (json/data/params を記録する)
+            started (float): 送信開始時刻 (time.perf_counter の値)
+            elapsed (float): 再送を含めた所要時間 (秒)
+            attempts (int): 試行回数
+            response (requests.Response): 最後の試行のレスポンス
+            error (Exception): 送信できなかった場合の例外
+        """
+        path = url[len(self.base_url):] if url.startswith(self.base_url) else url
+        if "json" in kwargs:
+            # 呼び出し元が送信後に変更しても記録が変わらないよう、この時点で文字列にする
+            body = json.dumps(kwargs["json"], ensure_ascii=False)
+        else:
+            body = kwargs.get("data")
+        entry = {
+            "offset": round(started - self._origin, 6),
+            "method": method.upper(),
+            "endpoint": endpoint,
+            "path": path,
+            "params": kwargs.get("params"),
+            "body": body,
+            "elapsed": round(elapsed, 6),
+            "attempts": attempts,
+        }
+        if response is not None:
+            entry["status"] = response.status_code
+            entry["response"] = response.content
+        else:
+            entry["status"] = "error"
+            entry["error"] = str(error)
+        with self._lock:
+            if self._closed:
+                return
+            self._seq += 1
+            entry["seq"] = self._seq
+            self._queue.put(entry)
+
+    def close(self):
+        """残りの記録を書き込んでファイルを閉じる"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+    def _line(self, entry):
+        entry["body"] = _decode(entry["body"])
+        if "response" in entry:
+            entry["response"] = _decode(entry["response"])
+        if entry["params"] is None:
+            del entry["params"]
+        return json.dumps(entry, ensure_ascii=False) + "\n"
+
+    def _run(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        header = {"type": "header", "version": TRACE_VERSION, "base_url": self.base_url,
+                  "started_at": self.started_at}
+        with gzip.open(self.path, "wt", encoding="utf-8") as file:
+            file.write(json.dumps(header, ensure_ascii=False) + "\n")
+            running = True
+            while running:
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    continue
+
+                lines = []
+                while True:
+                    if item is None:
+                        running = False
+                        break
+                    lines.append(self._line(item))
+                    if len(lines) >= self.batch_size:
+                        break
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+
+                if lines:
+                    try:
+                        file.write("".join(lines))
+                    except Exception as e:
+                        sys.stderr.write(f"トレース書き込みエラー: {str(e)}\n")
+
+
+def _read_lines(path):
+    """トレースファイルの行を読み出す (異常終了で末尾が欠けている場合は読めた行まで)"""
+    lines = []
+    try:
+        with gzip.open(path, "rt", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                lines.append(line)
+    except (EOFError, OSError, zlib.error):
+        pass
+    return lines
+
+
+def load_trace(patterns):
+    """
+    トレースファイルを読み込み、送信開始順に並べる
+
+    複数のファイル (複数プロセスで記録した場合など) は記録開始時刻を基準に1つの時間軸にまとめる。
+    末尾が書きかけの行や解析できない行は読み飛ばす。
+
+    Args:
+        patterns (list): トレースファイルのパス (ワイルドカード可)
+
+    Returns:
+        list: offset (最初の記録開始からの秒数) の昇順に並べた記録
+    """
+    paths = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)) or ([pattern] if os.path.exists(pattern) else []):
+            if path not in paths:
+                paths.append(path)
+    if not paths:
+        raise ValueError(f"トレースファイルが見つかりません: {list(patterns)}")
+
+    traces = []
+    for path in paths:
+        header, entries = None, []
+        for line in _read_lines(path):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(entry, dict):
+                continue
+            if entry.get("type") == "header":
+                header = entry
+            elif header is not None and "offset" in entry:
+                entries.append(entry)
+        if header is None:
+            raise ValueError(f"トレースファイルの形式が不正です: {path}")
+        traces.append((header["started_at"], path, entries))
+
+    origin = min(started_at for started_at, _, _ in traces)
+    records = []
+    for started_at, path, entries in traces:
+        for entry in entries:
+            entry["offset"] = round(entry["offset"] + started_at - origin, 6)
+            entry["trace"] = path
+            records.append(entry)
+    records.sort(key=lambda entry: (entry["offset"], entry["trace"], entry["seq"]))
+    return records
@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from endpoints import ENDPOINT_SERVICE_PROVIDER_CONFIG, ENDPOINT_SCHEMAS, ENDPOINT_RESOURCE_TYPES
+
+CORE_USER_SCHEMA = "urn:ietf:params:scim:schemas:core:2.0:User"
+DEFAULT_EXTIC_USER_SCHEMA = "urn:extic:scim:schemas:1.0:User"
+
+# キャッシュの保存先 (環境変数 EXTIC_DISCOVERY_CACHE_DIR で変更可能)
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "discovery")
+DEFAULT_CACHE_TTL = 3600
+# 取得に失敗した場合に既定値を使い続け、再取得を試みるまでの秒数
+DEFAULT_RETRY_INTERVAL = 30
+
+
+def _resources(body):
+    """ListResponse形式と単一リソース形式のどちらでもリソースのリストを返す"""
+    if isinstance(body, list):
+        return body
+    if not isinstance(body, dict) or not body:
+        return []
+    if "Resources" in body:
+        return body.get("Resources") or []
+    return [body]
+
+
+class ServerCapabilities:
+    def __init__(self, service_provider_config=None, schemas=None, resource_types=None):
+        """
+        SCIMサーバーの機能・上限値
+
+        Args:
+            service_provider_config (dict): /ServiceProviderConfig のレスポンス
+            schemas (list): /Schemas のリソース
+            resource_types (list): /ResourceTypes のリソース
+        """
+        self.service_provider_config = service_provider_config or {}
+        self.schemas = schemas or []
+        self.resource_types = resource_types or []
+
+    def _feature(self, name):
+        return self.service_provider_config.get(name) or {}
+
+    @property
+    def filter_supported(self):
+        return bool(self._feature("filter").get("supported"))
+
+    @property
+    def max_results(self):
+        """filter.maxResults (通知されていない場合は None)"""
+        value = self._feature("filter").get("maxResults")
+        return value if isinstance(value, int) and value > 0 else None
+
+    @property
+    def bulk_supported(self):
+        return bool(self._feature("bulk").get("supported"))
+
+    @property
+    def bulk_max_operations(self):
+        value = self._feature("bulk").get("maxOperations")
+        return value if isinstance(value, int) and value > 0 else None
+
+    @property
+    def bulk_max_payload_size(self):
+        value = self._feature("bulk").get("maxPayloadSize")
+        return value if isinstance(value, int) and value > 0 else None
+
+    @property
+    def patch_supported(self):
+        return bool(self._feature("patch").get("supported"))
+
+    @property
+    def etag_supported(self):
+        return bool(self._feature("etag").get("supported"))
+
+    @property
+    def sort_supported(self):
+        return bool(self._feature("sort").get("supported"))
+
+    @property
+    def user_extension_schemas(self):
+        """Userリソースの拡張スキーマURN (ResourceTypes、なければSchemasから取得)"""
+        for resource_type in self.resource_types:
+            if resource_type.get("id") == "User" or resource_type.get("endpoint") == "/Users":
+                return [extension["schema"] for extension in resource_type.get("schemaExtensions", [])]
+        return [schema["id"] for schema in self.schemas if schema.get("id") and schema["id"] != CORE_USER_SCHEMA
+                and schema["id"].endswith(":User")]
+
+    @property
+    def extic_schema(self):
+        """Extic拡張スキーマのURN"""
+        for schema in self.user_extension_schemas:
+            if "extic" in schema.lower():
+                return schema
+        return DEFAULT_EXTIC_USER_SCHEMA
+
+    def attribute(self, schema_id, name):
+        """
+        スキーマの属性定義を取得
+
+        Returns:
+            dict or None: 属性定義
+        """
+        for schema in self.schemas:
+            if schema.get("id") == schema_id:
+                for attribute in schema.get("attributes", []):
+                    if attribute.get("name", "").lower() == name.lower():
+                        return attribute
+        return None
+
+    def to_dict(self):
+        return {
+            "service_provider_config": self.service_provider_config,
+            "schemas": self.schemas,
+            "resource_types": self.resource_types,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get("service_provider_config"), data.get("schemas"), data.get("resource_types"))
+
+
+class CapabilityDiscovery:
+    def __init__(self, tester, cache_dir=None, ttl=DEFAULT_CACHE_TTL, retry_interval=DEFAULT_RETRY_INTERVAL):
+        """
+        SCIMサーバーの機能検出 (ベースURLごとにディスクへキャッシュ)
+
+        Args:
+            tester (ExticSCIMTester): リクエスト送信に使用するテスター
+            cache_dir (str): キャッシュの保存先 (省略時は EXTIC_DISCOVERY_CACHE_DIR または .cache/discovery)
+            ttl (float): キャッシュの有効期間 (秒)。0 の場合はキャッシュしない
+            retry_interval (float): 取得に失敗した場合に再取得を試みるまでの秒数
+        """
+        self.tester = tester
+        self.cache_dir = cache_dir or os.environ.get("EXTIC_DISCOVERY_CACHE_DIR") or DEFAULT_CACHE_DIR
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self._capabilities = None
+        # 不完全な機能情報を保持している場合の再取得時刻 (完全な場合は None)
+        self._retry_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def cache_file(self):
+        key = hashlib.sha256(self.tester.base_url.rstrip("/").encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def discover(self, refresh=False):
+        """
+        機能情報を取得 (メモリ → ディスクキャッシュ → サーバーの順に参照)
+
+        Args:
+            refresh (bool): キャッシュを無視してサーバーから再取得するか
+
+        Returns:
+            ServerCapabilities: 機能情報
+        """
+        with self._lock:
+            if self._capabilities is not None and not refresh and (
+                    self._retry_at is None or time.monotonic() < self._retry_at):
+                return self._capabilities
+            capabilities = None if refresh else self._load_cache()
+            complete = True
+            if capabilities is None:
+                capabilities, complete = self._fetch()
+                if complete:
+                    self._save_cache(capabilities)
+            self._capabilities = capabilities
+            # 取得に失敗した場合の既定値は短時間のみ使い、その後は再取得する
+            self._retry_at = None if complete else time.monotonic() + self.retry_interval
+            return capabilities
+
+    def invalidate(self):
+        """メモリとディスクのキャッシュを破棄"""
+        with self._lock:
+            self._capabilities = None
+            self._retry_at = None
+            try:
+                os.remove(self.cache_file)
+            except FileNotFoundError:
+                pass
+
+    def _get(self, endpoint, path):
+        response = self.tester._request("get", endpoint, f"{self.tester.base_url}{path}")
+        response.raise_for_status()
+        return response.json()
+
+    def _fetch(self):
+        """サーバーから取得 (ServiceProviderConfig の取得に成功した場合のみ完全とみなす)"""
+        self.tester.log("=== SCIM機能検出 ===")
+        try:
+            service_provider_config = self._get(ENDPOINT_SERVICE_PROVIDER_CONFIG, "/ServiceProviderConfig")
+        except Exception as e:
+            self.tester.log(f"ServiceProviderConfig取得エラー: {str(e)}", level="ERROR")
+            return ServerCapabilities(), False
+
+        documents = {}
+        for name, endpoint, path in (("schemas", ENDPOINT_SCHEMAS, "/Schemas"),
+                                     ("resource_types", ENDPOINT_RESOURCE_TYPES, "/ResourceTypes")):
+            try:
+                documents[name] = _resources(self._get(endpoint, path))
+            except Exception as e:
+                self.tester.log(f"{path}取得エラー: {str(e)}", level="WARNING")
+                documents[name] = []
+
+        capabilities = ServerCapabilities(service_provider_config, **documents)
+        self.tester.log(
+            f"機能検出結果: filter.maxResults={capabilities.max_results}, "
+            f"bulk={capabilities.bulk_supported} (maxOperations={capabilities.bulk_max_operations}), "
+            f"patch={capabilities.patch_supported}, etag={capabilities.etag_supported}, "
+            f"拡張スキーマ={capabilities.user_extension_schemas}"
+        )
+        return capabilities, True
+
+    def _load_cache(self):
+        if not self.ttl:
+            return None
+        try:
+            with open(self.cache_file, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("base_url") != self.tester.base_url.rstrip("/"):
+            return None
+        if time.time() - data.get("fetched_at", 0) >= self.ttl:
+            return None
+        self.tester.log("SCIM機能情報をキャッシュから読み込みました")
+        return ServerCapabilities.from_dict(data)
+
+    def _save_cache(self, capabilities):
+        if not self.ttl:
+            return
+        data = capabilities.to_dict()
+        data["base_url"] = self.tester.base_url.rstrip("/")
+        data["fetched_at"] = time.time()
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temporary = f"{self.cache_file}.{os.getpid()}.tmp"
+            with open(temporary, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temporary, self.cache_file)
+        except OSError as e:
+            self.tester.log(f"SCIM機能情報のキャッシュ保存エラー: {str(e)}", level="WARNING")
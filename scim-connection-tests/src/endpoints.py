@@ -0,0 +1,19 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# レイテンシ記録用のエンドポイント名
+ENDPOINT_LIST_USERS = "GET /Users"
+ENDPOINT_FILTER_USERS = "GET /Users?filter"
+ENDPOINT_GET_USER = "GET /Users/{id}"
+ENDPOINT_CREATE_USER = "POST /Users"
+ENDPOINT_UPDATE_USER = "PUT /Users/{id}"
+ENDPOINT_PATCH_USER = "PATCH /Users/{id}"
+ENDPOINT_DELETE_USER = "DELETE /Users/{id}"
+ENDPOINT_BULK = "POST /Bulk"
+ENDPOINT_SERVICE_PROVIDER_CONFIG = "GET /ServiceProviderConfig"
+ENDPOINT_SCHEMAS = "GET /Schemas"
+ENDPOINT_RESOURCE_TYPES = "GET /ResourceTypes"
+
+# ゲートウェイ (mcp-gateway) のエンドポイント
+ENDPOINT_GATEWAY_LOGIN = "POST /api/auth/login"
+ENDPOINT_GATEWAY_MODELS = "GET /api/models"
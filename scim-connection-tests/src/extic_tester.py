@@ -1,15 +1,87 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import atexit
 import requests
-import json
 import time
 import sys
 import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from bulk import BulkProvisioner
+from capture import TraceWriter
+from endpoints import (
+    ENDPOINT_LIST_USERS,
+    ENDPOINT_FILTER_USERS,
+    ENDPOINT_GET_USER,
+    ENDPOINT_CREATE_USER,
+    ENDPOINT_UPDATE_USER,
+    ENDPOINT_PATCH_USER,
+    ENDPOINT_DELETE_USER,
+)
+from discovery import CapabilityDiscovery, CORE_USER_SCHEMA, DEFAULT_CACHE_TTL
+from journal import Journal
+from latency import LatencyRecorder
+from load_generator import LoadGenerator
+from log_sink import LogSink, DEBUG, INFO, ERROR
+from transport import Transport, DEFAULT_MAX_RETRIES, DEFAULT_POOL_MAXSIZE
+
+# ServiceProviderConfig から上限が取得できない場合のページサイズ
+DEFAULT_PAGE_SIZE = 100
+
+PATCH_OP_SCHEMA = "urn:ietf:params:scim:api:messages:2.0:PatchOp"
+
+
+def apply_patch_operations(resource, operations):
+    """
+    PATCH操作をリソースに適用 (PATCH非対応サーバー向けのGET+PUTフォールバック用)
+    
+    対応するパスは "attr"、"attr.subAttr"、"urn:...:attr" 形式のみ (値フィルター付きパスは非対応)。
+    
+    Args:
+        resource (dict): 適用対象のリソース (変更される)
+        operations (list): {"op": "add"/"replace"/"remove", "path": ..., "value": ...} のリスト
+        
+    Returns:
+        dict: 適用後のリソース
+    """
+    for operation in operations:
+        op = operation.get("op", "").lower()
+        path = operation.get("path")
+        value = operation.get("value")
+        if not path:
+            if op == "remove" or not isinstance(value, dict):
+                raise ValueError("パスなしのPATCH操作にはオブジェクトの値が必要です")
+            resource.update(value)
+            continue
+        if "[" in path:
+            raise ValueError(f"値フィルター付きのパスには対応していません: {path}")
+        
+        container = resource
+        if ":" in path:
+            schema, path = path.rsplit(":", 1)
+            container = resource.setdefault(schema, {})
+        *parents, name = path.split(".")
+        for parent in parents:
+            container = container.setdefault(parent, {})
+        
+        if op == "remove":
+            container.pop(name, None)
+        elif op == "add" and isinstance(container.get(name), list) and isinstance(value, list):
+            container[name] = container[name] + [item for item in value if item not in container[name]]
+        elif op in ("add", "replace"):
+            container[name] = value
+        else:
+            raise ValueError(f"未対応のPATCH操作です: {op}")
+    return resource
+
 class ExticSCIMTester:
-    def __init__(self, base_url, auth_type="basic", username=None, password=None, token=None):
+    def __init__(self, base_url, auth_type="basic", username=None, password=None, token=None, log_level=INFO,
+                 discovery_cache_ttl=DEFAULT_CACHE_TTL, discovery_cache_dir=None, rate_limit=None,
+                 max_retries=DEFAULT_MAX_RETRIES, pool_maxsize=DEFAULT_POOL_MAXSIZE, timeout=None, log_file=None,
+                 journal=True, capture=None):
         """
         Exticとの接続テスト用クラスのコンストラクタ
         
@@ -19,6 +91,17 @@ class ExticSCIMTester:
             username (str): Basic認証用ユーザー名
             password (str): Basic認証用パスワード
             token (str): Bearer認証用トークン
+            log_level (int or str): ログ出力レベル ("DEBUG" の場合はレスポンス本文も出力)
+            discovery_cache_ttl (float): SCIM機能情報のディスクキャッシュ有効期間 (秒、0 で無効)
+            discovery_cache_dir (str): SCIM機能情報のキャッシュ保存先
+            rate_limit (float): 1秒あたりの最大リクエスト数 (テナントのスロットリング上限より少し低く設定する)
+            max_retries (int): 429/503・接続エラー時の最大再送回数 (0 で再送しない)
+            pool_maxsize (int): ホストごとに保持する接続数
+            timeout (float): リクエストのタイムアウト (秒)
+            log_file (str): ログファイルのパス (省略時は logs/ 配下に実行日時・プロセスID付きのファイル名で作成)
+            journal (bool or str): 作成・削除したユーザーIDをジャーナルに記録するか (文字列の場合は記録先のパス。
+                True の場合はログファイルと同じ場所に *_journal.jsonl で記録)
+            capture (str): 送信したリクエストとレスポンスを記録するトレースファイル (*.jsonl.gz) のパス
         """
         self.base_url = base_url
         self.auth_type = auth_type
@@ -42,37 +125,152 @@ class ExticSCIMTester:
             "Content-Type": "application/scim+json;charset=UTF-8"
         })
         
-        # ログファイルの設定 - logs ディレクトリに保存
-        log_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs")
-        os.makedirs(log_dir, exist_ok=True)
-        self.log_file = os.path.join(log_dir, f"extic_test_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
-        
-    def log(self, message):
-        """ログを出力"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_message = f"[{timestamp}] {message}"
-        print(log_message)
-        with open(self.log_file, "a", encoding="utf-8") as f:
-            f.write(log_message + "\n")
+        # ログファイルの設定 - logs ディレクトリ (環境変数 EXTIC_LOG_DIR で変更可能) に保存
+        if log_file is None:
+            log_dir = os.environ.get("EXTIC_LOG_DIR") or os.path.join(
+                os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs")
+            os.makedirs(log_dir, exist_ok=True)
+            # 同じ秒に作成した複数のテスターがログ・ジャーナルを共有しないよう、プロセスIDと識別子を付ける
+            log_file = os.path.join(
+                log_dir,
+                f"extic_test_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}_{uuid.uuid4().hex[:6]}.log",
+            )
+        self.log_file = log_file
+        self.log_sink = LogSink(self.log_file, level=log_level)
+        
+        # 作成したユーザーIDのジャーナル (中断時に残ったユーザーを sweep で削除するため)
+        if journal:
+            journal_file = journal if isinstance(journal, str) else os.path.splitext(self.log_file)[0] + "_journal.jsonl"
+            self.journal = Journal(journal_file)
+        else:
+            self.journal = None
+        atexit.register(self.close)
+        
+        # リクエストごとのレイテンシ記録
+        self.metrics = LatencyRecorder()
+        
+        # レート制限・再送・コネクションプール
+        self.transport = Transport(
+            self.session,
+            rate_limit=rate_limit,
+            max_retries=max_retries,
+            pool_maxsize=pool_maxsize,
+            timeout=timeout,
+            log=self.log,
+            capture=TraceWriter(capture, base_url) if capture else None
+        )
+        if capture:
+            self.log(f"トレース記録: {capture}")
+        
+        # SCIM機能検出 (初回参照時に取得し、ベースURLごとにディスクへキャッシュ)
+        self.discovery = CapabilityDiscovery(self, cache_dir=discovery_cache_dir, ttl=discovery_cache_ttl)
+        
+    def log(self, message, level=INFO, payload=None):
+        """
+        ログを出力 (書き込みはバックグラウンドスレッドで行う)
+        
+        Args:
+            message (str): メッセージ
+            level (int or str): ログレベル
+            payload (object or callable): DEBUGレベル有効時のみJSON整形して出力するデータ
+        """
+        self.log_sink.emit(level, message, payload)
+    
+    def close(self):
+        """未出力のログ・ジャーナルを書き込んで出力を終了"""
+        atexit.unregister(self.close)
+        if self.journal is not None:
+            self.journal.close()
+        if self.transport.capture is not None:
+            self.transport.capture.close()
+        self.log_sink.close()
+    
+    def _request(self, method, endpoint, url, **kwargs):
+        """
+        HTTPリクエストを送信し、レイテンシを試行ごとにエンドポイント・ステータス別に記録
+        
+        レート制限と 429/503 時の再送は送信層 (self.transport) が行う。
+        
+        Args:
+            method (str): HTTPメソッド ("get", "post", "put", "patch", "delete")
+            endpoint (str): レイテンシ記録用のエンドポイント名
+            url (str): リクエストURL
+            **kwargs: requestsに渡す追加引数
+            
+        Returns:
+            requests.Response: レスポンス
+        """
+        def record(status, seconds):
+            self.metrics.record(endpoint, status, seconds)
+        
+        self.metrics.begin(endpoint)
+        try:
+            response = self.transport.send(method, url, record=record, endpoint=endpoint, **kwargs)
+        finally:
+            self.metrics.finish(endpoint)
+        if self.journal is not None and endpoint in (ENDPOINT_CREATE_USER, ENDPOINT_DELETE_USER):
+            self._journal_response(endpoint, url, response)
+        return response
+    
+    def _journal_response(self, endpoint, url, response):
+        """ユーザーの作成・削除の結果をジャーナルに記録 (削除時の404は削除済みとして扱う)"""
+        if endpoint == ENDPOINT_CREATE_USER:
+            if response.status_code == 201:
+                try:
+                    created = response.json()
+                except ValueError:
+                    return
+                if isinstance(created, dict):
+                    self.journal.created(created.get("id"), created.get("userName"))
+        elif response.status_code in (204, 404):
+            self.journal.deleted(url.rstrip("/").rsplit("/", 1)[-1])
+    
+    def configure_pool(self, pool_maxsize):
+        """
+        並列実行数に合わせてコネクションプールを拡張 (現在のサイズ以下の場合は何もしない)
+        
+        Args:
+            pool_maxsize (int): ホストごとに保持する接続数 (並列ワーカー数)
+        """
+        if pool_maxsize <= self.transport.pool_maxsize:
+            return
+        self.transport.mount(pool_maxsize)
+    
+    def write_latency_report(self, path=None):
+        """
+        レイテンシ集計結果をJSONファイルに出力
+        
+        Args:
+            path (str): 出力先 (省略時はログファイルと同じ場所に *_latency.json で出力)
+            
+        Returns:
+            str: 出力先のファイルパス
+        """
+        if path is None:
+            path = os.path.splitext(self.log_file)[0] + "_latency.json"
+        self.metrics.write_report(path)
+        self.log(f"レイテンシレポート出力: {path}")
+        return path
             
     def test_connection(self):
         """基本的な接続テスト"""
         self.log("=== 基本接続テスト開始 ===")
         try:
-            response = self.session.get(f"{self.base_url}/Users?startIndex=1&count=0")
+            response = self._request("get", ENDPOINT_LIST_USERS, f"{self.base_url}/Users?startIndex=1&count=0")
             response.raise_for_status()
             self.log(f"接続成功: ステータスコード: {response.status_code}")
-            self.log(f"レスポンス: {json.dumps(response.json(), indent=2, ensure_ascii=False)}")
+            self.log("レスポンス:", level=DEBUG, payload=response.json)
             return True
         except Exception as e:
-            self.log(f"接続エラー: {str(e)}")
+            self.log(f"接続エラー: {str(e)}", level=ERROR)
             return False
             
     def get_users(self, start_index=1, count=10):
         """ユーザー一覧の取得"""
         self.log("=== ユーザー一覧取得テスト ===")
         try:
-            response = self.session.get(
+            response = self._request(
+                "get", ENDPOINT_LIST_USERS,
                 f"{self.base_url}/Users?startIndex={start_index}&count={count}"
             )
             response.raise_for_status()
@@ -80,14 +278,100 @@ class ExticSCIMTester:
             self.log(f"ユーザー数: {users.get('totalResults', 0)}")
             return users
         except Exception as e:
-            self.log(f"ユーザー一覧取得エラー: {str(e)}")
+            self.log(f"ユーザー一覧取得エラー: {str(e)}", level=ERROR)
             return None
+    
+    @property
+    def capabilities(self):
+        """SCIMサーバーの機能・上限値 (ServiceProviderConfig / Schemas / ResourceTypes)"""
+        return self.discovery.discover()
+    
+    def get_service_provider_config(self):
+        """
+        ServiceProviderConfigの取得 (機能検出結果を再利用)
+        
+        Returns:
+            dict: ServiceProviderConfig。取得に失敗した場合は空の辞書
+        """
+        return self.capabilities.service_provider_config
+    
+    def _max_page_size(self):
+        """サーバーが通知する1レスポンスあたりの最大件数 (filter.maxResults)"""
+        return self.capabilities.max_results or DEFAULT_PAGE_SIZE
+    
+    def _fetch_users_page(self, start_index, count, filter_query=None):
+        """ユーザー一覧の1ページを取得 (ログ出力なし)"""
+        url = f"{self.base_url}/Users?startIndex={start_index}&count={count}"
+        endpoint = ENDPOINT_LIST_USERS
+        if filter_query:
+            url += f"&filter={requests.utils.quote(filter_query)}"
+            endpoint = ENDPOINT_FILTER_USERS
+        response = self._request("get", endpoint, url)
+        response.raise_for_status()
+        return response.json()
+    
+    def iter_users(self, page_size=None, filter_query=None, prefetch=True):
+        """
+        全ユーザーを1件ずつ返すジェネレーター
+        
+        startIndex/count によるページングを遅延実行し、呼び出し側が現在のページを処理している間に
+        次のページを先読みする。保持するのは現在のページと先読み中のページのみのため、
+        テナントのユーザー数に関わらずメモリ使用量は一定となる。
+        
+        Args:
+            page_size (int): 1ページあたりの件数 (省略時およびサーバー上限超過時は filter.maxResults)
+            filter_query (str): SCIMフィルター式
+            prefetch (bool): 次ページを先読みするか
+            
+        Yields:
+            dict: SCIMユーザーリソース
+        """
+        max_page_size = self._max_page_size()
+        page_size = min(page_size or max_page_size, max_page_size)
+        self.log(f"=== ユーザー全件走査 (ページサイズ: {page_size}) ===")
+        
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        start_index = 1
+        fetched = 0
+        try:
+            if executor:
+                pending = executor.submit(self._fetch_users_page, start_index, page_size, filter_query)
+            while True:
+                if executor:
+                    page = pending.result()
+                else:
+                    page = self._fetch_users_page(start_index, page_size, filter_query)
+                
+                resources = page.get("Resources", [])
+                total = page.get("totalResults", 0)
+                next_index = start_index + len(resources)
+                has_next = bool(resources) and next_index <= total
+                
+                # 現在のページを返している間に次のページを取得
+                if has_next and executor:
+                    pending = executor.submit(self._fetch_users_page, next_index, page_size, filter_query)
+                
+                for resource in resources:
+                    yield resource
+                fetched += len(resources)
+                
+                if not has_next:
+                    break
+                start_index = next_index
+        except Exception as e:
+            self.log(f"ユーザー全件走査エラー: {str(e)}", level=ERROR)
+            raise
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+        self.log(f"走査ユーザー数: {fetched}")
             
     def get_user_by_username(self, username):
         """ユーザー名によるユーザー検索"""
         self.log(f"=== ユーザー検索テスト: {username} ===")
         try:
-            response = self.session.get(
+            response = self._request(
+                "get", ENDPOINT_FILTER_USERS,
                 f"{self.base_url}/Users?filter=userName eq \"{username}\""
             )
             response.raise_for_status()
@@ -95,96 +379,155 @@ class ExticSCIMTester:
             
             if result.get("totalResults", 0) > 0 and "Resources" in result:
                 user = result["Resources"][0]
-                self.log(f"ユーザー情報: {json.dumps(user, indent=2, ensure_ascii=False)}")
+                self.log(f"ユーザー情報: {user.get('id')}", payload=user)
                 return user
             else:
                 self.log(f"ユーザー {username} が見つかりません")
                 return None
         except Exception as e:
-            self.log(f"ユーザー検索エラー: {str(e)}")
+            self.log(f"ユーザー検索エラー: {str(e)}", level=ERROR)
             return None
     
     def get_user_by_id(self, user_id):
         """ユーザーIDによるユーザー取得"""
         self.log(f"=== ユーザーID検索テスト: {user_id} ===")
         try:
-            response = self.session.get(f"{self.base_url}/Users/{user_id}")
+            response = self._request("get", ENDPOINT_GET_USER, f"{self.base_url}/Users/{user_id}")
             response.raise_for_status()
             user = response.json()
-            self.log(f"ユーザー情報: {json.dumps(user, indent=2, ensure_ascii=False)}")
+            self.log(f"ユーザー情報: {user.get('id')}", payload=user)
             return user
         except Exception as e:
-            self.log(f"ユーザー取得エラー: {str(e)}")
+            self.log(f"ユーザー取得エラー: {str(e)}", level=ERROR)
             return None
     
     def create_user(self, user_data):
         """ユーザー作成"""
         self.log("=== ユーザー作成テスト ===")
         try:
-            response = self.session.post(
+            response = self._request(
+                "post", ENDPOINT_CREATE_USER,
                 f"{self.base_url}/Users",
                 json=user_data
             )
             response.raise_for_status()
             created_user = response.json()
-            self.log(f"ユーザー作成成功: {json.dumps(created_user, indent=2, ensure_ascii=False)}")
+            self.log(f"ユーザー作成成功: {created_user.get('id')}", payload=created_user)
             return created_user
         except Exception as e:
-            self.log(f"ユーザー作成エラー: {str(e)}")
+            self.log(f"ユーザー作成エラー: {str(e)}", level=ERROR)
             if hasattr(e, 'response') and e.response is not None:
-                self.log(f"エラーレスポンス: {e.response.text}")
+                self.log(f"エラーレスポンス: {e.response.text}", level=ERROR)
             return None
     
-    def update_user(self, user_id, user_data):
-        """ユーザー更新"""
+    def _if_match(self, version):
+        """ETag対応サーバーの場合のみ If-Match ヘッダーを付与"""
+        if version and self.capabilities.etag_supported:
+            return {"headers": {"If-Match": version}}
+        return {}
+    
+    def update_user(self, user_id, user_data, version=None):
+        """
+        ユーザー更新
+        
+        Args:
+            user_id (str): ユーザーID
+            user_data (dict): 更新後のユーザーリソース
+            version (str): meta.version (ETag対応サーバーの場合は If-Match として送信)
+        """
         self.log(f"=== ユーザー更新テスト: {user_id} ===")
         try:
-            response = self.session.put(
+            response = self._request(
+                "put", ENDPOINT_UPDATE_USER,
                 f"{self.base_url}/Users/{user_id}",
-                json=user_data
+                json=user_data,
+                **self._if_match(version)
             )
             response.raise_for_status()
             updated_user = response.json()
-            self.log(f"ユーザー更新成功: {json.dumps(updated_user, indent=2, ensure_ascii=False)}")
+            self.log(f"ユーザー更新成功: {updated_user.get('id')}", payload=updated_user)
             return updated_user
         except Exception as e:
-            self.log(f"ユーザー更新エラー: {str(e)}")
+            self.log(f"ユーザー更新エラー: {str(e)}", level=ERROR)
             if hasattr(e, 'response') and e.response is not None:
-                self.log(f"エラーレスポンス: {e.response.text}")
+                self.log(f"エラーレスポンス: {e.response.text}", level=ERROR)
+            return None
+    
+    def patch_user(self, user_id, operations, version=None):
+        """
+        変更された属性のみを更新
+        
+        ServiceProviderConfig で patch.supported が通知されている場合は PATCH を送信し、
+        非対応の場合は現在のユーザーを取得して操作を適用した上で PUT する。
+        
+        Args:
+            user_id (str): ユーザーID
+            operations (list): PATCH操作 ({"op", "path", "value"}) のリスト
+            version (str): meta.version (ETag対応サーバーの場合は If-Match として送信)
+            
+        Returns:
+            dict or None: 更新後のユーザー
+        """
+        if not self.capabilities.patch_supported:
+            current = self.get_user_by_id(user_id)
+            if current is None:
+                return None
+            current.pop("meta", None)
+            try:
+                updated = apply_patch_operations(current, operations)
+            except ValueError as e:
+                self.log(f"ユーザー更新エラー: {str(e)}", level=ERROR)
+                return None
+            return self.update_user(user_id, updated, version=version)
+        
+        self.log(f"=== ユーザー部分更新: {user_id} ===")
+        try:
+            response = self._request(
+                "patch", ENDPOINT_PATCH_USER,
+                f"{self.base_url}/Users/{user_id}",
+                json={"schemas": [PATCH_OP_SCHEMA], "Operations": operations},
+                **self._if_match(version)
+            )
+            response.raise_for_status()
+            updated_user = response.json() if response.status_code != 204 else {"id": user_id}
+            self.log(f"ユーザー部分更新成功: {user_id}", payload=updated_user)
+            return updated_user
+        except Exception as e:
+            self.log(f"ユーザー部分更新エラー: {str(e)}", level=ERROR)
+            if hasattr(e, 'response') and e.response is not None:
+                self.log(f"エラーレスポンス: {e.response.text}", level=ERROR)
             return None
     
     def delete_user(self, user_id):
         """ユーザー削除"""
         self.log(f"=== ユーザー削除テスト: {user_id} ===")
         try:
-            response = self.session.delete(f"{self.base_url}/Users/{user_id}")
+            response = self._request("delete", ENDPOINT_DELETE_USER, f"{self.base_url}/Users/{user_id}")
             if response.status_code == 204:
                 self.log("ユーザー削除成功")
                 return True
             else:
-                self.log(f"予期しないステータスコード: {response.status_code}")
+                self.log(f"予期しないステータスコード: {response.status_code}", level=ERROR)
                 return False
         except Exception as e:
-            self.log(f"ユーザー削除エラー: {str(e)}")
+            self.log(f"ユーザー削除エラー: {str(e)}", level=ERROR)
             return False
     
     def test_user_create_update_delete(self):
         """ユーザーのCRUD操作の一連のテスト"""
         self.log("=== ユーザーCRUD操作テスト開始 ===")
+        extic_schema = self.capabilities.extic_schema
         
         # テストユーザーデータ
         test_username = f"testuser_{int(time.time())}"
         
         # 1. ユーザー作成
         user_data = {
-            "schemas": [
-                "urn:ietf:params:scim:schemas:core:2.0:User",
-                "urn:extic:scim:schemas:1.0:User"
-            ],
+            "schemas": [CORE_USER_SCHEMA, extic_schema],
             "userName": test_username,
             "password": "TestP@ssw0rd",
             "displayName": "テストユーザー",
-            "urn:extic:scim:schemas:1.0:User": {
+            extic_schema: {
                 "exticGroups": ["基本ユーザーグループ"],
                 "extendAttrs": [
                     {
@@ -210,13 +553,10 @@ class ExticSCIMTester:
         
         # 3. ユーザー更新 - 研究グループに変更
         update_data = {
-            "schemas": [
-                "urn:ietf:params:scim:schemas:core:2.0:User",
-                "urn:extic:scim:schemas:1.0:User"
-            ],
+            "schemas": [CORE_USER_SCHEMA, extic_schema],
             "userName": test_username,
             "displayName": "テストユーザー（更新）",
-            "urn:extic:scim:schemas:1.0:User": {
+            extic_schema: {
                 "exticGroups": ["研究グループ"],
                 "extendAttrs": [
                     {
@@ -239,7 +579,7 @@ class ExticSCIMTester:
             return False
         
         # グループと権限レベルの変更を確認
-        extic_data = updated_check.get("urn:extic:scim:schemas:1.0:User", {})
+        extic_data = updated_check.get(extic_schema, {})
         groups = extic_data.get("exticGroups", [])
         
         if "研究グループ" in groups:
@@ -267,18 +607,16 @@ class ExticSCIMTester:
     def test_group_based_access(self):
         """グループベースのアクセス制御テスト"""
         self.log("=== グループベースアクセス制御テスト開始 ===")
+        extic_schema = self.capabilities.extic_schema
         
         # 1. 基本ユーザーの作成
         basic_username = f"basic_user_{int(time.time())}"
         basic_user_data = {
-            "schemas": [
-                "urn:ietf:params:scim:schemas:core:2.0:User",
-                "urn:extic:scim:schemas:1.0:User"
-            ],
+            "schemas": [CORE_USER_SCHEMA, extic_schema],
             "userName": basic_username,
             "password": "BasicP@ss123",
             "displayName": "基本ユーザー",
-            "urn:extic:scim:schemas:1.0:User": {
+            extic_schema: {
                 "exticGroups": ["基本ユーザーグループ"],
                 "extendAttrs": [
                     {
@@ -299,13 +637,10 @@ class ExticSCIMTester:
         # 2. グループの変更 (基本→研究)
         self.log("基本ユーザーを研究グループに変更")
         update_data = {
-            "schemas": [
-                "urn:ietf:params:scim:schemas:core:2.0:User",
-                "urn:extic:scim:schemas:1.0:User"
-            ],
+            "schemas": [CORE_USER_SCHEMA, extic_schema],
             "userName": basic_username,
             "displayName": "基本ユーザー",
-            "urn:extic:scim:schemas:1.0:User": {
+            extic_schema: {
                 "exticGroups": ["研究グループ"],
                 "extendAttrs": [
                     {
@@ -325,13 +660,10 @@ class ExticSCIMTester:
         # 3. 管理者グループへの変更
         self.log("研究ユーザーを管理者グループに変更")
         admin_update_data = {
-            "schemas": [
-                "urn:ietf:params:scim:schemas:core:2.0:User",
-                "urn:extic:scim:schemas:1.0:User"
-            ],
+            "schemas": [CORE_USER_SCHEMA, extic_schema],
             "userName": basic_username,
             "displayName": "基本ユーザー",
-            "urn:extic:scim:schemas:1.0:User": {
+            extic_schema: {
                 "exticGroups": ["管理者グループ"],
                 "role": "管理者",
                 "extendAttrs": [
@@ -352,7 +684,7 @@ class ExticSCIMTester:
         # 4. 最終確認とクリーンアップ
         final_user = self.get_user_by_id(basic_user_id)
         if final_user:
-            extic_data = final_user.get("urn:extic:scim:schemas:1.0:User", {})
+            extic_data = final_user.get(extic_schema, {})
             role = extic_data.get("role", "")
             self.log(f"最終ロール確認: {role}")
             
@@ -367,18 +699,16 @@ class ExticSCIMTester:
     def test_extended_attributes(self):
         """拡張属性テスト"""
         self.log("=== 拡張属性テスト開始 ===")
+        extic_schema = self.capabilities.extic_schema
         
         # ユーザー作成 (拡張属性付き)
         ext_username = f"ext_user_{int(time.time())}"
         ext_user_data = {
-            "schemas": [
-                "urn:ietf:params:scim:schemas:core:2.0:User",
-                "urn:extic:scim:schemas:1.0:User"
-            ],
+            "schemas": [CORE_USER_SCHEMA, extic_schema],
             "userName": ext_username,
             "password": "ExtP@ss123",
             "displayName": "拡張属性テストユーザー",
-            "urn:extic:scim:schemas:1.0:User": {
+            extic_schema: {
                 "exticGroups": ["基本ユーザーグループ"],
                 "extendAttrs": [
                     {
@@ -407,7 +737,7 @@ class ExticSCIMTester:
         # 拡張属性の確認
         retrieved_user = self.get_user_by_id(ext_user_id)
         if retrieved_user:
-            extic_data = retrieved_user.get("urn:extic:scim:schemas:1.0:User", {})
+            extic_data = retrieved_user.get(extic_schema, {})
             ext_attrs = extic_data.get("extendAttrs", [])
             
             self.log("拡張属性一覧:")
@@ -417,13 +747,10 @@ class ExticSCIMTester:
             # 拡張属性の更新
             self.log("拡張属性の更新テスト")
             update_data = {
-                "schemas": [
-                    "urn:ietf:params:scim:schemas:core:2.0:User",
-                    "urn:extic:scim:schemas:1.0:User"
-                ],
+                "schemas": [CORE_USER_SCHEMA, extic_schema],
                 "userName": ext_username,
                 "displayName": "拡張属性テストユーザー",
-                "urn:extic:scim:schemas:1.0:User": {
+                extic_schema: {
                     "exticGroups": ["基本ユーザーグループ"],
                     "extendAttrs": [
                         {
@@ -448,7 +775,7 @@ class ExticSCIMTester:
             
             updated_user = self.update_user(ext_user_id, update_data)
             if updated_user:
-                extic_data = updated_user.get("urn:extic:scim:schemas:1.0:User", {})
+                extic_data = updated_user.get(extic_schema, {})
                 updated_attrs = extic_data.get("extendAttrs", [])
                 
                 self.log("更新後の拡張属性一覧:")
@@ -468,21 +795,53 @@ class ExticSCIMTester:
     def test_performance(self, iterations=10):
         """パフォーマンステスト"""
         self.log(f"=== パフォーマンステスト ({iterations}回繰り返し) ===")
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         for i in range(iterations):
             self.log(f"イテレーション {i+1}/{iterations}")
             # ユーザー一覧取得の時間計測
-            user_start = time.time()
+            user_start = time.perf_counter()
             self.get_users(count=20)
-            user_end = time.time()
+            user_end = time.perf_counter()
             self.log(f"ユーザー一覧取得時間: {user_end - user_start:.3f}秒")
         
-        total_time = time.time() - start_time
+        total_time = time.perf_counter() - start_time
         self.log(f"合計実行時間: {total_time:.3f}秒")
         self.log(f"平均リクエスト時間: {total_time/iterations:.3f}秒")
+        
+        # ステータス別のレイテンシ分布
+        for status, summary in self.metrics.report()["endpoints"].get(ENDPOINT_LIST_USERS, {}).items():
+            self.log(
+                f"ユーザー一覧取得レイテンシ (ステータス {status}): "
+                f"p50 {summary['p50']:.3f}ms / p90 {summary['p90']:.3f}ms / "
+                f"p99 {summary['p99']:.3f}ms / p99.9 {summary['p99.9']:.3f}ms / max {summary['max']:.3f}ms"
+            )
         return True
 
+    def test_load(self, workers=4, duration=None, total_requests=None, target_rate=None, operation=None):
+        """
+        並列負荷テスト
+
+        Args:
+            workers (int): 並列ワーカー数
+            duration (float): 実行時間 (秒)
+            total_requests (int): 送信するリクエスト総数
+            target_rate (float): 目標リクエストレート (リクエスト/秒)
+            operation (callable): 1リクエスト分の操作 (省略時はユーザー一覧取得)
+
+        Returns:
+            dict: 実行結果の集計
+        """
+        generator = LoadGenerator(
+            self,
+            workers=workers,
+            duration=duration,
+            total_requests=total_requests,
+            target_rate=target_rate,
+            operation=operation
+        )
+        return generator.run()
+
     def test_filtered_search(self):
         """フィルター検索テスト"""
         self.log("=== フィルター検索テスト ===")
@@ -490,7 +849,8 @@ class ExticSCIMTester:
         # 拡張属性での検索
         try:
             filter_query = "(extendAttrs.name eq \"accessLevel\") and (extendAttrs.value eq \"advanced\")"
-            response = self.session.get(
+            response = self._request(
+                "get", ENDPOINT_FILTER_USERS,
                 f"{self.base_url}/Users?filter={requests.utils.quote(filter_query)}"
             )
             response.raise_for_status()
@@ -499,42 +859,37 @@ class ExticSCIMTester:
             self.log(f"高度アクセスレベルユーザー数: {result.get('totalResults', 0)}")
             return True
         except Exception as e:
-            self.log(f"フィルター検索エラー: {str(e)}")
+            self.log(f"フィルター検索エラー: {str(e)}", level=ERROR)
             return False
 
     def test_bulk_operations(self, user_count=3):
         """一括操作テスト"""
         self.log(f"=== 一括操作テスト ({user_count}ユーザー) ===")
+        extic_schema = self.capabilities.extic_schema
         
-        test_users = []
+        provisioner = BulkProvisioner(self)
         
         # 複数ユーザー作成
+        users = []
         for i in range(user_count):
             username = f"bulk_user_{int(time.time())}_{i}"
-            user_data = {
-                "schemas": ["urn:ietf:params:scim:schemas:core:2.0:User", "urn:extic:scim:schemas:1.0:User"],
+            users.append({
+                "schemas": [CORE_USER_SCHEMA, extic_schema],
                 "userName": username,
                 "password": f"BulkP@ss{i}",
                 "displayName": f"一括テストユーザー{i}",
-                "urn:extic:scim:schemas:1.0:User": {
+                extic_schema: {
                     "exticGroups": ["基本ユーザーグループ"]
                 }
-            }
-            
-            user = self.create_user(user_data)
-            if user:
-                test_users.append(user)
+            })
         
-        self.log(f"{len(test_users)}/{user_count}ユーザーの作成に成功")
+        created = provisioner.create_users(users)
+        self.log(f"{created['succeeded']}/{user_count}ユーザーの作成に成功 ({created['throughput']:.1f}ユーザー/秒)")
         
         # 一括削除
-        success_count = 0
-        for user in test_users:
-            if self.delete_user(user["id"]):
-                success_count += 1
-        
-        self.log(f"{success_count}/{len(test_users)}ユーザーの削除に成功")
-        return success_count == len(test_users)
+        deleted = provisioner.delete_users([user["id"] for user in created["created"]])
+        self.log(f"{deleted['succeeded']}/{created['succeeded']}ユーザーの削除に成功 ({deleted['throughput']:.1f}ユーザー/秒)")
+        return deleted["failed"] == 0
 
     def run_all_tests(self):
         """すべてのテストを実行"""
@@ -569,6 +924,8 @@ class ExticSCIMTester:
         if not self.test_bulk_operations(user_count=2):
             self.log("一括操作テスト失敗")
         
+        self.write_latency_report()
+        self.log(f"再送・スロットリング: {self.transport.stats()}")
         self.log("==== Extic SCIM API テスト完了 ====")
         return True
 
@@ -0,0 +1,577 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import itertools
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from endpoints import (
+    ENDPOINT_LIST_USERS,
+    ENDPOINT_FILTER_USERS,
+    ENDPOINT_GET_USER,
+    ENDPOINT_CREATE_USER,
+    ENDPOINT_UPDATE_USER,
+    ENDPOINT_DELETE_USER,
+    ENDPOINT_BULK,
+    ENDPOINT_SERVICE_PROVIDER_CONFIG,
+    ENDPOINT_SCHEMAS,
+    ENDPOINT_RESOURCE_TYPES,
+)
+from scim_filter import FilterSyntaxError, parse_filter, matches
+
+USER_SCHEMA = "urn:ietf:params:scim:schemas:core:2.0:User"
+EXTIC_USER_SCHEMA = "urn:extic:scim:schemas:1.0:User"
+LIST_RESPONSE_SCHEMA = "urn:ietf:params:scim:api:messages:2.0:ListResponse"
+ERROR_SCHEMA = "urn:ietf:params:scim:api:messages:2.0:Error"
+BULK_RESPONSE_SCHEMA = "urn:ietf:params:scim:api:messages:2.0:BulkResponse"
+
+EXTIC_SCHEMAS = [
+    {
+        "id": USER_SCHEMA,
+        "name": "User",
+        "description": "User Account",
+        "attributes": [
+            {"name": "id", "type": "string", "multiValued": False, "required": True,
+             "caseExact": True, "mutability": "readOnly", "returned": "always", "uniqueness": "server"},
+            {"name": "userName", "type": "string", "multiValued": False, "required": True,
+             "caseExact": False, "mutability": "readWrite", "returned": "always", "uniqueness": "server"},
+            {"name": "displayName", "type": "string", "multiValued": False, "required": False,
+             "caseExact": False, "mutability": "readWrite", "returned": "always", "uniqueness": "none"},
+            {"name": "password", "type": "string", "multiValued": False, "required": False,
+             "mutability": "writeOnly", "returned": "never"},
+            {"name": "active", "type": "boolean", "multiValued": False, "required": False,
+             "mutability": "readWrite", "returned": "always"},
+        ],
+    },
+    {
+        "id": EXTIC_USER_SCHEMA,
+        "name": "ExticUser",
+        "description": "Extic User Extension",
+        "attributes": [
+            {"name": "role", "type": "string", "multiValued": False, "required": False,
+             "caseExact": True, "mutability": "readWrite", "returned": "default"},
+            {"name": "exticGroups", "type": "string", "multiValued": True, "required": False,
+             "caseExact": True, "mutability": "readWrite", "returned": "default"},
+            {"name": "extendAttrs", "type": "complex", "multiValued": True, "required": False,
+             "mutability": "readWrite", "returned": "default",
+             "subAttributes": [
+                 {"name": "name", "type": "string", "multiValued": False, "required": True},
+                 {"name": "value", "type": "string", "multiValued": False, "required": True},
+             ]},
+        ],
+    },
+]
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def sample_latency(spec, rng):
+    """
+    レイテンシ分布の指定から待機時間 (秒) を生成
+
+    Args:
+        spec: 固定値 (秒)、("uniform", 最小, 最大)、("normal", 平均, 標準偏差)、
+              ("lognormal", mu, sigma)、("exponential", 平均)、または rng を受け取る関数
+        rng (random.Random): 乱数生成器
+
+    Returns:
+        float: 待機時間 (秒)
+    """
+    if spec is None:
+        return 0.0
+    if callable(spec):
+        return max(0.0, spec(rng))
+    if isinstance(spec, (int, float)):
+        return float(spec)
+    kind, *params = spec
+    if kind == "uniform":
+        return rng.uniform(*params)
+    if kind == "normal":
+        return max(0.0, rng.gauss(*params))
+    if kind == "lognormal":
+        return rng.lognormvariate(*params)
+    if kind == "exponential":
+        return rng.expovariate(1.0 / params[0])
+    raise ValueError(f"未対応のレイテンシ分布です: {kind}")
+
+
+class UserStore:
+    def __init__(self):
+        """idとuserNameで索引付けしたインメモリのユーザーストア (スレッドセーフ)"""
+        self._by_id = {}
+        self._by_username = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def get(self, user_id):
+        with self._lock:
+            return self._by_id.get(user_id)
+
+    def get_by_username(self, username):
+        with self._lock:
+            user_id = self._by_username.get(username.lower())
+            return self._by_id.get(user_id) if user_id else None
+
+    def snapshot(self):
+        """挿入順のユーザー一覧"""
+        with self._lock:
+            return list(self._by_id.values())
+
+    def page(self, start_index, count):
+        """
+        挿入順の一覧から1ページ分を取得
+
+        Returns:
+            tuple: (ページ内のユーザー, 全件数)
+        """
+        with self._lock:
+            users = list(itertools.islice(self._by_id.values(), start_index - 1, start_index - 1 + count))
+            return users, len(self._by_id)
+
+    def create(self, resource):
+        """
+        ユーザーを作成
+
+        Returns:
+            dict or None: 作成したユーザー。userName が重複する場合は None
+        """
+        with self._lock:
+            key = resource["userName"].lower()
+            if key in self._by_username:
+                return None
+            user = dict(resource)
+            user.pop("password", None)
+            user["id"] = user.get("id") or str(uuid.uuid4())
+            timestamp = _now()
+            user["meta"] = {"resourceType": "User", "created": timestamp, "lastModified": timestamp, "version": 'W/"1"'}
+            self._by_id[user["id"]] = user
+            self._by_username[key] = user["id"]
+            return user
+
+    def replace(self, user_id, resource):
+        """
+        ユーザーを置換 (PUT)
+
+        Returns:
+            tuple: (ユーザー, エラー種別)。エラー種別は "notFound" / "uniqueness" / None
+        """
+        with self._lock:
+            current = self._by_id.get(user_id)
+            if current is None:
+                return None, "notFound"
+            new_key = resource.get("userName", current["userName"]).lower()
+            owner = self._by_username.get(new_key)
+            if owner is not None and owner != user_id:
+                return None, "uniqueness"
+            user = dict(resource)
+            user.pop("password", None)
+            user["id"] = user_id
+            user.setdefault("userName", current["userName"])
+            version = int(current["meta"]["version"][3:-1]) + 1
+            user["meta"] = dict(current["meta"], lastModified=_now(), version=f'W/"{version}"')
+            del self._by_username[current["userName"].lower()]
+            self._by_username[new_key] = user_id
+            self._by_id[user_id] = user
+            return user, None
+
+    def delete(self, user_id):
+        with self._lock:
+            user = self._by_id.pop(user_id, None)
+            if user is None:
+                return False
+            del self._by_username[user["userName"].lower()]
+            return True
+
+
+class FakeSCIMServer:
+    def __init__(self, host="127.0.0.1", port=0, base_path="/idm/scimApi/1.0", latency=None,
+                 error_rate=0.0, throttle_rate=0.0, retry_after=1, error_status=500,
+                 max_results=200, bulk_supported=False, bulk_max_operations=100, simple_filters=False, seed=None):
+        """
+        Extic SCIM APIのインプロセス代替サーバー
+
+        /Users, /Users/{id}, フィルター検索, ServiceProviderConfig/Schemas/ResourceTypes
+        (Extic拡張スキーマを含む) を提供し、エンドポイントごとのレイテンシ分布とエラー・429の注入に対応する。
+
+        Args:
+            host (str): 待ち受けアドレス
+            port (int): 待ち受けポート (0 の場合は空きポートを使用)
+            base_path (str): SCIM APIのベースパス
+            latency (dict): エンドポイント名 (例: "GET /Users") ごとのレイテンシ分布。"*" は既定値
+            error_rate (float or dict): エラー応答を返す確率 (エンドポイント別指定は dict)
+            throttle_rate (float or dict): 429 (Retry-After付き) を返す確率
+            retry_after (int): 429応答の Retry-After (秒)
+            error_status (int): 注入するエラーのステータスコード
+            max_results (int): filter.maxResults (1レスポンスの最大件数)
+            bulk_supported (bool): /Bulk をサポートするか
+            bulk_max_operations (int): bulk.maxOperations
+            simple_filters (bool): ゲートウェイの parseScimFilter と同様に、userName/id/displayName の eq 以外の
+                フィルターを無視して全件を返す
+            seed (int): 乱数シード
+        """
+        self.base_path = base_path.rstrip("/")
+        self.latency = latency or {}
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.error_status = error_status
+        self.max_results = max_results
+        self.bulk_supported = bulk_supported
+        self.bulk_max_operations = bulk_max_operations
+        self.simple_filters = simple_filters
+        self.store = UserStore()
+        self.request_counts = {}
+        self._counts_lock = threading.Lock()
+
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{self.base_path}"
+
+    def start(self):
+        """バックグラウンドスレッドでサーバーを起動"""
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, name="fake-scim-server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """サーバーを停止"""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def seed_users(self, count, prefix="seed_user", group="基本ユーザーグループ", access_level="basic"):
+        """
+        ストアにユーザーを直接投入 (HTTPを経由しない)
+
+        Returns:
+            list: 作成したユーザー
+        """
+        users = []
+        for i in range(count):
+            users.append(self.store.create({
+                "schemas": [USER_SCHEMA, EXTIC_USER_SCHEMA],
+                "userName": f"{prefix}_{i}",
+                "displayName": f"シードユーザー{i}",
+                "active": True,
+                EXTIC_USER_SCHEMA: {
+                    "exticGroups": [group],
+                    "extendAttrs": [{"name": "accessLevel", "value": access_level}],
+                },
+            }))
+        return users
+
+    def _count(self, endpoint):
+        with self._counts_lock:
+            self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+
+    def _rate(self, setting, endpoint):
+        if isinstance(setting, dict):
+            return setting.get(endpoint, setting.get("*", 0.0))
+        return setting
+
+    def _roll(self, probability):
+        if probability <= 0:
+            return False
+        with self._rng_lock:
+            return self._rng.random() < probability
+
+    def _delay(self, endpoint):
+        spec = self.latency.get(endpoint, self.latency.get("*"))
+        with self._rng_lock:
+            return sample_latency(spec, self._rng)
+
+    def service_provider_config(self):
+        return {
+            "schemas": ["urn:ietf:params:scim:schemas:core:2.0:ServiceProviderConfig"],
+            "patch": {"supported": False},
+            "bulk": {
+                "supported": self.bulk_supported,
+                "maxOperations": self.bulk_max_operations,
+                "maxPayloadSize": 1048576,
+            },
+            "filter": {"supported": True, "maxResults": self.max_results},
+            "changePassword": {"supported": False},
+            "sort": {"supported": False},
+            "etag": {"supported": False},
+            "authenticationSchemes": [
+                {"type": "httpbasic", "name": "HTTP Basic", "primary": True},
+                {"type": "oauthbearertoken", "name": "OAuth Bearer Token"},
+            ],
+        }
+
+    def resource_types(self):
+        return {
+            "schemas": [LIST_RESPONSE_SCHEMA],
+            "totalResults": 1,
+            "Resources": [{
+                "schemas": ["urn:ietf:params:scim:schemas:core:2.0:ResourceType"],
+                "id": "User",
+                "name": "User",
+                "endpoint": "/Users",
+                "schema": USER_SCHEMA,
+                "schemaExtensions": [{"schema": EXTIC_USER_SCHEMA, "required": False}],
+            }],
+        }
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(_SCIMRequestHandler):
+            fake = server
+
+        return Handler
+
+
+class _SCIMRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # ヘッダーと本文をまとめて送信する (遅延ACKによる待ちを避ける)
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+    fake = None
+
+    def log_message(self, format, *args):
+        """アクセスログは出力しない"""
+
+    def _send(self, status, body=None, headers=None):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8") if body is not None else b""
+        self.send_response(status)
+        if body is not None:
+            self.send_header("Content-Type", "application/scim+json;charset=UTF-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if payload:
+            self.wfile.write(payload)
+
+    def _error(self, status, detail, scim_type=None, headers=None):
+        body = {"schemas": [ERROR_SCHEMA], "status": str(status), "detail": detail}
+        if scim_type:
+            body["scimType"] = scim_type
+        self._send(status, body, headers)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        return json.loads(raw.decode("utf-8")) if raw else {}
+
+    def _route(self, method):
+        """(エンドポイント名, ハンドラ, パスパラメータ) を返す"""
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        path = url.path
+        if not path.startswith(self.fake.base_path):
+            return None, None, None, query
+        path = path[len(self.fake.base_path):].rstrip("/")
+
+        if path == "/Users":
+            if method == "GET":
+                endpoint = ENDPOINT_FILTER_USERS if "filter" in query else ENDPOINT_LIST_USERS
+                return endpoint, self._list_users, None, query
+            if method == "POST":
+                return ENDPOINT_CREATE_USER, self._create_user, None, query
+        elif path.startswith("/Users/") and path.count("/") == 2:
+            user_id = path.rsplit("/", 1)[-1]
+            routes = {
+                "GET": (ENDPOINT_GET_USER, self._get_user),
+                "PUT": (ENDPOINT_UPDATE_USER, self._replace_user),
+                "DELETE": (ENDPOINT_DELETE_USER, self._delete_user),
+            }
+            if method in routes:
+                return routes[method] + (user_id, query)
+        elif path == "/Bulk" and method == "POST" and self.fake.bulk_supported:
+            return ENDPOINT_BULK, self._bulk, None, query
+        elif method == "GET" and path == "/ServiceProviderConfig":
+            return ENDPOINT_SERVICE_PROVIDER_CONFIG, lambda *_: (200, self.fake.service_provider_config()), None, query
+        elif method == "GET" and path == "/Schemas":
+            body = {"schemas": [LIST_RESPONSE_SCHEMA], "totalResults": len(EXTIC_SCHEMAS), "Resources": EXTIC_SCHEMAS}
+            return ENDPOINT_SCHEMAS, lambda *_: (200, body), None, query
+        elif method == "GET" and path == "/ResourceTypes":
+            return ENDPOINT_RESOURCE_TYPES, lambda *_: (200, self.fake.resource_types()), None, query
+        return None, None, None, query
+
+    def _dispatch(self, method):
+        endpoint, handler, user_id, query = self._route(method)
+        try:
+            body = self._read_json() if method in ("POST", "PUT") else None
+        except ValueError:
+            return self._error(400, "リクエストボディがJSONではありません", "invalidSyntax")
+
+        if endpoint is None:
+            return self._error(404, f"{method} {self.path} は存在しません")
+        self.fake._count(endpoint)
+
+        if "Authorization" not in self.headers:
+            return self._error(401, "Authorization ヘッダーが必要です")
+
+        delay = self.fake._delay(endpoint)
+        if delay > 0:
+            time.sleep(delay)
+        if self.fake._roll(self.fake._rate(self.fake.throttle_rate, endpoint)):
+            return self._error(429, "リクエスト数が上限を超えました", "tooMany",
+                               headers={"Retry-After": str(self.fake.retry_after)})
+        if self.fake._roll(self.fake._rate(self.fake.error_rate, endpoint)):
+            return self._error(self.fake.error_status, "注入されたエラー")
+
+        status, response = handler(user_id, query, body)
+        if status >= 400:
+            detail, scim_type = response
+            return self._error(status, detail, scim_type)
+        self._send(status, response)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _list_users(self, _user_id, query, _body):
+        try:
+            start_index = max(1, int(query.get("startIndex", ["1"])[0]))
+            count = min(max(0, int(query.get("count", [str(self.fake.max_results)])[0])), self.fake.max_results)
+        except ValueError:
+            return 400, ("startIndex と count は整数で指定してください", "invalidValue")
+        filter_text = query.get("filter", [None])[0]
+
+        store = self.fake.store
+        if filter_text:
+            try:
+                node = parse_filter(filter_text)
+            except FilterSyntaxError as e:
+                return 400, (str(e), "invalidFilter")
+            # userName eq の完全一致は索引を使用
+            if node[0] == "compare" and node[1].lower() == "username" and node[2] == "eq":
+                user = store.get_by_username(str(node[3]))
+                users = [user] if user else []
+            elif self.fake.simple_filters and not (
+                    node[0] == "compare" and node[2] == "eq" and node[1].lower() in ("id", "displayname")):
+                users = store.snapshot()
+            else:
+                users = [user for user in store.snapshot() if matches(node, user)]
+            total = len(users)
+            page = users[start_index - 1:start_index - 1 + count]
+        else:
+            page, total = store.page(start_index, count)
+
+        return 200, {
+            "schemas": [LIST_RESPONSE_SCHEMA],
+            "totalResults": total,
+            "startIndex": start_index,
+            "itemsPerPage": len(page),
+            "Resources": page,
+        }
+
+    def _get_user(self, user_id, _query, _body):
+        user = self.fake.store.get(user_id)
+        if user is None:
+            return 404, (f"ID={user_id} のユーザーが見つかりません", None)
+        return 200, user
+
+    def _create_user(self, _user_id, _query, body):
+        if not body.get("userName"):
+            return 400, ("userNameフィールドは必須です", "invalidValue")
+        user = self.fake.store.create(body)
+        if user is None:
+            return 409, (f"userName={body['userName']} は既に使用されています", "uniqueness")
+        return 201, user
+
+    def _replace_user(self, user_id, _query, body):
+        user, error = self.fake.store.replace(user_id, body)
+        if error == "notFound":
+            return 404, (f"ID={user_id} のユーザーが見つかりません", None)
+        if error == "uniqueness":
+            return 409, (f"userName={body.get('userName')} は既に使用されています", "uniqueness")
+        return 200, user
+
+    def _delete_user(self, user_id, _query, _body):
+        if not self.fake.store.delete(user_id):
+            return 404, (f"ID={user_id} のユーザーが見つかりません", None)
+        return 204, None
+
+    def _bulk(self, _user_id, _query, body):
+        operations = body.get("Operations", [])
+        if len(operations) > self.fake.bulk_max_operations:
+            return 413, (f"操作数が上限 ({self.fake.bulk_max_operations}) を超えています", "tooMany")
+
+        results = []
+        for operation in operations:
+            method = operation.get("method", "").upper()
+            path = operation.get("path", "")
+            result = {"method": method}
+            if operation.get("bulkId"):
+                result["bulkId"] = operation["bulkId"]
+            if method == "POST" and path == "/Users":
+                status, response = self._create_user(None, None, operation.get("data") or {})
+            elif method == "DELETE" and path.startswith("/Users/"):
+                status, response = self._delete_user(path.rsplit("/", 1)[-1], None, None)
+                result["location"] = f"{self.fake.base_url}{path}"
+            else:
+                status, response = 400, ("未対応のBulk操作です", "invalidValue")
+
+            result["status"] = str(status)
+            if status >= 400:
+                detail, scim_type = response
+                result["response"] = {"schemas": [ERROR_SCHEMA], "status": str(status), "detail": detail}
+                if scim_type:
+                    result["response"]["scimType"] = scim_type
+            elif method == "POST":
+                result["location"] = f"{self.fake.base_url}/Users/{response['id']}"
+            results.append(result)
+        return 200, {"schemas": [BULK_RESPONSE_SCHEMA], "Operations": results}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Extic SCIM APIのローカル代替サーバー")
+    parser.add_argument("--host", default="127.0.0.1", help="待ち受けアドレス")
+    parser.add_argument("--port", type=int, default=8090, help="待ち受けポート")
+    parser.add_argument("--latency", type=float, default=0.0, help="全エンドポイント共通の固定レイテンシ (秒)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="エラー応答の確率")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="429応答の確率")
+    parser.add_argument("--bulk", action="store_true", help="/Bulk をサポートする")
+    parser.add_argument("--seed-users", type=int, default=0, help="起動時に投入するユーザー数")
+    args = parser.parse_args()
+
+    fake = FakeSCIMServer(
+        host=args.host, port=args.port, latency={"*": args.latency},
+        error_rate=args.error_rate, throttle_rate=args.throttle_rate, bulk_supported=args.bulk
+    )
+    fake.seed_users(args.seed_users)
+    print(f"SCIMサーバー起動: {fake.base_url}")
+    try:
+        fake._server.serve_forever()
+    except KeyboardInterrupt:
+        fake._server.server_close()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import math
+import time
+from datetime import datetime
+
+import requests
+
+from bulk import BulkProvisioner
+from discovery import CORE_USER_SCHEMA
+from endpoints import ENDPOINT_FILTER_USERS, ENDPOINT_LIST_USERS
+from latency import LatencyHistogram
+from scim_filter import matches, parse_filter
+
+DEFAULT_DATASET_SIZES = (1000, 10000, 100000)
+
+# 計測するフィルター式 (名前, 式)。{prefix} は投入したユーザーの接頭辞、{schema} はExtic拡張スキーマのURN
+FILTER_MATRIX = (
+    ("eq_username", 'userName eq "{prefix}_000001"'),
+    ("eq_display_name", 'displayName eq "{prefix} 利用者 000001"'),
+    ("co_display_name", 'displayName co "{prefix}_vip"'),
+    ("sw_username", 'userName sw "{prefix}_0000"'),
+    ("pr_emails", "emails pr"),
+    ("and_sw_pr", 'userName sw "{prefix}_" and emails pr'),
+    ("or_eq", 'userName eq "{prefix}_000001" or userName eq "{prefix}_000002"'),
+    ("ext_access_level", '{schema}:extendAttrs.value eq "admin"'),
+    ("ext_value_path", 'extendAttrs[name eq "accessLevel" and value eq "advanced"]'),
+    ("ext_group", '{schema}:exticGroups eq "研究グループ"'),
+)
+
+# 投入するユーザーのアクセスレベルとグループ (件数の比率: admin 1%, advanced 9%, basic 90%)
+_TIERS = (("basic", "基本ユーザーグループ"), ("advanced", "研究グループ"), ("admin", "管理者グループ"))
+
+
+def _tier(index):
+    if index % 100 == 0:
+        return _TIERS[2]
+    if index % 10 == 0:
+        return _TIERS[1]
+    return _TIERS[0]
+
+
+class FilterMatrixBenchmark:
+    def __init__(self, tester, sizes=DEFAULT_DATASET_SIZES, filters=FILTER_MATRIX, iterations=20, warmup=2,
+                 page_size=100, workers=8, keep=False):
+        """
+        データ件数ごとのフィルター検索ベンチマーク
+
+        ユーザーを sizes の件数まで段階的に投入し、各段階でフィルター式ごとのレイテンシ・
+        レスポンスサイズ・totalResults を計測する。投入したデータから期待される件数を
+        手元で求め、サーバーの結果が全件 (フィルター未適用) の場合や期待と異なる場合は警告する。
+
+        Args:
+            tester (ExticSCIMTester): リクエスト送信に使用するテスター
+            sizes (tuple): 投入するユーザー数 (昇順に段階的に追加)
+            filters (tuple): (名前, 式) のタプル
+            iterations (int): フィルター式・件数ごとの計測回数
+            warmup (int): 計測前に実行する回数
+            page_size (int): 検索リクエストの count
+            workers (int): ユーザー投入・削除の並列数
+            keep (bool): 終了後に投入したユーザーを残すか
+        """
+        if not sizes or iterations < 1:
+            raise ValueError("sizes を1件以上、iterations を1以上指定してください")
+        self.tester = tester
+        self.sizes = tuple(sorted(sizes))
+        self.filters = tuple(filters)
+        self.iterations = iterations
+        self.warmup = warmup
+        self.page_size = page_size
+        self.workers = workers
+        self.keep = keep
+        self.prefix = f"filter_{int(time.time())}"
+        self._users = []
+        self._ids = []
+
+    def _user(self, index):
+        extic_schema = self.tester.capabilities.extic_schema
+        tier, group = _tier(index)
+        display_name = f"{self.prefix} 利用者 {index:06d}"
+        if index % 100 == 7:
+            display_name += f" {self.prefix}_vip"
+        user = {
+            "schemas": [CORE_USER_SCHEMA, extic_schema],
+            "userName": f"{self.prefix}_{index:06d}",
+            "password": "FilterP@ssw0rd",
+            "displayName": display_name,
+            extic_schema: {
+                "exticGroups": [group],
+                "extendAttrs": [{"name": "accessLevel", "value": tier}],
+            },
+        }
+        if index % 2 == 0:
+            user["emails"] = [{"value": f"user{index:06d}@example.com", "primary": True}]
+        return user
+
+    def _seed(self, size, chunk=1000):
+        """ユーザーを size 件になるまで追加"""
+        provisioner = BulkProvisioner(self.tester, workers=self.workers)
+        for start in range(len(self._users), size, chunk):
+            users = [self._user(index) for index in range(start, min(size, start + chunk))]
+            created = {user["userName"]: user["id"] for user in provisioner.create_users(users)["created"]}
+            # 一部の投入に失敗した場合も、作成できたユーザーは終了時に削除されるよう記録してから中断する
+            missing = []
+            for user in users:
+                if user["userName"] in created:
+                    self._users.append(user)
+                    self._ids.append(created[user["userName"]])
+                else:
+                    missing.append(user["userName"])
+            if missing:
+                raise RuntimeError(f"ユーザーを投入できませんでした ({len(missing)}件): {', '.join(missing[:5])}")
+        self.tester.log(f"投入済みユーザー数: {len(self._users)}")
+
+    def _collection_size(self):
+        """フィルターなしの全件数 (他のユーザーを含む)"""
+        response = self.tester._request("get", ENDPOINT_LIST_USERS, f"{self.tester.base_url}/Users?startIndex=1&count=0")
+        response.raise_for_status()
+        return response.json().get("totalResults", 0)
+
+    def _measure(self, expression):
+        url = (f"{self.tester.base_url}/Users?filter={requests.utils.quote(expression)}"
+               f"&startIndex=1&count={self.page_size}")
+        for _ in range(self.warmup):
+            self.tester._request("get", ENDPOINT_FILTER_USERS, url)
+        histogram = LatencyHistogram()
+        sizes = []
+        errors = 0
+        total_results = None
+        for _ in range(self.iterations):
+            start = time.perf_counter()
+            try:
+                response = self.tester._request("get", ENDPOINT_FILTER_USERS, url)
+                body = response.content
+            except requests.RequestException:
+                errors += 1
+                continue
+            histogram.record_seconds(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+                continue
+            sizes.append(len(body))
+            total_results = response.json().get("totalResults")
+        return {
+            "latency": histogram.summary(),
+            "bytes": round(sum(sizes) / len(sizes)) if sizes else 0,
+            "errors": errors,
+            "total_results": total_results,
+        }
+
+    @staticmethod
+    def _growth(first, last, size_ratio):
+        """(比率, 件数に対する増加の指数)。指数が0に近ければ件数に依存せず、1に近ければ件数に比例する"""
+        if not first or not last:
+            return None, None
+        ratio = last / first
+        exponent = math.log(ratio) / math.log(size_ratio) if size_ratio > 1 else None
+        return round(ratio, 3), round(exponent, 3) if exponent is not None else None
+
+    def run(self):
+        """
+        全件数・全フィルター式を計測
+
+        Returns:
+            dict: フィルター式ごと・件数ごとの計測結果、件数に対する増加率と警告の一覧
+        """
+        extic_schema = self.tester.capabilities.extic_schema
+        expressions = {name: template.format(prefix=self.prefix, schema=extic_schema)
+                       for name, template in self.filters}
+        nodes = {name: parse_filter(expression) for name, expression in expressions.items()}
+        self.tester.log(f"=== フィルター検索ベンチマーク開始 (件数: {list(self.sizes)}, フィルター: {len(expressions)}種類) ===")
+        self.tester.configure_pool(self.workers)
+
+        filters = {name: {"expression": expression, "results": {}} for name, expression in expressions.items()}
+        collections = {}
+        try:
+            for size in self.sizes:
+                self._seed(size)
+                collection = collections[size] = self._collection_size()
+                isolated = collection == len(self._users)
+                for name, expression in expressions.items():
+                    expected = sum(1 for user in self._users if matches(nodes[name], user))
+                    result = self._measure(expression)
+                    actual = result["total_results"]
+                    # 期待件数が全件より少ないのに全件が返る場合はフィルターが適用されていない
+                    result["expected"] = expected
+                    result["full_collection"] = actual is not None and actual == collection and expected < collection
+                    # 他のユーザーがいる場合は投入分の一致件数を下回ったときのみ不一致とする
+                    result["mismatch"] = actual is not None and (actual != expected if isolated else actual < expected)
+                    filters[name]["results"][str(size)] = result
+                    latency = result["latency"]
+                    self.tester.log(
+                        f"[{size}件] {name}: p50 {latency['p50']:.3f}ms / p99 {latency['p99']:.3f}ms, "
+                        f"{result['bytes']}バイト, totalResults {actual} (期待 {expected})"
+                    )
+                    if result["full_collection"]:
+                        self.tester.log(f"[{size}件] {name}: フィルターが適用されず全件が返されました: {expression}",
+                                        level="WARNING")
+                    elif result["mismatch"]:
+                        self.tester.log(f"[{size}件] {name}: 件数が期待と異なります: {expression}", level="WARNING")
+        finally:
+            if not self.keep and self._ids:
+                BulkProvisioner(self.tester, workers=self.workers).delete_users(self._ids)
+
+        size_ratio = self.sizes[-1] / self.sizes[0]
+        flagged = []
+        for name, summary in filters.items():
+            first, last = summary["results"].get(str(self.sizes[0])), summary["results"].get(str(self.sizes[-1]))
+            if first and last:
+                summary["latency_growth"], summary["latency_exponent"] = self._growth(
+                    first["latency"]["p50"], last["latency"]["p50"], size_ratio)
+                summary["bytes_growth"], summary["bytes_exponent"] = self._growth(first["bytes"], last["bytes"], size_ratio)
+            flags = sorted({flag for result in summary["results"].values()
+                            for flag in ("full_collection", "mismatch") if result[flag]})
+            if flags:
+                flagged.append({"filter": name, "flags": flags})
+
+        self.tester.log(f"=== フィルター検索ベンチマーク完了 (警告: {len(flagged)}件) ===")
+        return {
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "target": self.tester.base_url,
+            "config": {
+                "sizes": list(self.sizes),
+                "iterations": self.iterations,
+                "page_size": self.page_size,
+            },
+            "collection": {str(size): total for size, total in collections.items()},
+            "filters": filters,
+            "flagged": flagged,
+        }
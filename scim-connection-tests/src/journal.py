@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import glob
+import json
+import os
+import queue
+import sys
+import threading
+from datetime import datetime
+
+
+class Journal:
+    def __init__(self, path, batch_size=256, flush_interval=0.2, fsync=True):
+        """
+        作成したユーザーIDの追記専用ジャーナル (JSONL)
+
+        作成・削除のたびに1行ずつ記録し、実行が中断しても残ったユーザーを sweep で削除できるようにする。
+        書き込みはバックグラウンドスレッドでまとめて行い、fsync もまとめた単位で1回だけ行う
+        (異常終了時に失われるのは最後の flush_interval 秒程度の記録に限られる)。
+        ファイルは最初の記録時に作成する。
+
+        Args:
+            path (str): ジャーナルファイルのパス
+            batch_size (int): 1回の書き込みでまとめる記録件数の上限
+            flush_interval (float): キューが空の場合の最大待機時間 (秒)
+            fsync (bool): 書き込みごとにディスクへ同期するか
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = None
+
+    def created(self, user_id, user_name=None):
+        """作成したユーザーを記録"""
+        if user_id:
+            self._append({"op": "create", "id": user_id, "userName": user_name})
+
+    def deleted(self, user_id):
+        """削除したユーザーを記録"""
+        if user_id:
+            self._append({"op": "delete", "id": user_id})
+
+    def _append(self, record):
+        record["at"] = datetime.now().isoformat(timespec="milliseconds")
+        with self._lock:
+            if self._closed:
+                return
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="extic-journal-writer", daemon=True)
+                self._thread.start()
+            self._queue.put(record)
+
+    def flush(self, timeout=None):
+        """キューに積まれた記録がすべてディスクに書き込まれるまで待機"""
+        with self._lock:
+            if self._closed or self._thread is None:
+                return
+            done = threading.Event()
+            self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self):
+        """残りの記録を書き込んで書き込みスレッドを終了"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self._thread is None:
+                return
+            self._queue.put(None)
+        self._thread.join()
+
+    def _write(self, file, lines):
+        file.write("".join(lines))
+        file.flush()
+        if self.fsync:
+            os.fsync(file.fileno())
+
+    def _run(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as file:
+            running = True
+            while running:
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    continue
+
+                lines = []
+                events = []
+                while True:
+                    if item is None:
+                        running = False
+                    elif isinstance(item, threading.Event):
+                        events.append(item)
+                    else:
+                        lines.append(json.dumps(item, ensure_ascii=False) + "\n")
+
+                    if not running or len(lines) >= self.batch_size:
+                        break
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+
+                if lines:
+                    try:
+                        self._write(file, lines)
+                    except Exception as e:
+                        sys.stderr.write(f"ジャーナル書き込みエラー: {str(e)}\n")
+                for event in events:
+                    event.set()
+
+
+def expand_journal_paths(patterns):
+    """
+    ジャーナルファイルのパス (ワイルドカード可) を展開
+
+    Returns:
+        list: 存在するファイルのパス (重複なし、指定順)
+    """
+    paths = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)) or ([pattern] if os.path.exists(pattern) else []):
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+
+def read_journal(paths):
+    """
+    ジャーナルから削除されていないユーザーを取得
+
+    異常終了時に書きかけになった行など、解析できない行は読み飛ばす。
+
+    Args:
+        paths (list): ジャーナルファイルのパス
+
+    Returns:
+        list: 作成順の {"id", "userName", "journal"} (journal は記録されていたファイル)
+    """
+    pending = {}
+    for path in paths:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(record, dict) or not record.get("id"):
+                    continue
+                if record.get("op") == "create":
+                    pending[record["id"]] = {"id": record["id"], "userName": record.get("userName"), "journal": path}
+                elif record.get("op") == "delete":
+                    pending.pop(record["id"], None)
+    return list(pending.values())
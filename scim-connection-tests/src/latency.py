@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import math
+import threading
+from datetime import datetime
+
+# レポートに出力するパーセンタイル
+REPORT_PERCENTILES = (
+    ("p50", 50.0),
+    ("p90", 90.0),
+    ("p99", 99.0),
+    ("p99.9", 99.9),
+)
+
+
+class LatencyHistogram:
+    def __init__(self, significant_bits=8):
+        """
+        HDRヒストグラム形式のレイテンシ分布 (マイクロ秒単位で記録)
+
+        値の大きさに応じて対数的にバケット幅を広げ、各桁を 2^significant_bits 分割で
+        保持するため、相対誤差は 1/2^(significant_bits-1) 以下に収まる。
+
+        Args:
+            significant_bits (int): 仮数部のビット数 (精度)
+        """
+        if significant_bits < 2:
+            raise ValueError("significant_bits は2以上を指定してください")
+        self.significant_bits = significant_bits
+        self._sub_bucket_count = 1 << significant_bits
+        self._half_count = self._sub_bucket_count >> 1
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def _index(self, value):
+        """値からバケット番号を求める"""
+        if value < self._sub_bucket_count:
+            return value
+        shift = value.bit_length() - self.significant_bits
+        mantissa = value >> shift
+        return self._sub_bucket_count + (shift - 1) * self._half_count + (mantissa - self._half_count)
+
+    def _highest_equivalent(self, index):
+        """バケット番号からそのバケットに含まれる最大値を求める"""
+        if index < self._sub_bucket_count:
+            return index
+        offset = index - self._sub_bucket_count
+        shift = offset // self._half_count + 1
+        mantissa = offset % self._half_count + self._half_count
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, value_us):
+        """レイテンシ (マイクロ秒) を記録"""
+        value = max(0, int(value_us))
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def record_seconds(self, seconds):
+        """レイテンシ (秒) を記録"""
+        self.record(round(seconds * 1_000_000))
+
+    def merge(self, other):
+        """
+        別のヒストグラムの記録を合算 (バケットごとの件数を加算するため、分割して記録した場合と同じ結果になる)
+
+        Args:
+            other (LatencyHistogram): 合算するヒストグラム (精度が同じであること)
+
+        Returns:
+            LatencyHistogram: self
+        """
+        if other.significant_bits != self.significant_bits:
+            raise ValueError("精度 (significant_bits) が異なるヒストグラムは合算できません")
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        self.max = max(self.max, other.max)
+        return self
+
+    def to_dict(self):
+        """
+        プロセス間で受け渡すための簡易形式に変換 (記録のあるバケットのみ保持)
+
+        Returns:
+            dict: significant_bits, counts ([バケット番号, 件数] のリスト), count, total, min, max
+        """
+        return {
+            "significant_bits": self.significant_bits,
+            "counts": sorted(self.counts.items()),
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        to_dict の出力からヒストグラムを復元
+
+        Args:
+            data (dict): to_dict の戻り値 (JSONを経由してもよい)
+
+        Returns:
+            LatencyHistogram: 復元したヒストグラム
+        """
+        histogram = cls(data["significant_bits"])
+        histogram.counts = {int(index): count for index, count in data["counts"]}
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        return histogram
+
+    def cumulative_counts(self, bounds_us):
+        """
+        上限値ごとの累積件数 (Prometheus/OpenMetrics のヒストグラムバケット)
+
+        バケットの最大値が上限以下の記録を数えるため、上限付近の値は次のバケットに含まれることがある
+        (誤差はヒストグラムの精度の範囲内)。
+
+        Args:
+            bounds_us (list): 昇順の上限値 (マイクロ秒)
+
+        Returns:
+            list: 上限値ごとの累積件数
+        """
+        results = []
+        cumulative = 0
+        indexes = sorted(self.counts)
+        position = 0
+        for bound in bounds_us:
+            while position < len(indexes) and self._highest_equivalent(indexes[position]) <= bound:
+                cumulative += self.counts[indexes[position]]
+                position += 1
+            results.append(cumulative)
+        return results
+
+    def percentile(self, percentile):
+        """
+        パーセンタイル値を取得
+
+        Args:
+            percentile (float): 0〜100 のパーセンタイル
+
+        Returns:
+            int: レイテンシ (マイクロ秒)。記録がない場合は 0
+        """
+        if self.count == 0:
+            return 0
+        rank = max(1, math.ceil(round(percentile / 100.0 * self.count, 9)))
+        cumulative = 0
+        for index in sorted(self.counts):
+            cumulative += self.counts[index]
+            if cumulative >= rank:
+                return min(self._highest_equivalent(index), self.max)
+        return self.max
+
+    def summary(self):
+        """
+        集計結果 (ミリ秒単位) を取得
+
+        Returns:
+            dict: count, min, mean, 各パーセンタイル, max
+        """
+        result = {
+            "count": self.count,
+            "min": _to_ms(self.min or 0),
+            "mean": _to_ms(self.total / self.count) if self.count else 0.0,
+        }
+        for name, value in REPORT_PERCENTILES:
+            result[name] = _to_ms(self.percentile(value))
+        result["max"] = _to_ms(self.max)
+        return result
+
+
+class LatencyRecorder:
+    def __init__(self, significant_bits=8):
+        """
+        エンドポイント・ステータスコード別のレイテンシ記録 (スレッドセーフ)
+
+        Args:
+            significant_bits (int): 各ヒストグラムの精度
+        """
+        self.significant_bits = significant_bits
+        self._histograms = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, status, seconds):
+        """
+        1リクエスト分のレイテンシを記録
+
+        Args:
+            endpoint (str): エンドポイント名 (例: "GET /Users/{id}")
+            status (int or str): HTTPステータスコード (通信エラー時は "error")
+            seconds (float): レイテンシ (秒)
+        """
+        key = (endpoint, str(status))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = LatencyHistogram(self.significant_bits)
+                self._histograms[key] = histogram
+            histogram.record_seconds(seconds)
+
+    def begin(self, endpoint):
+        """リクエストの送信開始を記録 (実行中のリクエスト数)"""
+        with self._lock:
+            self._in_flight[endpoint] = self._in_flight.get(endpoint, 0) + 1
+
+    def finish(self, endpoint):
+        """リクエストの完了を記録"""
+        with self._lock:
+            self._in_flight[endpoint] -= 1
+
+    def in_flight(self):
+        """
+        エンドポイントごとの実行中のリクエスト数
+
+        Returns:
+            dict: {endpoint: 実行中の数}
+        """
+        with self._lock:
+            return dict(self._in_flight)
+
+    def histogram(self, endpoint, status):
+        """指定したエンドポイント・ステータスのヒストグラムを取得"""
+        with self._lock:
+            return self._histograms.get((endpoint, str(status)))
+
+    def snapshot(self):
+        """
+        全ヒストグラムをプロセス間で受け渡せる形式で取得
+
+        Returns:
+            dict: {endpoint: {status: LatencyHistogram.to_dict() の戻り値}}
+        """
+        snapshot = {}
+        with self._lock:
+            for (endpoint, status), histogram in sorted(self._histograms.items()):
+                snapshot.setdefault(endpoint, {})[status] = histogram.to_dict()
+        return snapshot
+
+    def merge_snapshot(self, snapshot):
+        """
+        snapshot の出力を合算 (別プロセスで記録したレイテンシの集約)
+
+        Args:
+            snapshot (dict): LatencyRecorder.snapshot の戻り値
+        """
+        with self._lock:
+            for endpoint, statuses in snapshot.items():
+                for status, data in statuses.items():
+                    histogram = LatencyHistogram.from_dict(data)
+                    current = self._histograms.get((endpoint, str(status)))
+                    if current is None:
+                        self._histograms[(endpoint, str(status))] = histogram
+                    else:
+                        current.merge(histogram)
+
+    def report(self):
+        """
+        エンドポイント・ステータス別の集計結果を取得
+
+        Returns:
+            dict: {"unit": "ms", "endpoints": {endpoint: {status: summary}}}
+        """
+        endpoints = {}
+        with self._lock:
+            for (endpoint, status), histogram in sorted(self._histograms.items()):
+                endpoints.setdefault(endpoint, {})[status] = histogram.summary()
+        return {
+            "unit": "ms",
+            "endpoints": endpoints,
+        }
+
+    def write_report(self, path):
+        """
+        集計結果をJSONファイルに出力 (キーをソートして実行間で差分を取りやすくする)
+
+        Args:
+            path (str): 出力先のファイルパス
+        """
+        report = self.report()
+        report["generated_at"] = datetime.now().isoformat(timespec="seconds")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True, ensure_ascii=False)
+            f.write("\n")
+        return path
+
+
+def _to_ms(value_us):
+    """マイクロ秒をミリ秒に変換"""
+    return round(value_us / 1000.0, 3)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from latency import LatencyHistogram
+
+
+def default_operation(tester):
+    """負荷テストのデフォルト操作: ユーザー一覧取得 (count=20)"""
+    return tester.get_users(count=20) is not None
+
+
+class LoadGenerator:
+    def __init__(self, tester, workers=4, duration=None, total_requests=None,
+                 target_rate=None, operation=None):
+        """
+        ExticSCIMTesterを用いた並列負荷生成クラスのコンストラクタ
+
+        Args:
+            tester (ExticSCIMTester): リクエスト送信に使用するテスター (セッションは全ワーカーで共有)
+            workers (int): 並列ワーカー数
+            duration (float): 実行時間 (秒)。total_requests と併用した場合は先に到達した方で終了
+            total_requests (int): 送信するリクエスト総数
+            target_rate (float): 目標リクエストレート (リクエスト/秒)。None の場合は無制限
+            operation (callable): 1リクエスト分の操作。tester を受け取り成功可否を返す
+        """
+        if workers < 1:
+            raise ValueError("ワーカー数は1以上を指定してください")
+        if duration is None and total_requests is None:
+            raise ValueError("duration または total_requests のいずれかを指定してください")
+        if target_rate is not None and target_rate <= 0:
+            raise ValueError("目標レートは正の値を指定してください")
+
+        self.tester = tester
+        self.workers = workers
+        self.duration = duration
+        self.total_requests = total_requests
+        self.target_rate = target_rate
+        self.operation = operation or default_operation
+
+        self._lock = threading.Lock()
+        self._issued = 0
+        self._successes = 0
+        self._failures = 0
+        self._latency = LatencyHistogram()
+
+    def _next_slot(self, start, deadline):
+        """
+        次のリクエスト枠を予約する
+
+        Returns:
+            float or None: 送信予定時刻 (perf_counter基準)。終了条件に達した場合は None
+        """
+        with self._lock:
+            if self.total_requests is not None and self._issued >= self.total_requests:
+                return None
+            if deadline is not None and time.perf_counter() >= deadline:
+                return None
+            slot = start
+            if self.target_rate is not None:
+                slot = start + self._issued / self.target_rate
+            self._issued += 1
+            return slot
+
+    def _record(self, success, elapsed):
+        with self._lock:
+            if success:
+                self._successes += 1
+            else:
+                self._failures += 1
+            self._latency.record_seconds(elapsed)
+
+    def _worker(self, start, deadline):
+        while True:
+            slot = self._next_slot(start, deadline)
+            if slot is None:
+                return
+            delay = slot - time.perf_counter()
+            if delay > 0:
+                if deadline is not None and slot >= deadline:
+                    return
+                time.sleep(delay)
+
+            request_start = time.perf_counter()
+            try:
+                success = bool(self.operation(self.tester))
+            except Exception as e:
+                self.tester.log(f"負荷テスト操作エラー: {str(e)}")
+                success = False
+            self._record(success, time.perf_counter() - request_start)
+
+    def run(self):
+        """
+        負荷テストを実行
+
+        Returns:
+            dict: 実行結果の集計 (リクエスト数、成功/失敗数、スループット、レイテンシ分布(ミリ秒))
+        """
+        self.tester.configure_pool(self.workers)
+        self.tester.log(
+            f"=== 負荷テスト開始 (ワーカー数: {self.workers}, 実行時間: {self.duration}秒, "
+            f"リクエスト数: {self.total_requests}, 目標レート: {self.target_rate}/秒) ==="
+        )
+
+        start = time.perf_counter()
+        deadline = start + self.duration if self.duration is not None else None
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self._worker, start, deadline) for _ in range(self.workers)]
+            for future in futures:
+                future.result()
+        elapsed = time.perf_counter() - start
+
+        completed = self._successes + self._failures
+        result = {
+            "workers": self.workers,
+            "requests": completed,
+            "successes": self._successes,
+            "failures": self._failures,
+            "elapsed": elapsed,
+            "throughput": completed / elapsed if elapsed > 0 else 0.0,
+            "latency": self._latency.summary(),
+            "transport": self.tester.transport.stats(),
+        }
+
+        self.tester.log(f"合計リクエスト数: {completed} (成功: {self._successes}, 失敗: {self._failures})")
+        self.tester.log(f"合計実行時間: {elapsed:.3f}秒")
+        self.tester.log(f"スループット: {result['throughput']:.1f}リクエスト/秒")
+        latency = result["latency"]
+        self.tester.log(
+            f"レイテンシ: 平均 {latency['mean']:.3f}ms / p50 {latency['p50']:.3f}ms / "
+            f"p90 {latency['p90']:.3f}ms / p99 {latency['p99']:.3f}ms / "
+            f"p99.9 {latency['p99.9']:.3f}ms / max {latency['max']:.3f}ms"
+        )
+        self.tester.log(f"再送・スロットリング: {result['transport']}")
+        self.tester.log("=== 負荷テスト完了 ===")
+        return result
@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import queue
+import sys
+import threading
+from datetime import datetime
+
+# ログレベル
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVEL_NAMES = {
+    DEBUG: "DEBUG",
+    INFO: "INFO",
+    WARNING: "WARNING",
+    ERROR: "ERROR",
+}
+
+
+def parse_level(level):
+    """
+    ログレベルを数値に変換
+
+    Args:
+        level (int or str): ログレベル (例: 20, "INFO", "debug")
+
+    Returns:
+        int: ログレベル
+    """
+    if isinstance(level, int):
+        return level
+    for value, name in LEVEL_NAMES.items():
+        if name == str(level).upper():
+            return value
+    raise ValueError(f"不正なログレベルです: {level}")
+
+
+def format_payload(payload):
+    """ペイロードを整形 (呼び出し可能オブジェクトの場合は評価してから整形)"""
+    if callable(payload):
+        payload = payload()
+    if isinstance(payload, (str, bytes)):
+        return payload.decode("utf-8", errors="replace") if isinstance(payload, bytes) else payload
+    return json.dumps(payload, indent=2, ensure_ascii=False)
+
+
+class LogSink:
+    def __init__(self, log_file, level=INFO, console=True, queue_size=10000, batch_size=256,
+                 flush_interval=0.5, max_bytes=10 * 1024 * 1024, backup_count=5):
+        """
+        バックグラウンドスレッドで書き込むノンブロッキングなログ出力先
+
+        呼び出し側はキューに積むだけで、整形・ファイル書き込み・コンソール出力は
+        書き込みスレッドがまとめて行う。ペイロード (レスポンス本文など) は DEBUG レベルが
+        有効な場合にのみシリアライズされる。dict などの変更可能なペイロードは emit 時点で
+        シリアライズし、文字列・バイト列・呼び出し可能オブジェクトのみ書き込みスレッドで整形する。
+
+        Args:
+            log_file (str): ログファイルのパス
+            level (int or str): 出力するログレベルの下限
+            console (bool): 標準出力にも出力するか
+            queue_size (int): キューの上限 (超過時は WARNING 未満のログを破棄)
+            batch_size (int): 1回の書き込みでまとめるログ件数の上限
+            flush_interval (float): キューが空の場合の最大待機時間 (秒)
+            max_bytes (int): ローテーションするファイルサイズ (0 の場合はローテーションしない)
+            backup_count (int): 保持するローテーション済みファイル数
+        """
+        self.log_file = log_file
+        self.level = parse_level(level)
+        self.console = console
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.dropped = 0
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._file = open(log_file, "a", encoding="utf-8")
+        self._size = self._file.tell()
+        self._thread = threading.Thread(target=self._run, name="extic-log-writer", daemon=True)
+        self._thread.start()
+
+    def is_enabled(self, level):
+        """指定したレベルのログが出力対象かどうか"""
+        return parse_level(level) >= self.level
+
+    def emit(self, level, message, payload=None):
+        """
+        ログをキューに追加
+
+        Args:
+            level (int or str): ログレベル
+            message (str): メッセージ
+            payload (object or callable): DEBUG レベル有効時のみ整形して付加するデータ
+                (呼び出し可能オブジェクトは書き込みスレッドで評価するため、評価結果が変化しないものに限る)
+        """
+        level = parse_level(level)
+        if level < self.level or self._closed:
+            return
+        if payload is not None and self.level > DEBUG:
+            payload = None
+        elif payload is not None and not isinstance(payload, (str, bytes)) and not callable(payload):
+            # 書き込みまでに呼び出し側が変更しても emit 時点の内容を出力する
+            try:
+                payload = format_payload(payload)
+            except Exception as e:
+                payload = f"(ペイロード整形エラー: {str(e)})"
+        record = (datetime.now(), level, message, payload)
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            if level >= WARNING:
+                self._queue.put(record)
+            else:
+                with self._lock:
+                    self.dropped += 1
+
+    def flush(self, timeout=None):
+        """キューに積まれたログがすべて書き込まれるまで待機"""
+        if self._closed:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self):
+        """残りのログを書き込んで書き込みスレッドを終了"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+
+    def _format(self, record):
+        timestamp, level, message, payload = record
+        line = f"[{timestamp.strftime('%Y-%m-%d %H:%M:%S')}] "
+        if level != INFO:
+            line += f"[{LEVEL_NAMES.get(level, level)}] "
+        line += message
+        if payload is not None:
+            try:
+                line += "\n" + format_payload(payload)
+            except Exception as e:
+                line += f"\n(ペイロード整形エラー: {str(e)})"
+        return line + "\n"
+
+    def _rotate(self):
+        """ログファイルをローテーション (extic_test_*.log → extic_test_*.log.1 → ...)"""
+        self._file.close()
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.log_file}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.log_file}.{index + 1}")
+        if self.backup_count > 0:
+            os.replace(self.log_file, f"{self.log_file}.1")
+        else:
+            os.remove(self.log_file)
+        self._file = open(self.log_file, "a", encoding="utf-8")
+        self._size = 0
+
+    def _write(self, lines):
+        text = "".join(lines)
+        if self.console:
+            sys.stdout.write(text)
+            sys.stdout.flush()
+        if self.max_bytes and self._size > 0 and self._size + len(text.encode("utf-8")) > self.max_bytes:
+            self._rotate()
+        self._file.write(text)
+        self._file.flush()
+        self._size += len(text.encode("utf-8"))
+
+    def _run(self):
+        running = True
+        while running:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            lines = []
+            events = []
+            while True:
+                if item is None:
+                    running = False
+                elif isinstance(item, threading.Event):
+                    events.append(item)
+                else:
+                    lines.append(self._format(item))
+
+                if not running or len(lines) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if lines:
+                try:
+                    self._write(lines)
+                except Exception as e:
+                    sys.stderr.write(f"ログ書き込みエラー: {str(e)}\n")
+            for event in events:
+                event.set()
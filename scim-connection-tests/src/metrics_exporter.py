@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from latency import LatencyHistogram
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# レイテンシヒストグラムのバケット上限 (秒)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+DEFAULT_METRICS_PORT = 9464
+
+# 送信層の集計と出力するメトリクス名 (値が秒のものは _seconds を付ける)
+TRANSPORT_COUNTERS = (
+    ("requests", "extic_scim_transport_attempts", "再送を含む送信回数"),
+    ("retries", "extic_scim_transport_retries", "再送回数"),
+    ("throttled", "extic_scim_transport_throttled", "429 応答の回数"),
+    ("unavailable", "extic_scim_transport_unavailable", "503 応答の回数"),
+    ("connection_errors", "extic_scim_transport_connection_errors", "接続エラーの回数"),
+    ("gave_up", "extic_scim_transport_gave_up", "再送を打ち切った回数"),
+    ("backoff_seconds", "extic_scim_transport_backoff_seconds", "再送待ちの合計秒数"),
+    ("rate_limit_wait_seconds", "extic_scim_transport_rate_limit_wait_seconds", "レート制限による待機の合計秒数"),
+)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def render_openmetrics(target, recorder, transport_stats=None, buckets=DEFAULT_BUCKETS):
+    """
+    計測値を OpenMetrics のテキスト形式に変換
+
+    エンドポイント・ステータス別のリクエスト数とレイテンシヒストグラム、再送・スロットリングの回数、
+    実行中のリクエスト数を出力する。
+
+    Args:
+        target (str): ラベル target に設定する値 (SCIM APIのベースURL)
+        recorder (LatencyRecorder): エンドポイント・ステータス別のレイテンシ
+        transport_stats (dict): 送信層の集計 (Transport.stats の戻り値)
+        buckets (tuple): レイテンシヒストグラムのバケット上限 (秒)
+
+    Returns:
+        str: OpenMetrics テキスト (末尾は "# EOF")
+    """
+    snapshot = recorder.snapshot()
+    lines = [
+        "# TYPE extic_scim_requests counter",
+        "# HELP extic_scim_requests エンドポイント・ステータス別の送信回数 (再送を含む)",
+    ]
+    histograms = []
+    for endpoint, statuses in sorted(snapshot.items()):
+        for status, data in sorted(statuses.items()):
+            histogram = LatencyHistogram.from_dict(data)
+            labels = _labels(target=target, endpoint=endpoint, status=status)
+            lines.append(f"extic_scim_requests_total{labels} {histogram.count}")
+            histograms.append((endpoint, status, histogram))
+
+    lines += [
+        "# TYPE extic_scim_request_duration_seconds histogram",
+        "# UNIT extic_scim_request_duration_seconds seconds",
+        "# HELP extic_scim_request_duration_seconds エンドポイント・ステータス別のレイテンシ (試行ごと)",
+    ]
+    bounds_us = [round(bound * 1_000_000) for bound in buckets]
+    for endpoint, status, histogram in histograms:
+        for bound, count in zip(buckets, histogram.cumulative_counts(bounds_us)):
+            labels = _labels(target=target, endpoint=endpoint, status=status, le=_number(float(bound)))
+            lines.append(f"extic_scim_request_duration_seconds_bucket{labels} {count}")
+        labels = _labels(target=target, endpoint=endpoint, status=status, le="+Inf")
+        lines.append(f"extic_scim_request_duration_seconds_bucket{labels} {histogram.count}")
+        labels = _labels(target=target, endpoint=endpoint, status=status)
+        lines.append(f"extic_scim_request_duration_seconds_count{labels} {histogram.count}")
+        lines.append(f"extic_scim_request_duration_seconds_sum{labels} {_number(histogram.total / 1_000_000)}")
+
+    stats = transport_stats or {}
+    for key, name, description in TRANSPORT_COUNTERS:
+        lines.append(f"# TYPE {name} counter")
+        if name.endswith("_seconds"):
+            lines.append(f"# UNIT {name} seconds")
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"{name}_total{_labels(target=target)} {_number(stats.get(key, 0))}")
+
+    lines += [
+        "# TYPE extic_scim_in_flight_requests gauge",
+        "# HELP extic_scim_in_flight_requests エンドポイント別の実行中のリクエスト数",
+    ]
+    for endpoint, count in sorted(recorder.in_flight().items()):
+        lines.append(f"extic_scim_in_flight_requests{_labels(target=target, endpoint=endpoint)} {count}")
+
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def tester_openmetrics(tester):
+    """テスターの計測値を OpenMetrics のテキスト形式に変換"""
+    return render_openmetrics(tester.base_url, tester.metrics, tester.transport.stats())
+
+
+def write_openmetrics(path, text):
+    """
+    OpenMetrics テキストをファイルに出力 (node_exporter の textfile コレクターなどで取り込む)
+
+    一時ファイルに書き込んでから置き換えるため、取り込み側が書きかけのファイルを読むことはない。
+
+    Args:
+        path (str): 出力先のファイルパス
+        text (str): render_openmetrics の戻り値
+
+    Returns:
+        str: 出力先のファイルパス
+    """
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temporary, path)
+    return path
+
+
+class MetricsServer:
+    def __init__(self, tester, host="127.0.0.1", port=DEFAULT_METRICS_PORT):
+        """
+        実行中の計測値を /metrics で公開するHTTPサーバー (Prometheus からのスクレイプ用)
+
+        Args:
+            tester (ExticSCIMTester): 計測値を保持するテスター
+            host (str): 待ち受けアドレス
+            port (int): 待ち受けポート (0 の場合は空きポートを使用)
+        """
+        self.tester = tester
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def _handler_class(self):
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = tester_openmetrics(exporter.tester).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        """バックグラウンドスレッドで待ち受けを開始"""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="extic-metrics-server", daemon=True)
+        self._thread.start()
+        self.tester.log(f"メトリクス公開: {self.url}")
+        return self
+
+    def stop(self):
+        """待ち受けを終了"""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
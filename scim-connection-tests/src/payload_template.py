@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import time
+import uuid
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from discovery import CORE_USER_SCHEMA, DEFAULT_EXTIC_USER_SCHEMA
+
+
+# json.dumps は既定以外の引数を渡すと呼び出しごとにエンコーダーを生成するため、インスタンスを使い回す
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+_encode_string = json.encoder.encode_basestring
+
+
+def _stdlib_dumps(value):
+    if type(value) is str:
+        return _encode_string(value).encode("utf-8")
+    return _ENCODER.encode(value).encode("utf-8")
+
+
+# orjson がインストールされている場合はそちらを使用する
+dumps = orjson.dumps if orjson is not None else _stdlib_dumps
+
+JSON_CODEC = "orjson" if orjson is not None else "json"
+
+
+class Slot:
+    def __init__(self, name):
+        """
+        テンプレート内の差し込み位置
+
+        Args:
+            name (str): render に渡すキーワード引数名
+        """
+        self.name = name
+
+    def __repr__(self):
+        return f"Slot({self.name!r})"
+
+
+class PayloadTemplate:
+    def __init__(self, template, encoder=None):
+        """
+        JSONリクエストボディのテンプレート
+
+        テンプレートを一度だけJSONに変換し、Slot の位置で分割したバイト列として保持する。
+        render では固定部分を再エンコードせず、差し込む値のみをエンコードして連結する。
+
+        Args:
+            template (dict): Slot を値として含むリクエストボディ (Slot は辞書のキーには使用できない)
+            encoder (callable): 差し込む値のエンコード関数 (省略時は orjson、なければ標準の json)
+        """
+        self.encoder = encoder or dumps
+        marker = uuid.uuid4().hex
+        names = []
+
+        def replace(value):
+            if isinstance(value, Slot):
+                names.append(value.name)
+                return f"__slot_{marker}_{len(names) - 1}__"
+            if isinstance(value, dict):
+                return {key: replace(item) for key, item in value.items()}
+            if isinstance(value, (list, tuple)):
+                return [replace(item) for item in value]
+            return value
+
+        encoded = _stdlib_dumps(replace(template))
+        self.segments = []
+        for index in range(len(names)):
+            placeholder = f'"__slot_{marker}_{index}__"'.encode("utf-8")
+            head, _, encoded = encoded.partition(placeholder)
+            self.segments.append(head)
+        self.segments.append(encoded)
+        self.slots = tuple(names)
+
+    def render(self, **values):
+        """
+        値を差し込んだリクエストボディを生成
+
+        Args:
+            **values: Slot 名ごとの値 (JSONに変換可能な値。bytes はエンコード済みのJSONとしてそのまま差し込む)
+
+        Returns:
+            bytes: UTF-8 のJSON
+
+        Raises:
+            KeyError: 値が指定されていない Slot がある場合
+        """
+        parts = [self.segments[0]]
+        encoder = self.encoder
+        for name, segment in zip(self.slots, self.segments[1:]):
+            if name not in values:
+                raise KeyError(f"テンプレートの値が指定されていません: {name}")
+            value = values[name]
+            parts.append(value if type(value) is bytes else encoder(value))
+            parts.append(segment)
+        return b"".join(parts)
+
+
+def user_template(extic_schema=DEFAULT_EXTIC_USER_SCHEMA, password=None, encoder=None):
+    """
+    Exticユーザー作成・更新用のテンプレート
+
+    差し込み位置は userName, displayName, groups (exticGroups), attributes (extendAttrs のリスト)。
+
+    Args:
+        extic_schema (str): Extic拡張スキーマのURN
+        password (str): 作成時のパスワード (省略時は含めない)
+        encoder (callable): 差し込む値のエンコード関数
+
+    Returns:
+        PayloadTemplate: コンパイル済みのテンプレート
+    """
+    template = {
+        "schemas": [CORE_USER_SCHEMA, extic_schema],
+        "userName": Slot("userName"),
+    }
+    if password is not None:
+        template["password"] = password
+    template["displayName"] = Slot("displayName")
+    template[extic_schema] = {
+        "exticGroups": Slot("groups"),
+        "extendAttrs": Slot("attributes"),
+    }
+    return PayloadTemplate(template, encoder=encoder)
+
+
+def _build_user(extic_schema, index):
+    """比較用: リクエストごとに辞書を組み立てて requests の json= と同じ方法でJSONに変換する"""
+    user = {
+        "schemas": [CORE_USER_SCHEMA, extic_schema],
+        "userName": f"perf_user_{index}",
+        "password": "TestP@ssw0rd",
+        "displayName": "パフォーマンステストユーザー",
+        extic_schema: {
+            "exticGroups": ["基本ユーザーグループ"],
+            "extendAttrs": [{"name": "accessLevel", "value": "basic"}],
+        },
+    }
+    return json.dumps(user, allow_nan=False).encode("utf-8")
+
+
+def micro_benchmark(iterations=100000):
+    """
+    リクエストボディ生成のCPU時間を比較
+
+    Returns:
+        dict: 方式ごとの1リクエストあたりのCPU時間 (マイクロ秒)
+    """
+    attributes = [{"name": "accessLevel", "value": "basic"}]
+    groups = ["基本ユーザーグループ"]
+    encoded_attributes = dumps(attributes)
+    encoded_groups = dumps(groups)
+
+    def measure(function):
+        start = time.process_time()
+        for index in range(iterations):
+            function(index)
+        return (time.process_time() - start) / iterations * 1_000_000
+
+    def render(template, groups=groups, attributes=attributes):
+        return lambda i: template.render(
+            userName=f"perf_user_{i}", displayName="パフォーマンステストユーザー",
+            groups=groups, attributes=attributes,
+        )
+
+    results = {"dict + json.dumps": measure(lambda i: _build_user(DEFAULT_EXTIC_USER_SCHEMA, i))}
+    results["template (json)"] = measure(render(user_template(password="TestP@ssw0rd", encoder=_stdlib_dumps)))
+    if orjson is not None:
+        results["template (orjson)"] = measure(render(user_template(password="TestP@ssw0rd", encoder=orjson.dumps)))
+    results[f"template ({JSON_CODEC}, 事前エンコード)"] = measure(
+        render(user_template(password="TestP@ssw0rd"), groups=encoded_groups, attributes=encoded_attributes)
+    )
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="リクエストボディ生成のマイクロベンチマーク")
+    parser.add_argument("--iterations", type=int, default=100000, help="計測回数 (デフォルト: 100000)")
+    args = parser.parse_args()
+
+    results = micro_benchmark(args.iterations)
+    baseline = results["dict + json.dumps"]
+    for name, per_request in results.items():
+        print(f"{name:<32}{per_request:>8.2f}µs/リクエスト  ({baseline / per_request:.1f}倍)")
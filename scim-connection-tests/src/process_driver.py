@@ -0,0 +1,302 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+from extic_tester import ExticSCIMTester
+from latency import LatencyHistogram, LatencyRecorder
+from scenario import ScenarioRunner, validate_scenario
+
+DEFAULT_REPORT_INTERVAL = 1.0
+
+# 他のプロセスの起動を待つ上限 (秒)。超えた場合は揃えずに開始する
+START_TIMEOUT = 60.0
+
+
+def _share_path(path, index):
+    """ワーカーごとの出力先 (trace.jsonl.gz → trace_p0.jsonl.gz)"""
+    directory, name = os.path.split(path)
+    stem, dot, extension = name.partition(".")
+    return os.path.join(directory, f"{stem}_p{index}{dot}{extension}")
+
+
+def _worker_main(index, count, connection, scenario, options, results, start_barrier):
+    """
+    ワーカープロセスの処理: 担当分のシナリオを実行し、途中経過と最終結果をキューに送る
+
+    途中経過は累積値のスナップショットとして送るため、コーディネーターは各ワーカーの
+    最新のスナップショットを合算するだけでよい (取りこぼしても集計は崩れない)。
+    """
+    connection = dict(connection)
+    if connection.get("rate_limit"):
+        # テナント全体のレート上限をプロセス数で分割する
+        connection["rate_limit"] = connection["rate_limit"] / count
+    if connection.get("capture"):
+        # トレースはプロセスごとのファイルに記録する (load_trace で1つの時間軸にまとめられる)
+        connection["capture"] = _share_path(connection["capture"], index)
+    tester = ExticSCIMTester(**connection, log_file=options["log_file"])
+    runner = ScenarioRunner(tester, scenario, max_concurrency=options["max_concurrency"],
+                            seed=options["seed"], share_index=index, share_count=count)
+    stop = threading.Event()
+
+    def report():
+        while not stop.wait(options["report_interval"]):
+            results.put(("progress", index, runner.snapshot()))
+
+    def ready():
+        try:
+            start_barrier.wait(START_TIMEOUT)
+        except threading.BrokenBarrierError:
+            tester.log("他のワーカーの起動を待たずに開始します", level="WARNING")
+
+    reporter = threading.Thread(target=report, daemon=True)
+    reporter.start()
+    elapsed, error = 0.0, None
+    try:
+        elapsed = runner.run(ready=ready)["elapsed"]
+    except Exception as e:
+        error = str(e)
+        tester.log(f"ワーカー {index} の実行エラー: {error}", level="ERROR")
+        start_barrier.abort()
+    finally:
+        stop.set()
+        reporter.join()
+        results.put(("done", index, {
+            "snapshot": runner.snapshot(),
+            "elapsed": elapsed,
+            "metrics": tester.metrics.snapshot(),
+            "transport": tester.transport.stats(),
+            "error": error,
+        }))
+        tester.close()
+
+
+def merge_operations(snapshots):
+    """
+    ScenarioRunner.snapshot の操作ごとの集計を合算
+
+    ヒストグラムはバケット単位で加算するため、パーセンタイルは単一プロセスで
+    全リクエストを記録した場合と一致する (平均値やパーセンタイル同士の平均は取らない)。
+
+    Args:
+        snapshots (list): ScenarioRunner.snapshot の戻り値のリスト
+
+    Returns:
+        dict: {operation: {"successes", "failures", "skipped", "latency", "service"}} (ヒストグラムは LatencyHistogram)
+    """
+    operations = {}
+    for snapshot in snapshots:
+        for operation, data in snapshot["operations"].items():
+            merged = operations.get(operation)
+            if merged is None:
+                merged = operations[operation] = {
+                    "successes": 0,
+                    "failures": 0,
+                    "skipped": 0,
+                    "latency": LatencyHistogram(data["latency"]["significant_bits"]),
+                    "service": LatencyHistogram(data["service"]["significant_bits"]),
+                }
+            for name in ("successes", "failures", "skipped"):
+                merged[name] += data[name]
+            merged["latency"].merge(LatencyHistogram.from_dict(data["latency"]))
+            merged["service"].merge(LatencyHistogram.from_dict(data["service"]))
+    return operations
+
+
+def _write_progress(line):
+    """進捗を標準エラー出力の同じ行に上書き表示"""
+    sys.stderr.write(f"\r{line}\033[K")
+    sys.stderr.flush()
+
+
+class MultiProcessDriver:
+    def __init__(self, connection, scenario, processes=None, max_concurrency=64, seed=None,
+                 report_interval=DEFAULT_REPORT_INTERVAL, progress=None, log_dir=None):
+        """
+        シナリオを複数プロセスに分担して実行する負荷ドライバー
+
+        1プロセスでは GIL によりクライアント側が先に頭打ちになるため、CPUコアごとに
+        ワーカープロセスを起動する。各ワーカーは独自のセッションで予定送信時刻を
+        processes 個おきに担当し、累積のヒストグラムと件数を定期的に送る。
+        コーディネーターはそれらを合算して進捗行とレポートを出力する。
+
+        Args:
+            connection (dict): ExticSCIMTester に渡す接続設定 (base_url, auth_type, 認証情報, 送信設定)。
+                rate_limit はプロセス数で分割して各ワーカーに適用する
+            scenario (dict): シナリオ定義 (load_scenario の戻り値)
+            processes (int): ワーカープロセス数 (省略時はCPUコア数)
+            max_concurrency (int): ワーカーごとの同時実行リクエスト数の上限
+            seed (int): 乱数シード (ワーカーごとに担当番号を加算する)
+            report_interval (float): 途中経過の送信・進捗表示の間隔 (秒)
+            progress (callable): 進捗行 (str) を受け取る関数 (省略時は標準エラー出力に上書き表示)
+            log_dir (str): ワーカーのログとレイテンシレポートの出力先 (省略時は logs/)
+        """
+        validate_scenario(scenario)
+        self.connection = dict(connection)
+        self.scenario = scenario
+        self.processes = processes or os.cpu_count() or 1
+        self.max_concurrency = max_concurrency
+        self.seed = scenario.get("seed") if seed is None else seed
+        self.report_interval = report_interval
+        self._progress = progress
+        if log_dir is None:
+            log_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs")
+        os.makedirs(log_dir, exist_ok=True)
+        self.log_prefix = os.path.join(log_dir, f"extic_test_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        self.metrics = LatencyRecorder()
+
+    def _worker_options(self, index):
+        return {
+            "max_concurrency": self.max_concurrency,
+            "seed": None if self.seed is None else self.seed + index,
+            "report_interval": self.report_interval,
+            "log_file": f"{self.log_prefix}_p{index}.log",
+        }
+
+    def progress_line(self, snapshots, elapsed, running):
+        """
+        合算した途中経過の1行表示
+
+        Args:
+            snapshots (list): 各ワーカーの最新のスナップショット
+            elapsed (float): 開始からの経過秒数
+            running (int): 実行中のワーカー数
+
+        Returns:
+            str: 進捗行
+        """
+        latency = LatencyHistogram()
+        successes = failures = 0
+        for summary in merge_operations(snapshots).values():
+            latency.merge(summary["latency"])
+            successes += summary["successes"]
+            failures += summary["failures"]
+        scheduled = sum(snapshot["scheduled"] for snapshot in snapshots)
+        completed = successes + failures
+        rate = completed / elapsed if elapsed > 0 else 0.0
+        return (
+            f"[{elapsed:7.1f}秒] プロセス {running}/{self.processes} | 予定 {scheduled} | "
+            f"完了 {completed} (失敗 {failures}) | {rate:.1f}リクエスト/秒 | "
+            f"p50 {latency.percentile(50) / 1000:.1f}ms p99 {latency.percentile(99) / 1000:.1f}ms"
+        )
+
+    def run(self):
+        """
+        ワーカープロセスを起動してシナリオを実行
+
+        Returns:
+            dict: ScenarioRunner.run と同じ形式の合算結果に processes・transport・workers (ワーカーごとの結果) を加えたもの
+        """
+        # fork はログ出力スレッドなどの状態を引き継ぐため spawn で起動する
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        start_barrier = context.Barrier(self.processes)
+        workers = [
+            context.Process(
+                target=_worker_main,
+                args=(index, self.processes, self.connection, self.scenario,
+                      self._worker_options(index), results, start_barrier),
+                name=f"scenario-worker-{index}",
+            )
+            for index in range(self.processes)
+        ]
+        for worker in workers:
+            worker.start()
+
+        latest = {}
+        finals = {}
+        started = time.perf_counter()
+        next_progress = started + self.report_interval
+        progress = self._progress or _write_progress
+        while len(finals) < self.processes:
+            try:
+                kind, index, payload = results.get(timeout=self.report_interval)
+            except queue.Empty:
+                for index, worker in enumerate(workers):
+                    if index not in finals and worker.exitcode not in (None, 0):
+                        # 結果を送る前に異常終了したワーカー
+                        finals[index] = {"error": f"終了コード {worker.exitcode}"}
+                        start_barrier.abort()
+            else:
+                if kind == "progress":
+                    latest[index] = payload
+                else:
+                    finals[index] = payload
+                    latest[index] = payload["snapshot"]
+            now = time.perf_counter()
+            if now >= next_progress:
+                progress(self.progress_line(list(latest.values()), now - started, self.processes - len(finals)))
+                next_progress = now + self.report_interval
+        progress(self.progress_line(list(latest.values()), time.perf_counter() - started, 0))
+        if self._progress is None:
+            sys.stderr.write("\n")
+        for worker in workers:
+            worker.join()
+
+        return self._result(finals)
+
+    def _result(self, finals):
+        snapshots = [final["snapshot"] for final in finals.values() if "snapshot" in final]
+        operations = merge_operations(snapshots)
+        dispatch_lag = LatencyHistogram()
+        transport = {}
+        for final in finals.values():
+            if "snapshot" not in final:
+                continue
+            dispatch_lag.merge(LatencyHistogram.from_dict(final["snapshot"]["dispatch_lag"]))
+            self.metrics.merge_snapshot(final["metrics"])
+            for name, value in final["transport"].items():
+                transport[name] = transport.get(name, 0) + value
+
+        scheduled = sum(snapshot["scheduled"] for snapshot in snapshots)
+        elapsed = max([final.get("elapsed", 0.0) for final in finals.values()] or [0.0])
+        return {
+            "name": self.scenario.get("name", "scenario"),
+            "processes": self.processes,
+            "scheduled": scheduled,
+            "completed": sum(op["successes"] + op["failures"] for op in operations.values()),
+            "elapsed": elapsed,
+            "offered_rate": scheduled / elapsed if elapsed > 0 else 0.0,
+            "dispatch_lag": dispatch_lag.summary(),
+            "operations": {
+                operation: {
+                    "successes": summary["successes"],
+                    "failures": summary["failures"],
+                    "skipped": summary["skipped"],
+                    "latency": summary["latency"].summary(),
+                    "service": summary["service"].summary(),
+                }
+                for operation, summary in sorted(operations.items())
+            },
+            "transport": transport,
+            "workers": [
+                {
+                    "index": index,
+                    "scheduled": final["snapshot"]["scheduled"] if "snapshot" in final else 0,
+                    "elapsed": final.get("elapsed", 0.0),
+                    "error": final.get("error"),
+                    "log_file": self._worker_options(index)["log_file"],
+                }
+                for index, final in sorted(finals.items())
+            ],
+        }
+
+    def write_latency_report(self, path=None):
+        """
+        全ワーカーを合算したレイテンシ集計結果をJSONファイルに出力
+
+        Args:
+            path (str): 出力先 (省略時はワーカーのログと同じ場所に *_latency.json で出力)
+
+        Returns:
+            str: 出力先のファイルパス
+        """
+        if path is None:
+            path = f"{self.log_prefix}_latency.json"
+        return self.metrics.write_report(path)
@@ -0,0 +1,349 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from discovery import CORE_USER_SCHEMA
+from endpoints import ENDPOINT_GATEWAY_LOGIN, ENDPOINT_GATEWAY_MODELS
+from latency import LatencyHistogram, LatencyRecorder
+from transport import Transport
+
+# アクセスレベルと対応するExticグループ (test_group_based_access と同じ対応)
+TIER_GROUPS = {
+    "basic": "基本ユーザーグループ",
+    "advanced": "研究グループ",
+    "admin": "管理者グループ",
+}
+
+# 計測するアクセスレベルの変更 (昇格と降格)
+DEFAULT_TRANSITIONS = (
+    ("basic", "advanced"),
+    ("advanced", "admin"),
+    ("admin", "basic"),
+)
+
+DEFAULT_PROBE_TIMEOUT = 30.0
+DEFAULT_POLL_INITIAL = 0.01
+DEFAULT_POLL_MAX = 1.0
+DEFAULT_POLL_FACTOR = 1.5
+
+
+def _b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def sign_jwt(claims, secret, expires_in=3600):
+    """
+    HS256 の JWT を生成 (ゲートウェイの User.getSignedJwtToken と同じクレーム形式で使用する)
+
+    Args:
+        claims (dict): ペイロード
+        secret (str): ゲートウェイの JWT_SECRET
+        expires_in (int): 有効期間 (秒)
+
+    Returns:
+        str: JWT
+    """
+    now = int(time.time())
+    header = _b64url(json.dumps({"alg": "HS256", "typ": "JWT"}, separators=(",", ":")).encode("utf-8"))
+    payload = _b64url(json.dumps(dict(claims, iat=now, exp=now + expires_in), separators=(",", ":"),
+                                 ensure_ascii=False).encode("utf-8"))
+    signature = hmac.new(secret.encode("utf-8"), f"{header}.{payload}".encode("ascii"), hashlib.sha256).digest()
+    return f"{header}.{payload}.{_b64url(signature)}"
+
+
+class GatewayClient:
+    def __init__(self, base_url, jwt_secret=None, password=None, pool_maxsize=10, timeout=10.0, log=None):
+        """
+        ゲートウェイ (mcp-gateway) の利用者APIクライアント
+
+        トークンは jwt_secret を指定した場合はゲートウェイと同じ秘密鍵で生成し、
+        省略した場合は /api/auth/login にユーザー名とパスワードでログインして取得する。
+
+        Args:
+            base_url (str): ゲートウェイのベースURL (例: "http://localhost:3000")
+            jwt_secret (str): ゲートウェイの JWT_SECRET
+            password (str): ログインに使用するパスワード (jwt_secret を省略した場合)
+            pool_maxsize (int): 保持する接続数 (並列ポーリング数)
+            timeout (float): リクエストのタイムアウト (秒)
+            log (callable): ログ出力関数 (message, level)
+        """
+        if not jwt_secret and not password:
+            raise ValueError("jwt_secret または password を指定してください")
+        self.base_url = base_url.rstrip("/")
+        self.jwt_secret = jwt_secret
+        self.password = password
+        self.session = requests.Session()
+        self.session.headers.update({"Accept": "application/json"})
+        self.transport = Transport(self.session, pool_maxsize=pool_maxsize, timeout=timeout, log=log)
+        self.metrics = LatencyRecorder()
+
+    def _request(self, method, endpoint, url, **kwargs):
+        def record(status, seconds):
+            self.metrics.record(endpoint, status, seconds)
+
+        return self.transport.send(method, url, record=record, **kwargs)
+
+    def token_for(self, user, tier):
+        """
+        ユーザーのアクセストークンを取得
+
+        Args:
+            user (dict): SCIMのユーザーリソース (id, userName)
+            tier (str): トークン発行時点のアクセスレベル
+
+        Returns:
+            str: Bearerトークン
+        """
+        if self.jwt_secret:
+            return sign_jwt({
+                "id": user["id"],
+                "userName": user["userName"],
+                "systemRole": "user",
+                "accessTier": tier,
+            }, self.jwt_secret)
+        response = self._request(
+            "post", ENDPOINT_GATEWAY_LOGIN, f"{self.base_url}/api/auth/login",
+            json={"username": user["userName"], "password": self.password}
+        )
+        response.raise_for_status()
+        return response.json()["token"]
+
+    def visible_models(self, token):
+        """
+        ユーザーに表示されるモデルIDの集合を取得
+
+        Returns:
+            frozenset or None: モデルIDの集合 (取得できなかった場合は None)
+        """
+        response = self._request(
+            "get", ENDPOINT_GATEWAY_MODELS, f"{self.base_url}/api/models",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        if response.status_code != 200:
+            return None
+        return frozenset(model["id"] for model in response.json().get("data", []))
+
+
+class PropagationProbe:
+    def __init__(self, tester, gateway, users=20, workers=8, transitions=DEFAULT_TRANSITIONS,
+                 timeout=DEFAULT_PROBE_TIMEOUT, poll_initial=DEFAULT_POLL_INITIAL, poll_max=DEFAULT_POLL_MAX,
+                 poll_factor=DEFAULT_POLL_FACTOR, password="ProbeP@ssw0rd"):
+        """
+        SCIMでのアクセスレベル変更がゲートウェイの認可に反映されるまでの時間を計測するプローブ
+
+        ユーザーごとに accessLevel を変更 (PUT) し、変更前に取得したトークンで /api/models を
+        ポーリングして、表示されるモデルが新しいアクセスレベルのものと一致するまでの時間を記録する。
+        ポーリング間隔は poll_initial から poll_factor 倍ずつ poll_max まで広げるため、
+        反映が速い場合は細かく、遅い場合はゲートウェイに負荷をかけすぎずに計測できる。
+
+        Args:
+            tester (ExticSCIMTester): SCIM書き込みに使用するテスター
+            gateway (GatewayClient): ゲートウェイのクライアント
+            users (int): 並列に計測するユーザー数
+            workers (int): 並列数
+            transitions (tuple): 計測するアクセスレベル変更 ((変更前, 変更後) のタプル、同じユーザーに順に適用する)
+            timeout (float): 反映を待つ上限 (秒)
+            poll_initial (float): 最初のポーリング間隔 (秒)
+            poll_max (float): ポーリング間隔の上限 (秒)
+            poll_factor (float): ポーリング間隔の増加率
+            password (str): 作成するユーザーのパスワード (ログインでトークンを取得する場合に使用)
+        """
+        self.tester = tester
+        self.gateway = gateway
+        self.users = users
+        self.workers = workers
+        self.transitions = tuple(tuple(transition) for transition in transitions)
+        for source, target in self.transitions:
+            if source not in TIER_GROUPS or target not in TIER_GROUPS:
+                raise ValueError(f"未対応のアクセスレベルです: {source} -> {target} (対応: {list(TIER_GROUPS)})")
+        for (_, previous), (source, _) in zip(self.transitions, self.transitions[1:]):
+            if previous != source:
+                raise ValueError(f"変更は連続するよう指定してください: {previous} の次が {source} になっています")
+        self.timeout = timeout
+        self.poll_initial = poll_initial
+        self.poll_max = poll_max
+        self.poll_factor = poll_factor
+        self.password = password
+        self.expected = {}
+        self._prefix = f"propagation_{int(time.time())}"
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._clock = time.perf_counter
+        self._sleep = time.sleep
+
+    def _user(self, username, tier):
+        extic_schema = self.tester.capabilities.extic_schema
+        return {
+            "schemas": [CORE_USER_SCHEMA, extic_schema],
+            "userName": username,
+            "password": self.password,
+            "displayName": "反映時間計測ユーザー",
+            extic_schema: {
+                "exticGroups": [TIER_GROUPS[tier]],
+                "extendAttrs": [{"name": "accessLevel", "value": tier}],
+            },
+        }
+
+    def _change_tier(self, user, tier):
+        """アクセスレベルとグループを変更 (PUT)"""
+        data = self._user(user["userName"], tier)
+        data.pop("password")
+        return self.tester.update_user(user["id"], data) is not None
+
+    def _wait_for(self, token, expected, deadline):
+        """
+        表示されるモデルが expected と一致するまでポーリング
+
+        Returns:
+            tuple: (一致したポーリングの送信時刻 (一致しなかった場合は None), ポーリング回数)
+        """
+        interval = self.poll_initial
+        polls = 0
+        while True:
+            sent = self._clock()
+            polls += 1
+            if self.gateway.visible_models(token) == expected:
+                return sent, polls
+            if sent >= deadline:
+                return None, polls
+            self._sleep(min(interval, max(0.0, deadline - self._clock())))
+            interval = min(self.poll_max, interval * self.poll_factor)
+
+    def calibrate(self):
+        """
+        アクセスレベルごとに表示されるモデルを取得
+
+        計測用ユーザーとは別に、各アクセスレベルで新規作成したユーザー (変更前の状態を持たない) の
+        表示モデルを正解とする。
+
+        Returns:
+            dict: {アクセスレベル: モデルIDの集合}
+        """
+        tiers = sorted({tier for transition in self.transitions for tier in transition})
+        self.tester.log(f"=== 反映時間計測: 正解のモデル一覧を取得 ({tiers}) ===")
+        for tier in tiers:
+            user = self.tester.create_user(self._user(f"{self._prefix}_calibration_{tier}", tier))
+            if user is None:
+                raise RuntimeError(f"正解取得用ユーザーを作成できません: {tier}")
+            try:
+                models = self.gateway.visible_models(self.gateway.token_for(user, tier))
+            finally:
+                self.tester.delete_user(user["id"])
+            if models is None:
+                raise RuntimeError(f"ゲートウェイからモデル一覧を取得できません: {tier}")
+            self.expected[tier] = models
+            self.tester.log(f"{tier}: {sorted(models)}")
+        return self.expected
+
+    def _stat(self, transition):
+        stat = self._stats.get(transition)
+        if stat is None:
+            stat = self._stats[transition] = {
+                "delay": LatencyHistogram(),
+                "write": LatencyHistogram(),
+                "polls": 0,
+                "propagated": 0,
+                "timeouts": 0,
+                "errors": 0,
+            }
+        return stat
+
+    def _probe_user(self, index):
+        source = self.transitions[0][0]
+        user = self.tester.create_user(self._user(f"{self._prefix}_{index}", source))
+        if user is None:
+            with self._lock:
+                self._stat(self.transitions[0])["errors"] += 1
+            return
+        try:
+            token = self.gateway.token_for(user, source)
+            # 作成直後の状態が見えてから計測を始める
+            self._wait_for(token, self.expected[source], self._clock() + self.timeout)
+            for transition in self.transitions:
+                _, target = transition
+                started = self._clock()
+                changed = self._change_tier(user, target)
+                acknowledged = self._clock()
+                if not changed:
+                    with self._lock:
+                        self._stat(transition)["errors"] += 1
+                    break
+                observed, polls = self._wait_for(token, self.expected[target], acknowledged + self.timeout)
+                with self._lock:
+                    stat = self._stat(transition)
+                    stat["write"].record_seconds(acknowledged - started)
+                    stat["polls"] += polls
+                    if observed is None:
+                        stat["timeouts"] += 1
+                    else:
+                        stat["propagated"] += 1
+                        stat["delay"].record_seconds(max(0.0, observed - acknowledged))
+        except Exception as e:
+            self.tester.log(f"反映時間計測エラー ({user['userName']}): {str(e)}", level="ERROR")
+            with self._lock:
+                self._stat(self.transitions[0])["errors"] += 1
+        finally:
+            self.tester.delete_user(user["id"])
+
+    def run(self):
+        """
+        反映時間を計測
+
+        Returns:
+            dict: 変更ごとの反映時間 (SCIM書き込みの応答から新しいモデル一覧が見えるまで)・
+                書き込み時間・ポーリング回数・タイムアウト数と、全体の反映時間
+        """
+        self.tester.log(f"=== 反映時間計測開始 (ユーザー数: {self.users}, 並列数: {self.workers}) ===")
+        self.calibrate()
+        indistinguishable = [
+            f"{source}->{target}" for source, target in self.transitions
+            if self.expected[source] == self.expected[target]
+        ]
+        if indistinguishable:
+            # 表示モデルが同じ変更は反映を判定できない (タイムアウトではなく即時一致になる)
+            self.tester.log(f"表示モデルが変わらないため反映を判定できない変更があります: {indistinguishable}",
+                            level="WARNING")
+
+        self.tester.configure_pool(self.workers)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            list(executor.map(self._probe_user, range(self.users)))
+
+        overall = LatencyHistogram()
+        transitions = {}
+        for (source, target), stat in sorted(self._stats.items()):
+            overall.merge(stat["delay"])
+            measured = stat["propagated"] + stat["timeouts"]
+            transitions[f"{source}->{target}"] = {
+                "propagated": stat["propagated"],
+                "timeouts": stat["timeouts"],
+                "errors": stat["errors"],
+                "mean_polls": stat["polls"] / measured if measured else 0.0,
+                "delay": stat["delay"].summary(),
+                "write": stat["write"].summary(),
+            }
+        result = {
+            "users": self.users,
+            "expected": {tier: sorted(models) for tier, models in sorted(self.expected.items())},
+            "indistinguishable": indistinguishable,
+            "transitions": transitions,
+            "delay": overall.summary(),
+        }
+
+        for name, summary in transitions.items():
+            delay = summary["delay"]
+            self.tester.log(
+                f"{name}: 反映 {summary['propagated']} / タイムアウト {summary['timeouts']} / エラー {summary['errors']}, "
+                f"p50 {delay['p50']:.3f}ms / p99 {delay['p99']:.3f}ms / max {delay['max']:.3f}ms "
+                f"(平均ポーリング回数 {summary['mean_polls']:.1f})"
+            )
+        self.tester.log("=== 反映時間計測完了 ===")
+        return result
@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from latency import LatencyHistogram
+
+# IDの候補となる文字列 (パス・フィルター・ボディ中のUUIDなど)
+ID_TOKEN = re.compile(r"[\w\-]+")
+
+# 記録にエンドポイント名がない場合に、パス中のリソースIDをまとめる
+RESOURCE_PATH = re.compile(r"/(Users|Groups)/[^/?]+")
+
+DEFAULT_REPLAY_CONCURRENCY = 16
+
+# 作成元のリクエストの完了を待つ上限 (秒)
+DEFAULT_WAIT_TIMEOUT = 30.0
+
+
+def created_ids(method, status, response):
+    """
+    レスポンスから作成されたリソースのIDを取り出す
+
+    Args:
+        method (str): HTTPメソッド
+        status (int or str): ステータスコード
+        response (object): JSONとして解釈したレスポンスボディ
+
+    Returns:
+        list: (照合キー, ID) のリスト。照合キーは単一作成では None、Bulkでは bulkId (ない場合は操作の位置)
+    """
+    if method.upper() != "POST" or not isinstance(status, int) or not 200 <= status < 300:
+        return []
+    if not isinstance(response, dict):
+        return []
+    if isinstance(response.get("Operations"), list):
+        ids = []
+        for position, operation in enumerate(response["Operations"]):
+            if not isinstance(operation, dict) or str(operation.get("method", "")).upper() != "POST":
+                continue
+            if not str(operation.get("status", "")).startswith("2") or not operation.get("location"):
+                continue
+            ids.append((operation.get("bulkId") or position, operation["location"].rstrip("/").rsplit("/", 1)[-1]))
+        return ids
+    if response.get("id"):
+        return [(None, response["id"])]
+    return []
+
+
+def endpoint_name(record):
+    """記録のエンドポイント名 (記録にない場合はメソッドとパスから生成)"""
+    if record.get("endpoint"):
+        return record["endpoint"]
+    path = RESOURCE_PATH.sub(r"/\1/{id}", record["path"].split("?", 1)[0])
+    return f"{record['method']} {path}"
+
+
+def _request_text(record):
+    body = record.get("body")
+    text = record["path"]
+    if body is not None:
+        text += " " + (body if isinstance(body, str) else json.dumps(body, ensure_ascii=False))
+    if record.get("params"):
+        text += " " + json.dumps(record["params"], ensure_ascii=False)
+    return text
+
+
+def _substitute(text, mapping):
+    if not mapping:
+        return text
+    return ID_TOKEN.sub(lambda match: mapping.get(match.group(0), match.group(0)), text)
+
+
+class TraceReplayer:
+    def __init__(self, tester, records, speed=1.0, concurrency=DEFAULT_REPLAY_CONCURRENCY,
+                 wait_timeout=DEFAULT_WAIT_TIMEOUT):
+        """
+        記録したリクエストの再送 (トレースのリプレイ)
+
+        記録時の送信開始時刻どおりに (speed 倍の速度で) リクエストを送り直し、エンドポイントごとに
+        記録時と再送時のレイテンシ・ステータスを比較する。記録中に作成されたユーザーのIDは再送先で
+        作成されたIDに置き換え、そのIDを参照するリクエストは作成の完了を待ってから送信する。
+        記録より前から存在したユーザーのIDは置き換えないため、再送先に同じIDのユーザーがない場合は
+        ステータスの不一致として集計される。
+
+        Args:
+            tester (ExticSCIMTester): 再送先のテスター
+            records (list): load_trace の戻り値
+            speed (float): 再送速度の倍率 (None または 0 の場合は待たずに送信)
+            concurrency (int): 同時実行リクエスト数の上限
+            wait_timeout (float): 作成元のリクエストの完了を待つ上限 (秒)
+        """
+        if speed is not None and speed < 0:
+            raise ValueError(f"speed は0以上で指定してください: {speed}")
+        self.tester = tester
+        self.records = records
+        self.speed = speed or None
+        self.concurrency = concurrency
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._id_map = {}
+        self._ready = {}
+        self._plan()
+
+    def _plan(self):
+        """作成されたIDとそれを参照するリクエストの対応を求める"""
+        creators = {}
+        self._dependencies = []
+        self._creations = []
+        for index, record in enumerate(self.records):
+            tokens = set(ID_TOKEN.findall(_request_text(record)))
+            self._dependencies.append(sorted(token for token in tokens if token in creators))
+            creations = created_ids(record["method"], record.get("status"), record.get("response"))
+            self._creations.append(creations)
+            for _, recorded_id in creations:
+                creators[recorded_id] = index
+                self._ready[recorded_id] = threading.Event()
+
+    def _stat(self, endpoint):
+        stat = self._stats.get(endpoint)
+        if stat is None:
+            stat = self._stats[endpoint] = {
+                "recorded": LatencyHistogram(),
+                "replayed": LatencyHistogram(),
+                "count": 0,
+                "status_mismatches": 0,
+                "errors": 0,
+                "unresolved": 0,
+            }
+        return stat
+
+    def _resolve(self, dependencies):
+        mapping = {}
+        for recorded_id in dependencies:
+            if not self._ready[recorded_id].wait(self.wait_timeout):
+                return None
+            with self._lock:
+                if recorded_id not in self._id_map:
+                    return None
+                mapping[recorded_id] = self._id_map[recorded_id]
+        return mapping
+
+    def _map_created(self, index, status, response):
+        creations = self._creations[index]
+        if not creations:
+            return
+        try:
+            replayed = created_ids("POST", status, response.json() if response is not None else None)
+        except ValueError:
+            replayed = []
+        replayed = dict(replayed)
+        with self._lock:
+            for key, recorded_id in creations:
+                if key in replayed:
+                    self._id_map[recorded_id] = replayed[key]
+
+    def _replay(self, index):
+        record = self.records[index]
+        endpoint = endpoint_name(record)
+        try:
+            mapping = self._resolve(self._dependencies[index])
+            if mapping is None:
+                with self._lock:
+                    self._stat(endpoint)["unresolved"] += 1
+                return
+
+            url = _substitute(record["path"], mapping)
+            if not url.startswith(("http://", "https://")):
+                url = f"{self.tester.base_url}{url}"
+            kwargs = {}
+            body = record.get("body")
+            if body is not None:
+                text = body if isinstance(body, str) else json.dumps(body, ensure_ascii=False)
+                kwargs["data"] = _substitute(text, mapping).encode("utf-8")
+            if record.get("params"):
+                kwargs["params"] = json.loads(_substitute(json.dumps(record["params"]), mapping))
+
+            started = time.perf_counter()
+            response = None
+            try:
+                response = self.tester._request(record["method"].lower(), endpoint, url, **kwargs)
+                status = response.status_code
+            except Exception as e:
+                self.tester.log(f"再送エラー ({record['method']} {record['path']}): {str(e)}", level="ERROR")
+                status = "error"
+            finished = time.perf_counter()
+
+            self._map_created(index, status, response)
+            with self._lock:
+                stat = self._stat(endpoint)
+                stat["count"] += 1
+                stat["recorded"].record_seconds(record["elapsed"])
+                stat["replayed"].record_seconds(finished - started)
+                if status == "error":
+                    stat["errors"] += 1
+                if status != record.get("status"):
+                    stat["status_mismatches"] += 1
+        finally:
+            # 作成に失敗した場合も待機中のリクエストを解放する (IDが対応付かないため未解決として集計される)
+            for _, recorded_id in self._creations[index]:
+                self._ready[recorded_id].set()
+
+    @staticmethod
+    def _diff(recorded, replayed):
+        return {name: round(replayed[name] - recorded[name], 3) for name in ("p50", "p90", "p99", "mean")}
+
+    def run(self):
+        """
+        トレースを再送
+
+        Returns:
+            dict: 件数 (requests, replayed, unresolved, status_mismatches, errors, remapped)、実行時間、送信遅れと
+                エンドポイントごとの記録時・再送時のレイテンシ (ミリ秒) と差分 (再送時 - 記録時)
+        """
+        speed_label = f"{self.speed}倍" if self.speed else "待機なし"
+        self.tester.log(f"=== トレース再送開始: {len(self.records)}件 (速度: {speed_label}, 同時実行: {self.concurrency}) ===")
+        self.tester.configure_pool(self.concurrency)
+        dispatch_lag = LatencyHistogram()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for index, record in enumerate(self.records):
+                if self.speed:
+                    intended = start + record["offset"] / self.speed
+                    delay = intended - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    dispatch_lag.record_seconds(max(0.0, time.perf_counter() - intended))
+                executor.submit(self._replay, index)
+        elapsed = time.perf_counter() - start
+
+        endpoints = {}
+        for endpoint, stat in sorted(self._stats.items()):
+            recorded, replayed = stat["recorded"].summary(), stat["replayed"].summary()
+            endpoints[endpoint] = {
+                "count": stat["count"],
+                "status_mismatches": stat["status_mismatches"],
+                "errors": stat["errors"],
+                "unresolved": stat["unresolved"],
+                "recorded": recorded,
+                "replayed": replayed,
+                "diff": self._diff(recorded, replayed) if stat["count"] else {},
+            }
+        result = {
+            "requests": len(self.records),
+            "replayed": sum(stat["count"] for stat in endpoints.values()),
+            "unresolved": sum(stat["unresolved"] for stat in endpoints.values()),
+            "status_mismatches": sum(stat["status_mismatches"] for stat in endpoints.values()),
+            "errors": sum(stat["errors"] for stat in endpoints.values()),
+            "remapped": len(self._id_map),
+            "speed": self.speed,
+            "recorded_duration": self.records[-1]["offset"] if self.records else 0.0,
+            "elapsed": elapsed,
+            "dispatch_lag": dispatch_lag.summary(),
+            "endpoints": endpoints,
+        }
+
+        self.tester.log(
+            f"再送: {result['replayed']}/{result['requests']}件, 未解決 {result['unresolved']}件, "
+            f"ステータス不一致 {result['status_mismatches']}件, ID置換 {result['remapped']}件, 実行時間: {elapsed:.3f}秒"
+        )
+        for endpoint, summary in endpoints.items():
+            if not summary["count"]:
+                continue
+            self.tester.log(
+                f"{endpoint}: {summary['count']}件, p50 {summary['recorded']['p50']:.3f}ms → "
+                f"{summary['replayed']['p50']:.3f}ms, p99 {summary['recorded']['p99']:.3f}ms → "
+                f"{summary['replayed']['p99']:.3f}ms (不一致 {summary['status_mismatches']}件)"
+            )
+        return result
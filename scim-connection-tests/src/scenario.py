@@ -0,0 +1,443 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from bulk import BulkProvisioner
+from discovery import CORE_USER_SCHEMA
+from endpoints import (
+    ENDPOINT_LIST_USERS,
+    ENDPOINT_FILTER_USERS,
+    ENDPOINT_GET_USER,
+    ENDPOINT_CREATE_USER,
+    ENDPOINT_UPDATE_USER,
+    ENDPOINT_DELETE_USER,
+)
+from latency import LatencyHistogram
+from payload_template import dumps, user_template
+
+OPERATIONS = ("list", "get", "filter", "create", "update_groups", "delete")
+
+# プロファイルの種類ごとの必須項目
+PROFILE_FIELDS = {
+    "constant": ("rate", "duration"),
+    "ramp": ("from", "to", "duration"),
+    "step": ("rates", "step_duration"),
+    "burst": ("peak", "burst_duration", "duration"),
+}
+
+# グループ変更で切り替えるグループ
+GROUP_CYCLE = ("基本ユーザーグループ", "研究グループ")
+
+
+def load_scenario(path):
+    """
+    シナリオファイル (YAML または JSON) を読み込む
+
+    YAML の読み込みには PyYAML が必要。
+
+    Returns:
+        dict: 検証済みのシナリオ定義
+    """
+    with open(path, encoding="utf-8") as f:
+        if os.path.splitext(path)[1].lower() in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("YAML形式のシナリオには PyYAML が必要です (pip install pyyaml)")
+            scenario = yaml.safe_load(f)
+        else:
+            scenario = json.load(f)
+    validate_scenario(scenario)
+    return scenario
+
+
+def validate_scenario(scenario):
+    """
+    シナリオ定義を検証
+
+    Raises:
+        ValueError: 定義が不正な場合
+    """
+    if not isinstance(scenario, dict):
+        raise ValueError("シナリオはオブジェクトで定義してください")
+    mix = scenario.get("mix")
+    if not isinstance(mix, dict) or not mix:
+        raise ValueError("mix に操作ごとの重みを指定してください")
+    unknown = set(mix) - set(OPERATIONS)
+    if unknown:
+        raise ValueError(f"未対応の操作です: {sorted(unknown)} (対応: {list(OPERATIONS)})")
+    if any(not isinstance(weight, (int, float)) or weight < 0 for weight in mix.values()) or not sum(mix.values()):
+        raise ValueError("mix の重みは0以上の数値で、合計が正になるよう指定してください")
+    profile = scenario.get("arrival")
+    if not isinstance(profile, list) or not profile:
+        raise ValueError("arrival に到着レートのプロファイルを指定してください")
+    for segment in profile:
+        kind = segment.get("type") if isinstance(segment, dict) else None
+        if kind not in PROFILE_FIELDS:
+            raise ValueError(f"未対応のプロファイルです: {kind} (対応: {list(PROFILE_FIELDS)})")
+        missing = [field for field in PROFILE_FIELDS[kind] if segment.get(field) in (None, [], "")]
+        if missing:
+            raise ValueError(f"{kind} プロファイルに {missing} を指定してください")
+
+
+def _segment_rate(segment):
+    """
+    プロファイル区間のレート関数と長さ
+
+    Returns:
+        tuple: (区間内の経過秒数を受け取りリクエスト/秒を返す関数, 区間の秒数)
+    """
+    kind = segment["type"]
+    if kind == "constant":
+        return (lambda t: segment["rate"]), segment["duration"]
+    if kind == "ramp":
+        start, end, duration = segment["from"], segment["to"], segment["duration"]
+        return (lambda t: start + (end - start) * min(t / duration, 1.0)), duration
+    if kind == "step":
+        rates = segment["rates"]
+        step = segment["step_duration"]
+        return (lambda t: rates[min(int(t // step), len(rates) - 1)]), step * len(rates)
+    # burst: period 秒ごとに先頭 burst_duration 秒だけ peak、それ以外は base
+    base, peak = segment.get("base", 0), segment["peak"]
+    period, burst = segment.get("period", segment["duration"]), segment["burst_duration"]
+    return (lambda t: peak if t % period < burst else base), segment["duration"]
+
+
+def arrival_times(profile, rng=None):
+    """
+    到着レートのプロファイルから各リクエストの予定送信時刻を生成
+
+    区間は順に連結する。レートが0の間は送信しない。rng を指定した場合はポアソン到着
+    (指数分布の間隔)、省略した場合は等間隔とする。
+
+    Args:
+        profile (list): constant/ramp/step/burst の区間のリスト
+        rng (random.Random): ポアソン到着用の乱数生成器
+
+    Yields:
+        float: 開始からの予定送信時刻 (秒)
+    """
+    offset = 0.0
+    for segment in profile:
+        rate_at, length = _segment_rate(segment)
+        t = 0.0
+        while t < length:
+            rate = rate_at(t)
+            if rate <= 0:
+                # レート0の区間は 10ms 刻みで次に送信が始まる時刻を探す
+                t += 0.01
+                continue
+            yield offset + t
+            t += rng.expovariate(rate) if rng else 1.0 / rate
+        offset += length
+
+
+class _UserPool:
+    def __init__(self, rng):
+        """シナリオ実行中に参照・更新・削除するユーザーID (スレッドセーフ)"""
+        self._ids = []
+        self._rng = rng
+        self._lock = threading.Lock()
+
+    def add(self, user_id):
+        with self._lock:
+            self._ids.append(user_id)
+
+    def pick(self):
+        with self._lock:
+            return self._rng.choice(self._ids) if self._ids else None
+
+    def take(self):
+        with self._lock:
+            if not self._ids:
+                return None
+            index = self._rng.randrange(len(self._ids))
+            self._ids[index], self._ids[-1] = self._ids[-1], self._ids[index]
+            return self._ids.pop()
+
+    def drain(self):
+        with self._lock:
+            ids, self._ids = self._ids, []
+            return ids
+
+
+class ScenarioRunner:
+    def __init__(self, tester, scenario, max_concurrency=64, seed=None, share_index=0, share_count=1):
+        """
+        重み付き操作ミックスをオープンループで実行するシナリオランナー
+
+        予定時刻どおりに送信を開始し (前のリクエストの完了を待たない)、レイテンシは
+        予定時刻から計測する。サーバーが遅延した場合の待ち時間もレイテンシに含まれるため、
+        クローズドループで生じる coordinated omission を避けられる。
+
+        Args:
+            tester (ExticSCIMTester): リクエスト送信に使用するテスター
+            scenario (dict): シナリオ定義 (load_scenario の戻り値)
+            max_concurrency (int): 同時に実行するリクエスト数の上限 (超過分は待ち時間としてレイテンシに計上)
+            seed (int): 操作選択・ポアソン到着の乱数シード (省略時はシナリオの seed)
+            share_index (int): 複数プロセスで分担する場合の担当番号 (0 始まり)
+            share_count (int): 分担するプロセス数 (予定送信時刻を share_count 個おきに担当する)
+        """
+        validate_scenario(scenario)
+        self.tester = tester
+        self.scenario = scenario
+        self.max_concurrency = max_concurrency
+        if not 0 <= share_index < share_count:
+            raise ValueError("share_index は 0 以上 share_count 未満を指定してください")
+        self.share_index = share_index
+        self.share_count = share_count
+        seed = scenario.get("seed") if seed is None else seed
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._operations = [name for name in OPERATIONS if scenario["mix"].get(name)]
+        self._weights = [scenario["mix"][name] for name in self._operations]
+        self._pool = _UserPool(random.Random(seed))
+        self._prefix = f"{scenario.get('user_prefix', 'scenario')}_{int(time.time())}"
+        if share_count > 1:
+            # 同時に起動した他プロセスとユーザー名が重複しないよう担当番号を含める
+            self._prefix += f"_w{share_index}"
+        self._scheduled = 0
+        self._dispatch_lag = LatencyHistogram()
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._create_template = None
+
+    def _user(self, username, group):
+        extic_schema = self.tester.capabilities.extic_schema
+        return {
+            "schemas": [CORE_USER_SCHEMA, extic_schema],
+            "userName": username,
+            "password": "ScenarioP@ssw0rd",
+            "displayName": "シナリオユーザー",
+            extic_schema: {
+                "exticGroups": [group],
+                "extendAttrs": [{"name": "accessLevel", "value": "basic"}],
+            },
+        }
+
+    def _next_username(self):
+        with self._lock:
+            self._sequence += 1
+            return f"{self._prefix}_{self._sequence}"
+
+    # 各操作は (成功したか, 実行されたか) を返す。対象ユーザーがいない場合は実行しない
+    def _op_list(self):
+        count = self.scenario.get("page_size", 20)
+        response = self.tester._request(
+            "get", ENDPOINT_LIST_USERS, f"{self.tester.base_url}/Users?startIndex=1&count={count}"
+        )
+        return response.status_code < 400, True
+
+    def _op_get(self):
+        user_id = self._pool.pick()
+        if user_id is None:
+            return False, False
+        response = self.tester._request("get", ENDPOINT_GET_USER, f"{self.tester.base_url}/Users/{user_id}")
+        return response.status_code < 400, True
+
+    def _op_filter(self):
+        expression = self.scenario.get("filter", f'userName sw "{self._prefix}_"')
+        response = self.tester._request(
+            "get", ENDPOINT_FILTER_USERS,
+            f"{self.tester.base_url}/Users?filter={requests.utils.quote(expression)}&startIndex=1&count=10"
+        )
+        return response.status_code < 400, True
+
+    def _op_create(self):
+        body = self._create_template.render(
+            userName=self._next_username(), displayName="シナリオユーザー",
+            groups=self._initial_groups, attributes=self._attributes
+        )
+        response = self.tester._request("post", ENDPOINT_CREATE_USER, f"{self.tester.base_url}/Users", data=body)
+        if response.status_code >= 400:
+            return False, True
+        self._pool.add(response.json()["id"])
+        return True, True
+
+    def _op_update_groups(self):
+        user_id = self._pool.take()
+        if user_id is None:
+            return False, False
+        try:
+            current = self.tester._request("get", ENDPOINT_GET_USER, f"{self.tester.base_url}/Users/{user_id}")
+            if current.status_code >= 400:
+                return False, True
+            user = current.json()
+            extic_schema = self.tester.capabilities.extic_schema
+            groups = (user.get(extic_schema) or {}).get("exticGroups") or [GROUP_CYCLE[0]]
+            next_group = GROUP_CYCLE[(GROUP_CYCLE.index(groups[0]) + 1) % len(GROUP_CYCLE)] \
+                if groups[0] in GROUP_CYCLE else GROUP_CYCLE[0]
+            user.pop("meta", None)
+            user.setdefault(extic_schema, {})["exticGroups"] = [next_group]
+            response = self.tester._request(
+                "put", ENDPOINT_UPDATE_USER, f"{self.tester.base_url}/Users/{user_id}", json=user
+            )
+            return response.status_code < 400, True
+        finally:
+            self._pool.add(user_id)
+
+    def _op_delete(self):
+        user_id = self._pool.take()
+        if user_id is None:
+            return False, False
+        response = self.tester._request("delete", ENDPOINT_DELETE_USER, f"{self.tester.base_url}/Users/{user_id}")
+        if response.status_code >= 400:
+            self._pool.add(user_id)
+            return False, True
+        return True, True
+
+    def _choose(self):
+        with self._rng_lock:
+            return self._rng.choices(self._operations, weights=self._weights)[0]
+
+    def _stat(self, operation):
+        stat = self._stats.get(operation)
+        if stat is None:
+            stat = self._stats[operation] = {
+                "latency": LatencyHistogram(),
+                "service": LatencyHistogram(),
+                "successes": 0,
+                "failures": 0,
+                "skipped": 0,
+            }
+        return stat
+
+    def _execute(self, operation, intended):
+        started = time.perf_counter()
+        try:
+            ok, executed = getattr(self, f"_op_{operation}")()
+        except Exception as e:
+            self.tester.log(f"シナリオ操作エラー ({operation}): {str(e)}", level="ERROR")
+            ok, executed = False, True
+        finished = time.perf_counter()
+        with self._lock:
+            stat = self._stat(operation)
+            if not executed:
+                stat["skipped"] += 1
+                return
+            stat["latency"].record_seconds(finished - intended)
+            stat["service"].record_seconds(finished - started)
+            stat["successes" if ok else "failures"] += 1
+
+    def _compile_templates(self):
+        """作成リクエストのボディをコンパイル (高レート時のクライアント側CPU負荷を抑える)"""
+        self._create_template = user_template(self.tester.capabilities.extic_schema, password="ScenarioP@ssw0rd")
+        self._initial_groups = dumps([GROUP_CYCLE[0]])
+        self._attributes = dumps([{"name": "accessLevel", "value": "basic"}])
+
+    def _seed_users(self):
+        total = self.scenario.get("initial_users", 0)
+        count = total // self.share_count + (1 if self.share_index < total % self.share_count else 0)
+        if not count:
+            return
+        users = [self._user(self._next_username(), GROUP_CYCLE[0]) for _ in range(count)]
+        for user in BulkProvisioner(self.tester).create_users(users)["created"]:
+            self._pool.add(user["id"])
+
+    def _cleanup(self):
+        ids = self._pool.drain()
+        if ids and self.scenario.get("cleanup", True):
+            BulkProvisioner(self.tester).delete_users(ids)
+
+    def snapshot(self):
+        """
+        実行途中の集計をプロセス間で受け渡せる形式で取得
+
+        Returns:
+            dict: scheduled・dispatch_lag と操作ごとの件数・ヒストグラム (LatencyHistogram.to_dict の形式)
+        """
+        with self._lock:
+            return {
+                "scheduled": self._scheduled,
+                "dispatch_lag": self._dispatch_lag.to_dict(),
+                "operations": {
+                    operation: {
+                        "successes": stat["successes"],
+                        "failures": stat["failures"],
+                        "skipped": stat["skipped"],
+                        "latency": stat["latency"].to_dict(),
+                        "service": stat["service"].to_dict(),
+                    }
+                    for operation, stat in sorted(self._stats.items())
+                },
+            }
+
+    def run(self, ready=None):
+        """
+        シナリオを実行
+
+        Args:
+            ready (callable): 初期ユーザー作成後、送信開始の直前に呼び出す関数 (複数プロセスの開始時刻を揃える)
+
+        Returns:
+            dict: 予定リクエスト数・送信遅れ・操作ごとの集計 (latency は予定時刻から、service は実際の送信開始から)
+        """
+        name = self.scenario.get("name", "scenario")
+        self.tester.log(f"=== シナリオ実行開始: {name} (操作: {dict(zip(self._operations, self._weights))}) ===")
+        self._compile_templates()
+        self._seed_users()
+        self.tester.configure_pool(self.max_concurrency)
+        if ready is not None:
+            ready()
+
+        poisson_rng = random.Random(self.scenario.get("seed")) if self.scenario.get("poisson") else None
+        dispatch_lag = self._dispatch_lag
+        scheduled = 0
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            for position, offset in enumerate(arrival_times(self.scenario["arrival"], poisson_rng)):
+                if position % self.share_count != self.share_index:
+                    continue
+                intended = start + offset
+                delay = intended - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                with self._lock:
+                    dispatch_lag.record_seconds(max(0.0, time.perf_counter() - intended))
+                executor.submit(self._execute, self._choose(), intended)
+                scheduled += 1
+                self._scheduled = scheduled
+        elapsed = time.perf_counter() - start
+        self._cleanup()
+
+        completed = sum(stat["successes"] + stat["failures"] for stat in self._stats.values())
+        result = {
+            "name": name,
+            "scheduled": scheduled,
+            "completed": completed,
+            "elapsed": elapsed,
+            "offered_rate": scheduled / elapsed if elapsed > 0 else 0.0,
+            "dispatch_lag": dispatch_lag.summary(),
+            "operations": {
+                operation: {
+                    "successes": stat["successes"],
+                    "failures": stat["failures"],
+                    "skipped": stat["skipped"],
+                    "latency": stat["latency"].summary(),
+                    "service": stat["service"].summary(),
+                }
+                for operation, stat in sorted(self._stats.items())
+            },
+        }
+
+        self.tester.log(
+            f"予定リクエスト数: {scheduled}, 完了: {completed}, 実行時間: {elapsed:.3f}秒, "
+            f"送信レート: {result['offered_rate']:.1f}リクエスト/秒"
+        )
+        for operation, summary in result["operations"].items():
+            latency, service = summary["latency"], summary["service"]
+            self.tester.log(
+                f"{operation}: 成功 {summary['successes']} / 失敗 {summary['failures']} / スキップ {summary['skipped']}, "
+                f"p50 {latency['p50']:.3f}ms / p99 {latency['p99']:.3f}ms (サービス時間 p99 {service['p99']:.3f}ms)"
+            )
+        self.tester.log(f"=== シナリオ実行完了: {name} ===")
+        return result
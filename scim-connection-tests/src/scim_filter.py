@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import re
+
+# RFC 7644 3.4.2.2 の比較演算子
+COMPARISON_OPERATORS = ("eq", "ne", "co", "sw", "ew", "gt", "ge", "lt", "le")
+
+# 大文字小文字を区別する属性 (それ以外の文字列比較は区別しない)
+CASE_EXACT_ATTRIBUTES = {"id", "externalid"}
+
+_TOKEN_PATTERN = re.compile(r"""
+    \s*(?:
+        (?P<lparen>\() |
+        (?P<rparen>\)) |
+        (?P<lbracket>\[) |
+        (?P<rbracket>\]) |
+        (?P<string>"(?:[^"\\]|\\.)*") |
+        (?P<number>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?(?![\w:.])) |
+        (?P<word>[A-Za-z][\w\-.:$]*)
+    )
+""", re.VERBOSE)
+
+
+class FilterSyntaxError(ValueError):
+    """SCIMフィルター式の構文エラー"""
+
+
+def tokenize(text):
+    """
+    SCIMフィルター式を字句に分割
+
+    Returns:
+        list: (種別, 値) のリスト
+    """
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN_PATTERN.match(text, position)
+        if not match:
+            raise FilterSyntaxError(f"フィルター式を解析できません (位置 {position}): {text}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "string":
+            value = json.loads(value)
+        elif kind == "number":
+            value = float(value) if any(c in value for c in ".eE") else int(value)
+        tokens.append((kind, value))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    def __init__(self, text):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def take(self, kind=None):
+        token = self.peek()
+        if token[0] is None or (kind is not None and token[0] != kind):
+            raise FilterSyntaxError(f"フィルター式の構文エラー (字句 {self.position}): {self.text}")
+        self.position += 1
+        return token
+
+    def peek_keyword(self, *keywords):
+        kind, value = self.peek()
+        return kind == "word" and value.lower() in keywords
+
+    def parse(self):
+        node = self.parse_or()
+        if self.position != len(self.tokens):
+            raise FilterSyntaxError(f"フィルター式の末尾に不正な字句があります: {self.text}")
+        return node
+
+    def parse_or(self):
+        node = self.parse_and()
+        while self.peek_keyword("or"):
+            self.take()
+            node = ("or", node, self.parse_and())
+        return node
+
+    def parse_and(self):
+        node = self.parse_not()
+        while self.peek_keyword("and"):
+            self.take()
+            node = ("and", node, self.parse_not())
+        return node
+
+    def parse_not(self):
+        if self.peek_keyword("not"):
+            self.take()
+            self.take("lparen")
+            node = self.parse_or()
+            self.take("rparen")
+            return ("not", node)
+        return self.parse_primary()
+
+    def parse_primary(self):
+        if self.peek()[0] == "lparen":
+            self.take()
+            node = self.parse_or()
+            self.take("rparen")
+            return node
+
+        _, path = self.take("word")
+        if self.peek()[0] == "lbracket":
+            self.take()
+            node = self.parse_or()
+            self.take("rbracket")
+            return ("valuePath", path, node)
+
+        _, operator = self.take("word")
+        operator = operator.lower()
+        if operator == "pr":
+            return ("pr", path)
+        if operator not in COMPARISON_OPERATORS:
+            raise FilterSyntaxError(f"未対応の演算子です: {operator}")
+
+        kind, value = self.take()
+        if kind == "word":
+            literals = {"true": True, "false": False, "null": None}
+            if value.lower() not in literals:
+                raise FilterSyntaxError(f"比較値が不正です: {value}")
+            value = literals[value.lower()]
+        elif kind not in ("string", "number"):
+            raise FilterSyntaxError(f"比較値が不正です: {self.text}")
+        return ("compare", path, operator, value)
+
+
+def parse_filter(text):
+    """
+    SCIMフィルター式を構文木に変換
+
+    Args:
+        text (str): SCIMフィルター式 (例: 'userName sw "bulk_" and active eq true')
+
+    Returns:
+        tuple: 構文木 ("and"/"or"/"not"/"compare"/"pr"/"valuePath" を先頭要素とするタプル)
+
+    Raises:
+        FilterSyntaxError: 構文エラーの場合
+    """
+    if not text or not text.strip():
+        raise FilterSyntaxError("フィルター式が空です")
+    return _Parser(text).parse()
+
+
+def _get_ignore_case(container, name):
+    if name in container:
+        return container[name]
+    lowered = name.lower()
+    for key, value in container.items():
+        if key.lower() == lowered:
+            return value
+    return None
+
+
+def _walk(containers, parts):
+    values = containers
+    for part in parts:
+        next_values = []
+        for item in values:
+            if not isinstance(item, dict):
+                continue
+            value = _get_ignore_case(item, part)
+            if value is None:
+                continue
+            if isinstance(value, list):
+                next_values.extend(value)
+            else:
+                next_values.append(value)
+        values = next_values
+    return values
+
+
+def resolve_path(resource, path):
+    """
+    属性パスの値を取得 (複数値属性は展開する)
+
+    URNで修飾されたパス (例: "urn:extic:scim:schemas:1.0:User:extendAttrs.name") は
+    該当する拡張スキーマから、修飾なしのパスはコア属性になければ各拡張スキーマから取得する。
+
+    Returns:
+        list: 値のリスト
+    """
+    if ":" in path:
+        schema, path = path.rsplit(":", 1)
+        container = _get_ignore_case(resource, schema)
+        return _walk([container] if isinstance(container, dict) else [], path.split("."))
+
+    parts = path.split(".")
+    values = _walk([resource], parts)
+    if values:
+        return values
+    extensions = [value for key, value in resource.items() if ":" in key and isinstance(value, dict)]
+    return _walk(extensions, parts)
+
+
+def _compare(actual, operator, expected, case_exact):
+    if isinstance(actual, str) and isinstance(expected, str):
+        if not case_exact:
+            actual = actual.lower()
+            expected = expected.lower()
+        if operator == "co":
+            return expected in actual
+        if operator == "sw":
+            return actual.startswith(expected)
+        if operator == "ew":
+            return actual.endswith(expected)
+    elif operator in ("co", "sw", "ew"):
+        return False
+
+    if operator == "eq":
+        return actual == expected
+    if operator == "ne":
+        return actual != expected
+    try:
+        if operator == "gt":
+            return actual > expected
+        if operator == "ge":
+            return actual >= expected
+        if operator == "lt":
+            return actual < expected
+        if operator == "le":
+            return actual <= expected
+    except TypeError:
+        return False
+    return False
+
+
+def matches(node, resource):
+    """
+    リソースが構文木の条件に一致するか判定
+
+    Args:
+        node (tuple): parse_filter で得た構文木
+        resource (dict): SCIMリソース
+
+    Returns:
+        bool: 一致する場合は True
+    """
+    kind = node[0]
+    if kind == "and":
+        return matches(node[1], resource) and matches(node[2], resource)
+    if kind == "or":
+        return matches(node[1], resource) or matches(node[2], resource)
+    if kind == "not":
+        return not matches(node[1], resource)
+    if kind == "pr":
+        return any(value not in (None, "", [], {}) for value in resolve_path(resource, node[1]))
+    if kind == "valuePath":
+        return any(isinstance(item, dict) and matches(node[2], item) for item in resolve_path(resource, node[1]))
+
+    _, path, operator, expected = node
+    values = resolve_path(resource, path)
+    case_exact = path.rsplit(".", 1)[-1].rsplit(":", 1)[-1].lower() in CASE_EXACT_ATTRIBUTES
+    if operator == "ne":
+        return not values or all(_compare(value, "ne", expected, case_exact) for value in values)
+    if expected is None and operator == "eq":
+        return not values
+    return any(_compare(value, operator, expected, case_exact) for value in values)
+
+
+def compile_filter(text):
+    """
+    SCIMフィルター式を判定関数に変換
+
+    Returns:
+        callable: リソースを受け取り一致するかを返す関数
+    """
+    node = parse_filter(text)
+    return lambda resource: matches(node, resource)
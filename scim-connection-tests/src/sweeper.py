@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import re
+
+from bulk import BulkProvisioner
+from journal import Journal, expand_journal_paths, read_journal
+
+# テストで作成するユーザー名の接頭辞 (後ろに作成時刻のエポック秒が続く)
+DEFAULT_SWEEP_PREFIXES = (
+    "testuser_",
+    "basic_user_",
+    "ext_user_",
+    "bulk_user_",
+    "bench_",
+    "scenario_",
+    "filter_",
+    "propagation_",
+)
+
+# 既定のジャーナルの保存先 (テスターのログと同じ場所)
+DEFAULT_JOURNAL_PATTERN = os.path.join(
+    os.environ.get("EXTIC_LOG_DIR") or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs"),
+    "*_journal.jsonl"
+)
+
+
+class Sweeper:
+    def __init__(self, tester, workers=8, require_epoch=True):
+        """
+        中断したテストが残したユーザーの削除
+
+        ジャーナルに記録されたユーザー、または接頭辞が一致するユーザーを並列に削除する。
+        送信レートはテスターのレート制限 (rate_limit) に従う。
+
+        Args:
+            tester (ExticSCIMTester): リクエスト送信に使用するテスター
+            workers (int): 並列ワーカー数
+            require_epoch (bool): 接頭辞検索で、接頭辞の直後にエポック秒 (10桁以上の数字) が続くユーザーのみ対象とする
+        """
+        self.tester = tester
+        self.workers = workers
+        self.require_epoch = require_epoch
+
+    def from_journal(self, patterns):
+        """
+        ジャーナルから削除されていないユーザーを取得
+
+        Args:
+            patterns (list): ジャーナルファイルのパス (ワイルドカード可)
+
+        Returns:
+            list: {"id", "userName", "journal"} のリスト
+        """
+        paths = expand_journal_paths(patterns)
+        users = read_journal(paths)
+        self.tester.log(f"ジャーナル {len(paths)}件から未削除のユーザー {len(users)}件を検出")
+        return users
+
+    def _matcher(self, prefix):
+        suffix = r"\d{10,}" if self.require_epoch else ""
+        return re.compile(re.escape(prefix) + suffix, re.IGNORECASE)
+
+    def find_by_prefix(self, prefixes):
+        """
+        接頭辞が一致するユーザーを検索
+
+        フィルター (userName sw) を解釈しないサーバーは全件を返すため、結果はクライアント側でも照合する。
+
+        Args:
+            prefixes (list): ユーザー名の接頭辞
+
+        Returns:
+            list: {"id", "userName"} のリスト
+        """
+        users = {}
+        for prefix in prefixes:
+            matcher = self._matcher(prefix)
+            found = 0
+            for user in self.tester.iter_users(filter_query=f'userName sw "{prefix}"'):
+                if user.get("id") and matcher.match(user.get("userName") or ""):
+                    users[user["id"]] = {"id": user["id"], "userName": user["userName"]}
+                    found += 1
+            self.tester.log(f"接頭辞 {prefix} に一致するユーザー: {found}件")
+        return list(users.values())
+
+    def sweep(self, users, dry_run=False):
+        """
+        ユーザーを並列に削除
+
+        削除済み (404) のユーザーは成功として扱い、ジャーナル由来のユーザーは削除をジャーナルに追記する
+        (再実行時に同じユーザーを対象にしない)。
+
+        Args:
+            users (list): {"id", "userName", "journal" (任意)} のリスト
+            dry_run (bool): 対象の表示のみ行い削除しない
+
+        Returns:
+            dict: candidates, deleted, already_deleted, failed と失敗した操作
+        """
+        result = {"candidates": len(users), "deleted": 0, "already_deleted": 0, "failed": 0, "failures": []}
+        if dry_run or not users:
+            for user in users:
+                self.tester.log(f"削除対象: {user['id']} ({user.get('userName')})")
+            return result
+
+        outcome = BulkProvisioner(self.tester, workers=self.workers).delete_users([user["id"] for user in users])
+        gone = set(outcome["deleted"])
+        result["deleted"] = len(gone)
+        for failure in outcome["failures"]:
+            if failure.get("status") == 404:
+                gone.add(failure["path"].rsplit("/", 1)[-1])
+                result["already_deleted"] += 1
+            else:
+                result["failures"].append(failure)
+        result["failed"] = len(result["failures"])
+
+        journals = {}
+        for user in users:
+            if user.get("journal") and user["id"] in gone:
+                journals.setdefault(user["journal"], []).append(user["id"])
+        for path, ids in journals.items():
+            journal = Journal(path)
+            for user_id in ids:
+                journal.deleted(user_id)
+            journal.close()
+        return result
+
+    def run(self, journal_patterns=(), prefixes=(), dry_run=False):
+        """
+        ジャーナルと接頭辞の両方から対象を集めて削除
+
+        Returns:
+            dict: sweep の戻り値
+        """
+        self.tester.log(f"=== 残存ユーザーの削除開始 (ジャーナル: {list(journal_patterns)}, 接頭辞: {list(prefixes)}) ===")
+        users = {}
+        if journal_patterns:
+            users.update((user["id"], user) for user in self.from_journal(journal_patterns))
+        if prefixes:
+            for user in self.find_by_prefix(prefixes):
+                users.setdefault(user["id"], user)
+        result = self.sweep(list(users.values()), dry_run=dry_run)
+        self.tester.log(
+            f"残存ユーザーの削除結果: 対象 {result['candidates']}件, 削除 {result['deleted']}件, "
+            f"削除済み {result['already_deleted']}件, 失敗 {result['failed']}件"
+            + (" (確認のみ)" if dry_run else "")
+        )
+        return result
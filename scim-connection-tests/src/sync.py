@@ -0,0 +1,395 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bulk import BulkProvisioner
+from discovery import CORE_USER_SCHEMA
+
+# 比較・更新の対象外とする属性 (password は作成時のみ送信する)
+IGNORED_ATTRIBUTES = {"schemas", "id", "meta", "password"}
+
+# CSVの複数値列 (exticGroups) の区切り文字
+LIST_SEPARATOR = ";"
+
+# CSVの拡張属性列の接頭辞 (例: "extendAttrs.accessLevel")
+EXTEND_ATTRS_PREFIX = "extendAttrs."
+
+
+def _get_ignore_case(container, name):
+    if not isinstance(container, dict):
+        return None
+    if name in container:
+        return container[name]
+    lowered = name.lower()
+    for key, value in container.items():
+        if key.lower() == lowered:
+            return value
+    return None
+
+
+def _canonical(value):
+    """比較用に正規化 (複数値属性は順序を無視する)"""
+    if isinstance(value, list):
+        items = [_canonical(item) for item in value]
+        return sorted(items, key=lambda item: json.dumps(item, sort_keys=True, ensure_ascii=False))
+    if isinstance(value, dict):
+        return {key: _canonical(item) for key, item in value.items()}
+    return value
+
+
+def _parse_bool(value):
+    lowered = value.strip().lower()
+    if lowered in ("true", "1", "yes"):
+        return True
+    if lowered in ("false", "0", "no"):
+        return False
+    raise ValueError(f"真偽値として解釈できません: {value}")
+
+
+def csv_row_to_user(row, extic_schema):
+    """
+    CSVの1行をSCIMユーザーリソースに変換
+
+    列名は属性パスとして解釈する ("name.givenName" は name の副属性、"email" は emails、
+    "exticGroups" は ";" 区切りのグループ、"extendAttrs.<名前>" は拡張属性)。
+    空欄の列は管理対象外として扱い、出力に含めない。
+
+    Args:
+        row (dict): csv.DictReader の1行
+        extic_schema (str): Extic拡張スキーマのURN
+
+    Returns:
+        dict: SCIMユーザーリソース
+    """
+    user = {}
+    extension = {}
+    extend_attrs = []
+    for column, value in row.items():
+        if column is None or value is None or value.strip() == "":
+            continue
+        column = column.strip()
+        value = value.strip()
+        if column == "exticGroups":
+            extension["exticGroups"] = [group.strip() for group in value.split(LIST_SEPARATOR) if group.strip()]
+        elif column.startswith(EXTEND_ATTRS_PREFIX):
+            extend_attrs.append({"name": column[len(EXTEND_ATTRS_PREFIX):], "value": value})
+        elif column == "email":
+            user["emails"] = [{"value": value, "type": "work", "primary": True}]
+        elif column == "active":
+            user["active"] = _parse_bool(value)
+        elif "." in column:
+            parent, child = column.split(".", 1)
+            user.setdefault(parent, {})[child] = value
+        else:
+            user[column] = value
+    if extend_attrs:
+        extension["extendAttrs"] = extend_attrs
+    user["schemas"] = [CORE_USER_SCHEMA]
+    if extension:
+        user["schemas"].append(extic_schema)
+        user[extic_schema] = extension
+    return user
+
+
+def normalize_user(user, extic_schema):
+    """
+    JSONLのユーザーをサーバーの拡張スキーマURNに合わせる
+
+    トップレベルの exticGroups/extendAttrs と、異なるURNで書かれたExtic拡張を extic_schema の下に移す。
+    """
+    user = dict(user)
+    extension = dict(user.pop(extic_schema, None) or {})
+    for key in list(user):
+        if ":" in key and "extic" in key.lower() and isinstance(user[key], dict):
+            extension.update(user.pop(key))
+    for key in ("exticGroups", "extendAttrs"):
+        if key in user:
+            extension[key] = user.pop(key)
+    user["schemas"] = [CORE_USER_SCHEMA] + ([extic_schema] if extension else [])
+    if extension:
+        user[extic_schema] = extension
+    return user
+
+
+def iter_desired_users(path, extic_schema, file_format=None):
+    """
+    あるべき状態のファイルからユーザーを1件ずつ読み込む
+
+    Args:
+        path (str): CSVまたはJSONLファイルのパス
+        extic_schema (str): Extic拡張スキーマのURN
+        file_format (str): "csv" または "jsonl" (省略時は拡張子から判定)
+
+    Yields:
+        dict: SCIMユーザーリソース
+    """
+    if file_format is None:
+        file_format = "csv" if os.path.splitext(path)[1].lower() == ".csv" else "jsonl"
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if file_format == "csv":
+            for row in csv.DictReader(f):
+                yield csv_row_to_user(row, extic_schema)
+        else:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield normalize_user(json.loads(line), extic_schema)
+                except ValueError as e:
+                    raise ValueError(f"{path}:{line_number}: JSONとして解析できません: {e}") from e
+
+
+def managed_paths(user):
+    """
+    あるべき状態のユーザーが管理する属性パスを列挙
+
+    Returns:
+        list: (親キー, 属性名) のタプル。親キーはコア属性の場合 None、複合属性または拡張スキーマの場合はそのキー
+    """
+    paths = []
+    for key, value in user.items():
+        if key in IGNORED_ATTRIBUTES or key == "userName":
+            continue
+        if isinstance(value, dict):
+            paths.extend((key, attribute) for attribute in value)
+        else:
+            paths.append((None, key))
+    return paths
+
+
+def _value(user, parent, attribute):
+    container = user if parent is None else _get_ignore_case(user, parent)
+    return _get_ignore_case(container, attribute)
+
+
+def project_user(user, paths):
+    """
+    比較に必要な属性のみを抽出 (リモートのスナップショットのメモリ使用量を抑える)
+
+    Args:
+        user (dict): サーバーから取得したユーザー
+        paths (set): managed_paths で得た属性パスの集合
+
+    Returns:
+        dict: {(親キー, 属性名): 正規化済みの値}
+    """
+    return {path: _canonical(_value(user, *path)) for path in paths}
+
+
+def diff_user(desired, remote_projection):
+    """
+    あるべき状態と現在の値の差分からPATCH操作を生成
+
+    Args:
+        desired (dict): あるべき状態のユーザー
+        remote_projection (dict): project_user で得た現在の値
+
+    Returns:
+        list: PATCH操作 (変更された属性のみの replace)
+    """
+    operations = []
+    for parent, attribute in managed_paths(desired):
+        value = _value(desired, parent, attribute)
+        if _canonical(value) == remote_projection.get((parent, attribute)):
+            continue
+        if parent is None:
+            path = attribute
+        elif ":" in parent:
+            path = f"{parent}:{attribute}"
+        else:
+            path = f"{parent}.{attribute}"
+        operations.append({"op": "replace", "path": path, "value": value})
+    return operations
+
+
+class SyncPlan:
+    def __init__(self):
+        """差分同期の実行計画"""
+        self.creates = []
+        self.updates = []
+        self.deletes = []
+        self.unchanged = 0
+
+    def summary(self):
+        """
+        計画の件数
+
+        Returns:
+            dict: create/update/delete/unchanged の件数
+        """
+        return {
+            "create": len(self.creates),
+            "update": len(self.updates),
+            "delete": len(self.deletes),
+            "unchanged": self.unchanged,
+        }
+
+
+class SyncEngine:
+    def __init__(self, tester, workers=8, delete_missing=False, filter_query=None):
+        """
+        あるべき状態のファイルとExticのユーザーを突き合わせる差分同期
+
+        あるべき状態とリモートのスナップショットをそれぞれ userName (大文字小文字を区別しない) で索引化し、
+        作成・変更された属性のみの更新・削除の最小集合を求めて並列に実行する。
+        リモート側は比較対象の属性のみを保持するため、メモリ使用量はユーザー数 × 管理属性数に比例する。
+
+        Args:
+            tester (ExticSCIMTester): リクエスト送信に使用するテスター
+            workers (int): 並列ワーカー数
+            delete_missing (bool): あるべき状態に存在しないユーザーを削除するか
+            filter_query (str): 同期対象とするリモートユーザーのSCIMフィルター (削除対象の範囲を限定する)
+        """
+        if workers < 1:
+            raise ValueError("ワーカー数は1以上を指定してください")
+        self.tester = tester
+        self.workers = workers
+        self.delete_missing = delete_missing
+        self.filter_query = filter_query
+
+    def load_desired(self, path, file_format=None):
+        """
+        あるべき状態のファイルを userName で索引化
+
+        Returns:
+            dict: {小文字のuserName: ユーザー}
+        """
+        extic_schema = self.tester.capabilities.extic_schema
+        desired = {}
+        for user in iter_desired_users(path, extic_schema, file_format):
+            username = user.get("userName")
+            if not username:
+                self.tester.log(f"userNameのないレコードをスキップしました: {user}", level="WARNING")
+                continue
+            key = username.lower()
+            if key in desired:
+                self.tester.log(f"userNameが重複しています (後の行を使用): {username}", level="WARNING")
+            desired[key] = user
+        return desired
+
+    def plan(self, path, file_format=None):
+        """
+        差分同期の実行計画を作成
+
+        Args:
+            path (str): あるべき状態のCSVまたはJSONLファイル
+            file_format (str): "csv" または "jsonl" (省略時は拡張子から判定)
+
+        Returns:
+            SyncPlan: 実行計画
+        """
+        self.tester.log(f"=== 差分同期の計画作成: {path} ===")
+        desired = self.load_desired(path, file_format)
+        paths = set()
+        for user in desired.values():
+            paths.update(managed_paths(user))
+
+        # リモートは比較対象の属性のみを保持する
+        remote = {}
+        for user in self.tester.iter_users(filter_query=self.filter_query):
+            username = user.get("userName")
+            if not username:
+                continue
+            remote[username.lower()] = (
+                user.get("id"),
+                username,
+                (user.get("meta") or {}).get("version"),
+                project_user(user, paths),
+            )
+
+        plan = SyncPlan()
+        for key, user in desired.items():
+            current = remote.pop(key, None)
+            if current is None:
+                plan.creates.append(user)
+                continue
+            user_id, username, version, projection = current
+            operations = diff_user(user, projection)
+            if operations:
+                plan.updates.append({"id": user_id, "userName": username, "version": version,
+                                     "operations": operations})
+            else:
+                plan.unchanged += 1
+        if self.delete_missing:
+            plan.deletes = [{"id": user_id, "userName": username} for user_id, username, _, _ in remote.values()]
+
+        summary = plan.summary()
+        self.tester.log(
+            f"同期計画: 作成 {summary['create']}件, 更新 {summary['update']}件, "
+            f"削除 {summary['delete']}件, 変更なし {summary['unchanged']}件"
+            + ("" if self.delete_missing else f" (削除対象外のリモートユーザー {len(remote)}件)")
+        )
+        return plan
+
+    def _update(self, update):
+        result = self.tester.patch_user(update["id"], update["operations"], version=update["version"])
+        return update, result is not None
+
+    def apply(self, plan):
+        """
+        実行計画を並列に実行
+
+        作成・削除は BulkProvisioner (/Bulk 対応時は一括、非対応時は並列個別リクエスト)、
+        更新は変更された属性のみの PATCH (非対応時は GET + PUT) で行う。
+
+        Args:
+            plan (SyncPlan): 実行計画
+
+        Returns:
+            dict: 実行結果 (各操作の成功件数、失敗一覧、実行時間)
+        """
+        self.tester.log("=== 差分同期の実行 ===")
+        start = time.perf_counter()
+        provisioner = BulkProvisioner(self.tester, workers=self.workers)
+        failures = []
+        result = {"created": 0, "updated": 0, "deleted": 0, "unchanged": plan.unchanged}
+
+        if plan.creates:
+            created = provisioner.create_users(plan.creates)
+            result["created"] = created["succeeded"]
+            failures.extend(dict(failure, operation="create") for failure in created["failures"])
+
+        if plan.updates:
+            self.tester.configure_pool(self.workers)
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(plan.updates))) as executor:
+                for update, ok in executor.map(self._update, plan.updates):
+                    if ok:
+                        result["updated"] += 1
+                    else:
+                        failures.append({"operation": "update", "userName": update["userName"], "id": update["id"]})
+
+        if plan.deletes:
+            deleted = provisioner.delete_users([user["id"] for user in plan.deletes])
+            result["deleted"] = deleted["succeeded"]
+            failures.extend(dict(failure, operation="delete") for failure in deleted["failures"])
+
+        result["failed"] = len(failures)
+        result["failures"] = failures
+        result["elapsed"] = time.perf_counter() - start
+        self.tester.log(
+            f"同期結果: 作成 {result['created']}件, 更新 {result['updated']}件, 削除 {result['deleted']}件, "
+            f"変更なし {result['unchanged']}件, 失敗 {result['failed']}件 ({result['elapsed']:.3f}秒)"
+        )
+        return result
+
+    def run(self, path, file_format=None, dry_run=False):
+        """
+        差分同期を実行
+
+        Args:
+            path (str): あるべき状態のCSVまたはJSONLファイル
+            file_format (str): "csv" または "jsonl" (省略時は拡張子から判定)
+            dry_run (bool): 計画の作成のみ行い、変更を送信しない
+
+        Returns:
+            dict: 実行結果 (dry_run の場合は計画の件数)
+        """
+        plan = self.plan(path, file_format)
+        if dry_run:
+            return dict(plan.summary(), dry_run=True)
+        return self.apply(plan)
@@ -0,0 +1,340 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import random
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+# 再送対象のステータスコード (429: スロットリング, 503: 一時的な過負荷)
+RETRY_STATUSES = (429, 503)
+
+# 接続エラー時に再送してよいメソッド (POSTは二重作成の恐れがあるため対象外)
+IDEMPOTENT_METHODS = ("GET", "HEAD", "PUT", "DELETE", "OPTIONS")
+
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_BASE = 0.5
+DEFAULT_BACKOFF_MAX = 30.0
+DEFAULT_POOL_MAXSIZE = 10
+
+
+def keepalive_socket_options(idle=60, interval=10, count=3):
+    """
+    TCPキープアライブを有効にするソケットオプション
+
+    Args:
+        idle (int): キープアライブ送信までのアイドル時間 (秒)
+        interval (int): キープアライブの送信間隔 (秒)
+        count (int): 切断と判定するまでの未応答回数
+
+    Returns:
+        list: urllib3 の socket_options 形式のリスト
+    """
+    options = list(HTTPConnection.default_socket_options)
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    # Linux は TCP_KEEPIDLE、macOS は TCP_KEEPALIVE
+    idle_option = getattr(socket, "TCP_KEEPIDLE", None) or getattr(socket, "TCP_KEEPALIVE", None)
+    if idle_option is not None:
+        options.append((socket.IPPROTO_TCP, idle_option, idle))
+    if hasattr(socket, "TCP_KEEPINTVL"):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, interval))
+    if hasattr(socket, "TCP_KEEPCNT"):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPCNT, count))
+    return options
+
+
+def parse_retry_after(value):
+    """
+    Retry-Afterヘッダーを秒数に変換
+
+    Args:
+        value (str): 秒数またはHTTP日付
+
+    Returns:
+        float or None: 待機秒数。解釈できない場合は None
+    """
+    if not isinstance(value, str) or not value.strip():
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    def __init__(self, keepalive_idle=60, keepalive_interval=10, keepalive_count=3, **kwargs):
+        """
+        TCPキープアライブ付きのHTTPアダプター
+
+        Args:
+            keepalive_idle (int): キープアライブ送信までのアイドル時間 (秒)
+            keepalive_interval (int): キープアライブの送信間隔 (秒)
+            keepalive_count (int): 切断と判定するまでの未応答回数
+            **kwargs: HTTPAdapter に渡す引数 (pool_connections, pool_maxsize, pool_block)
+        """
+        self.socket_options = keepalive_socket_options(keepalive_idle, keepalive_interval, keepalive_count)
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = self.socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+
+class TokenBucket:
+    def __init__(self, rate=None, burst=None, clock=time.monotonic, sleep=time.sleep):
+        """
+        トークンバケット方式のレート制限 (スレッドセーフ)
+
+        Args:
+            rate (float): 1秒あたりのリクエスト数 (None の場合は制限なし)
+            burst (float): 連続して送信できる最大リクエスト数 (省略時は rate と同じ、最小1)
+            clock (callable): 単調増加クロック
+            sleep (callable): 待機関数
+        """
+        if rate is not None and rate <= 0:
+            raise ValueError("rate は正の値を指定してください")
+        self.rate = rate
+        self.capacity = float(burst or max(1.0, rate or 1.0))
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """トークンを取得できれば 0、できなければ必要な待機秒数を返す"""
+        with self._lock:
+            now = self._clock()
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self.rate is None:
+                return 0.0
+            self._tokens = min(self.capacity, self._tokens + max(0.0, now - self._updated) * self.rate)
+            self._updated = max(now, self._updated)
+            # 浮動小数点の誤差で待機時間が 0 に丸められて空回りしないよう許容誤差を設ける
+            if self._tokens >= 1.0 - 1e-9:
+                self._tokens = max(0.0, self._tokens - 1.0)
+                return 0.0
+            return (1.0 - self._tokens) / self.rate
+
+    def acquire(self):
+        """
+        送信可能になるまで待機
+
+        Returns:
+            float: 待機した秒数
+        """
+        waited = 0.0
+        while True:
+            wait = self._reserve()
+            if wait <= 0:
+                return waited
+            self._sleep(wait)
+            waited += wait
+
+    def pause(self, seconds):
+        """
+        全スレッドの送信を指定秒数停止 (Retry-After の反映)
+
+        停止中はトークンを補充しないため、再開直後にバーストしない。
+        """
+        with self._lock:
+            resume_at = self._clock() + seconds
+            if resume_at > self._paused_until:
+                self._paused_until = resume_at
+                self._tokens = 0.0
+                self._updated = resume_at
+
+
+class Transport:
+    def __init__(self, session, rate_limit=None, burst=None, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff_base=DEFAULT_BACKOFF_BASE, backoff_max=DEFAULT_BACKOFF_MAX,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE, pool_block=True, keepalive_idle=60, timeout=None, log=None,
+                 seed=None, capture=None):
+        """
+        レート制限・再送・コネクションプールを備えたHTTP送信層
+
+        Args:
+            session (requests.Session): 送信に使用するセッション
+            rate_limit (float): 1秒あたりの最大リクエスト数 (None の場合は制限なし)
+            burst (float): 連続して送信できる最大リクエスト数
+            max_retries (int): 429/503・接続エラー時の最大再送回数
+            backoff_base (float): 指数バックオフの基準秒数
+            backoff_max (float): バックオフの上限秒数 (Retry-After がこれを超える場合は再送しない)
+            pool_maxsize (int): ホストごとに保持する接続数
+            pool_block (bool): プールが枯渇した場合に新規接続せず空きを待つか (接続数を pool_maxsize 以下に保つ)
+            keepalive_idle (int): TCPキープアライブ送信までのアイドル時間 (秒)
+            timeout (float): リクエストのタイムアウト (秒、None の場合は指定しない)
+            log (callable): ログ出力関数 (message, level)
+            seed (int): バックオフのジッター用乱数シード
+            capture (TraceWriter): 送信したリクエストとレスポンスの記録先 (None の場合は記録しない)
+        """
+        self.session = session
+        self.bucket = TokenBucket(rate_limit, burst)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.keepalive_idle = keepalive_idle
+        self.pool_block = pool_block
+        self._adapter = None
+        self.timeout = timeout
+        self.capture = capture
+        self._log = log
+        self._rng = random.Random(seed)
+        self._sleep = time.sleep
+        self._lock = threading.Lock()
+        self._counters = {
+            "requests": 0,
+            "retries": 0,
+            "throttled": 0,
+            "unavailable": 0,
+            "connection_errors": 0,
+            "gave_up": 0,
+            "backoff_seconds": 0.0,
+            "rate_limit_wait_seconds": 0.0,
+        }
+        self.mount(pool_maxsize)
+
+    def mount(self, pool_maxsize):
+        """
+        コネクションプールを設定 (以前のプールは新しいプールに切り替えた後に閉じる)
+
+        Args:
+            pool_maxsize (int): ホストごとに保持する接続数
+        """
+        previous = self._adapter
+        self.pool_maxsize = pool_maxsize
+        self._adapter = KeepAliveAdapter(
+            keepalive_idle=self.keepalive_idle,
+            pool_connections=1,
+            pool_maxsize=pool_maxsize,
+            pool_block=self.pool_block,
+        )
+        self.session.mount("http://", self._adapter)
+        self.session.mount("https://", self._adapter)
+        if previous is not None:
+            previous.close()
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def stats(self):
+        """
+        再送・スロットリングの集計
+
+        Returns:
+            dict: requests/retries/throttled/unavailable/connection_errors/gave_up と待機秒数
+        """
+        with self._lock:
+            return dict(self._counters)
+
+    def backoff(self, attempt):
+        """指数バックオフ (フルジッター) の待機秒数"""
+        return self._rng.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _wait(self, seconds, message):
+        if self._log:
+            self._log(message, "WARNING")
+        self._count("backoff_seconds", seconds)
+        self._sleep(seconds)
+
+    def send(self, method, url, record=None, endpoint=None, **kwargs):
+        """
+        リクエストを送信 (レート制限に従い、429/503・接続エラー時は再送)
+
+        Args:
+            method (str): HTTPメソッド ("get", "post", "put", "patch", "delete")
+            url (str): リクエストURL
+            record (callable): 試行ごとに (ステータスコードまたは "error", 秒数) を受け取る関数
+            endpoint (str): capture に記録するエンドポイント名
+            **kwargs: requestsに渡す追加引数
+
+        Returns:
+            requests.Response: 最後の試行のレスポンス
+        """
+        capture = self.capture
+        if capture is None:
+            return self._send(method, url, record, kwargs)
+
+        attempts = 0
+
+        def count(status, seconds):
+            nonlocal attempts
+            attempts += 1
+            if record:
+                record(status, seconds)
+
+        start = time.perf_counter()
+        try:
+            response = self._send(method, url, count, kwargs)
+        except Exception as e:
+            capture.record(method, url, endpoint, kwargs, start, time.perf_counter() - start, attempts, error=e)
+            raise
+        capture.record(method, url, endpoint, kwargs, start, time.perf_counter() - start, attempts, response=response)
+        return response
+
+    def _send(self, method, url, record, kwargs):
+        if self.timeout is not None:
+            kwargs.setdefault("timeout", self.timeout)
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            waited = self.bucket.acquire()
+            if waited:
+                self._count("rate_limit_wait_seconds", waited)
+            self._count("requests")
+
+            start = time.perf_counter()
+            try:
+                response = getattr(self.session, method)(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if record:
+                    record("error", time.perf_counter() - start)
+                self._count("connection_errors")
+                if not idempotent or attempt >= self.max_retries:
+                    raise
+                self._count("retries")
+                self._wait(self.backoff(attempt), f"接続エラーのため再送します ({attempt + 1}/{self.max_retries}): {e}")
+                attempt += 1
+                continue
+            except Exception:
+                if record:
+                    record("error", time.perf_counter() - start)
+                raise
+            if record:
+                record(response.status_code, time.perf_counter() - start)
+
+            status = response.status_code
+            if status not in RETRY_STATUSES:
+                return response
+            self._count("throttled" if status == 429 else "unavailable")
+
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if attempt >= self.max_retries or (retry_after is not None and retry_after > self.backoff_max):
+                self._count("gave_up")
+                return response
+            if retry_after is not None:
+                # 他のスレッドも含めて Retry-After まで送信を止め、再開時の集中はジッターで分散する
+                self.bucket.pause(retry_after)
+                delay = self._rng.uniform(0, self.backoff_base)
+            else:
+                delay = self.backoff(attempt)
+            response.close()
+            self._count("retries")
+            self._wait(delay, f"ステータス {status} のため再送します ({attempt + 1}/{self.max_retries}, "
+                              f"Retry-After: {retry_after})")
+            attempt += 1
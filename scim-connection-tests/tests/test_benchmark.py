@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+import sys
+import os
+
+# srcディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from benchmark import (
+    BASELINE_FORMAT_VERSION,
+    BenchmarkSuite,
+    compare,
+    format_comparison,
+    load_baseline,
+    parse_thresholds,
+    save_baseline,
+)
+
+def result(p50, p99, throughput, errors=0):
+    return {
+        "format_version": BASELINE_FORMAT_VERSION,
+        "scenarios": {
+            "get_by_id": {"requests": 100, "errors": errors, "throughput": throughput,
+                          "latency": {"p50": p50, "p90": p50, "p99": p99}},
+        },
+    }
+
+class TestBenchmark:
+    """ベンチマークのテストケース"""
+
+    def test_suite(self, fake_scim_tester, fake_scim_server, tmp_path):
+        """全シナリオが実行され、作成したユーザーが残らないこと"""
+        suite = BenchmarkSuite(fake_scim_tester, iterations=5, warmup=1, page_sizes=(1, 10), fixture_users=3)
+        baseline = suite.run(label="v1")
+
+        assert sorted(baseline["scenarios"]) == sorted([
+            "list_page_1", "list_page_10", "get_by_id", "filter_eq", "filter_sw", "filter_extension",
+            "create", "update", "delete",
+        ])
+        for name, scenario in baseline["scenarios"].items():
+            assert scenario["errors"] == 0, name
+            assert scenario["latency"]["count"] == 5
+        assert len(fake_scim_server.store) == 0
+
+        path = save_baseline(baseline, str(tmp_path / "baselines" / "v1.json"))
+        assert load_baseline(path)["label"] == "v1"
+
+    def test_parallel_crud(self, fake_scim_tester, fake_scim_server):
+        """並列実行でも作成・更新・削除が対応するユーザーに対して行われること"""
+        suite = BenchmarkSuite(fake_scim_tester, iterations=8, warmup=0, workers=4, page_sizes=(), fixture_users=2)
+        scenarios = suite.run()["scenarios"]
+        assert [scenarios[name]["errors"] for name in ("create", "update", "delete")] == [0, 0, 0]
+
+    def test_compare_regression(self):
+        """しきい値を超えた悪化のみ回帰とみなすこと"""
+        comparison = compare(result(10.0, 50.0, 100.0), result(11.0, 80.0, 80.0))
+        regressed = {row["metric"] for row in comparison["regressions"]}
+        assert regressed == {"p99", "throughput"}
+        assert "回帰" in format_comparison(comparison)
+
+    def test_compare_error_rate(self):
+        """エラーで早く終わった結果はレイテンシが改善してもエラー率の回帰とみなすこと"""
+        comparison = compare(result(10.0, 50.0, 100.0), result(2.0, 5.0, 150.0, errors=30))
+        assert {row["metric"] for row in comparison["regressions"]} == {"error_rate"}
+
+        comparison = compare(result(10.0, 50.0, 100.0), result(0.0, 0.0, 0.0, errors=100))
+        assert [row["metric"] for row in comparison["rows"]] == ["error_rate"]
+        assert comparison["regressions"][0]["current"] == 1.0
+
+    def test_measure_excludes_errors(self, fake_scim_tester):
+        """失敗した回はレイテンシ・スループットに含めないこと"""
+        suite = BenchmarkSuite(fake_scim_tester, iterations=4, warmup=0)
+        measured = suite._measure(lambda index: index % 2 == 0)
+        assert measured["errors"] == 2
+        assert measured["latency"]["count"] == 2
+
+    def test_compare_min_delta(self):
+        """増加幅が小さいパーセンタイルは回帰とみなさないこと"""
+        comparison = compare(result(0.5, 1.0, 100.0), result(0.9, 1.5, 100.0))
+        assert comparison["regressions"] == []
+
+    def test_compare_missing(self):
+        """今回実行されなかったシナリオが報告されること"""
+        comparison = compare(result(10.0, 50.0, 100.0), {"scenarios": {}})
+        assert comparison["missing"] == ["get_by_id"]
+
+    def test_parse_thresholds(self):
+        thresholds = parse_thresholds(["p99=0.5"])
+        assert thresholds["p99"] == 0.5
+        assert thresholds["throughput"] == 0.15
+        assert parse_thresholds(["p99.9=1", "error_rate=0.05"])["error_rate"] == 0.05
+        with pytest.raises(ValueError):
+            parse_thresholds(["p99"])
+        with pytest.raises(ValueError):
+            parse_thresholds(["p95=0.1"])
+
+    def test_load_baseline_version(self, tmp_path):
+        """形式バージョンが異なるベースラインは読み込めないこと"""
+        path = save_baseline({"format_version": 0}, str(tmp_path / "old.json"))
+        with pytest.raises(ValueError):
+            load_baseline(path)
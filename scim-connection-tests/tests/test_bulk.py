@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+from unittest.mock import MagicMock
+import threading
+import sys
+import os
+
+# srcディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from bulk import BulkProvisioner, BULK_REQUEST_SCHEMA
+
+class TestBulkProvisioner:
+    """BulkProvisionerクラスのテストケース"""
+
+    @pytest.fixture
+    def tester(self):
+        """ServiceProviderConfigとリクエスト送信をモックしたテスター"""
+        tester = MagicMock()
+        tester.base_url = "https://test.ex-tic.com/idm/scimApi/1.0"
+        tester.get_service_provider_config.return_value = {"bulk": {"supported": False}}
+        return tester
+
+    def users(self, count):
+        return [{"userName": f"bulk_user_{i}", "displayName": f"ユーザー{i}"} for i in range(count)]
+
+    def response(self, status_code, body=None):
+        response = MagicMock()
+        response.status_code = status_code
+        response.json.return_value = body or {}
+        return response
+
+    def test_parallel_fallback_create(self, tester):
+        """Bulk非対応時は個別POSTを並列実行すること"""
+        lock = threading.Lock()
+        calls = []
+
+        def request(method, endpoint, url, **kwargs):
+            with lock:
+                calls.append((method, endpoint, url))
+            user = kwargs["json"]
+            if user["userName"] == "bulk_user_3":
+                return self.response(409, {"detail": "userName は既に使用されています"})
+            return self.response(201, {"id": "id-" + user["userName"], "userName": user["userName"]})
+
+        tester._request.side_effect = request
+        result = BulkProvisioner(tester, workers=4).create_users(self.users(5))
+
+        assert result["mode"] == "parallel"
+        assert result["succeeded"] == 4
+        assert result["failed"] == 1
+        assert result["failures"][0]["status"] == 409
+        assert result["failures"][0]["userName"] == "bulk_user_3"
+        assert "id-bulk_user_0" in [user["id"] for user in result["created"]]
+        assert all(call[:2] == ("post", "POST /Users") for call in calls)
+        tester.configure_pool.assert_called_with(4)
+
+    def test_parallel_fallback_delete(self, tester):
+        """Bulk非対応時は個別DELETEを並列実行すること"""
+        tester._request.side_effect = lambda method, endpoint, url, **kwargs: (
+            self.response(404) if url.endswith("/missing") else self.response(204)
+        )
+        result = BulkProvisioner(tester).delete_users(["a", "b", "missing"])
+
+        assert result["succeeded"] == 2
+        assert sorted(result["deleted"]) == ["a", "b"]
+        assert result["failures"][0]["path"] == "/Users/missing"
+
+    def test_bulk_chunked_by_max_operations(self, tester):
+        """Bulk対応時はmaxOperationsごとに分割して送信すること"""
+        tester.get_service_provider_config.return_value = {
+            "bulk": {"supported": True, "maxOperations": 2, "maxPayloadSize": 1048576}
+        }
+        bodies = []
+
+        def request(method, endpoint, url, **kwargs):
+            body = kwargs["json"]
+            bodies.append(body)
+            operations = []
+            for op in body["Operations"]:
+                user = op["data"]
+                status = "400" if user["userName"] == "bulk_user_4" else "201"
+                operations.append({
+                    "method": "POST",
+                    "bulkId": op["bulkId"],
+                    "location": f"{tester.base_url}/Users/id-{user['userName']}",
+                    "status": status,
+                    "response": {"detail": "不正な値"} if status == "400" else None,
+                })
+            return self.response(200, {"Operations": operations})
+
+        tester._request.side_effect = request
+        result = BulkProvisioner(tester).create_users(self.users(5))
+
+        assert result["mode"] == "bulk"
+        assert len(bodies) == 3
+        assert all(body["schemas"] == [BULK_REQUEST_SCHEMA] for body in bodies)
+        assert all(len(body["Operations"]) <= 2 for body in bodies)
+        assert result["succeeded"] == 4
+        assert result["failures"][0]["detail"] == "不正な値"
+        assert {user["id"] for user in result["created"]} == {f"id-bulk_user_{i}" for i in range(4)}
+        tester._request.assert_called_with("post", "POST /Bulk", f"{tester.base_url}/Bulk", json=bodies[-1])
+
+    def test_bulk_delete_matched_by_location(self, tester):
+        """DELETEの結果がlocationで対応付けられること"""
+        tester.get_service_provider_config.return_value = {"bulk": {"supported": True, "maxOperations": 10}}
+        tester._request.return_value = self.response(200, {"Operations": [
+            {"method": "DELETE", "location": f"{tester.base_url}/Users/b", "status": "404"},
+            {"method": "DELETE", "location": f"{tester.base_url}/Users/a", "status": "204"},
+        ]})
+        result = BulkProvisioner(tester).delete_users(["a", "b"])
+
+        assert result["deleted"] == ["a"]
+        assert result["failures"][0]["status"] == 404
+
+    def test_bulk_request_error(self, tester):
+        """Bulkリクエスト自体が失敗した場合は全操作が失敗として集計されること"""
+        tester.get_service_provider_config.return_value = {"bulk": {"supported": True, "maxOperations": 10}}
+        tester._request.return_value = self.response(413, {"detail": "ペイロードが大きすぎます"})
+        result = BulkProvisioner(tester).create_users(self.users(3))
+
+        assert result["failed"] == 3
+        assert result["failures"][0]["detail"] == "ペイロードが大きすぎます"
+
+    def test_chunk_by_payload_size(self):
+        """maxPayloadSizeを超えないように分割されること"""
+        operations = [{"method": "POST", "path": "/Users", "data": {"userName": "x" * 100}} for _ in range(5)]
+        chunks = BulkProvisioner._chunk(operations, max_operations=100, max_payload_size=400)
+
+        assert len(chunks) == 3
+        assert sum(len(chunk) for chunk in chunks) == 5
@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+import gzip
+import json
+import sys
+import os
+from unittest.mock import MagicMock
+
+# srcディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from bulk import BulkProvisioner
+from capture import TraceWriter, load_trace
+from endpoints import ENDPOINT_FILTER_USERS
+from extic_tester import ExticSCIMTester
+from fake_scim_server import FakeSCIMServer
+from replay import TraceReplayer, created_ids, endpoint_name
+from transport import Transport
+
+def make_response(status, content=b""):
+    response = MagicMock()
+    response.status_code = status
+    response.headers = {}
+    response.content = content
+    return response
+
+def record_session(server, path, bulk=False):
+    """作成・取得・更新・検索・削除を記録したトレースを作成"""
+    tester = ExticSCIMTester(server.base_url, auth_type="bearer", token="test_token", journal=False, capture=path)
+    user = tester.create_user({"userName": "trace_user", "displayName": "Trace"})
+    tester.get_user_by_id(user["id"])
+    tester.update_user(user["id"], {"userName": "trace_user", "displayName": "Trace Updated"})
+    tester._request("get", ENDPOINT_FILTER_USERS, f'{server.base_url}/Users?filter=id eq "{user["id"]}"')
+    if bulk:
+        created = BulkProvisioner(tester).create_users([{"userName": f"trace_bulk_{i}"} for i in range(2)])
+        BulkProvisioner(tester).delete_users([item["id"] for item in created["created"]])
+    tester.delete_user(user["id"])
+    tester.close()
+    return user
+
+class TestCapture:
+    """トレース記録のテストケース"""
+
+    def test_records_requests(self, fake_scim_server, tmp_path):
+        """メソッド・パス・ボディ・ステータス・レスポンスが記録されること"""
+        path = str(tmp_path / "trace.jsonl.gz")
+        user = record_session(fake_scim_server, path)
+
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+        assert header["type"] == "header"
+        assert header["base_url"] == fake_scim_server.base_url
+
+        records = load_trace([path])
+        assert [(record["method"], record["status"]) for record in records] == [
+            ("POST", 201), ("GET", 200), ("PUT", 200), ("GET", 200), ("DELETE", 204)
+        ]
+        create = records[0]
+        assert create["path"] == "/Users"
+        assert create["endpoint"] == "POST /Users"
+        assert create["body"]["userName"] == "trace_user"
+        assert create["response"]["id"] == user["id"]
+        assert records[-1]["path"] == f"/Users/{user['id']}"
+        assert records[-1]["response"] is None
+        assert all(record["attempts"] == 1 and record["elapsed"] > 0 for record in records)
+        assert [record["offset"] for record in records] == sorted(record["offset"] for record in records)
+
+    def test_records_retries_once(self, tmp_path):
+        """再送したリクエストは最後の試行のステータスと試行回数で1件として記録されること"""
+        path = str(tmp_path / "trace.jsonl.gz")
+        session = MagicMock()
+        session.get.side_effect = [make_response(503), make_response(200, b'{"totalResults": 0}')]
+        transport = Transport(session, seed=0, capture=TraceWriter(path, "https://example.com/scim"))
+        transport._sleep = MagicMock()
+        transport.send("get", "https://example.com/scim/Users", endpoint="GET /Users")
+        session.get.side_effect = ConnectionResetError("reset")
+        with pytest.raises(ConnectionResetError):
+            transport.send("get", "https://example.com/scim/Users/1")
+        transport.capture.close()
+
+        first, second = load_trace([path])
+        assert (first["status"], first["attempts"], first["response"]) == (200, 2, {"totalResults": 0})
+        assert second["status"] == "error"
+        assert second["endpoint"] is None
+        assert "reset" in second["error"]
+
+    def test_truncated_trace(self, fake_scim_server, tmp_path):
+        """末尾が欠けたトレースは読めた記録まで読み込むこと"""
+        path = tmp_path / "trace.jsonl.gz"
+        record_session(fake_scim_server, str(path))
+        data = path.read_bytes()
+        truncated = tmp_path / "truncated.jsonl.gz"
+        truncated.write_bytes(data[:len(data) - 20])
+
+        records = load_trace([str(truncated)])
+        assert 0 < len(records) <= 5
+
+    def test_merge_traces(self, tmp_path):
+        """複数のトレースは記録開始時刻を基準に並べられること"""
+        for name, started_at, offsets in (("a", 100.0, [0.0, 2.0]), ("b", 101.0, [0.5])):
+            with gzip.open(tmp_path / f"{name}.jsonl.gz", "wt", encoding="utf-8") as f:
+                f.write(json.dumps({"type": "header", "version": 1, "base_url": "x", "started_at": started_at}) + "\n")
+                for seq, offset in enumerate(offsets, 1):
+                    f.write(json.dumps({"seq": seq, "offset": offset, "method": "GET", "path": name}) + "\n")
+
+        records = load_trace([str(tmp_path / "*.jsonl.gz")])
+        assert [(record["path"], record["offset"]) for record in records] == [("a", 0.0), ("b", 1.5), ("a", 2.0)]
+
+    def test_missing_trace(self, tmp_path):
+        with pytest.raises(ValueError):
+            load_trace([str(tmp_path / "missing.jsonl.gz")])
+
+
+class TestReplay:
+    """トレース再送のテストケース"""
+
+    @pytest.mark.parametrize("bulk_supported", [False, True])
+    def test_replay_remaps_ids(self, fake_scim_server, tmp_path, bulk_supported):
+        """作成されたIDが再送先のIDに置き換えられ、ステータスが一致すること"""
+        path = str(tmp_path / "trace.jsonl.gz")
+        user = record_session(fake_scim_server, path, bulk=True)
+
+        with FakeSCIMServer(bulk_supported=bulk_supported, seed=1) as target:
+            tester = ExticSCIMTester(target.base_url, auth_type="bearer", token="test_token", journal=False)
+            replayer = TraceReplayer(tester, load_trace([path]), speed=None, concurrency=4)
+            result = replayer.run()
+            tester.close()
+            remaining = len(target.store)
+
+        assert result["unresolved"] == 0
+        assert result["errors"] == 0
+        assert result["remapped"] == 3
+        assert user["id"] not in replayer._id_map.values()
+        if bulk_supported:
+            assert result["status_mismatches"] == 0
+        assert remaining == 0
+        diff = result["endpoints"]["PUT /Users/{id}"]["diff"]
+        assert set(diff) == {"p50", "p90", "p99", "mean"}
+
+    def test_replay_unresolved(self, fake_scim_server, tmp_path):
+        """再送先で作成に失敗した場合、そのIDを参照するリクエストは送信しないこと"""
+        path = str(tmp_path / "trace.jsonl.gz")
+        record_session(fake_scim_server, path)
+
+        with FakeSCIMServer(seed=1) as target:
+            target.store.create({"userName": "trace_user"})
+            tester = ExticSCIMTester(target.base_url, auth_type="bearer", token="test_token", journal=False)
+            result = TraceReplayer(tester, load_trace([path]), speed=None, wait_timeout=5).run()
+            tester.close()
+
+        assert result["replayed"] == 1
+        assert result["unresolved"] == 4
+        assert result["status_mismatches"] == 1
+
+    def test_replay_time_scaling(self, tmp_path):
+        """記録時の送信間隔を速度の倍率で縮めて再送すること"""
+        with FakeSCIMServer(seed=0) as server:
+            with gzip.open(tmp_path / "trace.jsonl.gz", "wt", encoding="utf-8") as f:
+                f.write(json.dumps({"type": "header", "version": 1, "base_url": "x", "started_at": 0}) + "\n")
+                for seq, offset in enumerate((0.0, 0.3, 0.6), 1):
+                    f.write(json.dumps({"seq": seq, "offset": offset, "method": "GET", "path": "/Users?count=1",
+                                        "body": None, "status": 200, "elapsed": 0.01}) + "\n")
+            tester = ExticSCIMTester(server.base_url, auth_type="bearer", token="test_token", journal=False)
+            result = TraceReplayer(tester, load_trace([str(tmp_path / "trace.jsonl.gz")]), speed=2).run()
+            tester.close()
+
+        assert result["replayed"] == 3
+        assert result["status_mismatches"] == 0
+        assert 0.3 <= result["elapsed"] < 0.6
+        assert list(result["endpoints"]) == ["GET /Users"]
+
+    def test_created_ids(self):
+        assert created_ids("POST", 201, {"id": "a"}) == [(None, "a")]
+        assert created_ids("POST", 409, {"id": "a"}) == []
+        assert created_ids("GET", 200, {"id": "a"}) == []
+        bulk = {"Operations": [
+            {"method": "POST", "bulkId": "b1", "status": "201", "location": "https://x/Users/u1"},
+            {"method": "DELETE", "status": "204", "location": "https://x/Users/u2"},
+            {"method": "POST", "status": "201", "location": "https://x/Users/u3"},
+        ]}
+        assert created_ids("POST", 200, bulk) == [("b1", "u1"), (2, "u3")]
+
+    def test_endpoint_name(self):
+        assert endpoint_name({"method": "GET", "path": "/Users/abc?attributes=id"}) == "GET /Users/{id}"
+        assert endpoint_name({"method": "GET", "path": "/Users", "endpoint": "GET /Users"}) == "GET /Users"
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+import json
+import sys
+import os
+from unittest.mock import MagicMock
+
+# srcディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from discovery import CapabilityDiscovery, ServerCapabilities, DEFAULT_EXTIC_USER_SCHEMA
+from extic_tester import ExticSCIMTester, apply_patch_operations
+from fake_scim_server import EXTIC_USER_SCHEMA
+
+SERVICE_PROVIDER_CONFIG = {
+    "patch": {"supported": True},
+    "bulk": {"supported": True, "maxOperations": 50, "maxPayloadSize": 1048576},
+    "filter": {"supported": True, "maxResults": 500},
+    "etag": {"supported": True},
+}
+
+RESOURCE_TYPES = {
+    "Resources": [{
+        "id": "User",
+        "endpoint": "/Users",
+        "schemaExtensions": [{"schema": "urn:example:extic:2.0:User", "required": False}],
+    }]
+}
+
+def discovery_tester(base_url="https://test.ex-tic.com/idm/scimApi/1.0"):
+    """ディスカバリー用のモックテスター"""
+    tester = MagicMock()
+    tester.base_url = base_url
+
+    def request(method, endpoint, url, **kwargs):
+        response = MagicMock()
+        if url.endswith("/ServiceProviderConfig"):
+            response.json.return_value = SERVICE_PROVIDER_CONFIG
+        elif url.endswith("/ResourceTypes"):
+            response.json.return_value = RESOURCE_TYPES
+        else:
+            response.json.return_value = {"Resources": []}
+        return response
+
+    tester._request.side_effect = request
+    return tester
+
+class TestCapabilityDiscovery:
+    """SCIM機能検出のテストケース"""
+
+    def test_capabilities(self, tmp_path):
+        """ServiceProviderConfig/ResourceTypesから機能・上限値が取得されること"""
+        capabilities = CapabilityDiscovery(discovery_tester(), cache_dir=str(tmp_path)).discover()
+
+        assert capabilities.max_results == 500
+        assert capabilities.bulk_supported is True
+        assert capabilities.bulk_max_operations == 50
+        assert capabilities.patch_supported is True
+        assert capabilities.etag_supported is True
+        assert capabilities.extic_schema == "urn:example:extic:2.0:User"
+
+    def test_defaults(self):
+        """機能情報が取得できない場合は既定値になること"""
+        capabilities = ServerCapabilities()
+        assert capabilities.max_results is None
+        assert capabilities.bulk_supported is False
+        assert capabilities.extic_schema == DEFAULT_EXTIC_USER_SCHEMA
+
+    def test_disk_cache(self, tmp_path):
+        """2回目以降のインスタンスはサーバーに問い合わせないこと"""
+        first = discovery_tester()
+        CapabilityDiscovery(first, cache_dir=str(tmp_path)).discover()
+        assert first._request.call_count == 3
+
+        second = discovery_tester()
+        capabilities = CapabilityDiscovery(second, cache_dir=str(tmp_path)).discover()
+        assert second._request.call_count == 0
+        assert capabilities.max_results == 500
+
+    def test_cache_keyed_by_base_url(self, tmp_path):
+        """ベースURLが異なる場合はキャッシュを共有しないこと"""
+        CapabilityDiscovery(discovery_tester(), cache_dir=str(tmp_path)).discover()
+
+        other = discovery_tester("https://other.ex-tic.com/idm/scimApi/1.0")
+        CapabilityDiscovery(other, cache_dir=str(tmp_path)).discover()
+        assert other._request.call_count == 3
+
+    def test_cache_expired(self, tmp_path):
+        """TTLを過ぎたキャッシュは使用されないこと"""
+        discovery = CapabilityDiscovery(discovery_tester(), cache_dir=str(tmp_path))
+        discovery.discover()
+        with open(discovery.cache_file, encoding="utf-8") as f:
+            data = json.load(f)
+        data["fetched_at"] -= 7200
+        with open(discovery.cache_file, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+        tester = discovery_tester()
+        CapabilityDiscovery(tester, cache_dir=str(tmp_path), ttl=3600).discover()
+        assert tester._request.call_count == 3
+
+    def test_failure_not_cached(self, tmp_path):
+        """ServiceProviderConfigの取得に失敗した場合はキャッシュされないこと"""
+        tester = discovery_tester()
+        tester._request.side_effect = Exception("Connection error")
+        discovery = CapabilityDiscovery(tester, cache_dir=str(tmp_path))
+
+        assert discovery.discover().max_results is None
+        assert not os.path.exists(discovery.cache_file)
+
+    def test_failure_retried(self, tmp_path):
+        """取得に失敗した場合の既定値は再取得時刻まで使い、その後は再取得すること"""
+        tester = discovery_tester()
+        request = tester._request.side_effect
+        tester._request.side_effect = Exception("Connection error")
+        discovery = CapabilityDiscovery(tester, cache_dir=str(tmp_path), retry_interval=60)
+
+        assert discovery.discover().max_results is None
+        assert discovery.discover().max_results is None
+        assert tester._request.call_count == 1
+
+        tester._request.side_effect = request
+        discovery._retry_at = 0
+        assert discovery.discover().max_results == 500
+        assert os.path.exists(discovery.cache_file)
+
+    def test_refresh(self, tmp_path):
+        """refresh指定時はキャッシュを無視して再取得すること"""
+        tester = discovery_tester()
+        discovery = CapabilityDiscovery(tester, cache_dir=str(tmp_path))
+        discovery.discover()
+        discovery.discover()
+        assert tester._request.call_count == 3
+
+        discovery.discover(refresh=True)
+        assert tester._request.call_count == 6
+
+    def test_fake_server(self, fake_scim_tester, fake_scim_server):
+        """インプロセスSCIMサーバーの機能情報が検出され、2つ目のテスターはキャッシュを使うこと"""
+        capabilities = fake_scim_tester.capabilities
+        assert capabilities.max_results == fake_scim_server.max_results
+        assert capabilities.extic_schema == EXTIC_USER_SCHEMA
+        assert capabilities.patch_supported is False
+
+        tester = ExticSCIMTester(fake_scim_server.base_url, auth_type="bearer", token="test_token")
+        tester.capabilities
+        tester.close()
+        assert fake_scim_server.request_counts["GET /ServiceProviderConfig"] == 1
+
+    def test_patch_fallback(self, fake_scim_tester):
+        """PATCH非対応サーバーではGETとPUTで部分更新されること"""
+        user = fake_scim_tester.create_user({
+            "schemas": ["urn:ietf:params:scim:schemas:core:2.0:User", EXTIC_USER_SCHEMA],
+            "userName": "patch_user",
+            "displayName": "変更前",
+            EXTIC_USER_SCHEMA: {"exticGroups": ["基本ユーザーグループ"]},
+        })
+
+        updated = fake_scim_tester.patch_user(user["id"], [
+            {"op": "replace", "path": "displayName", "value": "変更後"},
+            {"op": "add", "path": f"{EXTIC_USER_SCHEMA}:exticGroups", "value": ["研究グループ"]},
+        ])
+        assert updated["displayName"] == "変更後"
+        assert updated[EXTIC_USER_SCHEMA]["exticGroups"] == ["基本ユーザーグループ", "研究グループ"]
+        assert fake_scim_tester.metrics.histogram("PATCH /Users/{id}", 200) is None
+        assert fake_scim_tester.metrics.histogram("PUT /Users/{id}", 200).count == 1
+
+class TestApplyPatchOperations:
+    """PATCH操作のローカル適用のテストケース"""
+
+    def test_operations(self):
+        """add/replace/removeが適用されること"""
+        resource = {"userName": "a", "name": {"givenName": "太郎"}, "title": "x"}
+        apply_patch_operations(resource, [
+            {"op": "replace", "path": "name.familyName", "value": "山田"},
+            {"op": "remove", "path": "title"},
+            {"op": "add", "value": {"active": False}},
+        ])
+        assert resource == {"userName": "a", "name": {"givenName": "太郎", "familyName": "山田"}, "active": False}
+
+    def test_value_filter_unsupported(self):
+        """値フィルター付きパスはエラーになること"""
+        with pytest.raises(ValueError):
+            apply_patch_operations({}, [{"op": "remove", "path": 'emails[type eq "work"]'}])
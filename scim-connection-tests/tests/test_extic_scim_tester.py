@@ -49,6 +49,24 @@ class TestExticSCIMTester:
         assert tester.password == "testpass"
         assert mock_session.auth == ("testuser", "testpass")
     
+    def test_default_log_file_unique(self, mock_session, log_dir):
+        """同じ秒に作成したテスターがログ・ジャーナルを共有せず、close で終了時処理の登録を解除すること"""
+        testers = [
+            ExticSCIMTester(base_url="https://test.ex-tic.com/idm/scimApi/1.0", auth_type="bearer", token="t")
+            for _ in range(2)
+        ]
+        try:
+            assert testers[0].log_file != testers[1].log_file
+            assert testers[0].journal.path != testers[1].journal.path
+            assert f"_{os.getpid()}_" in os.path.basename(testers[0].log_file)
+            assert os.path.dirname(testers[0].log_file) == log_dir
+        finally:
+            with patch("extic_tester.atexit.unregister") as unregister:
+                for tester in testers:
+                    tester.close()
+        assert unregister.call_count == 2
+        unregister.assert_called_with(testers[1].close)
+    
     def test_init_bearer_auth(self, mock_session):
         """Bearer認証での初期化テスト"""
         tester = ExticSCIMTester(
@@ -199,3 +217,108 @@ class TestExticSCIMTester:
         mock_session.delete.assert_called_with(
             "https://test.ex-tic.com/idm/scimApi/1.0/Users/user_id"
         )
+    
+    def test_request_latency_recorded(self, tester, mock_session):
+        """リクエストのレイテンシがエンドポイント・ステータス別に記録されること"""
+        # モックレスポンスの設定
+        mock_response = MagicMock()
+        mock_response.status_code = 404
+        mock_response.raise_for_status.side_effect = Exception("404 Not Found")
+        mock_session.get.return_value = mock_response
+        mock_session.delete.side_effect = Exception("connection reset")
+        
+        # テスト実行
+        tester.get_user_by_id("missing")
+        tester.delete_user("user_id")
+        
+        # 検証
+        report = tester.metrics.report()
+        assert report["endpoints"]["GET /Users/{id}"]["404"]["count"] == 1
+        assert report["endpoints"]["DELETE /Users/{id}"]["error"]["count"] == 1
+    
+    def paged_users_response(self, total, max_results):
+        """startIndex/countに応じたページを返すモックレスポンス生成関数"""
+        requested = []
+        
+        def get(url, **kwargs):
+            response = MagicMock()
+            response.status_code = 200
+            if url.endswith("/ServiceProviderConfig"):
+                response.json.return_value = {"filter": {"supported": True, "maxResults": max_results}}
+                return response
+            if url.endswith("/Schemas") or url.endswith("/ResourceTypes"):
+                response.json.return_value = {}
+                return response
+            params = dict(p.split("=", 1) for p in url.split("?", 1)[1].split("&"))
+            start_index, count = int(params["startIndex"]), int(params["count"])
+            requested.append((start_index, count))
+            end = min(total, start_index - 1 + min(count, max_results))
+            response.json.return_value = {
+                "totalResults": total,
+                "startIndex": start_index,
+                "Resources": [{"id": str(i), "userName": f"user{i}"} for i in range(start_index, end + 1)]
+            }
+            return response
+        
+        return get, requested
+    
+    def test_iter_users(self, tester, mock_session):
+        """全ページのユーザーが順番に返されること"""
+        get, requested = self.paged_users_response(total=25, max_results=10)
+        mock_session.get.side_effect = get
+        
+        # テスト実行
+        users = list(tester.iter_users())
+        
+        # 検証
+        assert [u["id"] for u in users] == [str(i) for i in range(1, 26)]
+        assert requested == [(1, 10), (11, 10), (21, 10)]
+    
+    def test_iter_users_page_size_capped(self, tester, mock_session):
+        """ページサイズがサーバーのmaxResultsを超えないこと"""
+        get, requested = self.paged_users_response(total=5, max_results=3)
+        mock_session.get.side_effect = get
+        
+        # テスト実行
+        users = list(tester.iter_users(page_size=50, prefetch=False))
+        
+        # 検証
+        assert len(users) == 5
+        assert requested == [(1, 3), (4, 3)]
+    
+    def test_iter_users_lazy(self, tester, mock_session):
+        """途中で走査を打ち切った場合に残りのページを取得しないこと"""
+        get, requested = self.paged_users_response(total=1000, max_results=10)
+        mock_session.get.side_effect = get
+        
+        # テスト実行
+        iterator = tester.iter_users()
+        first = [next(iterator) for _ in range(5)]
+        iterator.close()
+        
+        # 検証 (現在のページと先読みした1ページのみ)
+        assert first[0]["id"] == "1"
+        assert len(requested) <= 2
+    
+    def test_configure_pool(self, tester, mock_session):
+        """コネクションプールが指定サイズで設定されること"""
+        tester.configure_pool(16)
+        
+        mounted = {call.args[0]: call.args[1] for call in mock_session.mount.call_args_list}
+        assert set(mounted) == {"http://", "https://"}
+        assert mounted["https://"]._pool_maxsize == 16
+    
+    def test_configure_pool_grow_only(self, tester, mock_session):
+        """現在のサイズ以下では再設定せず、拡張時は以前のプールを閉じること"""
+        tester.configure_pool(16)
+        previous = mock_session.mount.call_args.args[1]
+        mock_session.mount.reset_mock()
+        
+        tester.configure_pool(8)
+        tester.configure_pool(16)
+        assert not mock_session.mount.called
+        
+        with patch.object(previous, "close") as close:
+            tester.configure_pool(32)
+        close.assert_called_once()
+        assert mock_session.mount.call_args.args[1]._pool_maxsize == 32
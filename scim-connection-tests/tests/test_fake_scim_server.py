@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+import requests
+import time
+import sys
+import os
+
+# srcディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from bulk import BulkProvisioner
+from extic_tester import ExticSCIMTester
+from fake_scim_server import FakeSCIMServer, EXTIC_USER_SCHEMA
+
+def new_user(username, group="基本ユーザーグループ", access_level="basic"):
+    return {
+        "schemas": ["urn:ietf:params:scim:schemas:core:2.0:User", EXTIC_USER_SCHEMA],
+        "userName": username,
+        "password": "TestP@ssw0rd",
+        "displayName": "テストユーザー",
+        EXTIC_USER_SCHEMA: {
+            "exticGroups": [group],
+            "extendAttrs": [{"name": "accessLevel", "value": access_level}],
+        },
+    }
+
+class TestFakeSCIMServer:
+    """インプロセスSCIMサーバーのテストケース"""
+
+    def test_crud_via_tester(self, fake_scim_tester, fake_scim_server):
+        """テスターのCRUD操作がそのまま動作すること"""
+        assert fake_scim_tester.test_connection() is True
+        assert fake_scim_tester.test_user_create_update_delete() is True
+        assert fake_scim_tester.test_group_based_access() is True
+        assert fake_scim_tester.test_extended_attributes() is True
+        assert len(fake_scim_server.store) == 0
+
+    def test_duplicate_username(self, fake_scim_tester, fake_scim_server):
+        """userNameの重複が409になること"""
+        assert fake_scim_tester.create_user(new_user("dup_user")) is not None
+        assert fake_scim_tester.create_user(new_user("DUP_USER")) is None
+        assert fake_scim_tester.metrics.histogram("POST /Users", 409).count == 1
+
+    def test_password_not_returned(self, fake_scim_tester):
+        """パスワードがレスポンスに含まれないこと"""
+        user = fake_scim_tester.create_user(new_user("secret_user"))
+        assert "password" not in user
+        assert fake_scim_tester.get_user_by_username("secret_user")["id"] == user["id"]
+
+    def test_filter(self, fake_scim_tester, fake_scim_server):
+        """拡張属性フィルターが実際に絞り込まれること"""
+        fake_scim_server.seed_users(5, prefix="basic")
+        fake_scim_server.seed_users(3, prefix="adv", group="研究グループ", access_level="advanced")
+
+        users = list(fake_scim_tester.iter_users(
+            filter_query='(extendAttrs.name eq "accessLevel") and (extendAttrs.value eq "advanced")'
+        ))
+        assert sorted(user["userName"] for user in users) == ["adv_0", "adv_1", "adv_2"]
+
+    def test_invalid_filter(self, fake_scim_server):
+        """不正なフィルターが400 invalidFilterになること"""
+        response = requests.get(
+            f"{fake_scim_server.base_url}/Users", params={"filter": "userName like \"x\""},
+            headers={"Authorization": "Bearer test"}
+        )
+        assert response.status_code == 400
+        assert response.json()["scimType"] == "invalidFilter"
+
+    def test_invalid_paging(self, fake_scim_server):
+        """整数でない startIndex / count が400 invalidValueになること"""
+        for params in ({"startIndex": "abc"}, {"count": "1.5"}):
+            response = requests.get(
+                f"{fake_scim_server.base_url}/Users", params=params,
+                headers={"Authorization": "Bearer test"}
+            )
+            assert response.status_code == 400
+            assert response.json()["scimType"] == "invalidValue"
+
+    def test_unauthorized(self, fake_scim_server):
+        """Authorizationヘッダーがない場合は401になること"""
+        assert requests.get(f"{fake_scim_server.base_url}/Users").status_code == 401
+
+    def test_pagination_capped_by_max_results(self, fake_scim_tester, fake_scim_server):
+        """maxResultsを超える件数が返されず、全件走査できること"""
+        fake_scim_server.max_results = 7
+        fake_scim_server.seed_users(30)
+
+        page = fake_scim_tester.get_users(start_index=1, count=100)
+        assert page["totalResults"] == 30
+        assert len(page["Resources"]) == 7
+        assert len(list(fake_scim_tester.iter_users())) == 30
+
+    def test_discovery_documents(self, fake_scim_server):
+        """ServiceProviderConfig/Schemas/ResourceTypesにExtic拡張スキーマが含まれること"""
+        headers = {"Authorization": "Bearer test"}
+        base_url = fake_scim_server.base_url
+        config = requests.get(f"{base_url}/ServiceProviderConfig", headers=headers).json()
+        schemas = requests.get(f"{base_url}/Schemas", headers=headers).json()
+        resource_types = requests.get(f"{base_url}/ResourceTypes", headers=headers).json()
+
+        assert config["filter"]["maxResults"] == 200
+        assert EXTIC_USER_SCHEMA in [schema["id"] for schema in schemas["Resources"]]
+        assert resource_types["Resources"][0]["schemaExtensions"][0]["schema"] == EXTIC_USER_SCHEMA
+
+    def test_bulk(self, fake_scim_tester, fake_scim_server):
+        """Bulk対応時に/Bulkで一括作成・削除されること"""
+        fake_scim_server.bulk_supported = True
+        fake_scim_server.bulk_max_operations = 4
+        provisioner = BulkProvisioner(fake_scim_tester)
+
+        created = provisioner.create_users([new_user(f"bulk_user_{i}") for i in range(10)])
+        assert created["mode"] == "bulk"
+        assert created["succeeded"] == 10
+        assert fake_scim_server.request_counts["POST /Bulk"] == 3
+
+        deleted = provisioner.delete_users([user["id"] for user in created["created"]])
+        assert deleted["succeeded"] == 10
+        assert len(fake_scim_server.store) == 0
+
+    @pytest.mark.performance
+    def test_latency_injection(self, fake_scim_tester, fake_scim_server):
+        """エンドポイント別のレイテンシが注入されること"""
+        fake_scim_server.latency = {"GET /Users": 0.05, "*": ("uniform", 0.0, 0.001)}
+
+        start = time.perf_counter()
+        fake_scim_tester.get_users()
+        assert time.perf_counter() - start >= 0.05
+
+        summary = fake_scim_tester.metrics.histogram("GET /Users", 200).summary()
+        assert summary["min"] >= 50.0
+
+    def test_throttle_injection(self, fake_scim_server):
+        """429がRetry-After付きで返されること"""
+        fake_scim_server.throttle_rate = {"GET /Users": 1.0}
+        fake_scim_server.retry_after = 3
+
+        response = requests.get(f"{fake_scim_server.base_url}/Users", headers={"Authorization": "Bearer test"})
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "3"
+
+    def test_error_injection(self):
+        """指定した確率でエラーが注入されること"""
+        with FakeSCIMServer(error_rate=0.5, error_status=503, seed=1) as server:
+            tester = ExticSCIMTester(server.base_url, auth_type="bearer", token="test_token", max_retries=0)
+            for _ in range(40):
+                tester.get_users()
+            tester.close()
+
+            report = tester.metrics.report()["endpoints"]["GET /Users"]
+            assert 5 < report["503"]["count"] < 35
+            assert report["200"]["count"] + report["503"]["count"] == 40
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+from unittest.mock import patch
+import sys
+import os
+
+# srcディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from bulk import BulkProvisioner
+from extic_tester import ExticSCIMTester
+from fake_scim_server import FakeSCIMServer
+from filter_matrix import FilterMatrixBenchmark
+
+@pytest.mark.performance
+class TestFilterMatrixBenchmark:
+    """フィルター検索ベンチマークのテストケース"""
+
+    def test_run(self, fake_scim_tester, fake_scim_server):
+        """件数ごとに計測され、正しく絞り込むサーバーでは警告が出ないこと"""
+        benchmark = FilterMatrixBenchmark(fake_scim_tester, sizes=(120, 30), iterations=2, warmup=0, workers=4)
+        result = benchmark.run()
+
+        assert result["config"]["sizes"] == [30, 120]
+        assert result["collection"] == {"30": 30, "120": 120}
+        assert result["flagged"] == []
+        results = result["filters"]["sw_username"]["results"]
+        assert results["30"]["total_results"] == 30
+        assert results["120"]["total_results"] == 100
+        assert result["filters"]["eq_username"]["results"]["120"]["total_results"] == 1
+        assert result["filters"]["ext_access_level"]["results"]["120"]["expected"] == 2
+        assert result["filters"]["pr_emails"]["results"]["120"]["expected"] == 60
+        assert result["filters"]["pr_emails"]["bytes_growth"] > 1
+        assert "latency_exponent" in result["filters"]["eq_username"]
+        assert len(fake_scim_server.store) == 0
+
+    def test_partial_seed_cleaned_up(self, fake_scim_tester, fake_scim_server):
+        """投入に一部失敗した場合も作成済みのユーザーが削除されること"""
+        create_users = BulkProvisioner.create_users
+
+        def create_some(provisioner, users):
+            result = create_users(provisioner, users[1:])
+            result["failed"] = [users[0]["userName"]]
+            return result
+
+        with patch.object(BulkProvisioner, "create_users", autospec=True, side_effect=create_some):
+            with pytest.raises(RuntimeError):
+                FilterMatrixBenchmark(fake_scim_tester, sizes=(10,), iterations=1, warmup=0, workers=2).run()
+
+        assert len(fake_scim_server.store) == 0
+
+    def test_flags_full_collection(self):
+        """フィルターを無視して全件を返すサーバーでは全件として警告されること"""
+        with FakeSCIMServer(simple_filters=True, seed=0) as server:
+            tester = ExticSCIMTester(server.base_url, auth_type="bearer", token="test_token")
+            try:
+                result = FilterMatrixBenchmark(tester, sizes=(20,), iterations=1, warmup=0, workers=2).run()
+            finally:
+                tester.close()
+
+        flagged = {item["filter"]: item["flags"] for item in result["flagged"]}
+        assert "eq_username" not in flagged
+        assert "eq_display_name" not in flagged
+        assert flagged["co_display_name"] == ["full_collection", "mismatch"]
+        assert flagged["ext_access_level"] == ["full_collection", "mismatch"]
+        assert len(server.store) == 0
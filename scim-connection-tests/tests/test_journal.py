@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+import json
+import sys
+import os
+import threading
+from unittest.mock import patch
+
+# srcディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from bulk import BulkProvisioner
+from extic_tester import ExticSCIMTester
+from fake_scim_server import FakeSCIMServer
+from journal import Journal, expand_journal_paths, read_journal
+from sweeper import Sweeper
+
+class TestJournal:
+    """ジャーナルのテストケース"""
+
+    def test_created_and_deleted(self, tmp_path):
+        """削除されていないユーザーのみ読み出されること"""
+        path = str(tmp_path / "journal.jsonl")
+        journal = Journal(path)
+        journal.created("id-1", "user_1")
+        journal.created("id-2", "user_2")
+        journal.deleted("id-1")
+        journal.close()
+
+        assert read_journal([path]) == [{"id": "id-2", "userName": "user_2", "journal": path}]
+
+    def test_file_created_lazily(self, tmp_path):
+        """記録がない場合はファイルを作成しないこと"""
+        path = tmp_path / "journal.jsonl"
+        journal = Journal(str(path))
+        journal.flush()
+        journal.close()
+        assert not path.exists()
+
+    def test_writes_batched(self, tmp_path):
+        """まとめて積まれた記録は1回の書き込みで処理されること"""
+        path = str(tmp_path / "journal.jsonl")
+        journal = Journal(path, fsync=False)
+        # 101件を積み終えるまで書き込みスレッドを待機させる
+        gate = threading.Event()
+        run = journal._run
+        journal._run = lambda: (gate.wait(), run())
+        with patch.object(Journal, "_write", autospec=True, side_effect=Journal._write) as write:
+            for index in range(101):
+                journal.created(f"id-{index}")
+            gate.set()
+            journal.flush()
+            assert write.call_count == 1
+            assert len(write.call_args.args[2]) == 101
+            journal.close()
+        assert len(read_journal([path])) == 101
+
+    def test_torn_line_ignored(self, tmp_path):
+        """異常終了で書きかけになった行は読み飛ばすこと"""
+        path = tmp_path / "journal.jsonl"
+        path.write_text(
+            json.dumps({"op": "create", "id": "id-1", "userName": "a"}) + "\n" + '{"op": "create", "id": "id-',
+            encoding="utf-8"
+        )
+        assert [user["id"] for user in read_journal([str(path)])] == ["id-1"]
+
+    def test_expand_paths(self, tmp_path):
+        for name in ("a_journal.jsonl", "b_journal.jsonl"):
+            (tmp_path / name).write_text("", encoding="utf-8")
+        pattern = str(tmp_path / "*_journal.jsonl")
+        assert len(expand_journal_paths([pattern, pattern])) == 2
+        assert expand_journal_paths([str(tmp_path / "missing.jsonl")]) == []
+
+
+class TestTesterJournal:
+    """テスターのジャーナル記録のテストケース"""
+
+    @pytest.mark.parametrize("bulk_supported", [False, True])
+    def test_records_creates_and_deletes(self, tmp_path, bulk_supported):
+        """個別リクエスト・Bulkのいずれでも作成と削除が記録されること"""
+        path = str(tmp_path / "journal.jsonl")
+        with FakeSCIMServer(bulk_supported=bulk_supported, seed=0) as server:
+            tester = ExticSCIMTester(server.base_url, auth_type="bearer", token="test_token", journal=path)
+            single = tester.create_user({"userName": "journal_single"})
+            created = BulkProvisioner(tester).create_users([{"userName": f"journal_bulk_{i}"} for i in range(3)])
+            BulkProvisioner(tester).delete_users([created["created"][0]["id"]])
+            tester.delete_user(single["id"])
+            tester.close()
+
+        pending = read_journal([path])
+        assert sorted(user["userName"] for user in pending) == ["journal_bulk_1", "journal_bulk_2"]
+
+    def test_disabled(self, fake_scim_server):
+        tester = ExticSCIMTester(fake_scim_server.base_url, auth_type="bearer", token="test_token", journal=False)
+        assert tester.journal is None
+        assert tester.create_user({"userName": "no_journal"}) is not None
+        tester.close()
+
+
+class TestSweeper:
+    """残存ユーザー削除のテストケース"""
+
+    def test_sweep_journal(self, fake_scim_server, tmp_path):
+        """ジャーナルの未削除ユーザーを削除し、再実行時は対象にしないこと"""
+        path = str(tmp_path / "run_journal.jsonl")
+        tester = ExticSCIMTester(fake_scim_server.base_url, auth_type="bearer", token="test_token", journal=path)
+        ids = [tester.create_user({"userName": f"testuser_1700000000_{i}"})["id"] for i in range(5)]
+        tester.close()
+        # 別の経路で削除済みのユーザー (404)
+        fake_scim_server.store.delete(ids[0])
+
+        sweeper_tester = ExticSCIMTester(fake_scim_server.base_url, auth_type="bearer", token="test_token",
+                                         journal=False)
+        result = Sweeper(sweeper_tester, workers=4).run(journal_patterns=[str(tmp_path / "*_journal.jsonl")])
+        assert result["candidates"] == 5
+        assert result["deleted"] == 4
+        assert result["already_deleted"] == 1
+        assert result["failed"] == 0
+        assert len(fake_scim_server.store) == 0
+
+        assert Sweeper(sweeper_tester).run(journal_patterns=[path])["candidates"] == 0
+        sweeper_tester.close()
+
+    def test_sweep_prefix(self, fake_scim_tester, fake_scim_server):
+        """接頭辞とエポック秒が一致するユーザーのみ削除すること"""
+        for name in ("bench_1700000000_fixture_1", "BENCH_1700000001_crud_2", "bench_press", "alice"):
+            fake_scim_tester.create_user({"userName": name})
+
+        sweeper = Sweeper(fake_scim_tester)
+        assert sweeper.run(prefixes=["bench_"], dry_run=True)["candidates"] == 2
+        assert len(fake_scim_server.store) == 4
+
+        result = sweeper.run(prefixes=["bench_"])
+        assert result["deleted"] == 2
+        assert sorted(user["userName"] for user in fake_scim_server.store.snapshot()) == ["alice", "bench_press"]
+
+    def test_sweep_prefix_ignoring_server_filter(self, tmp_path):
+        """フィルターを解釈せず全件を返すサーバーでも、一致しないユーザーは削除しないこと"""
+        with FakeSCIMServer(simple_filters=True, seed=0) as server:
+            tester = ExticSCIMTester(server.base_url, auth_type="bearer", token="test_token", journal=False)
+            for name in ("scenario_1700000000_1", "alice", "bob"):
+                tester.create_user({"userName": name})
+            result = Sweeper(tester).run(prefixes=["scenario_"])
+            tester.close()
+            remaining = sorted(user["userName"] for user in server.store.snapshot())
+
+        assert result["deleted"] == 1
+        assert remaining == ["alice", "bob"]
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+import json
+import random
+import sys
+import os
+
+# srcディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from latency import LatencyHistogram, LatencyRecorder
+
+@pytest.mark.performance
+class TestLatencyHistogram:
+    """LatencyHistogramクラスのテストケース"""
+
+    def test_empty(self):
+        """記録がない場合は0を返すこと"""
+        histogram = LatencyHistogram()
+        assert histogram.percentile(99) == 0
+        assert histogram.summary()["count"] == 0
+
+    def test_small_values_exact(self):
+        """サブバケット範囲内の値は正確に記録されること"""
+        histogram = LatencyHistogram(significant_bits=8)
+        for value in range(1, 101):
+            histogram.record(value)
+
+        assert histogram.percentile(50) == 50
+        assert histogram.percentile(90) == 90
+        assert histogram.percentile(100) == 100
+        assert histogram.min == 1
+
+    def test_relative_error_bounded(self):
+        """大きな値でも相対誤差が精度の範囲内に収まること"""
+        histogram = LatencyHistogram(significant_bits=8)
+        rng = random.Random(42)
+        values = sorted(rng.randint(1, 60_000_000) for _ in range(5000))
+        for value in values:
+            histogram.record(value)
+
+        for percentile in (50, 90, 99, 99.9):
+            expected = values[max(0, int(len(values) * percentile / 100.0 + 0.999999) - 1)]
+            actual = histogram.percentile(percentile)
+            assert abs(actual - expected) / expected <= 1 / 128
+
+    def test_tail_latency_visible(self):
+        """平均では隠れるテールレイテンシがp99.9/maxに現れること"""
+        histogram = LatencyHistogram()
+        for _ in range(999):
+            histogram.record_seconds(0.010)
+        histogram.record_seconds(2.5)
+
+        summary = histogram.summary()
+        assert summary["p50"] == pytest.approx(10.0, rel=0.01)
+        assert summary["p99.9"] == pytest.approx(10.0, rel=0.01)
+        assert summary["max"] == 2500.0
+        assert summary["mean"] < 15.0
+
+    def test_merge_matches_single_histogram(self):
+        """分割して記録したヒストグラムの合算が、1つに記録した場合と一致すること"""
+        rng = random.Random(7)
+        values = [rng.randint(1, 5_000_000) for _ in range(3000)]
+        single = LatencyHistogram()
+        parts = [LatencyHistogram() for _ in range(3)]
+        for index, value in enumerate(values):
+            single.record(value)
+            parts[index % 3].record(value)
+
+        merged = LatencyHistogram()
+        for part in parts:
+            merged.merge(LatencyHistogram.from_dict(json.loads(json.dumps(part.to_dict()))))
+
+        assert merged.summary() == single.summary()
+        assert merged.counts == single.counts
+
+    def test_merge_requires_same_precision(self):
+        """精度が異なるヒストグラムは合算できないこと"""
+        with pytest.raises(ValueError):
+            LatencyHistogram(8).merge(LatencyHistogram(6))
+
+    def test_cumulative_counts(self):
+        """上限値ごとの累積件数が単調に増加し、全件で終わること"""
+        histogram = LatencyHistogram()
+        for value in (1_000, 4_000, 20_000, 20_000, 900_000):
+            histogram.record(value)
+
+        counts = histogram.cumulative_counts([5_000, 10_000, 50_000, 1_000_000])
+        assert counts == [2, 2, 4, 5]
+        assert LatencyHistogram().cumulative_counts([5_000]) == [0]
+
+
+@pytest.mark.performance
+class TestLatencyRecorder:
+    """LatencyRecorderクラスのテストケース"""
+
+    def test_report_grouped_by_endpoint_and_status(self):
+        """エンドポイント・ステータス別に集計されること"""
+        recorder = LatencyRecorder()
+        recorder.record("GET /Users", 200, 0.01)
+        recorder.record("GET /Users", 200, 0.02)
+        recorder.record("GET /Users", 429, 0.001)
+        recorder.record("DELETE /Users/{id}", "error", 0.5)
+
+        report = recorder.report()
+        assert report["unit"] == "ms"
+        assert report["endpoints"]["GET /Users"]["200"]["count"] == 2
+        assert report["endpoints"]["GET /Users"]["429"]["count"] == 1
+        assert report["endpoints"]["DELETE /Users/{id}"]["error"]["max"] == 500.0
+
+    def test_write_report(self, tmp_path):
+        """JSONレポートが出力されること"""
+        recorder = LatencyRecorder()
+        recorder.record("POST /Users", 201, 0.05)
+
+        path = recorder.write_report(str(tmp_path / "report.json"))
+        with open(path, encoding="utf-8") as f:
+            report = json.load(f)
+
+        assert report["endpoints"]["POST /Users"]["201"]["p99"] == 50.0
+        assert "generated_at" in report
+
+    def test_merge_snapshot(self):
+        """別のレコーダーのスナップショットを合算できること"""
+        first, second = LatencyRecorder(), LatencyRecorder()
+        first.record("GET /Users", 200, 0.01)
+        second.record("GET /Users", 200, 0.03)
+        second.record("GET /Users", 503, 0.002)
+
+        first.merge_snapshot(second.snapshot())
+        report = first.report()
+        assert report["endpoints"]["GET /Users"]["200"]["count"] == 2
+        assert report["endpoints"]["GET /Users"]["200"]["max"] == 30.0
+        assert report["endpoints"]["GET /Users"]["503"]["count"] == 1
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+from unittest.mock import MagicMock
+import threading
+import time
+import sys
+import os
+
+# srcディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from load_generator import LoadGenerator
+
+@pytest.mark.performance
+class TestLoadGenerator:
+    """LoadGeneratorクラスのテストケース"""
+
+    @pytest.fixture
+    def tester(self):
+        """ログ出力とセッションをモックしたテスター"""
+        tester = MagicMock()
+        tester.get_users.return_value = {"totalResults": 0, "Resources": []}
+        return tester
+
+    def test_requires_stop_condition(self, tester):
+        """終了条件の指定がない場合はエラー"""
+        with pytest.raises(ValueError):
+            LoadGenerator(tester, workers=2)
+
+    def test_total_requests(self, tester):
+        """指定したリクエスト数だけ実行されること"""
+        result = LoadGenerator(tester, workers=4, total_requests=40).run()
+
+        assert result["requests"] == 40
+        assert result["successes"] == 40
+        assert result["failures"] == 0
+        assert tester.get_users.call_count == 40
+        tester.get_users.assert_called_with(count=20)
+        assert result["latency"]["count"] == 40
+
+    def test_pool_sized_to_workers(self, tester):
+        """コネクションプールがワーカー数に合わせて設定されること"""
+        LoadGenerator(tester, workers=6, total_requests=1).run()
+
+        tester.configure_pool.assert_called_once_with(6)
+
+    def test_concurrent_workers(self, tester):
+        """ワーカーが並列に操作を実行すること"""
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def operation(_):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.pop()
+            return True
+
+        LoadGenerator(tester, workers=4, total_requests=16, operation=operation).run()
+        assert max(peak) > 1
+
+    def test_target_rate(self, tester):
+        """目標レートで送信間隔が制御されること"""
+        result = LoadGenerator(tester, workers=4, total_requests=11, target_rate=100).run()
+
+        # 11リクエスト / 100rps → 最後の送信は開始から約0.1秒後
+        assert result["elapsed"] >= 0.09
+        assert result["requests"] == 11
+
+    def test_duration(self, tester):
+        """実行時間で終了すること"""
+        result = LoadGenerator(tester, workers=2, duration=0.2, target_rate=50).run()
+
+        assert 0.15 <= result["elapsed"] < 1.0
+        assert 5 <= result["requests"] <= 12
+
+    def test_failures_counted(self, tester):
+        """失敗と例外が失敗数として集計されること"""
+        outcomes = iter([True, False, None])
+
+        def operation(_):
+            value = next(outcomes)
+            if value is None:
+                raise RuntimeError("boom")
+            return value
+
+        result = LoadGenerator(tester, workers=1, total_requests=3, operation=operation).run()
+        assert result["successes"] == 1
+        assert result["failures"] == 2
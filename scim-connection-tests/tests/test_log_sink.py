@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+from unittest.mock import MagicMock
+import threading
+import sys
+import os
+
+# srcディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from log_sink import LogSink, parse_level, DEBUG, INFO, WARNING, ERROR
+
+class TestLogSink:
+    """LogSinkクラスのテストケース"""
+
+    @pytest.fixture
+    def log_file(self, tmp_path):
+        """テスト用のログファイルパス"""
+        return str(tmp_path / "extic_test_20250101_000000.log")
+
+    def read(self, path):
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+    def test_parse_level(self):
+        """レベル名と数値が相互に解釈できること"""
+        assert parse_level("debug") == DEBUG
+        assert parse_level("WARNING") == WARNING
+        assert parse_level(ERROR) == ERROR
+        with pytest.raises(ValueError):
+            parse_level("verbose")
+
+    def test_level_filtering(self, log_file):
+        """出力レベル未満のログが出力されないこと"""
+        sink = LogSink(log_file, level=INFO, console=False)
+        sink.emit(DEBUG, "デバッグ")
+        sink.emit(INFO, "情報")
+        sink.emit(ERROR, "エラー")
+        sink.close()
+
+        content = self.read(log_file)
+        assert "デバッグ" not in content
+        assert "] 情報" in content
+        assert "[ERROR] エラー" in content
+
+    def test_payload_lazy_at_info(self, log_file):
+        """INFOレベルではペイロードが整形されないこと"""
+        payload = MagicMock(return_value={"id": "1"})
+        sink = LogSink(log_file, level=INFO, console=False)
+        sink.emit(INFO, "ユーザー作成成功", payload=payload)
+        sink.close()
+
+        payload.assert_not_called()
+        assert "\"id\"" not in self.read(log_file)
+
+    def test_payload_serialized_at_debug(self, log_file):
+        """DEBUGレベルではペイロードがJSON整形されて出力されること"""
+        sink = LogSink(log_file, level=DEBUG, console=False)
+        sink.emit(INFO, "ユーザー作成成功", payload={"id": "1", "displayName": "テスト"})
+        sink.emit(INFO, "レスポンス", payload=lambda: {"totalResults": 0})
+        sink.close()
+
+        content = self.read(log_file)
+        assert "\"displayName\": \"テスト\"" in content
+        assert "\"totalResults\": 0" in content
+
+    def test_payload_snapshot_at_emit(self, log_file):
+        """emit後にペイロードを変更しても emit 時点の内容が出力されること"""
+        sink = LogSink(log_file, level=DEBUG, console=False, flush_interval=5)
+        user = {"id": "1", "displayName": "変更前"}
+        sink.emit(INFO, "ユーザー情報", payload=user)
+        user["displayName"] = "変更後"
+        sink.close()
+
+        content = self.read(log_file)
+        assert "\"displayName\": \"変更前\"" in content
+        assert "変更後" not in content
+
+    def test_flush(self, log_file):
+        """flushでキュー内のログが書き込まれること"""
+        sink = LogSink(log_file, console=False, flush_interval=5)
+        for i in range(10):
+            sink.emit(INFO, f"メッセージ{i}")
+        sink.flush(timeout=5)
+
+        assert self.read(log_file).count("メッセージ") == 10
+        sink.close()
+
+    def test_concurrent_emit(self, log_file):
+        """複数スレッドからのログが欠落なく書き込まれること"""
+        sink = LogSink(log_file, console=False, batch_size=32)
+
+        def worker(n):
+            for i in range(200):
+                sink.emit(INFO, f"worker{n}-{i}")
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        sink.close()
+
+        assert len(self.read(log_file).splitlines()) == 800
+
+    def test_rotation(self, log_file):
+        """サイズ超過時に同じディレクトリ内でローテーションされること"""
+        sink = LogSink(log_file, console=False, batch_size=1, max_bytes=200, backup_count=2)
+        for i in range(30):
+            sink.emit(INFO, f"ローテーションテスト {i:02d}")
+        sink.close()
+
+        assert os.path.exists(log_file + ".1")
+        assert os.path.exists(log_file + ".2")
+        assert not os.path.exists(log_file + ".3")
+        assert "ローテーションテスト 29" in self.read(log_file)
+
+    def test_drop_when_queue_full(self, log_file):
+        """キューが満杯の場合はINFOログを破棄し、ERRORログは保持すること"""
+        sink = LogSink(log_file, console=False, queue_size=2)
+        blocker = threading.Event()
+        sink._write = lambda lines, original=sink._write: (blocker.wait(5), original(lines))
+        sink.emit(INFO, "先頭")
+        # 書き込みスレッドが先頭を取り出してブロックするまで待つ
+        for _ in range(100):
+            if sink._queue.empty():
+                break
+            threading.Event().wait(0.01)
+        for i in range(10):
+            sink.emit(INFO, f"破棄対象{i}")
+        assert sink.dropped > 0
+
+        blocker.set()
+        sink.emit(ERROR, "重要なエラー")
+        sink.close()
+        assert "重要なエラー" in self.read(log_file)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+import re
+import sys
+import os
+
+import requests
+
+# srcディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from latency import LatencyRecorder
+from metrics_exporter import CONTENT_TYPE, MetricsServer, render_openmetrics, tester_openmetrics, write_openmetrics
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{[^}]*\})? (\S+)$')
+
+
+def parse_samples(text):
+    """OpenMetrics テキストのサンプル行を {(名前, ラベル): 値} に変換"""
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith("#"):
+            continue
+        match = SAMPLE.match(line)
+        assert match, f"不正な行: {line}"
+        samples[(match.group(1), match.group(2) or "")] = float(match.group(3))
+    return samples
+
+
+class TestRenderOpenMetrics:
+    """OpenMetrics 形式への変換のテストケース"""
+
+    def test_requests_and_histogram(self):
+        """エンドポイント・ステータス別の件数とヒストグラムが出力されること"""
+        recorder = LatencyRecorder()
+        for seconds in (0.002, 0.02, 0.2, 3.0):
+            recorder.record("GET /Users", 200, seconds)
+        recorder.record("POST /Users", 429, 0.001)
+
+        text = render_openmetrics("https://example.com/scim", recorder, {"retries": 1, "backoff_seconds": 0.5})
+        assert text.endswith("# EOF\n")
+        samples = parse_samples(text)
+
+        labels = '{target="https://example.com/scim",endpoint="GET /Users",status="200"}'
+        assert samples[("extic_scim_requests_total", labels)] == 4
+        assert samples[("extic_scim_request_duration_seconds_count", labels)] == 4
+        assert samples[("extic_scim_request_duration_seconds_sum", labels)] == pytest.approx(3.222, rel=0.01)
+
+        buckets = [value for (name, label), value in samples.items()
+                   if name == "extic_scim_request_duration_seconds_bucket" and 'endpoint="GET /Users"' in label]
+        assert buckets == sorted(buckets)
+        assert buckets[-1] == 4
+        assert samples[("extic_scim_transport_retries_total", '{target="https://example.com/scim"}')] == 1
+        assert samples[("extic_scim_transport_backoff_seconds_total", '{target="https://example.com/scim"}')] == 0.5
+        assert samples[("extic_scim_transport_throttled_total", '{target="https://example.com/scim"}')] == 0
+
+    def test_in_flight(self):
+        """実行中のリクエスト数がゲージとして出力されること"""
+        recorder = LatencyRecorder()
+        recorder.begin("GET /Users")
+        recorder.begin("GET /Users")
+        recorder.finish("GET /Users")
+
+        samples = parse_samples(render_openmetrics("t", recorder))
+        assert samples[("extic_scim_in_flight_requests", '{target="t",endpoint="GET /Users"}')] == 1
+
+    def test_label_escaping(self):
+        recorder = LatencyRecorder()
+        recorder.record('GET /Users?filter="a"', 200, 0.01)
+        text = render_openmetrics("t", recorder)
+        assert 'endpoint="GET /Users?filter=\\"a\\""' in text
+
+    def test_write_file(self, fake_scim_tester, tmp_path):
+        """テスターの計測値がファイルに出力されること"""
+        fake_scim_tester.create_user({"userName": "metrics_user"})
+        path = write_openmetrics(str(tmp_path / "metrics.prom"), tester_openmetrics(fake_scim_tester))
+
+        with open(path, encoding="utf-8") as f:
+            samples = parse_samples(f.read())
+        labels = f'{{target="{fake_scim_tester.base_url}",endpoint="POST /Users",status="201"}}'
+        assert samples[("extic_scim_requests_total", labels)] == 1
+        assert samples[("extic_scim_in_flight_requests", f'{{target="{fake_scim_tester.base_url}",endpoint="POST /Users"}}')] == 0
+        assert not os.path.exists(f"{path}.tmp")
+
+
+class TestMetricsServer:
+    """メトリクス公開サーバーのテストケース"""
+
+    def test_scrape(self, fake_scim_tester):
+        """/metrics で実行中の計測値を取得できること"""
+        with MetricsServer(fake_scim_tester, port=0) as server:
+            fake_scim_tester.get_users()
+            response = requests.get(server.url, timeout=5)
+            missing = requests.get(server.url.replace("/metrics", "/other"), timeout=5)
+
+        assert response.status_code == 200
+        assert response.headers["Content-Type"] == CONTENT_TYPE
+        assert "extic_scim_requests_total" in response.text
+        assert response.text.endswith("# EOF\n")
+        assert missing.status_code == 404
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+import json
+import sys
+import os
+
+# srcディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from payload_template import PayloadTemplate, Slot, _stdlib_dumps, dumps, micro_benchmark, user_template
+from fake_scim_server import EXTIC_USER_SCHEMA
+
+class TestPayloadTemplate:
+    """リクエストボディテンプレートのテストケース"""
+
+    @pytest.mark.parametrize("encoder", [None, _stdlib_dumps])
+    def test_render(self, encoder):
+        """差し込んだ値が辞書から生成したJSONと同じ内容になること"""
+        template = user_template(EXTIC_USER_SCHEMA, password="P@ss", encoder=encoder)
+        body = template.render(
+            userName='quote"user\\', displayName="表示名",
+            groups=["研究グループ"], attributes=[{"name": "accessLevel", "value": "advanced"}]
+        )
+        assert json.loads(body) == {
+            "schemas": ["urn:ietf:params:scim:schemas:core:2.0:User", EXTIC_USER_SCHEMA],
+            "userName": 'quote"user\\',
+            "password": "P@ss",
+            "displayName": "表示名",
+            EXTIC_USER_SCHEMA: {
+                "exticGroups": ["研究グループ"],
+                "extendAttrs": [{"name": "accessLevel", "value": "advanced"}],
+            },
+        }
+
+    def test_pre_encoded(self):
+        """bytes はエンコード済みの値としてそのまま差し込まれること"""
+        template = PayloadTemplate({"a": Slot("a"), "b": [1, Slot("b")], "c": Slot("a")})
+        assert json.loads(template.render(a=dumps({"x": None}), b=True)) == {
+            "a": {"x": None}, "b": [1, True], "c": {"x": None}
+        }
+        assert template.slots == ("a", "b", "a")
+
+    def test_missing_slot(self):
+        with pytest.raises(KeyError):
+            user_template().render(userName="a")
+
+    def test_create_via_fake_server(self, fake_scim_tester):
+        """エンコード済みのボディをそのまま送信できること"""
+        body = user_template(EXTIC_USER_SCHEMA, password="P@ss").render(
+            userName="template_user", displayName="テンプレート", groups=["基本ユーザーグループ"], attributes=[]
+        )
+        response = fake_scim_tester._request("post", "POST /Users", f"{fake_scim_tester.base_url}/Users", data=body)
+        assert response.status_code == 201
+        assert fake_scim_tester.get_user_by_username("template_user")["displayName"] == "テンプレート"
+
+    def test_micro_benchmark(self):
+        results = micro_benchmark(iterations=100)
+        assert "dict + json.dumps" in results
+        assert all(value >= 0 for value in results.values())
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+import json
+import sys
+import os
+
+# srcディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from latency import LatencyHistogram
+from process_driver import MultiProcessDriver, merge_operations
+
+class TestMergeOperations:
+    """操作ごとの集計の合算のテストケース"""
+
+    def test_counts_and_histograms(self):
+        """件数は加算し、ヒストグラムはバケット単位で合算すること"""
+        def snapshot(values, failures):
+            latency = LatencyHistogram()
+            for value in values:
+                latency.record(value)
+            return {
+                "scheduled": len(values),
+                "operations": {
+                    "get": {
+                        "successes": len(values) - failures,
+                        "failures": failures,
+                        "skipped": 0,
+                        "latency": latency.to_dict(),
+                        "service": latency.to_dict(),
+                    },
+                },
+            }
+
+        merged = merge_operations([snapshot([100, 200], 0), snapshot([300, 40000], 1)])
+        assert merged["get"]["successes"] == 3
+        assert merged["get"]["failures"] == 1
+        assert merged["get"]["latency"].count == 4
+        assert merged["get"]["latency"].min == 100
+        assert merged["get"]["latency"].max == 40000
+
+
+@pytest.mark.performance
+class TestMultiProcessDriver:
+    """複数プロセス実行のテストケース"""
+
+    def test_run(self, fake_scim_server, tmp_path):
+        """予定送信時刻をプロセス間で分担し、結果とレイテンシレポートが合算されること"""
+        scenario = {
+            "name": "mp",
+            "seed": 1,
+            "initial_users": 3,
+            "mix": {"list": 1, "get": 2, "create": 1},
+            "arrival": [{"type": "constant", "rate": 100, "duration": 1.0}],
+        }
+        connection = {"base_url": fake_scim_server.base_url, "auth_type": "bearer", "token": "test_token"}
+        lines = []
+        driver = MultiProcessDriver(connection, scenario, processes=2, max_concurrency=4,
+                                    report_interval=0.2, progress=lines.append, log_dir=str(tmp_path))
+        result = driver.run()
+
+        assert result["processes"] == 2
+        assert result["scheduled"] == 100
+        assert [worker["scheduled"] for worker in result["workers"]] == [50, 50]
+        assert all(worker["error"] is None for worker in result["workers"])
+        assert all(op["failures"] == 0 for op in result["operations"].values())
+        assert result["completed"] + sum(op["skipped"] for op in result["operations"].values()) == 100
+        assert result["transport"]["requests"] >= result["completed"]
+        assert lines and "プロセス 0/2" in lines[-1]
+        assert len(fake_scim_server.store) == 0
+
+        with open(driver.write_latency_report(), encoding="utf-8") as f:
+            report = json.load(f)
+        assert report["endpoints"]["GET /Users"]["200"]["count"] == result["operations"]["list"]["successes"]
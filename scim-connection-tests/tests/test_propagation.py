@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import sys
+import os
+from unittest.mock import MagicMock
+
+# srcディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from propagation import GatewayClient, PropagationProbe, sign_jwt
+
+EXTIC_SCHEMA = "urn:extic:scim:schemas:1.0:User"
+
+TIER_MODELS = {
+    "basic": frozenset({"gpt-3.5-turbo"}),
+    "advanced": frozenset({"gpt-3.5-turbo", "gpt-4"}),
+    "admin": frozenset({"gpt-3.5-turbo", "gpt-4", "dall-e-3"}),
+}
+
+
+class LaggingGateway:
+    """SCIMでの変更が指定回数のポーリング後に見えるゲートウェイの代替"""
+
+    def __init__(self, server, lag_polls):
+        self.server = server
+        self.lag_polls = lag_polls
+        self._visible = {}
+        self._lock = threading.Lock()
+
+    def token_for(self, user, tier):
+        return user["id"]
+
+    def visible_models(self, token):
+        user = self.server.store.get(token)
+        actual = user[EXTIC_SCHEMA]["extendAttrs"][0]["value"]
+        with self._lock:
+            visible, stale = self._visible.get(token, (actual, 0))
+            if visible != actual and stale < self.lag_polls:
+                self._visible[token] = (visible, stale + 1)
+                return TIER_MODELS[visible]
+            self._visible[token] = (actual, 0)
+            return TIER_MODELS[actual]
+
+
+class TestSignJwt:
+    """JWT生成のテストケース"""
+
+    def test_hs256(self):
+        """ゲートウェイと同じ秘密鍵で検証できる署名が付くこと"""
+        token = sign_jwt({"id": "u1", "accessTier": "basic"}, "secret", expires_in=60)
+        header, payload, signature = token.split(".")
+        expected = hmac.new(b"secret", f"{header}.{payload}".encode("ascii"), hashlib.sha256).digest()
+        assert base64.urlsafe_b64decode(signature + "=" * (-len(signature) % 4)) == expected
+
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        assert claims["id"] == "u1"
+        assert claims["accessTier"] == "basic"
+        assert claims["exp"] - claims["iat"] == 60
+
+
+class TestGatewayClient:
+    """ゲートウェイクライアントのテストケース"""
+
+    def test_requires_credentials(self):
+        with pytest.raises(ValueError):
+            GatewayClient("http://localhost:3000")
+
+    def test_visible_models(self):
+        """モデルIDの集合を返し、エラー時は None を返すこと"""
+        client = GatewayClient("http://localhost:3000/", jwt_secret="secret")
+        client.transport.session = MagicMock()
+        response = MagicMock(status_code=200)
+        response.json.return_value = {"success": True, "count": 2, "data": [{"id": "a"}, {"id": "b"}]}
+        client.transport.session.get.return_value = response
+
+        assert client.visible_models("token") == frozenset({"a", "b"})
+        client.transport.session.get.assert_called_with(
+            "http://localhost:3000/api/models", headers={"Authorization": "Bearer token"}, timeout=10.0
+        )
+
+        client.transport.session.get.return_value = MagicMock(status_code=401)
+        assert client.visible_models("token") is None
+
+
+class TestPropagationProbe:
+    """反映時間計測のテストケース"""
+
+    def test_invalid_transitions(self, fake_scim_tester):
+        with pytest.raises(ValueError):
+            PropagationProbe(fake_scim_tester, MagicMock(), transitions=[("basic", "unknown")])
+        with pytest.raises(ValueError):
+            PropagationProbe(fake_scim_tester, MagicMock(), transitions=[("basic", "advanced"), ("admin", "basic")])
+
+    def test_run(self, fake_scim_tester, fake_scim_server):
+        """変更ごとに反映までのポーリング回数と反映時間が記録され、ユーザーが削除されること"""
+        probe = PropagationProbe(fake_scim_tester, LaggingGateway(fake_scim_server, lag_polls=2), users=4, workers=2)
+        probe._sleep = lambda seconds: None
+        result = probe.run()
+
+        assert result["expected"]["advanced"] == ["gpt-3.5-turbo", "gpt-4"]
+        assert result["indistinguishable"] == []
+        assert set(result["transitions"]) == {"basic->advanced", "advanced->admin", "admin->basic"}
+        for summary in result["transitions"].values():
+            assert summary["propagated"] == 4
+            assert summary["timeouts"] == 0
+            assert summary["mean_polls"] == 3.0
+        assert result["delay"]["count"] == 12
+        assert len(fake_scim_server.store) == 0
+
+    def test_timeout(self, fake_scim_tester, fake_scim_server):
+        """反映されない場合はタイムアウトとして数えること"""
+        probe = PropagationProbe(fake_scim_tester, LaggingGateway(fake_scim_server, lag_polls=10 ** 6), users=1,
+                                 workers=1, transitions=[("basic", "advanced")], timeout=0.05, poll_max=0.01)
+        result = probe.run()
+
+        summary = result["transitions"]["basic->advanced"]
+        assert summary["propagated"] == 0
+        assert summary["timeouts"] == 1
+        assert summary["mean_polls"] > 1
+        assert len(fake_scim_server.store) == 0
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+import json
+import random
+import sys
+import os
+
+# srcディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from scenario import ScenarioRunner, arrival_times, load_scenario, validate_scenario
+
+SCENARIOS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scenarios")
+
+class TestArrivalProfile:
+    """到着レートプロファイルのテストケース"""
+
+    def test_constant(self):
+        times = list(arrival_times([{"type": "constant", "rate": 10, "duration": 2}]))
+        assert len(times) == 20
+        assert times[1] - times[0] == pytest.approx(0.1)
+
+    def test_ramp(self):
+        """ランプでは後半ほど間隔が短くなること"""
+        times = list(arrival_times([{"type": "ramp", "from": 10, "to": 100, "duration": 4}]))
+        assert 150 < len(times) < 250
+        assert times[1] - times[0] > times[-1] - times[-2]
+
+    def test_step_and_offset(self):
+        """区間が順に連結されること"""
+        times = list(arrival_times([
+            {"type": "step", "rates": [1, 5], "step_duration": 2},
+            {"type": "constant", "rate": 2, "duration": 1},
+        ]))
+        assert len([t for t in times if t < 2]) == 2
+        assert len([t for t in times if 2 <= t < 4]) == 10
+        assert [t for t in times if t >= 4] == [4.0, 4.5]
+
+    def test_burst(self):
+        """バースト区間のみ高いレートになること"""
+        times = list(arrival_times([
+            {"type": "burst", "base": 0, "peak": 100, "burst_duration": 0.1, "period": 1, "duration": 3}
+        ]))
+        assert len(times) == pytest.approx(30, abs=3)
+        assert all(t % 1 < 0.1 + 1e-9 for t in times)
+
+    def test_poisson(self):
+        """ポアソン到着でも平均レートが保たれること"""
+        times = list(arrival_times([{"type": "constant", "rate": 100, "duration": 10}], random.Random(0)))
+        assert 900 < len(times) < 1100
+
+    @pytest.mark.parametrize("scenario", [
+        {"arrival": [{"type": "constant", "rate": 1, "duration": 1}]},
+        {"mix": {"login": 1}, "arrival": [{"type": "constant", "rate": 1, "duration": 1}]},
+        {"mix": {"get": 0}, "arrival": [{"type": "constant", "rate": 1, "duration": 1}]},
+        {"mix": {"get": 1}, "arrival": [{"type": "sine", "duration": 1}]},
+        {"mix": {"get": 1}, "arrival": [{"type": "step", "rates": []}]},
+    ])
+    def test_invalid(self, scenario):
+        with pytest.raises(ValueError):
+            validate_scenario(scenario)
+
+    def test_example_scenario(self):
+        """同梱のシナリオファイルが読み込めること"""
+        scenario = load_scenario(os.path.join(SCENARIOS_DIR, "monday_morning.yaml"))
+        assert scenario["name"] == "monday-morning"
+
+class TestScenarioRunner:
+    """シナリオ実行のテストケース"""
+
+    def test_run(self, fake_scim_tester, fake_scim_server, tmp_path):
+        """操作ミックスが実行され、作成したユーザーが削除されること"""
+        path = tmp_path / "scenario.json"
+        path.write_text(json.dumps({
+            "name": "mix",
+            "seed": 3,
+            "initial_users": 5,
+            "mix": {"list": 1, "get": 3, "filter": 1, "create": 2, "update_groups": 2, "delete": 1},
+            "arrival": [{"type": "constant", "rate": 200, "duration": 0.5}],
+        }), encoding="utf-8")
+
+        result = ScenarioRunner(fake_scim_tester, load_scenario(str(path)), max_concurrency=8).run()
+        assert result["scheduled"] == 100
+        assert result["completed"] + sum(op["skipped"] for op in result["operations"].values()) == 100
+        assert set(result["operations"]) == {"list", "get", "filter", "create", "update_groups", "delete"}
+        assert all(op["failures"] == 0 for op in result["operations"].values())
+        assert len(fake_scim_server.store) == 0
+
+    @pytest.mark.performance
+    def test_latency_from_intended_start(self, fake_scim_tester, fake_scim_server):
+        """サーバーが遅い場合の待ち時間がレイテンシに含まれること (coordinated omission の回避)"""
+        fake_scim_server.latency = {"GET /Users": 0.05}
+        scenario = {
+            "mix": {"list": 1},
+            "arrival": [{"type": "constant", "rate": 100, "duration": 0.3}],
+        }
+        result = ScenarioRunner(fake_scim_tester, scenario, max_concurrency=1).run()
+
+        summary = result["operations"]["list"]
+        assert summary["successes"] == 30
+        assert summary["service"]["p50"] < 100
+        assert summary["latency"]["max"] > 1000
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+import sys
+import os
+
+# srcディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from scim_filter import FilterSyntaxError, compile_filter, parse_filter
+
+USER = {
+    "id": "2819c223",
+    "userName": "Bulk_User_1",
+    "displayName": "一括テストユーザー1",
+    "active": True,
+    "emails": [
+        {"value": "bulk1@example.com", "type": "work", "primary": True},
+        {"value": "bulk1@home.example", "type": "home"},
+    ],
+    "meta": {"lastModified": "2025-05-01T00:00:00Z"},
+    "urn:extic:scim:schemas:1.0:User": {
+        "exticGroups": ["研究グループ"],
+        "extendAttrs": [
+            {"name": "accessLevel", "value": "advanced"},
+            {"name": "department", "value": "研究開発部"},
+        ],
+    },
+}
+
+class TestSCIMFilter:
+    """SCIMフィルター解析・評価のテストケース"""
+
+    @pytest.mark.parametrize("expression, expected", [
+        ('userName eq "bulk_user_1"', True),
+        ('userName eq "bulk_user_2"', False),
+        ('userName ne "bulk_user_2"', True),
+        ('userName co "user"', True),
+        ('userName sw "bulk_"', True),
+        ('userName ew "_1"', True),
+        ('id eq "2819C223"', False),
+        ('active eq true', True),
+        ('displayName pr', True),
+        ('nickName pr', False),
+        ('meta.lastModified gt "2025-01-01T00:00:00Z"', True),
+        ('emails.type eq "work"', True),
+        ('emails[type eq "work" and value co "@example.com"]', True),
+        ('emails[type eq "home" and value co "@example.com"]', False),
+        ('userName sw "bulk_" and not (active eq false)', True),
+        ('userName eq "x" or displayName co "テスト"', True),
+        ('(extendAttrs.name eq "accessLevel") and (extendAttrs.value eq "advanced")', True),
+        ('urn:extic:scim:schemas:1.0:User:exticGroups eq "研究グループ"', True),
+        ('urn:extic:scim:schemas:1.0:User:extendAttrs[name eq "department" and value eq "研究開発部"]', True),
+        ('urn:extic:scim:schemas:1.0:User:extendAttrs[name eq "department" and value eq "advanced"]', False),
+    ])
+    def test_matches(self, expression, expected):
+        """フィルター式の評価結果"""
+        assert compile_filter(expression)(USER) is expected
+
+    def test_precedence(self):
+        """andがorより優先されること"""
+        assert parse_filter('a eq 1 or b eq 2 and c eq 3') == (
+            "or", ("compare", "a", "eq", 1), ("and", ("compare", "b", "eq", 2), ("compare", "c", "eq", 3))
+        )
+
+    @pytest.mark.parametrize("expression", [
+        "",
+        'userName eq',
+        'userName like "x"',
+        '(userName eq "x"',
+        'userName eq "x" extra',
+        'userName eq bogus',
+    ])
+    def test_syntax_error(self, expression):
+        """不正なフィルター式は構文エラーになること"""
+        with pytest.raises(FilterSyntaxError):
+            parse_filter(expression)
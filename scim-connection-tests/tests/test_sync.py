@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+import json
+import sys
+import os
+
+# srcディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from sync import SyncEngine, csv_row_to_user, diff_user, managed_paths, normalize_user, project_user
+from fake_scim_server import EXTIC_USER_SCHEMA
+
+CSV_HEADER = "userName,displayName,name.familyName,email,active,exticGroups,extendAttrs.accessLevel\n"
+
+def write_csv(path, rows):
+    path.write_text(CSV_HEADER + "".join(row + "\n" for row in rows), encoding="utf-8")
+    return str(path)
+
+class TestSyncDiff:
+    """差分計算のテストケース"""
+
+    def test_csv_row_to_user(self):
+        """CSVの列が属性パスとして解釈されること"""
+        user = csv_row_to_user({
+            "userName": "hr_user",
+            "name.familyName": "山田",
+            "email": "hr@example.com",
+            "active": "false",
+            "exticGroups": "研究グループ; 基本ユーザーグループ",
+            "extendAttrs.accessLevel": "advanced",
+            "title": "",
+        }, EXTIC_USER_SCHEMA)
+
+        assert user["name"] == {"familyName": "山田"}
+        assert user["emails"][0]["value"] == "hr@example.com"
+        assert user["active"] is False
+        assert "title" not in user
+        assert user[EXTIC_USER_SCHEMA] == {
+            "exticGroups": ["研究グループ", "基本ユーザーグループ"],
+            "extendAttrs": [{"name": "accessLevel", "value": "advanced"}],
+        }
+
+    def test_normalize_user(self):
+        """トップレベルや別URNのExtic拡張が拡張スキーマの下に移されること"""
+        user = normalize_user({
+            "userName": "a",
+            "exticGroups": ["g"],
+            "urn:extic:scim:schemas:1.0:User": {"extendAttrs": []},
+        }, "urn:example:extic:2.0:User")
+        assert user["urn:example:extic:2.0:User"] == {"exticGroups": ["g"], "extendAttrs": []}
+        assert "urn:extic:scim:schemas:1.0:User" not in user
+
+    def test_diff_only_changed(self):
+        """変更された属性のみがPATCH操作になり、複数値属性の順序は無視されること"""
+        desired = {
+            "userName": "a",
+            "displayName": "新しい表示名",
+            "name": {"familyName": "山田", "givenName": "太郎"},
+            EXTIC_USER_SCHEMA: {
+                "exticGroups": ["g1", "g2"],
+                "extendAttrs": [{"name": "accessLevel", "value": "advanced"}],
+            },
+        }
+        remote = {
+            "userName": "A",
+            "displayName": "古い表示名",
+            "name": {"familyName": "山田", "givenName": "花子"},
+            EXTIC_USER_SCHEMA: {
+                "exticGroups": ["g2", "g1"],
+                "extendAttrs": [{"name": "accessLevel", "value": "advanced"}],
+            },
+        }
+        operations = diff_user(desired, project_user(remote, set(managed_paths(desired))))
+        assert operations == [
+            {"op": "replace", "path": "displayName", "value": "新しい表示名"},
+            {"op": "replace", "path": "name.givenName", "value": "太郎"},
+        ]
+
+class TestSyncEngine:
+    """インプロセスSCIMサーバーを使用した差分同期のテストケース"""
+
+    def test_sync(self, fake_scim_tester, fake_scim_server, tmp_path):
+        """作成・更新・削除の最小集合が実行され、再実行では変更が送信されないこと"""
+        fake_scim_server.seed_users(4, prefix="hr")
+        source = write_csv(tmp_path / "hr.csv", [
+            "hr_0,シードユーザー0,,,,基本ユーザーグループ,basic",
+            "hr_1,表示名変更,,,,基本ユーザーグループ,basic",
+            "HR_2,シードユーザー2,,,,研究グループ;基本ユーザーグループ,advanced",
+            "new_user,新規ユーザー,鈴木,new@example.com,true,基本ユーザーグループ,basic",
+        ])
+        engine = SyncEngine(fake_scim_tester, workers=4, delete_missing=True)
+
+        plan = engine.plan(source)
+        assert plan.summary() == {"create": 1, "update": 2, "delete": 1, "unchanged": 1}
+
+        result = engine.apply(plan)
+        assert (result["created"], result["updated"], result["deleted"], result["failed"]) == (1, 2, 1, 0)
+
+        users = {user["userName"]: user for user in fake_scim_tester.iter_users()}
+        assert sorted(users) == ["hr_0", "hr_1", "hr_2", "new_user"]
+        assert users["hr_1"]["displayName"] == "表示名変更"
+        assert sorted(users["hr_2"][EXTIC_USER_SCHEMA]["exticGroups"]) == ["基本ユーザーグループ", "研究グループ"]
+        assert users["hr_2"][EXTIC_USER_SCHEMA]["extendAttrs"] == [{"name": "accessLevel", "value": "advanced"}]
+
+        writes = ("POST /Users", "PUT /Users/{id}", "DELETE /Users/{id}")
+        before = {endpoint: fake_scim_server.request_counts.get(endpoint, 0) for endpoint in writes}
+        assert engine.run(source)["unchanged"] == 4
+        assert {endpoint: fake_scim_server.request_counts.get(endpoint, 0) for endpoint in writes} == before
+
+    def test_keep_missing_by_default(self, fake_scim_tester, fake_scim_server, tmp_path):
+        """delete_missing を指定しない場合は削除しないこと"""
+        fake_scim_server.seed_users(3, prefix="keep")
+        source = tmp_path / "hr.jsonl"
+        source.write_text(json.dumps({"userName": "keep_0", "displayName": "変更"}, ensure_ascii=False) + "\n",
+                          encoding="utf-8")
+
+        result = SyncEngine(fake_scim_tester).run(str(source))
+        assert (result["updated"], result["deleted"]) == (1, 0)
+        assert len(fake_scim_server.store) == 3
+
+    def test_dry_run(self, fake_scim_tester, fake_scim_server, tmp_path):
+        """dry_run では変更を送信しないこと"""
+        source = write_csv(tmp_path / "hr.csv", ["dry_user,ドライラン,,,,,"])
+        result = SyncEngine(fake_scim_tester).run(source, dry_run=True)
+        assert result["create"] == 1
+        assert len(fake_scim_server.store) == 0
+
+    def test_invalid_workers(self, fake_scim_tester):
+        with pytest.raises(ValueError):
+            SyncEngine(fake_scim_tester, workers=0)
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+import requests
+import socket
+import sys
+import os
+from unittest.mock import MagicMock
+
+# srcディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from extic_tester import ExticSCIMTester
+from transport import KeepAliveAdapter, TokenBucket, Transport, parse_retry_after
+
+class FakeClock:
+    """sleep で進む疑似クロック"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def make_response(status, retry_after=None):
+    response = MagicMock()
+    response.status_code = status
+    response.headers = {"Retry-After": retry_after} if retry_after is not None else {}
+    return response
+
+def make_transport(responses, **kwargs):
+    session = MagicMock()
+    session.get.side_effect = responses
+    session.post.side_effect = responses
+    transport = Transport(session, seed=0, **kwargs)
+    transport._sleep = MagicMock()
+    return transport, session
+
+class TestTokenBucket:
+    """トークンバケットのテストケース"""
+
+    def test_rate(self):
+        """バースト分を使い切った後はレートに従って待機すること"""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, burst=2, clock=clock, sleep=clock.sleep)
+        for _ in range(12):
+            bucket.acquire()
+        assert clock.now == pytest.approx(1.0)
+
+    def test_unlimited(self):
+        """レート未指定の場合は待機しないこと"""
+        clock = FakeClock()
+        bucket = TokenBucket(clock=clock, sleep=clock.sleep)
+        for _ in range(1000):
+            bucket.acquire()
+        assert clock.sleeps == []
+
+    def test_pause(self):
+        """停止中は待機し、再開直後にバーストしないこと"""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, burst=5, clock=clock, sleep=clock.sleep)
+        bucket.pause(2.0)
+        assert bucket.acquire() == pytest.approx(2.1)
+
+    def test_invalid_rate(self):
+        with pytest.raises(ValueError):
+            TokenBucket(rate=0)
+
+class TestTransport:
+    """送信層のテストケース"""
+
+    @pytest.mark.parametrize("value, expected", [
+        ("3", 3.0),
+        ("0", 0.0),
+        ("", None),
+        (None, None),
+        ("soon", None),
+        ("Wed, 21 Oct 2015 07:28:00 GMT", 0.0),
+    ])
+    def test_parse_retry_after(self, value, expected):
+        assert parse_retry_after(value) == expected
+
+    def test_retry_after_honored(self):
+        """429のRetry-Afterの間は送信を停止して再送すること"""
+        transport, session = make_transport([make_response(429, "2"), make_response(200)])
+        transport.bucket._clock = FakeClock()
+        transport.bucket._sleep = transport.bucket._clock.sleep
+
+        response = transport.send("get", "https://example.com/Users")
+        assert response.status_code == 200
+        assert session.get.call_count == 2
+        assert transport.bucket._clock.sleeps == [pytest.approx(2.0)]
+        stats = transport.stats()
+        assert stats["throttled"] == 1
+        assert stats["retries"] == 1
+        assert stats["requests"] == 2
+
+    def test_exponential_backoff(self):
+        """Retry-Afterがない503は指数バックオフの範囲内で待機すること"""
+        transport, session = make_transport([make_response(503)] * 3 + [make_response(200)], backoff_base=1.0)
+        transport.send("get", "https://example.com/Users")
+
+        delays = [call.args[0] for call in transport._sleep.call_args_list]
+        assert len(delays) == 3
+        for attempt, delay in enumerate(delays):
+            assert 0 <= delay <= 2 ** attempt
+        assert transport.stats()["unavailable"] == 3
+
+    def test_give_up(self):
+        """最大再送回数を超えた場合は最後のレスポンスを返すこと"""
+        transport, session = make_transport([make_response(429)] * 5, max_retries=2)
+        assert transport.send("get", "https://example.com/Users").status_code == 429
+        assert session.get.call_count == 3
+        assert transport.stats()["gave_up"] == 1
+
+    def test_retry_after_too_long(self):
+        """Retry-Afterがバックオフ上限を超える場合は再送しないこと"""
+        transport, session = make_transport([make_response(429, "600")])
+        assert transport.send("get", "https://example.com/Users").status_code == 429
+        assert session.get.call_count == 1
+
+    def test_connection_error_idempotent_only(self):
+        """接続エラーはGETのみ再送し、POSTは再送しないこと"""
+        transport, session = make_transport([requests.ConnectionError("reset"), make_response(200)])
+        assert transport.send("get", "https://example.com/Users").status_code == 200
+
+        transport, session = make_transport([requests.ConnectionError("reset"), make_response(201)])
+        with pytest.raises(requests.ConnectionError):
+            transport.send("post", "https://example.com/Users", json={})
+        assert session.post.call_count == 1
+
+    def test_record_each_attempt(self):
+        """試行ごとにステータスが記録されること"""
+        transport, session = make_transport([make_response(503), make_response(200)])
+        record = MagicMock()
+        transport.send("get", "https://example.com/Users", record=record)
+        assert [call.args[0] for call in record.call_args_list] == [503, 200]
+
+    def test_timeout(self):
+        """タイムアウトは設定した場合のみ渡されること"""
+        transport, session = make_transport([make_response(200)] * 2)
+        transport.send("get", "https://example.com/Users")
+        session.get.assert_called_with("https://example.com/Users")
+
+        transport.timeout = 5
+        transport.send("get", "https://example.com/Users")
+        session.get.assert_called_with("https://example.com/Users", timeout=5)
+
+    def test_keepalive_adapter(self):
+        """プールサイズとTCPキープアライブが設定されること"""
+        transport, session = make_transport([], pool_maxsize=32)
+        adapter = session.mount.call_args.args[1]
+        assert isinstance(adapter, KeepAliveAdapter)
+        assert adapter._pool_maxsize == 32
+        assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) in adapter.poolmanager.connection_pool_kw["socket_options"]
+
+    def test_fake_server_throttle(self, fake_scim_server):
+        """インプロセスSCIMサーバーの429から回復すること"""
+        fake_scim_server.throttle_rate = {"GET /Users": 0.3}
+        fake_scim_server.retry_after = 0
+        tester = ExticSCIMTester(fake_scim_server.base_url, auth_type="bearer", token="test_token", max_retries=10)
+        for _ in range(20):
+            assert tester.get_users() is not None
+        tester.close()
+
+        stats = tester.transport.stats()
+        assert stats["throttled"] > 0
+        assert stats["retries"] == stats["throttled"]
+        assert tester.metrics.histogram("GET /Users", 200).count == 20